@@ -4,6 +4,8 @@ from __future__ import absolute_import
 from __future__ import division
 from __future__ import unicode_literals
 
+import threading
+
 from future.builtins import str
 import psutil
 
@@ -12,7 +14,9 @@ from grr_response_client import client_utils
 from grr_response_client import vfs
 from grr_response_client.client_actions.file_finder_utils import conditions
 from grr_response_client.client_actions.file_finder_utils import globbing
+from grr_response_client.client_actions.file_finder_utils import parallel
 from grr_response_client.client_actions.file_finder_utils import subactions
+from grr_response_core import config
 from grr_response_core.lib import utils
 from grr_response_core.lib.rdfvalues import file_finder as rdf_file_finder
 from grr_response_core.lib.rdfvalues import paths as rdf_paths
@@ -71,20 +75,49 @@ class FileFinderOS(actions.ActionPlugin):
   in_rdfvalue = rdf_file_finder.FileFinderArgs
   out_rdfvalues = [rdf_file_finder.FileFinderResult]
 
+  def __init__(self, grr_worker=None):
+    super(FileFinderOS, self).__init__(grr_worker=grr_worker)
+    # Matches may be processed on multiple threads, which all report progress
+    # and charge the bytes they upload to the session.
+    self._lock = threading.RLock()
+
   def Run(self, args):
     self.stat_cache = utils.StatCache()
 
     action = self._ParseAction(args)
-    for path in GetExpandedPaths(args):
-      self.Progress()
-      try:
-        matches = self._Validate(args, path)
-        result = rdf_file_finder.FileFinderResult()
-        result.matches = matches
-        action.Execute(path, result)
+
+    def ProcessPath(path):
+      return self._ProcessPath(args, action, path)
+
+    # Each worker has at most one file open at a time. Results are sent in the
+    # order of the expanded paths, no matter how many workers are used.
+    results = parallel.OrderedMap(
+        ProcessPath,
+        GetExpandedPaths(args),
+        num_workers=config.CONFIG["Client.file_finder_max_open_files"])
+    for result in results:
+      if result is not None:
         self.SendReply(result)
-      except _SkipFileException:
-        pass
+
+  def _ProcessPath(self, args, action, path):
+    """Returns the `FileFinderResult` for a path or None if it is skipped."""
+    self.Progress()
+    try:
+      matches = self._Validate(args, path)
+      result = rdf_file_finder.FileFinderResult()
+      result.matches = matches
+      action.Execute(path, result)
+      return result
+    except _SkipFileException:
+      return None
+
+  def Progress(self):
+    with self._lock:
+      super(FileFinderOS, self).Progress()
+
+  def ChargeBytesToSession(self, length):
+    with self._lock:
+      super(FileFinderOS, self).ChargeBytesToSession(length)
 
   def _ParseAction(self, args):
     action_type = args.action.action_type
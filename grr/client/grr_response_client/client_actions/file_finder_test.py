@@ -399,6 +399,19 @@ class FileFinderTest(client_test_lib.EmptyActionTest):
     self.assertTrue(stat.S_ISDIR(results[0].stat_entry.st_mode))
     self.assertFalse(results[0].HasField("hash_entry"))
 
+  def testParallelHashActionKeepsResultOrder(self):
+    paths = [self.base_path + "/*"]
+    action = rdf_file_finder.FileFinderAction.Hash()
+
+    expected = self._RunFileFinder(paths, action)
+    with test_lib.ConfigOverrider({"Client.file_finder_max_open_files": 4}):
+      results = self._RunFileFinder(paths, action)
+
+    self.assertEqual(
+        self._GetRelativeResults(results), self._GetRelativeResults(expected))
+    self.assertEqual([result.hash_entry for result in results],
+                     [result.hash_entry for result in expected])
+
   def testDownloadDirectory(self):
     action = rdf_file_finder.FileFinderAction.Download()
     path = os.path.join(self.base_path, "a")
@@ -6,8 +6,12 @@ from __future__ import unicode_literals
 
 import abc
 import collections
+import heapq
+import re
 
 
+from builtins import range  # pylint: disable=redefined-builtin
+from future.utils import iteritems
 from future.utils import with_metaclass
 
 from grr_response_client import streaming
@@ -164,6 +168,7 @@ class ContentCondition(with_metaclass(abc.ABCMeta, object)):
     classes = {
         kind.CONTENTS_LITERAL_MATCH: LiteralMatchCondition,
         kind.CONTENTS_REGEX_MATCH: RegexMatchCondition,
+        kind.CONTENTS_MULTI_MATCH: MultiMatchCondition,
     }
 
     for condition in conditions:
@@ -192,18 +197,20 @@ class ContentCondition(with_metaclass(abc.ABCMeta, object)):
     amount = self.params.length
     for chunk in streamer.StreamFilePath(path, offset=offset, amount=amount):
       for span in chunk.Scan(matcher):
-        ctx_begin = max(span.begin - self.params.bytes_before, 0)
-        ctx_end = min(span.end + self.params.bytes_after, len(chunk.data))
-        ctx_data = chunk.data[ctx_begin:ctx_end]
-
-        yield rdf_client.BufferReference(
-            offset=chunk.offset + ctx_begin,
-            length=len(ctx_data),
-            data=ctx_data)
+        yield self._BufferReference(chunk, span)
 
         if self.params.mode == self.params.Mode.FIRST_HIT:
           return
 
+  def _BufferReference(self, chunk, span):
+    """Returns a `BufferReference` to a match and its context within a chunk."""
+    ctx_begin = max(span.begin - self.params.bytes_before, 0)
+    ctx_end = min(span.end + self.params.bytes_after, len(chunk.data))
+    ctx_data = chunk.data[ctx_begin:ctx_end]
+
+    return rdf_client.BufferReference(
+        offset=chunk.offset + ctx_begin, length=len(ctx_data), data=ctx_data)
+
 
 class LiteralMatchCondition(ContentCondition):
   """A content condition that lookups a literal pattern."""
@@ -231,6 +238,62 @@ class RegexMatchCondition(ContentCondition):
       yield match
 
 
+class MultiMatchCondition(ContentCondition):
+  """A content condition that looks up many literals and regexes at once.
+
+  All patterns are searched for in a single pass over the file. Every match is
+  reported with the id of its pattern. Hits of a single pattern don't overlap,
+  but hits of different patterns may.
+  """
+
+  def __init__(self, params):
+    super(MultiMatchCondition, self).__init__()
+    self.params = params.contents_multi_match
+
+  def Search(self, path):
+    matcher = MultiMatcher(
+        literals=[literal.AsBytes() for literal in self.params.literals],
+        regexes=[regex.SerializeToString() for regex in self.params.regexes])
+    first_hit = self.params.mode == self.params.Mode.FIRST_HIT
+
+    streamer = streaming.Streamer(
+        chunk_size=self.CHUNK_SIZE, overlap_size=self.OVERLAP_SIZE)
+
+    # Offsets (within the file) at which the last hit of every pattern ends.
+    hit_ends = {}
+
+    offset = self.params.start_offset
+    amount = self.params.length
+    for chunk in streamer.StreamFilePath(path, offset=offset, amount=amount):
+      # Regexes are searched for right after their last hit, so that they
+      # don't match the overlap with the previous chunk differently.
+      positions = {}
+      for pattern_id, hit_end in iteritems(hit_ends):
+        if first_hit:
+          positions[pattern_id] = len(chunk.data)
+        else:
+          positions[pattern_id] = max(0, hit_end - chunk.offset)
+
+      for hit in matcher.Scan(chunk.data, positions=positions):
+        # Hits within the overlap-only zone were seen in the previous chunk.
+        if hit.span.end <= chunk.overlap:
+          continue
+
+        hit_end = hit_ends.get(hit.pattern_id)
+        if hit_end is not None:
+          if first_hit or chunk.offset + hit.span.begin < hit_end:
+            continue
+
+        hit_ends[hit.pattern_id] = chunk.offset + hit.span.end
+
+        result = self._BufferReference(chunk, hit.span)
+        result.pattern_id = hit.pattern_id
+        yield result
+
+        if first_hit and len(hit_ends) == matcher.pattern_count:
+          return
+
+
 class Matcher(with_metaclass(abc.ABCMeta, object)):
   """An abstract class for objects able to lookup byte strings."""
 
@@ -290,3 +353,156 @@ class LiteralMatcher(Matcher):
       return None
 
     return Matcher.Span(begin=offset, end=offset + len(self.literal))
+
+
+class MultiMatcher(object):
+  """Looks up many literals and regular expressions in a single pass.
+
+  Literals are compiled into a trie, which is turned into a single regular
+  expression that doesn't backtrack over alternatives with a common prefix.
+  This way every byte of the data is looked at once for all literals instead
+  of once per literal. Regular expressions are searched for one by one, since
+  joining them into one alternation would break backreferences and named
+  groups.
+
+  Patterns are identified by their index: literals come first, followed by the
+  regular expressions. Empty patterns never match.
+
+  Args:
+    literals: A list of byte strings to search for.
+    regexes: A list of byte string regular expressions to search for.
+
+  Attributes:
+    pattern_count: The number of non-empty patterns.
+  """
+
+  Hit = collections.namedtuple("Hit", ["pattern_id", "span"])  # pylint: disable=invalid-name
+
+  # Flags used by `RegularExpression` RDF values.
+  _REGEX_FLAGS = re.I | re.S | re.M
+
+  def __init__(self, literals=None, regexes=None):
+    literals = literals or []
+    regexes = regexes or []
+
+    self._trie = {}
+    for pattern_id, literal in enumerate(literals):
+      if not literal:
+        continue
+
+      node = self._trie
+      for i in range(len(literal)):
+        node = node.setdefault(literal[i:i + 1], {})
+      node.setdefault(None, []).append(pattern_id)
+
+    self._literals_regex = None
+    if self._trie:
+      self._literals_regex = re.compile(_TrieRegex(self._trie))
+
+    # Pairs of pattern ids and compiled regular expressions.
+    self._regexes = []
+    for i, regex in enumerate(regexes):
+      if regex:
+        pattern_id = len(literals) + i
+        self._regexes.append((pattern_id, re.compile(regex, self._REGEX_FLAGS)))
+
+    self.pattern_count = len([literal for literal in literals if literal])
+    self.pattern_count += len(self._regexes)
+
+  def Scan(self, data, positions=None):
+    """Finds all hits of all patterns within the data.
+
+    Hits are found lazily, so that callers can stop early without searching
+    the rest of the data.
+
+    Args:
+      data: A byte string to search.
+      positions: An optional dict mapping ids of regular expressions to the
+        positions at which searching for them starts.
+
+    Yields:
+      `Hit` objects sorted by their position and pattern id. Hits of the same
+      regular expression don't overlap, hits of the same literal may.
+    """
+    positions = positions or {}
+
+    # All iterators yield (position, pattern id, hit) tuples, so that they can
+    # be merged.
+    iterators = []
+    if self._literals_regex is not None:
+      iterators.append(self._ScanLiterals(data))
+    for pattern_id, regex in self._regexes:
+      position = positions.get(pattern_id, 0)
+      iterators.append(self._ScanRegex(pattern_id, regex, data, position))
+
+    for _, _, hit in heapq.merge(*iterators):
+      yield hit
+
+  def _ScanLiterals(self, data):
+    """Yields hits of all literals, starting at every position."""
+    position = 0
+    while True:
+      match = self._literals_regex.search(data, position)
+      if match is None:
+        return
+
+      for hit in sorted(self._LiteralHits(data, match.start())):
+        yield hit.span.begin, hit.pattern_id, hit
+      position = match.start() + 1
+
+  def _ScanRegex(self, pattern_id, regex, data, position):
+    """Yields non-overlapping hits of a regex, like `Chunk.Scan` does."""
+    while position <= len(data):
+      match = regex.search(data, position)
+      if match is None:
+        return
+
+      if match.end() > match.start():
+        span = Matcher.Span(begin=match.start(), end=match.end())
+        yield span.begin, pattern_id, self.Hit(pattern_id=pattern_id, span=span)
+        position = match.end()
+      else:
+        # Empty matches are not reported.
+        position = match.start() + 1
+
+  def _LiteralHits(self, data, begin):
+    """Yields hits of all literals that start at a given position."""
+    node = self._trie
+    position = begin
+    while node is not None:
+      for pattern_id in node.get(None, []):
+        if position > begin:
+          yield self.Hit(
+              pattern_id=pattern_id,
+              span=Matcher.Span(begin=begin, end=position))
+
+      node = node.get(data[position:position + 1])
+      position += 1
+
+
+def _TrieRegex(node):
+  """Returns a byte string regular expression matching all words of a trie."""
+  # Chains of nodes without branches are turned into plain byte strings, so
+  # that the recursion depth only depends on the number of branches.
+  prefix = []
+  while len(node) == 1 and None not in node:
+    (char, node), = node.items()
+    prefix.append(re.escape(char))
+
+  alternatives = [
+      re.escape(char) + _TrieRegex(child)
+      for char, child in sorted(
+          (char, child) for char, child in node.items() if char is not None)
+  ]
+
+  if not alternatives:
+    suffix = b""
+  elif len(alternatives) == 1:
+    suffix = b"(?:" + alternatives[0] + b")"
+  else:
+    suffix = b"(?:" + b"|".join(alternatives) + b")"
+
+  if suffix and None in node:
+    suffix += b"?"
+
+  return b"".join(prefix) + suffix
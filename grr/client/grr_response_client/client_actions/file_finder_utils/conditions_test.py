@@ -110,6 +110,80 @@ class LiteralMatcherTest(absltest.TestCase):
     self.assertFalse(span)
 
 
+class MultiMatcherTest(absltest.TestCase):
+
+  def _Hits(self, matcher, data, positions=None):
+    return [(hit.pattern_id, hit.span.begin, hit.span.end)
+            for hit in matcher.Scan(data, positions=positions)]
+
+  def testNoHits(self):
+    matcher = conditions.MultiMatcher(literals=[b"foo"], regexes=[b"ba+r"])
+
+    self.assertEqual(self._Hits(matcher, b"quux norf"), [])
+
+  def testLiterals(self):
+    matcher = conditions.MultiMatcher(literals=[b"foo", b"bar", b"x.y"])
+
+    hits = self._Hits(matcher, b"bar foo xzy x.y")
+    self.assertEqual(hits, [(1, 0, 3), (0, 4, 7), (2, 12, 15)])
+
+  def testLiteralsWithCommonPrefix(self):
+    matcher = conditions.MultiMatcher(literals=[b"foobar", b"foo", b"fo"])
+
+    hits = self._Hits(matcher, b"foobar foo")
+    self.assertEqual(hits, [(0, 0, 6), (1, 0, 3), (2, 0, 2), (1, 7, 10),
+                            (2, 7, 9)])
+
+  def testLiteralsAreCaseSensitive(self):
+    matcher = conditions.MultiMatcher(literals=[b"foo"])
+
+    self.assertEqual(self._Hits(matcher, b"FOO foo"), [(0, 4, 7)])
+
+  def testRegexes(self):
+    matcher = conditions.MultiMatcher(regexes=[b"ba+r", b"[0-9]{2}"])
+
+    hits = self._Hits(matcher, b"BAAR 42")
+    self.assertEqual(hits, [(0, 0, 4), (1, 5, 7)])
+
+  def testRegexIdsFollowLiteralIds(self):
+    matcher = conditions.MultiMatcher(literals=[b"foo"], regexes=[b"o+b"])
+
+    hits = self._Hits(matcher, b"foob")
+    self.assertEqual(hits, [(0, 0, 3), (1, 1, 4)])
+
+  def testRegexesWithBackreferences(self):
+    matcher = conditions.MultiMatcher(regexes=[b"(a)\\1", b"(b)\\1"])
+
+    hits = self._Hits(matcher, b"ab aa bb")
+    self.assertEqual(hits, [(0, 3, 5), (1, 6, 8)])
+
+  def testRegexesWithSameGroupNames(self):
+    matcher = conditions.MultiMatcher(
+        regexes=[b"(?P<x>[0-9]+)", b"(?P<x>[a-z]+)"])
+
+    hits = self._Hits(matcher, b"12 ab")
+    self.assertEqual(hits, [(0, 0, 2), (1, 3, 5)])
+
+  def testRegexHitsDoNotOverlap(self):
+    matcher = conditions.MultiMatcher(regexes=[b"[a-z]+", b"a*"])
+
+    hits = self._Hits(matcher, b"a" * 1024 * 1024 + b" b")
+    self.assertEqual(hits, [(0, 0, 1024 * 1024), (1, 0, 1024 * 1024),
+                            (0, 1024 * 1024 + 1, 1024 * 1024 + 2)])
+
+  def testScanStartsAtGivenPositions(self):
+    matcher = conditions.MultiMatcher(regexes=[b"[a-z]+", b"[0-9]+"])
+
+    hits = self._Hits(matcher, b"abc 123", positions={0: 1, 1: 5})
+    self.assertEqual(hits, [(0, 1, 3), (1, 5, 7)])
+
+  def testEmptyPatternsAreNotCounted(self):
+    matcher = conditions.MultiMatcher(literals=[b"", b"foo"], regexes=[b""])
+
+    self.assertEqual(matcher.pattern_count, 1)
+    self.assertEqual(self._Hits(matcher, b"foo"), [(1, 0, 3)])
+
+
 class ConditionTestMixin(object):
 
   def setUp(self):
@@ -555,6 +629,108 @@ class RegexMatchCondition(ConditionTestMixin, absltest.TestCase):
     self.assertEqual(results[0].length, 4)
 
 
+class MultiMatchConditionTest(ConditionTestMixin, absltest.TestCase):
+
+  def _Condition(self, literals=(), regexes=(), **kwargs):
+    params = rdf_file_finder.FileFinderCondition.ContentsMultiMatch(
+        literals=list(literals), regexes=list(regexes), **kwargs)
+    return conditions.MultiMatchCondition(params)
+
+  def testNoHits(self):
+    with open(self.temp_filepath, "wb") as fd:
+      fd.write("foo bar quux")
+
+    condition = self._Condition(literals=[b"baz"], regexes=["no+rf"])
+
+    results = list(condition.Search(self.temp_filepath))
+    self.assertFalse(results)
+
+  def testAllHits(self):
+    with open(self.temp_filepath, "wb") as fd:
+      fd.write("foo bar foo baaar")
+
+    condition = self._Condition(
+        literals=[b"foo", b"bar"], regexes=["ba+r"], mode="ALL_HITS")
+
+    results = list(condition.Search(self.temp_filepath))
+    hits = [(result.pattern_id, result.offset, result.data)
+            for result in results]
+    self.assertEqual(hits, [(0, 0, "foo"), (1, 4, "bar"), (2, 4, "bar"),
+                            (0, 8, "foo"), (2, 12, "baaar")])
+
+  def testHitsOfSamePatternDoNotOverlap(self):
+    with open(self.temp_filepath, "wb") as fd:
+      fd.write("oooo")
+
+    condition = self._Condition(
+        literals=[b"oo"], regexes=["o+"], mode="ALL_HITS")
+
+    results = list(condition.Search(self.temp_filepath))
+    hits = [(result.pattern_id, result.offset, result.length)
+            for result in results]
+    self.assertEqual(hits, [(0, 0, 2), (1, 0, 4), (0, 2, 2)])
+
+  def testFirstHit(self):
+    with open(self.temp_filepath, "wb") as fd:
+      fd.write("bar foo baz foo bar")
+
+    condition = self._Condition(
+        literals=[b"foo", b"bar"], mode="FIRST_HIT")
+
+    results = list(condition.Search(self.temp_filepath))
+    hits = [(result.pattern_id, result.offset) for result in results]
+    self.assertEqual(hits, [(1, 0), (0, 4)])
+
+  def testContext(self):
+    with open(self.temp_filepath, "wb") as fd:
+      fd.write("foobarbaz")
+
+    condition = self._Condition(
+        literals=[b"bar"], mode="ALL_HITS", bytes_before=2, bytes_after=1)
+
+    results = list(condition.Search(self.temp_filepath))
+    self.assertLen(results, 1)
+    self.assertEqual(results[0].data, "oobarb")
+    self.assertEqual(results[0].offset, 1)
+    self.assertEqual(results[0].length, 6)
+
+  def testHitsAcrossChunks(self):
+    with open(self.temp_filepath, "wb") as fd:
+      fd.write("xxxxxfooxxxxfooxxfoo")
+
+    condition = self._Condition(literals=[b"foo"], mode="ALL_HITS")
+
+    with utils.MultiStubber((conditions.ContentCondition, "CHUNK_SIZE", 8),
+                            (conditions.ContentCondition, "OVERLAP_SIZE", 4)):
+      results = list(condition.Search(self.temp_filepath))
+
+    self.assertEqual([result.offset for result in results], [5, 12, 17])
+
+  def testGreedyRegexOverLargeFile(self):
+    with open(self.temp_filepath, "wb") as fd:
+      fd.write(b"a" * 1024 * 1024 + b" b")
+
+    condition = self._Condition(regexes=["[a-z]+"], mode="ALL_HITS")
+
+    results = list(condition.Search(self.temp_filepath))
+    hits = [(result.offset, result.length) for result in results]
+    self.assertEqual(hits, [(0, 1024 * 1024), (1024 * 1024 + 1, 1)])
+
+  def testRegexHitsAcrossChunks(self):
+    with open(self.temp_filepath, "wb") as fd:
+      fd.write("aaaaaaaaaaaa")
+
+    condition = self._Condition(regexes=["a+"], mode="ALL_HITS")
+
+    with utils.MultiStubber((conditions.ContentCondition, "CHUNK_SIZE", 8),
+                            (conditions.ContentCondition, "OVERLAP_SIZE", 4)):
+      results = list(condition.Search(self.temp_filepath))
+
+    # Hits are cut at chunk boundaries, but don't overlap.
+    hits = [(result.offset, result.length) for result in results]
+    self.assertEqual(hits, [(0, 8), (8, 4)])
+
+
 def main(argv):
   test_lib.main(argv)
 
@@ -0,0 +1,112 @@
+#!/usr/bin/env python
+"""Utilities for processing file-finder matches in parallel."""
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import unicode_literals
+
+import collections
+import sys
+import threading
+
+
+from builtins import range  # pylint: disable=redefined-builtin
+from future.utils import raise_
+import queue
+
+
+class _Task(object):
+  """A single application of a function to an item."""
+
+  def __init__(self, item):
+    self.item = item
+    self._done = threading.Event()
+    self._value = None
+    self._exc_info = None
+
+  def Run(self, func):
+    try:
+      self._value = func(self.item)
+    except Exception:  # pylint: disable=broad-except
+      self._exc_info = sys.exc_info()
+    finally:
+      self._done.set()
+
+  def Cancel(self):
+    self._done.set()
+
+  def Done(self):
+    return self._done.is_set()
+
+  def Get(self):
+    """Waits for the task to finish and returns its result."""
+    self._done.wait()
+    if self._exc_info is not None:
+      raise_(*self._exc_info)
+    return self._value
+
+
+def OrderedMap(func, items, num_workers):
+  """Applies a function to items using a bounded number of threads.
+
+  This behaves like a lazy `map(func, items)`: results are yielded in the order
+  of the input items and an exception raised for an item is raised when its
+  result would be yielded. No new items are processed after that.
+
+  At most `num_workers` items are processed at the same time and at most twice
+  as many items are taken from the input before their results are consumed,
+  so `items` may be a long running generator.
+
+  Args:
+    func: A function to apply to every item.
+    items: An iterable of items.
+    num_workers: The maximum number of items processed concurrently. If it is 1
+      or less, the items are processed sequentially on the calling thread.
+
+  Yields:
+    Results of `func` for all items.
+  """
+  if num_workers <= 1:
+    for item in items:
+      yield func(item)
+    return
+
+  tasks = queue.Queue()
+  stop = threading.Event()
+
+  def Worker():
+    while True:
+      task = tasks.get()
+      if task is None:
+        return
+
+      if stop.is_set():
+        task.Cancel()
+      else:
+        task.Run(func)
+
+  workers = []
+  for _ in range(num_workers):
+    worker = threading.Thread(target=Worker, name="OrderedMapWorker")
+    worker.daemon = True
+    worker.start()
+    workers.append(worker)
+
+  pending = collections.deque()
+  try:
+    for item in items:
+      task = _Task(item)
+      tasks.put(task)
+      pending.append(task)
+
+      while pending and (pending[0].Done() or
+                         len(pending) >= 2 * num_workers):
+        yield pending.popleft().Get()
+
+    while pending:
+      yield pending.popleft().Get()
+  finally:
+    stop.set()
+    for _ in workers:
+      tasks.put(None)
+    for worker in workers:
+      worker.join()
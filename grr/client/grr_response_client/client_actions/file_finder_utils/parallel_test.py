@@ -0,0 +1,92 @@
+#!/usr/bin/env python
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import unicode_literals
+
+import random
+import threading
+import time
+
+from absl.testing import absltest
+from builtins import range  # pylint: disable=redefined-builtin
+
+from grr_response_client.client_actions.file_finder_utils import parallel
+
+
+class OrderedMapTest(absltest.TestCase):
+
+  def testSequential(self):
+    threads = set()
+
+    def Func(item):
+      threads.add(threading.current_thread())
+      return item * 2
+
+    results = list(parallel.OrderedMap(Func, range(10), num_workers=1))
+
+    self.assertEqual(results, [item * 2 for item in range(10)])
+    self.assertEqual(threads, {threading.current_thread()})
+
+  def testResultsAreOrdered(self):
+
+    def Func(item):
+      time.sleep(random.random() / 100)
+      return item * 2
+
+    results = list(parallel.OrderedMap(Func, range(100), num_workers=8))
+
+    self.assertEqual(results, [item * 2 for item in range(100)])
+
+  def testConcurrencyIsBounded(self):
+    lock = threading.Lock()
+    running = [0]
+    max_running = [0]
+
+    def Func(item):
+      with lock:
+        running[0] += 1
+        max_running[0] = max(max_running[0], running[0])
+      time.sleep(0.01)
+      with lock:
+        running[0] -= 1
+      return item
+
+    results = list(parallel.OrderedMap(Func, range(50), num_workers=3))
+
+    self.assertEqual(results, list(range(50)))
+    self.assertLessEqual(max_running[0], 3)
+
+  def testInputIsConsumedLazily(self):
+    consumed = []
+
+    def Items():
+      for item in range(100):
+        consumed.append(item)
+        yield item
+
+    results = parallel.OrderedMap(lambda item: item, Items(), num_workers=2)
+    self.assertEqual(next(results), 0)
+    self.assertLessEqual(len(consumed), 4)
+    results.close()
+
+  def testExceptionsAreRaisedInOrder(self):
+    processed = []
+
+    def Func(item):
+      if item == 5:
+        raise ValueError("foo")
+      processed.append(item)
+      return item
+
+    results = []
+    with self.assertRaisesRegexp(ValueError, "foo"):
+      for result in parallel.OrderedMap(Func, range(1000), num_workers=4):
+        results.append(result)
+
+    self.assertEqual(results, list(range(5)))
+    # Items taken from the input after the failing one are not processed.
+    self.assertLess(len(processed), 20)
+
+
+if __name__ == "__main__":
+  absltest.main()
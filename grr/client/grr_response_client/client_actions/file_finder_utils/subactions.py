@@ -139,6 +139,8 @@ class DownloadAction(Action):
     chunk_size = self.opts.chunk_size
 
     uploader = uploading.TransferStoreUploader(self.flow, chunk_size=chunk_size)
+    if self.opts.hash_first:
+      return uploader.HashFilePath(filepath, amount=max_size)
     return uploader.UploadFilePath(filepath, amount=max_size)
 
 
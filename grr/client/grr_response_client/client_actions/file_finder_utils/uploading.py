@@ -5,9 +5,10 @@ from __future__ import division
 from __future__ import unicode_literals
 
 import hashlib
-import zlib
 
+from grr_response_client import client_utils_common
 from grr_response_client import streaming
+from grr_response_core.lib import compression
 from grr_response_core.lib import rdfvalue
 from grr_response_core.lib.rdfvalues import client_fs as rdf_client_fs
 from grr_response_core.lib.rdfvalues import protodict as rdf_protodict
@@ -16,8 +17,9 @@ from grr_response_core.lib.rdfvalues import protodict as rdf_protodict
 class TransferStoreUploader(object):
   """An utility class for uploading chunked files to the server.
 
-  Input is divided into chunks, then these chunks are compressed (using zlib)
-  and then they are uploaded to the transfer store (a well-known flow).
+  Input is divided into chunks, then these chunks are compressed (unless they
+  don't look compressible) and then they are uploaded to the transfer store (a
+  well-known flow).
   """
 
   DEFAULT_CHUNK_SIZE = 512 * 1024
@@ -59,6 +61,37 @@ class TransferStoreUploader(object):
     return rdf_client_fs.BlobImageDescriptor(
         chunks=chunks, chunk_size=self._streamer.chunk_size)
 
+  def HashFilePath(self, filepath, offset=0, amount=None):
+    """Describes chunks of a file on a given path without uploading them.
+
+    The returned descriptor has the same chunks `UploadFilePath` would upload,
+    so the server can check which of them it already has and request only the
+    missing ones.
+
+    Args:
+      filepath: A path to the file to hash.
+      offset: An integer offset at which the file hashing should start on.
+      amount: An upper bound on number of bytes to stream. If it is `None` then
+          the whole file is hashed.
+
+    Returns:
+      A `BlobImageDescriptor` object.
+    """
+    chunk_stream = self._streamer.StreamFilePath(
+        filepath, offset=offset, amount=amount)
+
+    chunks = []
+    for chunk in chunk_stream:
+      self._action.Progress()
+      chunks.append(
+          rdf_client_fs.BlobImageChunkDescriptor(
+              digest=hashlib.sha256(chunk.data).digest(),
+              offset=chunk.offset,
+              length=len(chunk.data)))
+
+    return rdf_client_fs.BlobImageDescriptor(
+        chunks=chunks, chunk_size=self._streamer.chunk_size)
+
   def UploadChunk(self, chunk):
     """Uploads a single chunk to the transfer store flow.
 
@@ -74,12 +107,15 @@ class TransferStoreUploader(object):
     self._action.SendReply(blob, session_id=self._TRANSFER_STORE_SESSION_ID)
 
     return rdf_client_fs.BlobImageChunkDescriptor(
-        digest=hashlib.sha256(chunk.data).digest(),
+        digest=blob.digest,
         offset=chunk.offset,
         length=len(chunk.data))
 
 
 def _CompressedDataBlob(chunk):
+  compression_type, data = compression.Compress(
+      chunk.data, client_utils_common.CompressionType())
   return rdf_protodict.DataBlob(
-      data=zlib.compress(chunk.data),
-      compression=rdf_protodict.DataBlob.CompressionType.ZCOMPRESSION)
+      data=data,
+      compression=compression_type,
+      digest=hashlib.sha256(chunk.data).digest())
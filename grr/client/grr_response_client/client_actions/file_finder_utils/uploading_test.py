@@ -5,12 +5,14 @@ from __future__ import unicode_literals
 
 import collections
 import hashlib
+import os
 import zlib
 
 from absl.testing import absltest
 import mock
 
 from grr_response_client.client_actions.file_finder_utils import uploading
+from grr_response_core.lib.rdfvalues import protodict as rdf_protodict
 from grr.test_lib import temp
 
 
@@ -133,6 +135,48 @@ class UploaderTest(absltest.TestCase):
       self.assertEqual(blobdesc.chunks[2].length, 1)
       self.assertEqual(blobdesc.chunks[2].digest, Sha256("6"))
 
+  def testIncompressibleChunks(self):
+    action = FakeAction()
+    uploader = uploading.TransferStoreUploader(action, chunk_size=128 * 1024)
+
+    data = os.urandom(128 * 1024) + b"foo"
+    with temp.AutoTempFilePath() as temp_filepath:
+      with open(temp_filepath, "wb") as temp_file:
+        temp_file.write(data)
+
+      uploader.UploadFilePath(temp_filepath)
+
+      ct = rdf_protodict.DataBlob.CompressionType
+      self.assertLen(action.messages, 2)
+      self.assertEqual(action.messages[0].item.compression, ct.UNCOMPRESSED)
+      self.assertEqual(action.messages[0].item.data, data[:128 * 1024])
+      self.assertEqual(action.messages[0].item.digest,
+                       Sha256(data[:128 * 1024]))
+      self.assertEqual(action.messages[1].item.compression, ct.ZCOMPRESSION)
+      self.assertEqual(action.messages[1].item.data, zlib.compress(b"foo"))
+
+  def testHashFilePath(self):
+    action = FakeAction()
+    uploader = uploading.TransferStoreUploader(action, chunk_size=3)
+
+    with temp.AutoTempFilePath() as temp_filepath:
+      with open(temp_filepath, "w") as temp_file:
+        temp_file.write("1234567")
+
+      blobdesc = uploader.HashFilePath(temp_filepath, offset=1)
+
+      self.assertEqual(action.charged_bytes, 0)
+      self.assertEmpty(action.messages)
+
+      self.assertLen(blobdesc.chunks, 2)
+      self.assertEqual(blobdesc.chunk_size, 3)
+      self.assertEqual(blobdesc.chunks[0].offset, 1)
+      self.assertEqual(blobdesc.chunks[0].length, 3)
+      self.assertEqual(blobdesc.chunks[0].digest, Sha256("234"))
+      self.assertEqual(blobdesc.chunks[1].offset, 4)
+      self.assertEqual(blobdesc.chunks[1].length, 3)
+      self.assertEqual(blobdesc.chunks[1].digest, Sha256("567"))
+
   def testIncorrectFile(self):
     action = FakeAction()
     uploader = uploading.TransferStoreUploader(action, chunk_size=10)
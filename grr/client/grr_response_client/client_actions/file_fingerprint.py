@@ -4,10 +4,12 @@ from __future__ import absolute_import
 from __future__ import division
 from __future__ import unicode_literals
 
+import binascii
 import hashlib
 
 
 from grr_response_core.lib import fingerprint
+from grr_response_client import hash_cache
 from grr_response_client import vfs
 from grr_response_client.client_actions import standard
 from grr_response_core.lib.rdfvalues import client_action as rdf_client_action
@@ -47,9 +49,6 @@ class FingerprintFile(standard.ReadBuffer):
     """Fingerprint a file."""
     with vfs.VFSOpen(
         args.pathspec, progress_callback=self.Progress) as file_obj:
-      fingerprinter = Fingerprinter(self.Progress, file_obj)
-      response = rdf_client_action.FingerprintResponse()
-      response.pathspec = file_obj.pathspec
       if args.tuples:
         tuples = args.tuples
       else:
@@ -58,40 +57,66 @@ class FingerprintFile(standard.ReadBuffer):
         for k in self._fingerprint_types:
           tuples.append(rdf_client_action.FingerprintTuple(fp_type=k))
 
-      for finger in tuples:
-        hashers = [self._hash_types[h] for h in finger.hashers] or None
-        if finger.fp_type in self._fingerprint_types:
-          invoke = self._fingerprint_types[finger.fp_type]
-          res = invoke(fingerprinter, hashers)
-          if res:
-            response.matching_types.append(finger.fp_type)
-        else:
-          raise RuntimeError(
-              "Encountered unknown fingerprint type. %s" % finger.fp_type)
-
-      # Structure of the results is a list of dicts, each containing the
-      # name of the hashing method, hashes for enabled hash algorithms,
-      # and auxilliary data where present (e.g. signature blobs).
-      # Also see Fingerprint:HashIt()
-      response.results = fingerprinter.HashIt()
-
-      # We now return data in a more structured form.
-      for result in response.results:
-        if result.GetItem("name") == "generic":
-          for hash_type in ["md5", "sha1", "sha256"]:
-            value = result.GetItem(hash_type)
-            if value is not None:
-              setattr(response.hash, hash_type, value)
-
-        if result["name"] == "pecoff":
-          for hash_type in ["md5", "sha1", "sha256"]:
-            value = result.GetItem(hash_type)
-            if value:
-              setattr(response.hash, "pecoff_" + hash_type, value)
-
-          signed_data = result.GetItem("SignedData", [])
-          for data in signed_data:
-            response.hash.signed_data.Append(
-                revision=data[0], cert_type=data[1], certificate=data[2])
+      cache = hash_cache.GetHashCache()
+      key = None
+      if cache is not None:
+        context = "FingerprintFile:%s" % binascii.hexlify(b"".join(
+            finger.SerializeToString() for finger in tuples)).decode("ascii")
+        key, value = cache.Lookup(file_obj, context)
+        if value is not None:
+          response = rdf_client_action.FingerprintResponse.FromSerializedString(
+              value)
+          response.pathspec = file_obj.pathspec
+          response.hash.from_cache = True
+          self.SendReply(response)
+          return
+
+      response = self._Fingerprint(file_obj, tuples)
+      if key is not None:
+        cache.Store(file_obj, key, response.SerializeToString())
 
+      response.pathspec = file_obj.pathspec
       self.SendReply(response)
+
+  def _Fingerprint(self, file_obj, tuples):
+    """Returns a `FingerprintResponse` without a pathspec for a file."""
+    fingerprinter = Fingerprinter(self.Progress, file_obj)
+    response = rdf_client_action.FingerprintResponse()
+
+    for finger in tuples:
+      hashers = [self._hash_types[h] for h in finger.hashers] or None
+      if finger.fp_type in self._fingerprint_types:
+        invoke = self._fingerprint_types[finger.fp_type]
+        res = invoke(fingerprinter, hashers)
+        if res:
+          response.matching_types.append(finger.fp_type)
+      else:
+        raise RuntimeError(
+            "Encountered unknown fingerprint type. %s" % finger.fp_type)
+
+    # Structure of the results is a list of dicts, each containing the
+    # name of the hashing method, hashes for enabled hash algorithms,
+    # and auxilliary data where present (e.g. signature blobs).
+    # Also see Fingerprint:HashIt()
+    response.results = fingerprinter.HashIt()
+
+    # We now return data in a more structured form.
+    for result in response.results:
+      if result.GetItem("name") == "generic":
+        for hash_type in ["md5", "sha1", "sha256"]:
+          value = result.GetItem(hash_type)
+          if value is not None:
+            setattr(response.hash, hash_type, value)
+
+      if result["name"] == "pecoff":
+        for hash_type in ["md5", "sha1", "sha256"]:
+          value = result.GetItem(hash_type)
+          if value:
+            setattr(response.hash, "pecoff_" + hash_type, value)
+
+        signed_data = result.GetItem("SignedData", [])
+        for data in signed_data:
+          response.hash.signed_data.Append(
+              revision=data[0], cert_type=data[1], certificate=data[2])
+
+    return response
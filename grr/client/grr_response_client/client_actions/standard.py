@@ -16,7 +16,6 @@ import platform
 import socket
 import sys
 import time
-import zlib
 
 
 import psutil
@@ -28,6 +27,7 @@ from grr_response_client import client_utils_common
 from grr_response_client import vfs
 from grr_response_client.client_actions import tempfiles
 from grr_response_core import config
+from grr_response_core.lib import compression
 from grr_response_core.lib import constants
 from grr_response_core.lib import flags
 from grr_response_core.lib import rdfvalue
@@ -88,12 +88,13 @@ class TransferBuffer(actions.ActionPlugin):
         args.offset,
         args.length,
         progress_callback=self.Progress)
-    result = rdf_protodict.DataBlob(
-        data=zlib.compress(data),
-        compression=rdf_protodict.DataBlob.CompressionType.ZCOMPRESSION)
-
     digest = hashlib.sha256(data).digest()
 
+    compression_type, compressed_data = compression.Compress(
+        data, client_utils_common.CompressionType())
+    result = rdf_protodict.DataBlob(
+        data=compressed_data, compression=compression_type, digest=digest)
+
     # Ensure that the buffer is counted against this response. Check network
     # send limit.
     self.ChargeBytesToSession(len(data))
@@ -15,8 +15,10 @@ import time
 
 from future.utils import itervalues
 
+from grr_response_client import hash_cache
 from grr_response_client.local import binary_whitelist
 from grr_response_core import config
+from grr_response_core.lib import compression
 from grr_response_core.lib import constants
 from grr_response_core.lib.rdfvalues import crypto as rdf_crypto
 
@@ -203,6 +205,43 @@ def IsExecutionWhitelisted(cmd, args):
   return False
 
 
+# The compression types the server advertised it can decompress. zlib is
+# understood by all servers.
+_server_compression_types = frozenset([compression.ZCOMPRESSION])
+# Names of configured compression schemes that were found to be unavailable.
+_unavailable_compression_names = set()
+
+
+def SetServerCompressionTypes(compression_types):
+  """Records the `CompressionType` values the server can decompress."""
+  global _server_compression_types
+  _server_compression_types = frozenset(
+      [compression.ZCOMPRESSION] + [int(t) for t in compression_types])
+
+
+def CompressionType():
+  """Returns the `CompressionType` configured for data sent to the server.
+
+  Compression schemes other than zlib are only used once the server advertised
+  that it supports them. If the configured compression scheme is not available
+  on this client, zlib is used instead.
+  """
+  name = config.CONFIG["Client.compression"]
+  try:
+    compression_type = compression.GetCodecByName(name).compression_type
+  except compression.UnsupportedCompressionError:
+    if name not in _unavailable_compression_names:
+      _unavailable_compression_names.add(name)
+      logging.warning("Compression scheme %s is not available, using zlib.",
+                      name)
+    return compression.ZCOMPRESSION
+
+  if compression_type not in _server_compression_types:
+    return compression.ZCOMPRESSION
+
+  return compression_type
+
+
 class MultiHasher(object):
   """An utility class that is able to applies multiple hash algorithms.
 
@@ -211,6 +250,9 @@ class MultiHasher(object):
   boilerplate associated with it and provides a readable API similar to the one
   exposed by Python's `hashlib` module.
 
+  Hashes of whole local files are taken from the client's hash cache if it is
+  enabled and the file hasn't changed since it was last hashed.
+
   Args:
     algorithms: List of names of the algorithms from the `hashlib` module that
       need to be applied.
@@ -226,6 +268,7 @@ class MultiHasher(object):
     for algorithm in algorithms:
       self._hashers[algorithm] = hashlib.new(algorithm)
     self._bytes_read = 0
+    self._cached_hash = None
 
     self._progress = progress
 
@@ -246,6 +289,18 @@ class MultiHasher(object):
       fd: A file object that is going to be fed to the hashers.
       byte_count: A maximum number of bytes that are going to be processed.
     """
+    cache = hash_cache.GetHashCache()
+    key = None
+    # The cache can only be used if the file is all that is hashed.
+    if cache is not None and not self._bytes_read and not self._cached_hash:
+      context = "MultiHasher:%s:%d" % (",".join(sorted(self._hashers)),
+                                       byte_count)
+      key, value = cache.Lookup(fd, context)
+      if value is not None:
+        self._cached_hash = rdf_crypto.Hash.FromSerializedString(value)
+        self._cached_hash.from_cache = True
+        return
+
     while byte_count > 0:
       buf_size = min(byte_count, constants.CLIENT_MAX_BUFFER_SIZE)
       buf = fd.read(buf_size)
@@ -255,12 +310,21 @@ class MultiHasher(object):
       self.HashBuffer(buf)
       byte_count -= buf_size
 
+    if key is not None:
+      cache.Store(fd, key, self.GetHashObject().SerializeToString())
+
   def HashBuffer(self, buf):
     """Updates underlying hashers with a given buffer.
 
     Args:
       buf: A byte buffer (string object) that is going to be fed to the hashers.
+
+    Raises:
+      ValueError: If the hashes were taken from the hash cache.
     """
+    if self._cached_hash:
+      raise ValueError("Can't hash more data after a hash cache hit.")
+
     for hasher in itervalues(self._hashers):
       hasher.update(buf)
       if self._progress:
@@ -270,6 +334,9 @@ class MultiHasher(object):
 
   def GetHashObject(self):
     """Returns a `Hash` object with appropriate fields filled-in."""
+    if self._cached_hash:
+      return self._cached_hash.Copy()
+
     hash_object = rdf_crypto.Hash()
     hash_object.num_bytes = self._bytes_read
     for algorithm in self._hashers:
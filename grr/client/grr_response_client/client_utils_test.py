@@ -7,6 +7,7 @@ from __future__ import unicode_literals
 
 import hashlib
 import imp
+import logging
 import os
 import sys
 
@@ -15,7 +16,9 @@ import mock
 
 from grr_response_client import client_utils_common
 from grr_response_client import client_utils_osx
+from grr_response_core.lib import compression
 from grr_response_core.lib import flags
+from grr_response_core.lib import utils
 from grr.test_lib import temp
 from grr.test_lib import test_lib
 
@@ -129,6 +132,54 @@ class OSXVersionTests(test_lib.GRRBaseTest):
     self.assertEqual(osversion.VersionString(), "10.8.1")
 
 
+class CompressionTypeTest(test_lib.GRRBaseTest):
+
+  def setUp(self):
+    super(CompressionTypeTest, self).setUp()
+    # The lz4 package is optional, the codec is made available regardless.
+    codecs = dict(compression._CODECS)
+    codecs[compression.LZ4COMPRESSION] = compression.Lz4Codec()
+    for name, value in [
+        ("_server_compression_types",
+         frozenset([compression.ZCOMPRESSION])),
+        ("_unavailable_compression_names", set()),
+    ]:
+      stubber = utils.Stubber(client_utils_common, name, value)
+      stubber.Start()
+      self.addCleanup(stubber.Stop)
+
+    stubber = utils.Stubber(compression, "_CODECS", codecs)
+    stubber.Start()
+    self.addCleanup(stubber.Stop)
+
+  def testSchemeIsOnlyUsedOnceTheServerSupportsIt(self):
+    with test_lib.ConfigOverrider({"Client.compression": "lz4"}):
+      self.assertEqual(client_utils_common.CompressionType(),
+                       compression.ZCOMPRESSION)
+
+      client_utils_common.SetServerCompressionTypes(
+          [compression.ZCOMPRESSION, compression.LZ4COMPRESSION])
+      self.assertEqual(client_utils_common.CompressionType(),
+                       compression.LZ4COMPRESSION)
+
+      client_utils_common.SetServerCompressionTypes([])
+      self.assertEqual(client_utils_common.CompressionType(),
+                       compression.ZCOMPRESSION)
+
+  def testUnavailableSchemeIsReportedOnce(self):
+    del compression._CODECS[compression.LZ4COMPRESSION]
+    client_utils_common.SetServerCompressionTypes(
+        [compression.ZCOMPRESSION, compression.LZ4COMPRESSION])
+
+    with test_lib.ConfigOverrider({"Client.compression": "lz4"}):
+      with mock.patch.object(logging, "warning") as warning:
+        for _ in range(3):
+          self.assertEqual(client_utils_common.CompressionType(),
+                           compression.ZCOMPRESSION)
+
+    self.assertEqual(warning.call_count, 1)
+
+
 class MultiHasherTest(absltest.TestCase):
 
   @staticmethod
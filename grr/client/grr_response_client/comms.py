@@ -91,6 +91,8 @@ import requests
 from grr_response_client import actions
 from grr_response_client import client_stats
 from grr_response_client import client_utils
+from grr_response_client import client_utils_common
+from grr_response_client import message_spool
 from grr_response_client.client_actions import admin
 from grr_response_core import config
 from grr_response_core.lib import communicator
@@ -103,6 +105,7 @@ from grr_response_core.lib.rdfvalues import client as rdf_client
 from grr_response_core.lib.rdfvalues import crypto as rdf_crypto
 from grr_response_core.lib.rdfvalues import flows as rdf_flows
 from grr_response_core.lib.rdfvalues import protodict as rdf_protodict
+from grr_response_core.lib.rdfvalues import structs as rdf_structs
 from grr_response_core.stats import stats_collector_instance
 
 
@@ -542,9 +545,16 @@ class GRRClientWorker(threading.Thread):
     else:
       # The size of the output queue controls the worker thread. Once this queue
       # is too large, the worker thread will block until the queue is drained.
+      spool = None
+      if config.CONFIG["Client.message_spool_max_size"]:
+        spool = message_spool.MessageSpool(
+            config.CONFIG["Client.message_spool_directory"],
+            max_size=config.CONFIG["Client.message_spool_max_size"])
+
       self._out_queue = SizeLimitedQueue(
           maxsize=config.CONFIG["Client.max_out_queue"],
-          heart_beat_cb=heart_beat_cb)
+          heart_beat_cb=heart_beat_cb,
+          spool=spool)
 
     # Only start this thread after the _out_queue is ready to send.
     self.StartStatsCollector()
@@ -570,6 +580,27 @@ class GRRClientWorker(threading.Thread):
     """
     return self._out_queue.GetMessages(soft_size_limit=max_size)
 
+  def DrainBatch(self, max_size=1024):
+    """Like Drain() but also tells whether the messages require fast polling.
+
+    Args:
+       max_size: The size (in bytes) of the returned protobuf will be at most
+         one message length over this size.
+
+    Returns:
+       A tuple of a MessageList protobuf and a bool that is True if any of the
+       messages requires fast polling.
+    """
+    return self._out_queue.GetMessageBatch(soft_size_limit=max_size)
+
+  def AcknowledgeDrained(self):
+    """Acknowledges the messages returned by DrainBatch() as sent."""
+    self._out_queue.AcknowledgeBatch()
+
+  def RequeueDrained(self):
+    """Puts the messages returned by DrainBatch() back to be sent again."""
+    self._out_queue.RequeueBatch()
+
   def QueueMessages(self, messages):
     """Push messages to the input queue."""
     # Push all the messages to our input queue
@@ -829,20 +860,44 @@ class GRRClientWorker(threading.Thread):
       os.kill(os.getpid(), signal.SIGKILL)
 
 
+# Spooled messages are prefixed with a byte recording whether they require
+# fast polling.
+_SPOOL_FASTPOLL = b"\x01"
+_SPOOL_NO_FASTPOLL = b"\x00"
+
+
 class SizeLimitedQueue(object):
   """A Queue which limits the total size of its elements.
 
   The standard Queue implementations uses the total number of elements to block
   on. In the client we want to limit the total memory footprint, hence we need
   to use the total size as a measure of how full the queue is.
+
+  Messages are kept serialized. GetMessages() adds them to the returned
+  MessageList in their wire format, so they are neither parsed nor serialized
+  again when the list is encoded for the server.
+
+  If a message_spool.MessageSpool is given, messages that don't fit into the
+  queue are written to disk instead of blocking the caller. Once the spool
+  holds any messages, all new messages go there too so that messages are
+  returned in the order they were put. If such a message doesn't fit into the
+  spool either, the caller blocks until it does.
+
+  The messages returned by GetMessageBatch() are in flight until the batch is
+  either acknowledged with AcknowledgeBatch() or put back at the head of the
+  queue with RequeueBatch().
   """
 
-  def __init__(self, heart_beat_cb, maxsize=1024):
+  def __init__(self, heart_beat_cb, maxsize=1024, spool=None):
     self._queue = collections.deque()
     self._lock = threading.Lock()
+    self._not_full = threading.Condition(self._lock)
     self._total_size = 0
     self._maxsize = maxsize
     self._heart_beat_cb = heart_beat_cb
+    self._spool = spool
+    # Messages of the batch in flight that were held in memory.
+    self._in_flight = []
 
   def Put(self, message, block=True, timeout=1000):
     """Put a message on the queue, blocking if it is too full.
@@ -861,33 +916,65 @@ class SizeLimitedQueue(object):
         timeout is exceeded.
     """
     # We only queue already serialized objects so we know how large they are.
-    message = message.SerializeToString()
-
-    if not block:
-      if self.Full():
-        raise queue.Full
+    # Whether the message requires fast polling is recorded here, so the
+    # queued messages don't have to be parsed again to find out.
+    data = message.SerializeToString()
+    require_fastpoll = bool(message.require_fastpoll)
 
-    else:
-      t0 = time.time()
-      while self.Full():
-        time.sleep(1)
-        self._heart_beat_cb()
+    t0 = time.time()
+    while True:
+      with self._not_full:
+        if self._Store(data, require_fastpoll):
+          return
 
-        if time.time() - t0 > timeout:
+        if not block or time.time() - t0 > timeout:
           raise queue.Full
 
-    with self._lock:
-      self._queue.appendleft(message)
-      self._total_size += len(message)
+        # Wake up at least once a second to heartbeat.
+        self._not_full.wait(1)
+
+      # The heartbeat callback is not run while holding the lock.
+      self._heart_beat_cb()
+
+  def _Store(self, data, require_fastpoll):
+    """Stores a message in memory or in the spool, returns True if it did."""
+    # Messages that were spooled or are in flight from the spool are older
+    # than this one, so it can't be kept in memory even if there is room.
+    if self._spool is None or not self._spool.Size():
+      if not self.Full():
+        self._queue.appendleft((data, require_fastpoll))
+        self._total_size += len(data)
+        return True
+
+      if self._spool is None:
+        return False
+
+    if require_fastpoll:
+      record = _SPOOL_FASTPOLL + data
+    else:
+      record = _SPOOL_NO_FASTPOLL + data
+
+    try:
+      self._spool.Append(record)
+      return True
+    except message_spool.SpoolFullError:
+      return False
+    except (IOError, OSError) as e:
+      logging.warning("Unable to write message to spool: %s", e)
+      return False
 
   def _Generate(self):
     """Yields messages from the queue. Lock should be held by the caller."""
     while self._queue:
-      yield self._queue.pop()
+      data, require_fastpoll = self._queue.pop()
+      self._total_size -= len(data)
+      yield data, require_fastpoll
 
   def GetMessages(self, soft_size_limit=None):
     """Retrieves and removes the messages from the queue.
 
+    Unlike GetMessageBatch(), the messages are acknowledged right away.
+
     Args:
       soft_size_limit: int If there is more data in the queue than
         soft_size_limit bytes, the returned list of messages will be
@@ -898,16 +985,109 @@ class SizeLimitedQueue(object):
       rdf_flows.MessageList A list of messages that were .Put on the queue
       earlier.
     """
-    with self._lock:
+    message_list, _ = self.GetMessageBatch(soft_size_limit=soft_size_limit)
+    self.AcknowledgeBatch()
+    return message_list
+
+  def GetMessageBatch(self, soft_size_limit=None):
+    """Retrieves the messages from the queue as a batch in flight.
+
+    A batch that is still in flight when this is called is acknowledged.
+
+    Args:
+      soft_size_limit: int If there is more data in the queue than
+        soft_size_limit bytes, the returned list of messages will be
+        approximately this large. If None (default), returns all messages
+        currently on the queue.
+
+    Returns:
+      A tuple (rdf_flows.MessageList, bool) with the messages and a flag
+      telling whether any of them requires fast polling.
+    """
+    with self._not_full:
+      self._AcknowledgeBatch()
+
       ret = rdf_flows.MessageList()
+      encoded_tag = ret.type_infos["job"].encoded_tag
       ret_size = 0
-      for message in self._Generate():
-        ret.job.append(rdf_flows.GrrMessage.FromSerializedString(message))
-        ret_size += len(message)
+      batch_requires_fastpoll = False
+      for data, require_fastpoll in self._Generate():
+        self._in_flight.append((data, require_fastpoll))
+        # The messages are only parsed if they are accessed.
+        ret.job.Append(wire_format=(encoded_tag,
+                                    rdf_structs.VarintEncode(len(data)), data))
+        ret_size += len(data)
+        batch_requires_fastpoll = batch_requires_fastpoll or require_fastpoll
         if soft_size_limit is not None and ret_size > soft_size_limit:
           break
 
-      return ret
+      # The queue is only spooled to disk when it is full, so the messages in
+      # the spool are newer than the ones that were in memory.
+      if (self._spool is not None and
+          (soft_size_limit is None or ret_size <= soft_size_limit)):
+        if soft_size_limit is not None:
+          spool_limit = soft_size_limit - ret_size
+        else:
+          spool_limit = None
+
+        try:
+          records = self._spool.ReadBatch(size_limit=spool_limit)
+        except (IOError, OSError) as e:
+          logging.warning("Unable to read messages from spool: %s", e)
+          self._spool.Rollback()
+          records = []
+
+        for record in records:
+          data = record[1:]
+          ret.job.Append(wire_format=(encoded_tag,
+                                      rdf_structs.VarintEncode(len(data)),
+                                      data))
+          if record[:1] == _SPOOL_FASTPOLL:
+            batch_requires_fastpoll = True
+
+      self._not_full.notify_all()
+      return ret, batch_requires_fastpoll
+
+  def AcknowledgeBatch(self):
+    """Removes the messages of the batch in flight for good."""
+    with self._not_full:
+      self._AcknowledgeBatch()
+      self._not_full.notify_all()
+
+  def _AcknowledgeBatch(self):
+    """Acknowledges the batch in flight. Lock should be held by the caller."""
+    self._in_flight = []
+    if self._spool is not None:
+      try:
+        self._spool.Commit()
+      except (IOError, OSError) as e:
+        logging.warning("Unable to commit messages in spool: %s", e)
+
+  def RequeueBatch(self):
+    """Puts the messages of the batch in flight back at the head of the queue.
+
+    This is used when the batch could not be sent. The retransmission counter
+    of messages that were held in memory is decremented and messages that run
+    out of retransmissions are dropped. Spooled messages stay in the spool and
+    are read again.
+    """
+    with self._not_full:
+      # The right end of the queue holds the oldest messages.
+      for data, _ in reversed(self._in_flight):
+        message = rdf_flows.GrrMessage.FromSerializedString(data)
+        message.require_fastpoll = False
+        message.ttl -= 1
+        if message.ttl <= 0:
+          logging.info("Dropped message due to retransmissions.")
+          continue
+
+        data = message.SerializeToString()
+        self._queue.append((data, False))
+        self._total_size += len(data)
+
+      self._in_flight = []
+      if self._spool is not None:
+        self._spool.Rollback()
 
   def Size(self):
     return self._total_size
@@ -1103,16 +1283,14 @@ class GRRHTTPClient(object):
     # back so we don't expire our messages too fast.
     if self.http_manager.consecutive_connection_errors == 0:
       # Grab some messages to send
-      message_list = self.client_worker.Drain(
+      message_list, require_fastpoll = self.client_worker.DrainBatch(
           max_size=config.CONFIG["Client.max_post_size"])
     else:
-      message_list = rdf_flows.MessageList()
+      message_list, require_fastpoll = rdf_flows.MessageList(), False
 
     # If any outbound messages require fast poll we switch to fast poll mode.
-    for message in message_list.job:
-      if message.require_fastpoll:
-        self.timer.FastPoll()
-        break
+    if require_fastpoll:
+      self.timer.FastPoll()
 
     # Make new encrypted ClientCommunication rdfvalue.
     payload = rdf_flows.ClientCommunication()
@@ -1143,19 +1321,18 @@ class GRRHTTPClient(object):
 
       # Force the server pem to be reparsed on the next connection.
       self.server_certificate = None
+      # Only use zlib until the server advertises other compression schemes
+      # again, it may have been replaced by one that doesn't support them.
+      client_utils_common.SetServerCompressionTypes([])
 
-      # Reschedule the tasks back on the queue so they get retried next time.
-      messages = list(message_list.job)
-      for message in messages:
-        message.require_fastpoll = False
-        message.ttl -= 1
-        if message.ttl > 0:
-          self.client_worker.QueueResponse(message)
-        else:
-          logging.info("Dropped message due to retransmissions.")
+      # Put the messages back at the head of the queue so they get retried
+      # next time, before any messages that were queued since.
+      self.client_worker.RequeueDrained()
 
       return response
 
+    self.client_worker.AcknowledgeDrained()
+
     # Check the decoded nonce was as expected.
     if response.nonce != nonce:
       logging.info("Nonce not matched.")
@@ -1311,6 +1488,13 @@ class ClientCommunicator(communicator.Communicator):
         certificate=certificate, private_key=private_key)
     self.InitPrivateKey()
 
+  @property
+  def compression_type(self):
+    return client_utils_common.CompressionType()
+
+  def SetRemoteCompressionTypes(self, compression_types):
+    client_utils_common.SetServerCompressionTypes(compression_types)
+
   def InitPrivateKey(self):
     """Makes sure this client has a private key set.
 
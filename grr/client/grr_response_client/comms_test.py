@@ -4,6 +4,7 @@ from __future__ import absolute_import
 from __future__ import division
 from __future__ import unicode_literals
 
+import threading
 import time
 
 
@@ -13,11 +14,13 @@ import queue
 import requests
 
 from grr_response_client import comms
+from grr_response_client import message_spool
 from grr_response_core.lib import flags
 from grr_response_core.lib import rdfvalue
 from grr_response_core.lib import utils
 from grr_response_core.lib.rdfvalues import flows as rdf_flows
 from grr_response_core.lib.util import compatibility
+from grr.test_lib import temp
 from grr.test_lib import test_lib
 
 
@@ -321,6 +324,161 @@ class SizeLimitedQueueTest(test_lib.GRRBaseTest):
 
     self.assertTrue(heartbeat.called)
 
+  def testSizeLimitedQueueDoesNotReserializeMessages(self):
+    limited_queue = comms.SizeLimitedQueue(
+        maxsize=10000000, heart_beat_cb=lambda: None)
+
+    messages = [rdf_flows.GrrMessage(name=name) for name in "ABC"]
+    for message in messages:
+      limited_queue.Put(message)
+
+    result = limited_queue.GetMessages()
+    self.assertEqual(limited_queue.Size(), 0)
+    self.assertEqual(result.SerializeToString(),
+                     rdf_flows.MessageList(job=messages).SerializeToString())
+    # Nothing has been parsed to get the serialized list.
+    for python_format, _ in result.job.wrapped_list:
+      self.assertIsNone(python_format)
+
+    self.assertEqual(list(result.job), messages)
+
+  def testSizeLimitedQueueReturnsFastpollFlag(self):
+    limited_queue = comms.SizeLimitedQueue(
+        maxsize=10000000, heart_beat_cb=lambda: None)
+
+    limited_queue.Put(rdf_flows.GrrMessage(name="A", require_fastpoll=False))
+    limited_queue.Put(rdf_flows.GrrMessage(name="B", require_fastpoll=False))
+    result, require_fastpoll = limited_queue.GetMessageBatch()
+    self.assertLen(result.job, 2)
+    self.assertFalse(require_fastpoll)
+
+    limited_queue.Put(rdf_flows.GrrMessage(name="C", require_fastpoll=False))
+    limited_queue.Put(rdf_flows.GrrMessage(name="D", require_fastpoll=True))
+    result, require_fastpoll = limited_queue.GetMessageBatch()
+    self.assertLen(result.job, 2)
+    self.assertTrue(require_fastpoll)
+    # The flag is known without parsing the queued messages.
+    for python_format, _ in result.job.wrapped_list:
+      self.assertIsNone(python_format)
+
+  def testSizeLimitedQueueWakesUpBlockedPut(self):
+    msg_a = rdf_flows.GrrMessage(name="A")
+    msg_b = rdf_flows.GrrMessage(name="B")
+
+    limited_queue = comms.SizeLimitedQueue(
+        maxsize=len(msg_a.SerializeToString()), heart_beat_cb=lambda: None)
+    limited_queue.Put(msg_a)
+
+    put_thread = threading.Thread(target=limited_queue.Put, args=(msg_b,))
+    put_thread.start()
+
+    self.assertEqual(list(limited_queue.GetMessages().job), [msg_a])
+    put_thread.join(10)
+    self.assertFalse(put_thread.isAlive())
+    self.assertEqual(list(limited_queue.GetMessages().job), [msg_b])
+
+  def testSizeLimitedQueueSpoolsMessagesWhenFull(self):
+    messages = [rdf_flows.GrrMessage(name=name) for name in "ABCDE"]
+
+    with temp.AutoTempDirPath(remove_non_empty=True) as spool_dir:
+      spool = message_spool.MessageSpool(spool_dir, max_size=1024 * 1024)
+      limited_queue = comms.SizeLimitedQueue(
+          maxsize=2 * len(messages[0].SerializeToString()),
+          heart_beat_cb=lambda: None,
+          spool=spool)
+
+      # None of these block, messages that don't fit go to the spool.
+      for message in messages[:4]:
+        limited_queue.Put(message, block=False)
+      self.assertGreater(spool.Size(), 0)
+
+      self.assertEqual(list(limited_queue.GetMessages().job), messages[:4])
+
+      # As long as the spool is not empty, new messages are queued after the
+      # spooled ones.
+      limited_queue.Put(messages[0])
+      limited_queue.Put(messages[1])
+      limited_queue.Put(messages[2])
+      limited_queue.Put(messages[4])
+      self.assertEqual(
+          list(
+              limited_queue.GetMessages(
+                  soft_size_limit=len(messages[0].SerializeToString())).job),
+          messages[:2])
+      limited_queue.Put(messages[3])
+      self.assertEqual(
+          list(limited_queue.GetMessages().job),
+          [messages[2], messages[4], messages[3]])
+
+  def testSizeLimitedQueueDoesNotBypassFullSpool(self):
+    messages = [rdf_flows.GrrMessage(name=name) for name in "ABCD"]
+    message_size = len(messages[0].SerializeToString())
+
+    with temp.AutoTempDirPath(remove_non_empty=True) as spool_dir:
+      # The spool only has room for a single message.
+      spool = message_spool.MessageSpool(spool_dir, max_size=message_size + 9)
+      limited_queue = comms.SizeLimitedQueue(
+          maxsize=2 * message_size, heart_beat_cb=lambda: None, spool=spool)
+
+      for message in messages[:3]:
+        limited_queue.Put(message, block=False)
+      with self.assertRaises(queue.Full):
+        limited_queue.Put(messages[3], block=False)
+
+      self.assertEqual(
+          list(limited_queue.GetMessages(soft_size_limit=message_size).job),
+          messages[:2])
+
+      # There is room in memory now, but the message would be sent before the
+      # spooled one.
+      with self.assertRaises(queue.Full):
+        limited_queue.Put(messages[3], block=False)
+
+      self.assertEqual(list(limited_queue.GetMessages().job), [messages[2]])
+      limited_queue.Put(messages[3], block=False)
+      self.assertEqual(list(limited_queue.GetMessages().job), [messages[3]])
+
+  def testSizeLimitedQueueRequeuesBatchAtHead(self):
+    messages = [rdf_flows.GrrMessage(name=name) for name in "ABCDE"]
+
+    with temp.AutoTempDirPath(remove_non_empty=True) as spool_dir:
+      spool = message_spool.MessageSpool(spool_dir, max_size=1024 * 1024)
+      limited_queue = comms.SizeLimitedQueue(
+          maxsize=2 * len(messages[0].SerializeToString()),
+          heart_beat_cb=lambda: None,
+          spool=spool)
+
+      for message in messages[:4]:
+        limited_queue.Put(message)
+      batch, _ = limited_queue.GetMessageBatch()
+      self.assertEqual(list(batch.job), messages[:4])
+
+      # Sending the batch failed, it is retried before newer messages.
+      limited_queue.Put(messages[4])
+      limited_queue.RequeueBatch()
+
+      batch, _ = limited_queue.GetMessageBatch()
+      self.assertEqual([message.name for message in batch.job], list("ABCDE"))
+      limited_queue.AcknowledgeBatch()
+
+      self.assertEqual(limited_queue.Size(), 0)
+      self.assertEqual(spool.Size(), 0)
+      self.assertEmpty(limited_queue.GetMessages().job)
+
+  def testSizeLimitedQueueDropsMessagesAfterRetransmissions(self):
+    limited_queue = comms.SizeLimitedQueue(
+        maxsize=10000000, heart_beat_cb=lambda: None)
+    limited_queue.Put(rdf_flows.GrrMessage(name="A", ttl=2))
+
+    limited_queue.GetMessageBatch()
+    limited_queue.RequeueBatch()
+    batch, require_fastpoll = limited_queue.GetMessageBatch()
+    self.assertEqual([message.ttl for message in batch.job], [1])
+    self.assertFalse(require_fastpoll)
+
+    limited_queue.RequeueBatch()
+    self.assertEmpty(limited_queue.GetMessages().job)
+
 
 class GRRClientWorkerTest(test_lib.GRRBaseTest):
   """Tests the GRRClientWorker class."""
@@ -22,6 +22,7 @@ import queue
 
 from fleetspeak.src.client.daemonservice.client import client as fs_client
 from fleetspeak.src.common.proto.fleetspeak import common_pb2 as fs_common_pb2
+from grr_response_client import client_utils_common
 from grr_response_client import comms
 from grr_response_core import config
 from grr_response_core.lib import communicator
@@ -132,7 +133,9 @@ class GRRFleetspeakClient(object):
     """Sends a block of messages through Fleetspeak."""
     message_list = rdf_flows.PackedMessageList()
     communicator.Communicator.EncodeMessageList(
-        rdf_flows.MessageList(job=grr_msgs), message_list)
+        rdf_flows.MessageList(job=grr_msgs),
+        message_list,
+        compression_type=client_utils_common.CompressionType())
     fs_msg = fs_common_pb2.Message(
         message_type="MessageList",
         destination=fs_common_pb2.Address(service_name="GRR"),
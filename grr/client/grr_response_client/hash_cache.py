@@ -0,0 +1,238 @@
+#!/usr/bin/env python
+"""A persistent cache of file hashes computed on the client."""
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import unicode_literals
+
+import collections
+import logging
+import os
+import struct
+import threading
+import time
+import zlib
+
+
+from grr_response_client.vfs_handlers import files as vfs_files
+from grr_response_core import config
+from grr_response_core.lib import utils
+
+# Files modified less than this many seconds before they are looked at are not
+# cached. Their timestamps may not change on a subsequent modification if the
+# file system only stores them with a coarse granularity.
+_RACY_INTERVAL = 5
+
+
+class HashCache(object):
+  """An LRU cache of file hashes that is kept on disk between client restarts.
+
+  Entries are keyed by the device, inode, size, modification and inode change
+  time of a file together with a description of what was computed (e.g. which
+  hash algorithms were used on how many bytes). Any change to the contents of a
+  file updates its modification or change time, so stale entries are never
+  returned. Files whose timestamps are too recent to be trusted are not cached
+  at all, neither are files that changed while they were hashed.
+
+  On systems that don't report inode numbers (Windows with Python 2), the path
+  of the file is made part of the key instead.
+
+  The cache is written to disk every `flush_interval` seconds if it has
+  changed. A corrupted cache file is discarded.
+
+  Attributes:
+    path: The path of the file the cache is kept in.
+    max_entries: The maximum number of entries kept in the cache.
+    flush_interval: How often (in seconds) changes are written to disk.
+  """
+
+  _MAGIC = b"GRRHC001"
+  _RECORD_HEADER = struct.Struct("<II")
+  _CHECKSUM = struct.Struct("<I")
+
+  def __init__(self, path, max_entries, flush_interval=60):
+    self.path = path
+    self.max_entries = max_entries
+    self.flush_interval = flush_interval
+
+    self._entries = collections.OrderedDict()
+    self._lock = threading.RLock()
+    self._dirty = False
+    self._last_flush = time.time()
+    self._Load()
+
+  def _Load(self):
+    """Reads the cache entries from disk."""
+    try:
+      with open(self.path, "rb") as fd:
+        data = fd.read()
+    except (IOError, OSError):
+      return
+
+    header_size = len(self._MAGIC)
+    checksum_size = self._CHECKSUM.size
+    if (len(data) < header_size + checksum_size or
+        not data.startswith(self._MAGIC)):
+      logging.warning("Ignoring invalid hash cache file %s.", self.path)
+      return
+
+    (checksum,) = self._CHECKSUM.unpack(data[-checksum_size:])
+    data = data[header_size:-checksum_size]
+    if zlib.crc32(data) & 0xffffffff != checksum:
+      logging.warning("Ignoring corrupted hash cache file %s.", self.path)
+      return
+
+    offset = 0
+    while offset < len(data):
+      key_length, value_length = self._RECORD_HEADER.unpack_from(data, offset)
+      offset += self._RECORD_HEADER.size
+      key = data[offset:offset + key_length]
+      offset += key_length
+      self._entries[key] = data[offset:offset + value_length]
+      offset += value_length
+
+  def Flush(self):
+    """Writes the cache entries to disk if they have changed."""
+    with self._lock:
+      if not self._dirty:
+        return
+
+      chunks = []
+      for key, value in self._entries.items():
+        chunks.append(self._RECORD_HEADER.pack(len(key), len(value)))
+        chunks.append(key)
+        chunks.append(value)
+      data = b"".join(chunks)
+
+      directory = os.path.dirname(self.path)
+      tmp_path = self.path + ".tmp"
+      try:
+        if directory and not os.path.isdir(directory):
+          os.makedirs(directory)
+
+        with open(tmp_path, "wb") as fd:
+          fd.write(self._MAGIC)
+          fd.write(data)
+          fd.write(self._CHECKSUM.pack(zlib.crc32(data) & 0xffffffff))
+          fd.flush()
+          os.fsync(fd.fileno())
+
+        # On Windows, files can't be renamed over existing ones.
+        if os.name == "nt" and os.path.exists(self.path):
+          os.remove(self.path)
+        os.rename(tmp_path, self.path)
+      except (IOError, OSError) as e:
+        logging.warning("Unable to write hash cache file %s: %s", self.path, e)
+
+      self._dirty = False
+      self._last_flush = time.time()
+
+  def Lookup(self, fd, context):
+    """Looks up a cached value for an open file.
+
+    Args:
+      fd: A file object or a VFS handler of a local file, positioned at its
+        start.
+      context: A string describing what is computed from the file, e.g. the
+        hash algorithms and the number of bytes hashed.
+
+    Returns:
+      A tuple (key, value). The key is None if the file can't be cached, the
+      value is None if the cache doesn't have an entry for the file yet.
+    """
+    key = _FileKey(fd, context)
+    if key is None or _Tell(fd) != 0:
+      return None, None
+
+    with self._lock:
+      value = self._entries.pop(key, None)
+      if value is not None:
+        self._entries[key] = value
+
+    return key, value
+
+  def Store(self, fd, key, value):
+    """Stores a value for a file.
+
+    Args:
+      fd: The file object or VFS handler passed to `Lookup`.
+      key: The key returned by `Lookup`.
+      value: The value to store, a byte string.
+    """
+    context = key.split(b"\0", 1)[0].decode("utf-8")
+    if _FileKey(fd, context) != key:
+      # The file changed while it was processed.
+      return
+
+    with self._lock:
+      self._entries.pop(key, None)
+      self._entries[key] = value
+      while len(self._entries) > self.max_entries:
+        self._entries.popitem(last=False)
+      self._dirty = True
+
+      if time.time() - self._last_flush >= self.flush_interval:
+        self.Flush()
+
+
+def _Tell(fd):
+  if isinstance(fd, vfs_files.File):
+    return fd.Tell()
+  return fd.tell()
+
+
+def _Stat(fd):
+  """Returns a tuple (path, os.stat_result) for local files or None."""
+  if isinstance(fd, vfs_files.File):
+    pathspec = fd.pathspec
+    if (len(pathspec) != 1 or fd.IsDirectory() or fd.file_offset or
+        fd.alignment != 1 or pathspec.last.HasField("file_size_override")):
+      return None
+
+    # The file is read through the handle cache, which might still refer to a
+    # file that has been replaced since, so we have to check that one.
+    with vfs_files.FileHandleManager(fd.filename) as handle:
+      return fd.filename, os.fstat(handle.fd.fileno())
+
+  try:
+    return fd.name, os.fstat(fd.fileno())
+  except (AttributeError, ValueError):
+    return None
+
+
+def _FileKey(fd, context):
+  """Returns the cache key for a file or None if it can't be cached."""
+  try:
+    result = _Stat(fd)
+  except (IOError, OSError):
+    return None
+
+  if result is None:
+    return None
+
+  path, stat = result
+  if time.time() - max(stat.st_mtime, stat.st_ctime) < _RACY_INTERVAL:
+    return None
+
+  key = "%s\0%d:%d:%d:%r:%r" % (context, stat.st_dev, stat.st_ino,
+                                stat.st_size, stat.st_mtime, stat.st_ctime)
+  if not stat.st_ino:
+    key += "\0%s" % utils.SmartUnicode(path)
+  return key.encode("utf-8")
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def GetHashCache():
+  """Returns the client's hash cache or None if it is disabled."""
+  global _cache
+
+  max_entries = config.CONFIG["Client.hash_cache_max_entries"]
+  if not max_entries:
+    return None
+
+  with _cache_lock:
+    if _cache is None:
+      _cache = HashCache(config.CONFIG["Client.hash_cache_path"], max_entries)
+    return _cache
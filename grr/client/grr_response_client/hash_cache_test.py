@@ -0,0 +1,147 @@
+#!/usr/bin/env python
+"""Tests for the client hash cache."""
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import unicode_literals
+
+import hashlib
+import os
+import shutil
+import time
+
+
+from grr_response_client import client_utils_common
+from grr_response_client import hash_cache
+from grr_response_core.lib import flags
+from grr_response_core.lib import utils
+from grr.test_lib import temp
+from grr.test_lib import test_lib
+
+
+class HashCacheTest(test_lib.GRRBaseTest):
+
+  def setUp(self):
+    super(HashCacheTest, self).setUp()
+    self.directory = temp.TempDirPath()
+    self.addCleanup(shutil.rmtree, self.directory)
+    self.cache_path = os.path.join(self.directory, "hash_cache")
+
+    config_overrider = test_lib.ConfigOverrider({
+        "Client.hash_cache_max_entries": 10,
+        "Client.hash_cache_path": self.cache_path,
+    })
+    config_overrider.Start()
+    self.addCleanup(config_overrider.Stop)
+
+    cache_stubber = utils.Stubber(hash_cache, "_cache", None)
+    cache_stubber.Start()
+    self.addCleanup(cache_stubber.Stop)
+
+    # Files written by the test are too recent to be cached otherwise.
+    fake_time = test_lib.FakeTime(time.time() + 60)
+    fake_time.__enter__()
+    self.addCleanup(fake_time.__exit__, None, None, None)
+
+  def _WriteFile(self, name, data):
+    path = os.path.join(self.directory, name)
+    with open(path, "wb") as fd:
+      fd.write(data)
+    return path
+
+  def _Hash(self, path):
+    hasher = client_utils_common.MultiHasher(["md5", "sha256"])
+    hasher.HashFilePath(path, 1024)
+    return hasher.GetHashObject()
+
+  def testMultiHasherUsesCachedHashes(self):
+    path = self._WriteFile("foo", b"foo")
+
+    first = self._Hash(path)
+    self.assertFalse(first.from_cache)
+
+    second = self._Hash(path)
+    self.assertTrue(second.from_cache)
+    self.assertEqual(second.md5, hashlib.md5(b"foo").digest())
+    self.assertEqual(second.sha256, hashlib.sha256(b"foo").digest())
+    self.assertEqual(second.num_bytes, 3)
+
+  def testCacheDependsOnHashingParameters(self):
+    path = self._WriteFile("foo", b"foobar")
+    self._Hash(path)
+
+    hasher = client_utils_common.MultiHasher(["md5", "sha256"])
+    hasher.HashFilePath(path, 3)
+    hash_object = hasher.GetHashObject()
+
+    self.assertFalse(hash_object.from_cache)
+    self.assertEqual(hash_object.md5, hashlib.md5(b"foo").digest())
+
+  def testModifiedFilesAreHashedAgain(self):
+    path = self._WriteFile("foo", b"foo")
+    self._Hash(path)
+
+    self._WriteFile("foo", b"bar")
+    # Make sure the modification time changes even on file systems with a
+    # coarse timestamp granularity.
+    stat = os.stat(path)
+    os.utime(path, (stat.st_atime, stat.st_mtime + 10))
+
+    hash_object = self._Hash(path)
+    self.assertFalse(hash_object.from_cache)
+    self.assertEqual(hash_object.md5, hashlib.md5(b"bar").digest())
+
+  def testRecentlyModifiedFilesAreNotCached(self):
+    path = self._WriteFile("foo", b"foo")
+    stat = os.stat(path)
+
+    with test_lib.FakeTime(stat.st_ctime + 1):
+      self._Hash(path)
+      self.assertFalse(self._Hash(path).from_cache)
+
+  def testCacheIsPersisted(self):
+    path = self._WriteFile("foo", b"foo")
+    self._Hash(path)
+    hash_cache.GetHashCache().Flush()
+
+    with utils.Stubber(hash_cache, "_cache", None):
+      self.assertTrue(self._Hash(path).from_cache)
+
+  def testCorruptedCacheFileIsIgnored(self):
+    path = self._WriteFile("foo", b"foo")
+    self._Hash(path)
+    hash_cache.GetHashCache().Flush()
+
+    with open(self.cache_path, "r+b") as fd:
+      fd.seek(10)
+      fd.write(b"\xff\xff")
+
+    with utils.Stubber(hash_cache, "_cache", None):
+      self.assertFalse(self._Hash(path).from_cache)
+
+  def testLeastRecentlyUsedEntriesAreEvicted(self):
+    cache = hash_cache.HashCache(self.cache_path, max_entries=2)
+    paths = [self._WriteFile(name, name.encode("ascii")) for name in "abc"]
+
+    for path in paths:
+      with open(path, "rb") as fd:
+        key, value = cache.Lookup(fd, "test")
+        self.assertIsNone(value)
+        cache.Store(fd, key, b"value")
+
+      # Keep the first entry in use.
+      with open(paths[0], "rb") as fd:
+        self.assertEqual(cache.Lookup(fd, "test")[1], b"value")
+
+    values = []
+    for path in paths:
+      with open(path, "rb") as fd:
+        values.append(cache.Lookup(fd, "test")[1])
+    self.assertEqual(values, [b"value", None, b"value"])
+
+
+def main(argv):
+  test_lib.main(argv)
+
+
+if __name__ == "__main__":
+  flags.StartMain(main)
@@ -0,0 +1,257 @@
+#!/usr/bin/env python
+"""A bounded on-disk spool for messages the client can't send right away."""
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import unicode_literals
+
+import logging
+import os
+import re
+import struct
+import zlib
+
+
+class Error(Exception):
+  """Base class for message spool errors."""
+
+
+class SpoolFullError(Error):
+  """Raised when a message does not fit into the spool anymore."""
+
+
+class MessageSpool(object):
+  """A bounded first-in, first-out queue of serialized messages on disk.
+
+  Messages are appended to segment files. Every record is prefixed with its
+  length and a CRC32 checksum of its data, so a record that was only partially
+  written when the client died is detected when the spool is read back. Such a
+  record ends its segment: it and everything after it in the same segment is
+  dropped.
+
+  Records that were read only count as consumed once they are committed, e.g.
+  after they were sent successfully. Until then, a rollback makes them
+  available to be read again. Segments are deleted once all their records have
+  been committed, the committed position inside the oldest segment is kept in a
+  small checksummed cursor file. If the client dies before the cursor is
+  updated, the records read since the last update are read again after a
+  restart.
+
+  This class is not thread-safe, callers have to synchronize access to it.
+
+  Attributes:
+    directory: The directory the spool files are kept in.
+    max_size: The maximum number of bytes the spool may hold.
+    segment_size: The size after which a new segment file is started.
+  """
+
+  _RECORD_HEADER = struct.Struct("<II")
+  # Segment number, offset and checksum of the two.
+  _CURSOR = struct.Struct("<QQI")
+  _CURSOR_FILENAME = "cursor"
+  _SEGMENT_FILENAME_FORMAT = "%020d.segment"
+  _SEGMENT_FILENAME_REGEX = re.compile(r"^(\d{20})\.segment$")
+
+  def __init__(self, directory, max_size, segment_size=16 * 1024 * 1024):
+    self.directory = directory
+    self.max_size = max_size
+    self.segment_size = segment_size
+    self._cursor_path = os.path.join(directory, self._CURSOR_FILENAME)
+
+    if not os.path.isdir(directory):
+      os.makedirs(directory)
+
+    self._segments = []
+    for filename in sorted(os.listdir(directory)):
+      match = self._SEGMENT_FILENAME_REGEX.match(filename)
+      if match:
+        self._segments.append(int(match.group(1)))
+
+    self._read_fd = None
+    self._read_offset = 0
+    self._write_fd = None
+    self._ReadCursor()
+
+    # The committed position is at `_commit_offset` in the oldest segment. The
+    # read position is at `_read_offset` in `_segments[_read_index]`,
+    # `_read_size` bytes after the committed position.
+    self._commit_offset = self._read_offset
+    self._read_index = 0
+    self._read_size = 0
+
+    self._size = 0
+    for segment in self._segments:
+      self._size += os.path.getsize(self._SegmentPath(segment))
+    self._size -= self._read_offset
+
+  def _SegmentPath(self, segment):
+    return os.path.join(self.directory, self._SEGMENT_FILENAME_FORMAT % segment)
+
+  def _ReadCursor(self):
+    """Restores the read position and drops segments that were consumed."""
+    try:
+      with open(self._cursor_path, "rb") as fd:
+        data = fd.read(self._CURSOR.size)
+    except (IOError, OSError):
+      return
+
+    if len(data) != self._CURSOR.size:
+      return
+
+    segment, offset, checksum = self._CURSOR.unpack(data)
+    if zlib.crc32(data[:16]) & 0xffffffff != checksum:
+      logging.warning("Ignoring corrupted message spool cursor.")
+      return
+
+    while self._segments and self._segments[0] < segment:
+      self._DeleteSegment(self._segments.pop(0))
+
+    if self._segments and self._segments[0] == segment:
+      self._read_offset = offset
+
+  def _WriteCursor(self):
+    if self._segments:
+      segment = self._segments[0]
+    else:
+      segment = 0
+    data = struct.pack("<QQ", segment, self._commit_offset)
+    data += struct.pack("<I", zlib.crc32(data) & 0xffffffff)
+
+    with open(self._cursor_path, "wb") as fd:
+      fd.write(data)
+
+  def _DeleteSegment(self, segment):
+    try:
+      os.remove(self._SegmentPath(segment))
+    except (IOError, OSError) as e:
+      logging.warning("Unable to remove message spool segment %d: %s", segment,
+                      e)
+
+  def Size(self):
+    """Returns the number of bytes in the spool that were not committed yet."""
+    return self._size
+
+  def Append(self, data):
+    """Appends a serialized message to the spool.
+
+    Args:
+      data: The serialized message.
+
+    Raises:
+      SpoolFullError: If the message doesn't fit into the spool.
+      IOError: If the message can't be written.
+    """
+    record_size = self._RECORD_HEADER.size + len(data)
+    if self._size + record_size > self.max_size:
+      raise SpoolFullError()
+
+    if (self._write_fd is not None and
+        self._write_fd.tell() >= self.segment_size):
+      self._CloseWriteSegment()
+
+    if self._write_fd is None:
+      # A new segment is started after every restart, so that we never append
+      # to a segment that ends with a partially written record.
+      if self._segments:
+        segment = self._segments[-1] + 1
+      else:
+        segment = 0
+      self._write_fd = open(self._SegmentPath(segment), "ab")
+      self._segments.append(segment)
+
+    checksum = zlib.crc32(data) & 0xffffffff
+    self._write_fd.write(self._RECORD_HEADER.pack(len(data), checksum) + data)
+    self._write_fd.flush()
+    self._size += record_size
+
+  def _CloseWriteSegment(self):
+    self._write_fd.flush()
+    os.fsync(self._write_fd.fileno())
+    self._write_fd.close()
+    self._write_fd = None
+
+  def _ReadRecord(self):
+    """Returns the next record or None if there is nothing left to read."""
+    while self._read_index < len(self._segments):
+      segment = self._segments[self._read_index]
+      if self._read_fd is None:
+        self._read_fd = open(self._SegmentPath(segment), "rb")
+        self._read_fd.seek(self._read_offset)
+
+      header = self._read_fd.read(self._RECORD_HEADER.size)
+      if len(header) == self._RECORD_HEADER.size:
+        length, checksum = self._RECORD_HEADER.unpack(header)
+        data = self._read_fd.read(length)
+        if len(data) == length and zlib.crc32(data) & 0xffffffff == checksum:
+          self._read_offset += self._RECORD_HEADER.size + length
+          self._read_size += self._RECORD_HEADER.size + length
+          return data
+
+        logging.warning("Dropping corrupted records from message spool segment "
+                        "%d at offset %d.", segment, self._read_offset)
+
+      # The segment is exhausted, account for any corrupted data left in it.
+      self._read_fd.seek(0, os.SEEK_END)
+      self._read_size += self._read_fd.tell() - self._read_offset
+      self._read_fd.close()
+      self._read_fd = None
+      if self._write_fd is not None and segment == self._segments[-1]:
+        self._write_fd.close()
+        self._write_fd = None
+
+      self._read_index += 1
+      self._read_offset = 0
+
+    return None
+
+  def ReadBatch(self, size_limit=None):
+    """Reads the oldest messages that were not read yet from the spool.
+
+    The messages stay in the spool until Commit() is called.
+
+    Args:
+      size_limit: If given, no more messages are read once their total size
+        exceeds this number of bytes.
+
+    Returns:
+      A list of serialized messages, oldest first.
+    """
+    result = []
+    result_size = 0
+    while size_limit is None or result_size <= size_limit:
+      data = self._ReadRecord()
+      if data is None:
+        break
+
+      result.append(data)
+      result_size += len(data)
+
+    return result
+
+  def Commit(self):
+    """Removes the messages read so far from the spool.
+
+    Raises:
+      IOError: If the cursor can't be written.
+    """
+    if not self._read_size:
+      return
+
+    for segment in self._segments[:self._read_index]:
+      self._DeleteSegment(segment)
+    del self._segments[:self._read_index]
+
+    self._read_index = 0
+    self._commit_offset = self._read_offset
+    self._size -= self._read_size
+    self._read_size = 0
+    self._WriteCursor()
+
+  def Rollback(self):
+    """Makes the messages read since the last commit available again."""
+    if self._read_fd is not None:
+      self._read_fd.close()
+      self._read_fd = None
+
+    self._read_index = 0
+    self._read_offset = self._commit_offset
+    self._read_size = 0
@@ -0,0 +1,136 @@
+#!/usr/bin/env python
+"""Tests for the client message spool."""
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import unicode_literals
+
+import os
+import shutil
+
+
+from grr_response_client import message_spool
+from grr_response_core.lib import flags
+from grr.test_lib import temp
+from grr.test_lib import test_lib
+
+
+class MessageSpoolTest(test_lib.GRRBaseTest):
+
+  def setUp(self):
+    super(MessageSpoolTest, self).setUp()
+    self.directory = temp.TempDirPath()
+    self.addCleanup(shutil.rmtree, self.directory)
+
+  def _Spool(self, max_size=1024 * 1024, segment_size=64):
+    return message_spool.MessageSpool(
+        self.directory, max_size=max_size, segment_size=segment_size)
+
+  def _Segments(self):
+    return [f for f in os.listdir(self.directory) if f.endswith(".segment")]
+
+  def testMessagesAreReadInOrder(self):
+    spool = self._Spool()
+    messages = [b"message %d" % i for i in range(20)]
+    for message in messages:
+      spool.Append(message)
+
+    # The messages don't fit into a single segment.
+    self.assertGreater(len(self._Segments()), 1)
+
+    self.assertEqual(spool.ReadBatch(size_limit=20), messages[:3])
+    self.assertEqual(spool.ReadBatch(), messages[3:])
+    self.assertEqual(spool.ReadBatch(), [])
+
+    # Messages stay in the spool until they are committed.
+    self.assertGreater(spool.Size(), 0)
+    self.assertNotEmpty(self._Segments())
+
+    spool.Commit()
+    self.assertEqual(spool.Size(), 0)
+    self.assertEmpty(self._Segments())
+
+  def testUnreadMessagesSurviveRestart(self):
+    spool = self._Spool()
+    messages = [b"message %d" % i for i in range(20)]
+    for message in messages:
+      spool.Append(message)
+    self.assertEqual(spool.ReadBatch(size_limit=40), messages[:5])
+    spool.Commit()
+
+    spool = self._Spool()
+    spool.Append(b"foo")
+
+    self.assertEqual(spool.ReadBatch(), messages[5:] + [b"foo"])
+
+  def testUncommittedMessagesSurviveRestart(self):
+    spool = self._Spool()
+    messages = [b"message %d" % i for i in range(20)]
+    for message in messages:
+      spool.Append(message)
+    self.assertEqual(spool.ReadBatch(size_limit=40), messages[:5])
+    spool.Commit()
+    self.assertEqual(spool.ReadBatch(), messages[5:])
+
+    spool = self._Spool()
+    self.assertEqual(spool.ReadBatch(), messages[5:])
+
+  def testRollback(self):
+    spool = self._Spool()
+    messages = [b"message %d" % i for i in range(20)]
+    for message in messages:
+      spool.Append(message)
+    self.assertEqual(spool.ReadBatch(size_limit=40), messages[:5])
+    spool.Commit()
+
+    self.assertEqual(spool.ReadBatch(), messages[5:])
+    spool.Rollback()
+    spool.Append(b"foo")
+    self.assertEqual(spool.ReadBatch(size_limit=40), messages[5:10])
+    self.assertEqual(spool.ReadBatch(), messages[10:] + [b"foo"])
+
+    spool.Commit()
+    self.assertEqual(spool.Size(), 0)
+    self.assertEmpty(self._Segments())
+
+  def testCorruptedRecordEndsSegment(self):
+    spool = self._Spool(segment_size=1024)
+    spool.Append(b"foo")
+    spool.Append(b"bar")
+    spool.Append(b"baz")
+    del spool
+
+    # Corrupt the data of the second record.
+    segment_path = os.path.join(self.directory, self._Segments()[0])
+    with open(segment_path, "r+b") as fd:
+      fd.seek(2 * 8 + 3)
+      fd.write(b"X")
+
+    spool = self._Spool()
+    spool.Append(b"quux")
+    with test_lib.SuppressLogs():
+      self.assertEqual(spool.ReadBatch(), [b"foo", b"quux"])
+    spool.Commit()
+    self.assertEqual(spool.Size(), 0)
+
+  def testSpoolIsBounded(self):
+    spool = self._Spool(max_size=100)
+    spool.Append(b"x" * 50)
+
+    with self.assertRaises(message_spool.SpoolFullError):
+      spool.Append(b"x" * 50)
+
+    # Messages only make room once they are committed.
+    spool.ReadBatch()
+    with self.assertRaises(message_spool.SpoolFullError):
+      spool.Append(b"x" * 50)
+
+    spool.Commit()
+    spool.Append(b"x" * 50)
+
+
+def main(argv):
+  test_lib.main(argv)
+
+
+if __name__ == "__main__":
+  flags.StartMain(main)
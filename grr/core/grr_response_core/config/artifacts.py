@@ -13,6 +13,13 @@ config_lib.DEFINE_list("Artifacts.artifact_dirs", [
     "%(grr_response_core/artifacts/local@grr-response-core|resource)"
 ], "A list directories to load artifacts from.")
 
+config_lib.DEFINE_string(
+    "Artifacts.registry_snapshot_path", "",
+    "Path of a precompiled snapshot of the artifacts loaded from the artifact "
+    "files, written by `grr_config_updater build_artifact_snapshot`. While the "
+    "artifact files do not change, artifacts are loaded from the snapshot "
+    "instead of being parsed and validated again.")
+
 config_lib.DEFINE_list(
     "Artifacts.knowledge_base", [
         "LinuxRelease",
@@ -100,6 +100,42 @@ config_lib.DEFINE_integer("Client.max_post_size", 40000000,
 config_lib.DEFINE_integer("Client.max_out_queue", 51200000,
                           "Maximum size of the output queue.")
 
+config_lib.DEFINE_integer(
+    "Client.message_spool_max_size", 0,
+    "Maximum size (in bytes) of the on-disk spool that outbound messages are "
+    "written to when the output queue is full, e.g. while the server is not "
+    "reachable. If 0, the spool is disabled and the client waits for the "
+    "output queue to be drained instead.")
+
+config_lib.DEFINE_string(
+    "Client.message_spool_directory", "%(Logging.path)/spool",
+    "The directory the outbound message spool is kept in.")
+
+config_lib.DEFINE_integer(
+    "Client.file_finder_max_open_files", 1,
+    "Maximum number of files the client file finder processes (checks "
+    "conditions on, hashes or uploads) at the same time. Results are still "
+    "returned in order. If 1, files are processed one after another.")
+
+config_lib.DEFINE_integer(
+    "Client.hash_cache_max_entries", 0,
+    "Maximum number of file hashes kept in the client's hash cache. Hashes of "
+    "files that haven't changed since they were last hashed (same device, "
+    "inode, size, modification and change time) are taken from the cache "
+    "instead of reading the files again. If 0, the cache is disabled.")
+
+config_lib.DEFINE_string(
+    "Client.hash_cache_path", "%(Logging.path)/hash_cache",
+    "The file the client's hash cache is kept in.")
+
+config_lib.DEFINE_choice(
+    "Client.compression", "zlib", ["zlib", "lz4"],
+    "How the client compresses messages and file contents it sends to the "
+    "server. 'lz4' uses a lot less CPU than 'zlib' but needs the lz4 package "
+    "on both the client and the server; it is only used once the server "
+    "advertised that it supports it. Data that doesn't compress well is "
+    "always sent uncompressed.")
+
 config_lib.DEFINE_integer(
     "Client.foreman_check_frequency", 1800,
     "The minimum number of seconds before checking with "
@@ -17,6 +17,16 @@ config_lib.DEFINE_string("Datastore.implementation", "FakeDataStore",
 config_lib.DEFINE_string("Blobstore.implementation", "MemoryStreamBlobStore",
                          "Blob storage subsystem to use.")
 
+config_lib.DEFINE_string(
+    "Blobstore.local_fs_root", "",
+    "Root directory of the LocalFSBlobStore. Blobs are stored in a sharded "
+    "directory tree below this directory.")
+
+config_lib.DEFINE_integer(
+    "Blobstore.local_fs_read_threads", 10,
+    "Maximum number of threads used by LocalFSBlobStore to read blobs in "
+    "parallel.")
+
 config_lib.DEFINE_string("Database.implementation", "",
                          "Relational database system to use.")
 
@@ -107,6 +107,41 @@ config_lib.DEFINE_integer(
     "use ports between Frontend.bind_port and "
     "Frontend.port_max.")
 
+config_lib.DEFINE_choice(
+    "Frontend.server_mode", "threading", ["threading", "event_loop"],
+    "How the HTTP frontend serves client connections. 'threading' uses a "
+    "thread per connection. 'event_loop' multiplexes connections on a single "
+    "thread and processes requests in a bounded worker pool, rejecting "
+    "requests with 503 when the pool is saturated.")
+
+config_lib.DEFINE_integer(
+    "Frontend.event_loop_workers", 32,
+    "Number of worker threads processing client requests in the "
+    "'event_loop' frontend server mode.")
+
+config_lib.DEFINE_integer(
+    "Frontend.event_loop_idle_timeout", 300,
+    "Time (in seconds) after which idle keep-alive client connections are "
+    "closed in the 'event_loop' frontend server mode.")
+
+config_lib.DEFINE_integer(
+    "Frontend.event_loop_max_request_size", 100 * 1024 * 1024,
+    "Maximum size (in bytes) of a request body accepted in the 'event_loop' "
+    "frontend server mode. Larger requests are rejected with 413.")
+
+config_lib.DEFINE_integer(
+    "Frontend.processes", 1,
+    "Number of frontend worker processes to run. If larger than 1, the "
+    "frontend forks this many workers that all listen on Frontend.bind_port "
+    "using SO_REUSEPORT, so that client requests are processed on multiple "
+    "cores.")
+
+config_lib.DEFINE_integer(
+    "Frontend.shared_key_cache_size", 65536,
+    "Number of client public keys kept in the memory-mapped cache shared by "
+    "all frontend worker processes. Only used if Frontend.processes is "
+    "larger than 1.")
+
 config_lib.DEFINE_integer(
     "Frontend.max_queue_size", 500,
     "Maximum number of messages to queue for the client.")
@@ -121,6 +156,16 @@ config_lib.DEFINE_integer(
     "Maximum time messages remain valid within the "
     "system.")
 
+config_lib.DEFINE_integer(
+    "Frontend.outbound_cipher_cache_size", 100000,
+    "Maximum number of per-client session ciphers the frontend keeps for "
+    "encrypting messages sent to clients.")
+
+config_lib.DEFINE_integer(
+    "Frontend.outbound_cipher_cache_max_age", 24 * 60 * 60,
+    "Maximum time (in seconds) a session cipher is reused for messages sent "
+    "to a client. Every new cipher costs an RSA encryption and signature.")
+
 config_lib.DEFINE_bool(
     "Server.initialized", False, "True once config_updater initialize has been "
     "run at least once.")
@@ -201,6 +246,31 @@ config_lib.DEFINE_integer(
     help="The number of bytes allowed for unbounded "
     "reads from a file object")
 
+config_lib.DEFINE_integer(
+    "Server.blob_decompression_threads", 4,
+    "Maximum number of threads used to decompress and hash blobs uploaded "
+    "by clients.")
+
+config_lib.DEFINE_bool(
+    "Server.trust_client_blob_digests", False,
+    "If True, blobs uploaded by clients are not decompressed if the digest "
+    "reported by the client identifies a blob that is already stored. This "
+    "saves server CPU, but the server no longer verifies that the uploaded "
+    "data matches the digest. Since blobs are content-addressed, a client can "
+    "only affect its own uploads this way.")
+
+config_lib.DEFINE_integer(
+    "Server.blob_stream_read_ahead",
+    10,
+    help="Number of blobs fetched from the blob store in a single call "
+    "when reading collected files from the file store.")
+
+config_lib.DEFINE_integer(
+    "Server.blob_stream_cache_size",
+    64 * 1024 * 1024,
+    help="Maximum number of bytes of blob data cached in memory by file "
+    "store readers. Cached blobs are shared by all readers in the process.")
+
 # Data retention policies.
 config_lib.DEFINE_semantic_value(
     rdfvalue.Duration,
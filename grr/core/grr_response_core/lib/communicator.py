@@ -7,11 +7,11 @@ from __future__ import unicode_literals
 import abc
 import struct
 import time
-import zlib
 
 
 from future.utils import with_metaclass
 
+from grr_response_core.lib import compression
 from grr_response_core.lib import rdfvalue
 from grr_response_core.lib import type_info
 from grr_response_core.lib import utils
@@ -34,6 +34,8 @@ def GetMetricMetadata():
       stats_utils.CreateCounterMetadata("grr_rsa_operations"),
       stats_utils.CreateCounterMetadata(
           "grr_encrypted_cipher_cache", fields=[("type", str)]),
+      stats_utils.CreateCounterMetadata(
+          "grr_outbound_cipher_cache", fields=[("type", str)]),
   ]
 
 
@@ -267,6 +269,9 @@ class ReceivedCipher(Cipher):
 class Communicator(with_metaclass(abc.ABCMeta, object)):
   """A class responsible for encoding and decoding comms."""
   server_name = None
+  # How outbound message lists are compressed. Servers keep using zlib, since
+  # it is the only scheme all clients understand.
+  compression_type = compression.ZCOMPRESSION
 
   def __init__(self, certificate=None, private_key=None):
     """Creates a communicator.
@@ -282,23 +287,30 @@ class Communicator(with_metaclass(abc.ABCMeta, object)):
     # A cache for encrypted ciphers
     self.encrypted_cipher_cache = utils.FastStore(max_size=50000)
 
+    # A cache for ciphers used to send messages to a given destination. Only
+    # set up by communicators that talk to more than one endpoint.
+    self.outbound_cipher_cache = None
+
   @abc.abstractmethod
   def _GetRemotePublicKey(self, server_name):
     raise NotImplementedError()
 
   @classmethod
-  def EncodeMessageList(cls, message_list, packed_message_list):
+  def EncodeMessageList(cls,
+                        message_list,
+                        packed_message_list,
+                        compression_type=compression.ZCOMPRESSION):
     """Encode the MessageList into the packed_message_list rdfvalue."""
     # By default uncompress
     uncompressed_data = message_list.SerializeToString()
     packed_message_list.message_list = uncompressed_data
 
-    compressed_data = zlib.compress(uncompressed_data)
+    compression_type, compressed_data = compression.Compress(
+        uncompressed_data, compression_type)
 
     # Only compress if it buys us something.
     if len(compressed_data) < len(uncompressed_data):
-      packed_message_list.compression = (
-          rdf_flows.PackedMessageList.CompressionType.ZCOMPRESSION)
+      packed_message_list.compression = compression_type
       packed_message_list.message_list = compressed_data
 
   def _ClearServerCipherCache(self):
@@ -319,6 +331,30 @@ class Communicator(with_metaclass(abc.ABCMeta, object)):
     self.server_cipher_age = rdfvalue.RDFDatetime.Now()
     return self.server_cipher
 
+  def _GetOutboundCipher(self, destination):
+    """Returns the cipher for messages sent to a given destination."""
+    remote_public_key = self._GetRemotePublicKey(destination)
+    if self.outbound_cipher_cache is None:
+      return Cipher(self.common_name, self.private_key, remote_public_key)
+
+    # A cached cipher is only valid as long as the destination's key doesn't
+    # change (e.g. because the client was re-enrolled).
+    key_id = remote_public_key.GetN()
+    try:
+      cached_key_id, cipher = self.outbound_cipher_cache.Get(str(destination))
+      if cached_key_id == key_id:
+        stats_collector_instance.Get().IncrementCounter(
+            "grr_outbound_cipher_cache", fields=["hits"])
+        return cipher
+    except KeyError:
+      pass
+
+    stats_collector_instance.Get().IncrementCounter(
+        "grr_outbound_cipher_cache", fields=["misses"])
+    cipher = Cipher(self.common_name, self.private_key, remote_public_key)
+    self.outbound_cipher_cache.Put(str(destination), (key_id, cipher))
+    return cipher
+
   def EncodeMessages(self,
                      message_list,
                      result,
@@ -363,15 +399,19 @@ class Communicator(with_metaclass(abc.ABCMeta, object)):
       # it's the only cipher it ever uses.
       cipher = self._GetServerCipher()
     else:
-      remote_public_key = self._GetRemotePublicKey(destination)
-      cipher = Cipher(self.common_name, self.private_key, remote_public_key)
+      cipher = self._GetOutboundCipher(destination)
 
     # Make a nonce for this transaction
     if timestamp is None:
       self.timestamp = timestamp = int(time.time() * 1000000)
 
-    packed_message_list = rdf_flows.PackedMessageList(timestamp=timestamp)
-    self.EncodeMessageList(message_list, packed_message_list)
+    packed_message_list = rdf_flows.PackedMessageList(
+        timestamp=timestamp,
+        supported_compression=compression.SupportedCompressionTypes())
+    self.EncodeMessageList(
+        message_list,
+        packed_message_list,
+        compression_type=self.compression_type)
 
     result.encrypted_cipher_metadata = cipher.encrypted_cipher_metadata
 
@@ -433,18 +473,13 @@ class Communicator(with_metaclass(abc.ABCMeta, object)):
     Raises:
       DecodingError: If decompression fails.
     """
-    compression = packed_message_list.compression
-    if compression == rdf_flows.PackedMessageList.CompressionType.UNCOMPRESSED:
-      data = packed_message_list.message_list
-
-    elif (compression ==
-          rdf_flows.PackedMessageList.CompressionType.ZCOMPRESSION):
-      try:
-        data = zlib.decompress(packed_message_list.message_list)
-      except zlib.error as e:
-        raise DecodingError("Failed to decompress: %s" % e)
-    else:
+    try:
+      data = compression.Decompress(packed_message_list.message_list,
+                                    packed_message_list.compression)
+    except compression.UnsupportedCompressionError:
       raise DecodingError("Compression scheme not supported")
+    except compression.DecompressionError as e:
+      raise DecodingError("Failed to decompress: %s" % e)
 
     try:
       result = rdf_flows.MessageList.FromSerializedString(data)
@@ -520,6 +555,9 @@ class Communicator(with_metaclass(abc.ABCMeta, object)):
         remote_public_key)
     # pyformat: enable
 
+    if auth_state == rdf_flows.GrrMessage.AuthorizationState.AUTHENTICATED:
+      self.SetRemoteCompressionTypes(packed_message_list.supported_compression)
+
     # Mark messages as authenticated and where they came from.
     for msg in message_list.job:
       msg.auth_state = auth_state
@@ -528,6 +566,13 @@ class Communicator(with_metaclass(abc.ABCMeta, object)):
     return (message_list.job, cipher.cipher_metadata.source,
             packed_message_list.timestamp)
 
+  def SetRemoteCompressionTypes(self, compression_types):
+    """Called with the compression types an authenticated remote end supports.
+
+    Args:
+      compression_types: A list of `CompressionType` enum values.
+    """
+
   def VerifyMessageSignature(self, unused_response_comms, packed_message_list,
                              cipher, cipher_verified, api_version,
                              remote_public_key):
@@ -0,0 +1,227 @@
+#!/usr/bin/env python
+"""Compression codecs for data sent between clients and the server.
+
+Both `DataBlob` and `PackedMessageList` carry a `CompressionType` enum telling
+the receiving end how their payload is compressed. This module maps these enum
+values to codecs, so that new compression schemes only have to be added here.
+
+zlib is always available. LZ4 is used if the `lz4` package is installed, it is
+a lot faster than zlib at the cost of a lower compression ratio.
+"""
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import unicode_literals
+
+import zlib
+
+
+from grr_response_core.lib.rdfvalues import protodict as rdf_protodict
+
+# pylint: disable=g-import-not-at-top
+try:
+  # pytype: disable=import-error
+  import lz4.frame
+  # pytype: enable=import-error
+except ImportError:
+  lz4 = None
+# pylint: enable=g-import-not-at-top
+
+# `DataBlob` and `PackedMessageList` use the same numbering of their
+# `CompressionType` enums.
+UNCOMPRESSED = int(rdf_protodict.DataBlob.CompressionType.UNCOMPRESSED)
+ZCOMPRESSION = int(rdf_protodict.DataBlob.CompressionType.ZCOMPRESSION)
+LZ4COMPRESSION = int(rdf_protodict.DataBlob.CompressionType.LZ4COMPRESSION)
+
+
+class Error(Exception):
+  """Base class for compression errors."""
+
+
+class UnsupportedCompressionError(Error):
+  """Raised when a compression scheme is unknown or not available."""
+
+
+class DecompressionError(Error):
+  """Raised when compressed data can't be decompressed."""
+
+
+class Codec(object):
+  """A compression scheme.
+
+  Attributes:
+    name: The name used to select the codec in the configuration.
+    compression_type: The `CompressionType` enum value of the codec.
+  """
+
+  name = None
+  compression_type = None
+
+  def Compress(self, data):
+    raise NotImplementedError()
+
+  def Decompress(self, data):
+    raise NotImplementedError()
+
+
+class NullCodec(Codec):
+  """A codec that leaves the data as it is."""
+
+  name = "none"
+  compression_type = UNCOMPRESSED
+
+  def Compress(self, data):
+    return data
+
+  def Decompress(self, data):
+    return data
+
+
+class ZlibCodec(Codec):
+  """A codec using zlib."""
+
+  name = "zlib"
+  compression_type = ZCOMPRESSION
+
+  def Compress(self, data):
+    return zlib.compress(data)
+
+  def Decompress(self, data):
+    try:
+      return zlib.decompress(data)
+    except zlib.error as e:
+      raise DecompressionError(e)
+
+
+class Lz4Codec(Codec):
+  """A codec using the LZ4 frame format."""
+
+  name = "lz4"
+  compression_type = LZ4COMPRESSION
+
+  def Compress(self, data):
+    return lz4.frame.compress(data)
+
+  def Decompress(self, data):
+    try:
+      return lz4.frame.decompress(data)
+    except RuntimeError as e:
+      raise DecompressionError(e)
+
+
+_CODECS = {}
+
+
+def RegisterCodec(codec):
+  """Makes a codec available for compression and decompression."""
+  _CODECS[codec.compression_type] = codec
+
+
+def GetCodec(compression_type):
+  """Returns the codec for a given `CompressionType` enum value.
+
+  Args:
+    compression_type: A `CompressionType` enum value.
+
+  Returns:
+    A `Codec` instance.
+
+  Raises:
+    UnsupportedCompressionError: If the compression type is not available.
+  """
+  try:
+    return _CODECS[int(compression_type)]
+  except KeyError:
+    raise UnsupportedCompressionError(
+        "Compression scheme %s not supported." % compression_type)
+
+
+def SupportedCompressionTypes():
+  """Returns the `CompressionType` enum values of all available codecs."""
+  return sorted(_CODECS)
+
+
+def GetCodecByName(name):
+  """Returns the codec with a given name, see `GetCodec`."""
+  for codec in _CODECS.values():
+    if codec.name == name:
+      return codec
+
+  raise UnsupportedCompressionError(
+      "Compression scheme %s not supported." % name)
+
+
+RegisterCodec(NullCodec())
+RegisterCodec(ZlibCodec())
+if lz4 is not None:
+  RegisterCodec(Lz4Codec())
+
+# Data shorter than this is compressed without checking its entropy first.
+_MIN_SAMPLED_SIZE = 64 * 1024
+_SAMPLE_SIZE = 4096
+_SAMPLE_COUNT = 4
+# The compression ratio above which samples are considered incompressible.
+_INCOMPRESSIBLE_RATIO = 0.95
+
+
+def IsLikelyIncompressible(data):
+  """Guesses whether compressing some data is a waste of time.
+
+  Already compressed or encrypted data (JPEGs, zip files, packed executables
+  and so on) doesn't shrink when it is compressed again. To detect it without
+  compressing all of it, a few small samples spread over the data are
+  compressed with the fastest zlib level. If they don't shrink, the data most
+  likely has a high entropy throughout.
+
+  Args:
+    data: The data to check.
+
+  Returns:
+    True if the data is most likely not worth compressing.
+  """
+  if len(data) < _MIN_SAMPLED_SIZE:
+    return False
+
+  stride = (len(data) - _SAMPLE_SIZE) // (_SAMPLE_COUNT - 1)
+  sample = b"".join(data[i * stride:i * stride + _SAMPLE_SIZE]
+                    for i in range(_SAMPLE_COUNT))
+  compressed_size = len(zlib.compress(sample, 1))
+  return compressed_size > len(sample) * _INCOMPRESSIBLE_RATIO
+
+
+def Compress(data, compression_type=ZCOMPRESSION):
+  """Compresses data unless it is likely incompressible.
+
+  Args:
+    data: The data to compress.
+    compression_type: The `CompressionType` enum value of the codec to use.
+
+  Returns:
+    A tuple (compression_type, data) with the compression that was actually
+    applied, which is UNCOMPRESSED if the data doesn't look compressible, and
+    the resulting data.
+
+  Raises:
+    UnsupportedCompressionError: If the compression type is not available.
+  """
+  codec = GetCodec(compression_type)
+  if IsLikelyIncompressible(data):
+    return UNCOMPRESSED, data
+
+  return codec.compression_type, codec.Compress(data)
+
+
+def Decompress(data, compression_type):
+  """Decompresses data compressed with a given codec.
+
+  Args:
+    data: The compressed data.
+    compression_type: The `CompressionType` enum value of the codec used.
+
+  Returns:
+    The decompressed data.
+
+  Raises:
+    UnsupportedCompressionError: If the compression type is not available.
+    DecompressionError: If the data can't be decompressed.
+  """
+  return GetCodec(compression_type).Decompress(data)
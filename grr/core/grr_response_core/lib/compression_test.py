@@ -0,0 +1,89 @@
+#!/usr/bin/env python
+"""Tests for compression codecs."""
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import unicode_literals
+
+import os
+import unittest
+import zlib
+
+
+from absl.testing import absltest
+
+from grr_response_core.lib import compression
+from grr_response_core.lib import flags
+from grr.test_lib import test_lib
+
+
+class CompressionTest(absltest.TestCase):
+
+  def testCompressesCompressibleData(self):
+    data = b"foobar" * 100000
+
+    compression_type, compressed = compression.Compress(data)
+
+    self.assertEqual(compression_type, compression.ZCOMPRESSION)
+    self.assertEqual(compressed, zlib.compress(data))
+    self.assertEqual(compression.Decompress(compressed, compression_type), data)
+
+  def testCompressesSmallData(self):
+    compression_type, compressed = compression.Compress(b"foo")
+
+    self.assertEqual(compression_type, compression.ZCOMPRESSION)
+    self.assertEqual(compressed, zlib.compress(b"foo"))
+
+  def testDoesNotCompressRandomData(self):
+    data = os.urandom(512 * 1024)
+
+    self.assertTrue(compression.IsLikelyIncompressible(data))
+    self.assertEqual(
+        compression.Compress(data), (compression.UNCOMPRESSED, data))
+
+  def testDoesNotCompressDataAlreadyCompressed(self):
+    data = zlib.compress(os.urandom(256 * 1024) + b"\0" * 256 * 1024)
+
+    self.assertTrue(compression.IsLikelyIncompressible(data))
+
+  def testCompressesDataWithIncompressiblePrefix(self):
+    data = os.urandom(4096) + b"foo" * 100000
+
+    self.assertFalse(compression.IsLikelyIncompressible(data))
+
+  def testDecompressesUncompressedData(self):
+    self.assertEqual(
+        compression.Decompress(b"foo", compression.UNCOMPRESSED), b"foo")
+
+  def testRaisesOnUnsupportedCompressionType(self):
+    with self.assertRaises(compression.UnsupportedCompressionError):
+      compression.Compress(b"foo", 42)
+
+    with self.assertRaises(compression.UnsupportedCompressionError):
+      compression.Decompress(b"foo", 42)
+
+    with self.assertRaises(compression.UnsupportedCompressionError):
+      compression.GetCodecByName("foo")
+
+  def testRaisesOnCorruptedData(self):
+    with self.assertRaises(compression.DecompressionError):
+      compression.Decompress(b"foo", compression.ZCOMPRESSION)
+
+  @unittest.skipIf(compression.lz4 is None, "lz4 is not installed.")
+  def testLz4RoundTrip(self):
+    data = b"foobar" * 100000
+    codec = compression.GetCodecByName("lz4")
+
+    compression_type, compressed = compression.Compress(
+        data, codec.compression_type)
+
+    self.assertEqual(compression_type, compression.LZ4COMPRESSION)
+    self.assertLess(len(compressed), len(data))
+    self.assertEqual(compression.Decompress(compressed, compression_type), data)
+
+
+def main(argv):
+  test_lib.main(argv)
+
+
+if __name__ == "__main__":
+  flags.StartMain(main)
@@ -24,6 +24,7 @@ import logging
 import posixpath
 import re
 import time
+import types
 import zlib
 
 
@@ -57,6 +58,11 @@ def RegisterLateBindingCallback(target_name, callback, **kwargs):
   _LATE_BINDING_STORE.setdefault(target_name, []).append((callback, kwargs))
 
 
+def GetLateBoundNames():
+  """Returns names of RDFValues that are referred to but not declared yet."""
+  return list(_LATE_BINDING_STORE)
+
+
 class Error(Exception):
   """Errors generated by RDFValue parsers."""
 
@@ -73,12 +79,44 @@ class DecodeError(InitializeError, ValueError):
     super(DecodeError, self).__init__(msg)
 
 
+# Defaults of the attributes stored in `RDFValue.__slots__`.
+_SLOT_DEFAULTS = {
+    "_value": None,
+    "_age": 0,
+    # Mark as dirty each time we modify this object.
+    "dirty": False,
+    # If this value was created as part of an AFF4 attribute, the attribute is
+    # assigned here.
+    "attribute_instance": None,
+}
+
+
+def _GetSlots(cls):
+  """Returns a dict of the slot descriptors used by instances of a class."""
+  slots = {}
+  for base in cls.__mro__:
+    for name in base.__dict__.get("__slots__", ()):
+      descriptor = base.__dict__[name]
+      # Slots shadowed by a class attribute are not used.
+      if getattr(cls, name) is descriptor:
+        slots[name] = descriptor
+  return slots
+
+
 class RDFValueMetaclass(registry.MetaclassRegistry):
   """A metaclass for managing semantic values."""
 
   def __init__(cls, name, bases, env_dict):  # pylint: disable=no-self-argument
     super(RDFValueMetaclass, cls).__init__(name, bases, env_dict)
 
+    # Classes that do not declare `__slots__` have an instance dictionary and
+    # do not necessarily call `RDFValue.__init__`, so they keep the defaults as
+    # class attributes.
+    if "__slots__" not in env_dict:
+      for attr_name, default in iteritems(_SLOT_DEFAULTS):
+        if isinstance(getattr(cls, attr_name), types.MemberDescriptorType):
+          setattr(cls, attr_name, default)
+
     # Run and clear any late binding callbacks registered for this class.
     for callback, kwargs in _LATE_BINDING_STORE.pop(name, []):
       callback(target=cls, **kwargs)
@@ -93,8 +131,14 @@ class RDFValue(with_metaclass(RDFValueMetaclass, object)):
   """Baseclass for values.
 
   RDFValues are serialized to and from the data store.
+
+  Values are created in very large numbers, so the primitive values declare
+  `__slots__` instead of having an instance dictionary. Subclasses which do not
+  declare `__slots__` get an instance dictionary as usual.
   """
 
+  __slots__ = tuple(_SLOT_DEFAULTS)
+
   # This is how the attribute will be serialized to the data store. It must
   # indicate both the type emitted by SerializeToDataStore() and expected by
   # FromDatastoreValue()
@@ -103,16 +147,6 @@ class RDFValue(with_metaclass(RDFValueMetaclass, object)):
   # URL pointing to a help page about this value type.
   context_help_url = None
 
-  _value = None
-  _age = 0
-
-  # Mark as dirty each time we modify this object.
-  dirty = False
-
-  # If this value was created as part of an AFF4 attribute, the attribute is
-  # assigned here.
-  attribute_instance = None
-
   def __init__(self, initializer=None, age=None):
     """Constructor must be able to take no args.
 
@@ -124,11 +158,12 @@ class RDFValue(with_metaclass(RDFValueMetaclass, object)):
     Raises:
       InitializeError: if we can not be initialized from this parameter.
     """
-    # Default timestamp is now.
-    if age is None:
-      age = RDFDatetime(age=0)
-
-    self._age = age
+    self._value = None
+    # The default age is the epoch. It is converted to an `RDFDatetime` only
+    # when accessed, see the `age` property.
+    self._age = age if age is not None else 0
+    self.dirty = False
+    self.attribute_instance = None
 
     # Allow an RDFValue to be initialized from an identical RDFValue.
     # TODO(user):pytype: type checker can't infer that the initializer
@@ -151,6 +186,23 @@ class RDFValue(with_metaclass(RDFValueMetaclass, object)):
   def __copy__(self):
     return self.Copy()
 
+  def __getstate__(self):
+    state = dict(getattr(self, "__dict__", {}))
+    for name, descriptor in iteritems(_GetSlots(self.__class__)):
+      try:
+        state[name] = descriptor.__get__(self, self.__class__)
+      except AttributeError:
+        pass
+    return state
+
+  def __setstate__(self, state):
+    slots = _GetSlots(self.__class__)
+    for name, value in iteritems(state):
+      if name in slots:
+        slots[name].__set__(self, value)
+      else:
+        self.__dict__[name] = value
+
   @property
   def age(self):
     if self._age.__class__ is not RDFDatetime:
@@ -233,6 +285,8 @@ class RDFValue(with_metaclass(RDFValueMetaclass, object)):
 
 class RDFPrimitive(RDFValue):
 
+  __slots__ = ()
+
   @classmethod
   def FromHumanReadable(cls, string):
     instance = cls()
@@ -256,12 +310,14 @@ class RDFBytes(RDFPrimitive):
   """An attribute which holds bytes."""
   data_store_type = "bytes"
 
-  _value = b""
+  __slots__ = ()
 
   def __init__(self, initializer=None, age=None):
     super(RDFBytes, self).__init__(initializer=initializer, age=age)
-    if not self._value and initializer is not None:
-      self.ParseFromString(initializer)
+    if not self._value:
+      self._value = b""
+      if initializer is not None:
+        self.ParseFromString(initializer)
 
   def ParseFromString(self, string):
     precondition.AssertType(string, bytes)
@@ -309,6 +365,8 @@ class RDFBytes(RDFPrimitive):
 class RDFZippedBytes(RDFBytes):
   """Zipped bytes sequence."""
 
+  __slots__ = ()
+
   def Uncompress(self):
     if self:
       return zlib.decompress(self._value)
@@ -323,11 +381,12 @@ class RDFString(RDFPrimitive):
 
   data_store_type = "string"
 
-  _value = u""
+  __slots__ = ()
 
   # TODO(hanuszczak): Allow initializng form arbitrary `unicode`-able object.
   def __init__(self, initializer=None, age=None):
     super(RDFString, self).__init__(initializer=None, age=age)
+    self._value = u""
 
     if isinstance(initializer, RDFString):
       self._value = initializer._value  # pylint: disable=protected-access
@@ -413,6 +472,8 @@ class HashDigest(RDFBytes):
 
   data_store_type = "bytes"
 
+  __slots__ = ()
+
   def HexDigest(self):
     return binascii.hexlify(self._value).decode("ascii")
 
@@ -436,6 +497,8 @@ class RDFInteger(RDFPrimitive):
 
   data_store_type = "integer"
 
+  __slots__ = ()
+
   @staticmethod
   def IsNumeric(value):
     return isinstance(value, (int, float, RDFInteger))
@@ -562,6 +625,8 @@ class RDFBool(RDFInteger):
   """Boolean value."""
   data_store_type = "unsigned_integer"
 
+  __slots__ = ()
+
   def ParseFromHumanReadable(self, string):
     precondition.AssertType(string, Text)
 
@@ -580,6 +645,8 @@ class RDFDatetime(RDFInteger):
   converter = MICROSECONDS
   data_store_type = "unsigned_integer"
 
+  __slots__ = ()
+
   def __init__(self, initializer=None, age=None):
     super(RDFDatetime, self).__init__(None, age)
 
@@ -772,12 +839,16 @@ class RDFDatetimeSeconds(RDFDatetime):
   """A DateTime class which is stored in whole seconds."""
   converter = 1
 
+  __slots__ = ()
+
 
 @python_2_unicode_compatible
 class Duration(RDFInteger):
   """Duration value stored in seconds internally."""
   data_store_type = "unsigned_integer"
 
+  __slots__ = ()
+
   # pyformat: disable
   DIVIDERS = collections.OrderedDict((
       ("w", 60 * 60 * 24 * 7),
@@ -928,6 +999,8 @@ class ByteSize(RDFInteger):
   """
   data_store_type = "unsigned_integer"
 
+  __slots__ = ()
+
   DIVIDERS = dict((
       ("", 1),
       ("k", 1000),
@@ -1012,7 +1085,7 @@ class RDFURN(RDFPrimitive):
   # class for performance reasons.
   scheme = "aff4"
 
-  _string_urn = ""
+  __slots__ = ("_string_urn",)
 
   def __init__(self, initializer=None, age=None):
     """Constructor.
@@ -1032,6 +1105,7 @@ class RDFURN(RDFPrimitive):
       super(RDFURN, self).__init__(None, age=age)
       return
 
+    self._string_urn = ""
     super(RDFURN, self).__init__(initializer=initializer, age=age)
     if self._value is None and initializer is not None:
       if isinstance(initializer, bytes):
@@ -1206,6 +1280,8 @@ class RDFURN(RDFPrimitive):
 class Subject(RDFURN):
   """A psuedo attribute representing the subject of an AFF4 object."""
 
+  __slots__ = ()
+
 
 DEFAULT_FLOW_QUEUE = RDFURN("F")
 
@@ -1213,6 +1289,8 @@ DEFAULT_FLOW_QUEUE = RDFURN("F")
 class SessionID(RDFURN):
   """An rdfvalue object that represents a session_id."""
 
+  __slots__ = ()
+
   def __init__(self,
                initializer=None,
                age=None,
@@ -1272,4 +1350,4 @@ class SessionID(RDFURN):
 
 # TODO(hanuszczak): Remove this class.
 class FlowSessionID(SessionID):
-  pass
+  __slots__ = ()
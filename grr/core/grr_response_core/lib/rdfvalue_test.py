@@ -6,6 +6,7 @@ from __future__ import absolute_import
 from __future__ import division
 from __future__ import unicode_literals
 
+import pickle
 
 from absl.testing import absltest
 from future.builtins import str
@@ -35,6 +36,36 @@ class RDFValueTest(absltest.TestCase):
     self.assertEqual(str(rdfvalue.RDFBool(True)), "1")
     self.assertEqual(str(rdfvalue.RDFString(long_string)), long_string)
 
+  def testPrimitivesHaveNoInstanceDictionary(self):
+    values = [
+        rdfvalue.RDFBytes(b"foo"),
+        rdfvalue.RDFString("foo"),
+        rdfvalue.RDFInteger(42),
+        rdfvalue.RDFDatetime.Now(),
+        rdfvalue.Duration("5m"),
+        rdfvalue.ByteSize("1kib"),
+        rdfvalue.RDFURN("aff4:/foo/bar"),
+        rdfvalue.SessionID(flow_name="ABCDEF12"),
+    ]
+
+    for value in values:
+      self.assertFalse(hasattr(value, "__dict__"), value.__class__.__name__)
+
+  def testDefaultAgeIsEpoch(self):
+    value = rdfvalue.RDFInteger(42)
+    self.assertIsInstance(value.age, rdfvalue.RDFDatetime)
+    self.assertEqual(value.age, rdfvalue.RDFDatetime(0))
+
+  def testPickle(self):
+    urn = rdfvalue.RDFURN("aff4:/foo/bar", age=rdfvalue.RDFDatetime(42))
+    urn.attribute_instance = "attribute"
+
+    for protocol in [0, pickle.HIGHEST_PROTOCOL]:
+      unpickled = pickle.loads(pickle.dumps(urn, protocol))
+      self.assertEqual(unpickled, urn)
+      self.assertEqual(unpickled.age, rdfvalue.RDFDatetime(42))
+      self.assertEqual(unpickled.attribute_instance, "attribute")
+
   # TODO(hanuszczak): Current implementation of `repr` for RDF values is broken
   # and not in line with Python guidelines. For example, `repr` should be
   # unambiguous whereas current implementation will trim long representations
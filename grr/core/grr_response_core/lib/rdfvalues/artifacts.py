@@ -345,6 +345,24 @@ class Artifact(rdf_structs.RDFProtoStruct):
     return "name: %s\n%s\n%s" % (name, doc_str, yaml_str)
 
 
+class ArtifactSnapshotEntry(rdf_structs.RDFProtoStruct):
+  """An artifact stored in an artifact registry snapshot."""
+
+  protobuf = artifact_pb2.ArtifactSnapshotEntry
+  rdf_deps = [
+      Artifact,
+  ]
+
+
+class ArtifactRegistrySnapshot(rdf_structs.RDFProtoStruct):
+  """A precompiled snapshot of the artifacts loaded from artifact files."""
+
+  protobuf = artifact_pb2.ArtifactRegistrySnapshot
+  rdf_deps = [
+      ArtifactSnapshotEntry,
+  ]
+
+
 class ArtifactProcessorDescriptor(rdf_structs.RDFProtoStruct):
   """Describes artifact processor."""
 
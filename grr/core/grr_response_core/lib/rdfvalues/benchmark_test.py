@@ -4,17 +4,24 @@ from __future__ import absolute_import
 from __future__ import division
 from __future__ import unicode_literals
 
+import sys
 
 from future.builtins import range
 from future.utils import iteritems
 from typing import Text
 
 from grr_response_core.lib import flags
+from grr_response_core.lib import rdfvalue
 from grr_response_core.lib import type_info
+from grr_response_core.lib import utils
 from grr_response_core.lib.rdfvalues import client as rdf_client
+from grr_response_core.lib.rdfvalues import client_fs as rdf_client_fs
+from grr_response_core.lib.rdfvalues import flows as rdf_flows
+from grr_response_core.lib.rdfvalues import paths as rdf_paths
 from grr_response_core.lib.rdfvalues import structs as rdf_structs
 from grr_response_proto import jobs_pb2
 from grr_response_proto import knowledge_base_pb2
+from grr_response_server.rdfvalues import flow_objects as rdf_flow_objects
 from grr.test_lib import benchmark_test_lib
 from grr.test_lib import test_lib
 
@@ -62,6 +69,22 @@ class FastGrrMessageList(rdf_structs.RDFProtoStruct):
               name="job", field_number=1, nested=StructGrrMessage)))
 
 
+class GenericStructCodec(object):
+  """A stand-in for struct codecs that uses the generic functions."""
+
+  def __init__(self, unused_struct_cls):
+    pass
+
+  def Encode(self, data):
+    # pylint: disable=protected-access
+    return rdf_structs._SerializeEntries(
+        utils.IterValuesInSortedKeysOrder(data))
+    # pylint: enable=protected-access
+
+  def Decode(self, buff, value_obj):
+    rdf_structs.ReadIntoObject(buff, 0, value_obj)
+
+
 class RDFValueBenchmark(benchmark_test_lib.AverageMicroBenchmarks):
   """Microbenchmark tests for RDFProtos."""
 
@@ -347,6 +370,90 @@ class RDFValueBenchmark(benchmark_test_lib.AverageMicroBenchmarks):
     self.TimeIt(RDFStructDecodeEncode)
     self.TimeIt(ProtoDecodeEncode)
 
+  def _StatEntry(self):
+    return rdf_client_fs.StatEntry(
+        pathspec=rdf_paths.PathSpec(
+            path="/home/user/.bash_history", pathtype="OS"),
+        st_mode=33188,
+        st_ino=1063090,
+        st_dev=64512,
+        st_nlink=1,
+        st_uid=1000,
+        st_gid=1000,
+        st_size=12345,
+        st_atime=1540000000,
+        st_mtime=1540000000,
+        st_ctime=1540000000)
+
+  def _GrrMessage(self):
+    return rdf_flows.GrrMessage(
+        session_id="aff4:/C.1000000000000000/flows/F:ABCDEF12",
+        request_id=1,
+        response_id=2,
+        name="GetFileStat",
+        payload=self._StatEntry())
+
+  def _FlowResult(self):
+    return rdf_flow_objects.FlowResult(
+        client_id="C.1000000000000000",
+        flow_id="ABCDEF12",
+        tag="tag:foo",
+        timestamp=rdfvalue.RDFDatetime(1540000000000000),
+        payload=self._StatEntry())
+
+  def _TimeStructCodecs(self, factory):
+    """Compares struct codecs to the generic serialization functions."""
+    sample = factory()
+    data = sample.SerializeToString()
+    name = sample.__class__.__name__
+
+    def CreateAndSerialize():
+      return len(factory().SerializeToString())
+
+    def DecodeAndEncode():
+      value = sample.__class__.FromSerializedString(data)
+      return len(value.SerializeToString())
+
+    with utils.Stubber(rdf_structs, "_GetStructCodec", GenericStructCodec):
+      self.assertEqual(factory().SerializeToString(), data)
+
+      self.TimeIt(CreateAndSerialize,
+                  "%s create and serialize (generic)" % name)
+      self.TimeIt(DecodeAndEncode, "%s decode and encode (generic)" % name)
+
+    self.TimeIt(CreateAndSerialize, "%s create and serialize (codec)" % name)
+    self.TimeIt(DecodeAndEncode, "%s decode and encode (codec)" % name)
+
+  def testStructCodecs(self):
+    self._TimeStructCodecs(self._GrrMessage)
+    self._TimeStructCodecs(self._StatEntry)
+    self._TimeStructCodecs(self._FlowResult)
+
+  def _TimePrimitiveAllocation(self, factory):
+    """Times allocation of primitive values and reports their size."""
+    sample = factory()
+    size = sys.getsizeof(sample)
+    if hasattr(sample, "__dict__"):
+      size += sys.getsizeof(sample.__dict__)
+
+    def Allocate():
+      values = [factory() for _ in range(1000)]
+      del values
+      return size
+
+    self.TimeIt(Allocate,
+                "Allocate 1000 %s (bytes each)" % sample.__class__.__name__)
+
+  def testPrimitiveAllocation(self):
+    self._TimePrimitiveAllocation(lambda: rdfvalue.RDFInteger(42))
+    self._TimePrimitiveAllocation(
+        lambda: rdfvalue.RDFDatetime(1540000000000000))
+    self._TimePrimitiveAllocation(lambda: rdfvalue.Duration("5m"))
+    self._TimePrimitiveAllocation(
+        lambda: rdfvalue.RDFURN("aff4:/C.1000000000000000/fs/os"))
+    self._TimePrimitiveAllocation(
+        lambda: rdfvalue.SessionID(flow_name="ABCDEF12"))
+
 
 def main(argv):
   # Run the full test suite
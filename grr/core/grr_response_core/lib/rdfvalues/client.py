@@ -58,6 +58,8 @@ class ClientURN(rdfvalue.RDFURN):
   # Valid client urns must match this expression.
   CLIENT_ID_RE = re.compile(r"^(aff4:)?/?(?P<clientid>(c|C)\.[0-9a-fA-F]{16})$")
 
+  __slots__ = ()
+
   def __init__(self, initializer=None, age=None):
     if isinstance(initializer, rdfvalue.RDFURN):
       if not self.Validate(initializer.Path()):
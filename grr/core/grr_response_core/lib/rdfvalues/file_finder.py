@@ -66,6 +66,14 @@ class FileFinderContentsLiteralMatchCondition(rdf_structs.RDFProtoStruct):
   ]
 
 
+class FileFinderContentsMultiMatchCondition(rdf_structs.RDFProtoStruct):
+  protobuf = flows_pb2.FileFinderContentsMultiMatchCondition
+  rdf_deps = [
+      rdf_standard.LiteralExpression,
+      rdf_standard.RegularExpression,
+  ]
+
+
 class FileFinderCondition(rdf_structs.RDFProtoStruct):
   """An RDF value representing file finder conditions."""
 
@@ -73,6 +81,7 @@ class FileFinderCondition(rdf_structs.RDFProtoStruct):
   rdf_deps = [
       FileFinderAccessTimeCondition,
       FileFinderContentsLiteralMatchCondition,
+      FileFinderContentsMultiMatchCondition,
       FileFinderContentsRegexMatchCondition,
       FileFinderInodeChangeTimeCondition,
       FileFinderModificationTimeCondition,
@@ -122,6 +131,12 @@ class FileFinderCondition(rdf_structs.RDFProtoStruct):
     opts = FileFinderContentsRegexMatchCondition(**kwargs)
     return cls(condition_type=condition_type, contents_regex_match=opts)
 
+  @classmethod
+  def ContentsMultiMatch(cls, **kwargs):
+    condition_type = cls.Type.CONTENTS_MULTI_MATCH
+    opts = FileFinderContentsMultiMatchCondition(**kwargs)
+    return cls(condition_type=condition_type, contents_multi_match=opts)
+
 
 class FileFinderStatActionOptions(rdf_structs.RDFProtoStruct):
   protobuf = flows_pb2.FileFinderStatActionOptions
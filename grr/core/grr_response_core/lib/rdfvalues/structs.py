@@ -208,6 +208,44 @@ def SplitBuffer(buff, index=0, length=None):
       raise rdfvalue.DecodeError("Unexpected Tag.")
 
 
+def _SplitOffsets(buff, index, end):
+  """Like `SplitBuffer` but yields the offsets of fields instead of copies.
+
+  Args:
+    buff: The buffer to parse.
+    index: The position to start parsing.
+    end: The position to parse until.
+
+  Yields:
+    Tuples (encoded_tag, length_index, data_index, data_end). The encoded length
+    of a field is in buff[length_index:data_index] and its raw data is in
+    buff[data_index:data_end].
+  """
+  while index < end:
+    encoded_tag, length_index = ReadTag(buff, index)
+
+    tag_type = ORD_MAP[encoded_tag[0]] & TAG_TYPE_MASK
+    if tag_type == WIRETYPE_VARINT:
+      _, index = VarintReader(buff, length_index)
+      yield (encoded_tag, length_index, length_index, index)
+
+    elif tag_type == WIRETYPE_FIXED64:
+      index = length_index + 8
+      yield (encoded_tag, length_index, length_index, index)
+
+    elif tag_type == WIRETYPE_FIXED32:
+      index = length_index + 4
+      yield (encoded_tag, length_index, length_index, index)
+
+    elif tag_type == WIRETYPE_LENGTH_DELIMITED:
+      length, data_index = VarintReader(buff, length_index)
+      index = data_index + length
+      yield (encoded_tag, length_index, data_index, index)
+
+    else:
+      raise rdfvalue.DecodeError("Unexpected Tag.")
+
+
 def _SerializeEntries(entries):
   """Serializes given triplets of python and wire values and a descriptor."""
 
@@ -681,6 +719,8 @@ class EnumNamedValue(rdfvalue.RDFInteger):
   Enums are just integers, except when printed they have a name.
   """
 
+  __slots__ = ("name", "description", "labels")
+
   def __init__(self,
                initializer=None,
                name=None,
@@ -841,6 +881,24 @@ class ProtoBoolean(ProtoEnum):
             value, container=container))
 
 
+# Descriptors of scalar fields. Their python format is never dirty and their
+# wire format is always a tuple of byte strings, so serializing them needs no
+# further checks.
+_SCALAR_DESCRIPTORS = frozenset([
+    ProtoString,
+    ProtoBinary,
+    ProtoUnsignedInteger,
+    ProtoSignedInteger,
+    ProtoFixed32,
+    ProtoFixed64,
+    ProtoFixedU32,
+    ProtoFloat,
+    ProtoDouble,
+    ProtoEnum,
+    ProtoBoolean,
+])
+
+
 class ProtoEmbedded(ProtoType):
   """A field may be embedded as a serialized protobuf.
 
@@ -887,14 +945,13 @@ class ProtoEmbedded(ProtoType):
   def ConvertFromWireFormat(self, value, container=None):
     """The wire format is simply a string."""
     result = self.type()
-    ReadIntoObject(value[2], 0, result)
+    _GetStructCodec(self.type).Decode(value[2], result)
 
     return result
 
   def ConvertToWireFormat(self, value):
     """Encode the nested protobuf into wire format."""
-    output = _SerializeEntries(
-        utils.IterValuesInSortedKeysOrder(value.GetRawData()))
+    output = _GetStructCodec(value.__class__).Encode(value.GetRawData())
     return (self.encoded_tag, VarintEncode(len(output)), output)
 
   def LateBind(self, target=None):
@@ -1046,7 +1103,7 @@ class ProtoDynamicAnyValueEmbedded(ProtoDynamicEmbedded):
   def ConvertFromWireFormat(self, value, container=None):
     """The wire format is an AnyValue message."""
     result = AnyValue()
-    ReadIntoObject(value[2], 0, result)
+    _GetStructCodec(AnyValue).Decode(value[2], result)
     if self._type is not None:
       converted_value = self._type(container)
     else:
@@ -1098,8 +1155,7 @@ class ProtoDynamicAnyValueEmbedded(ProtoDynamicEmbedded):
           "Can't convert value %s to an protobuf.Any value." % value)
 
     any_value = AnyValue(type_url=type_name, value=data)
-    output = _SerializeEntries(
-        utils.IterValuesInSortedKeysOrder(any_value.GetRawData()))
+    output = _GetStructCodec(AnyValue).Encode(any_value.GetRawData())
 
     return (self.encoded_tag, VarintEncode(len(output)), output)
 
@@ -1342,10 +1398,20 @@ class ProtoList(ProtoType):
     Returns:
       A wire format representation of the value.
     """
-    output = _SerializeEntries(
-        (python_format, wire_format, value.type_descriptor)
-        for (python_format, wire_format) in value.wrapped_list)
-    return b"", b"", output
+    type_descriptor = value.type_descriptor
+    if type_descriptor.__class__ not in _SCALAR_DESCRIPTORS:
+      output = _SerializeEntries(
+          (python_format, wire_format, type_descriptor)
+          for (python_format, wire_format) in value.wrapped_list)
+      return b"", b"", output
+
+    output = []
+    for python_format, wire_format in value.wrapped_list:
+      if wire_format is None:
+        wire_format = type_descriptor.ConvertToWireFormat(python_format)
+      output.extend(wire_format)
+
+    return b"", b"", b"".join(output)
 
   def Format(self, value):
     yield "["
@@ -1546,6 +1612,118 @@ class ProtoRDFValue(ProtoType):
         self.name, self.proto_type_name, self.owner.__name__, self.field_number)
 
 
+class _StructCodec(object):
+  """Serialization routines specialised for a single RDFStruct class.
+
+  `_SerializeEntries` and `ReadIntoObject` work for any struct, so they have to
+  inspect and check every field each time a struct is serialized or parsed. A
+  codec resolves the fields of its class once: it knows which tags belong to
+  repeated fields and which fields are scalars whose wire format can be used
+  without checks. Fields keep being converted lazily, so semantic values are
+  only decoded when they are accessed and only encoded when they were set.
+
+  The serialized form is exactly the same as the one the generic functions
+  produce.
+  """
+
+  def __init__(self, struct_cls):
+    # Maps encoded tags to tuples (field name, type descriptor, repeated).
+    self._fields_by_tag = {}
+    for encoded_tag, type_descriptor in iteritems(
+        struct_cls.type_infos_by_encoded_tag):
+      repeated = type_descriptor.__class__ is ProtoList
+      self._fields_by_tag[encoded_tag] = (type_descriptor.name, type_descriptor,
+                                          repeated)
+
+    self._scalar_fields = set()
+    for type_descriptor in struct_cls.type_infos:
+      if type_descriptor.__class__ in _SCALAR_DESCRIPTORS:
+        self._scalar_fields.add(type_descriptor.name)
+
+  def Encode(self, data):
+    """Serializes raw data of a struct of this codec's class."""
+    scalar_fields = self._scalar_fields
+
+    output = []
+    for key in sorted(data):
+      python_format, wire_format, type_descriptor = data[key]
+
+      if key in scalar_fields:
+        if wire_format is None:
+          wire_format = type_descriptor.ConvertToWireFormat(python_format)
+
+      # Unknown fields are kept in wire format and have no descriptor.
+      elif wire_format is None or (python_format and
+                                   type_descriptor.IsDirty(python_format)):
+        wire_format = type_descriptor.ConvertToWireFormat(python_format)
+        precondition.AssertIterableType(wire_format, bytes)
+
+      output.extend(wire_format)
+
+    return b"".join(output)
+
+  def Decode(self, buff, value_obj):
+    """Parses a serialized struct into an object of this codec's class."""
+    raw_data = value_obj.GetRawData()
+    fields_by_tag = self._fields_by_tag
+
+    # Wrapped lists of the repeated fields found so far.
+    wrapped_lists = {}
+    count = 0
+
+    for encoded_tag, encoded_length, encoded_field in SplitBuffer(
+        buff, index=0, length=0):
+      wire_format = (encoded_tag, encoded_length, encoded_field)
+
+      field = fields_by_tag.get(encoded_tag)
+      if field is None:
+        # See `ReadIntoObject` for how unknown fields are stored.
+        raw_data[count] = (None, wire_format, None)
+        count += 1
+        continue
+
+      name, type_descriptor, repeated = field
+      if repeated:
+        wrapped_list = wrapped_lists.get(name)
+        if wrapped_list is None:
+          wrapped_list = value_obj.Get(name).wrapped_list
+          wrapped_lists[name] = wrapped_list
+
+        wrapped_list.append((None, wire_format))
+      else:
+        raw_data[name] = (None, wire_format, type_descriptor)
+
+    value_obj.SetRawData(raw_data)
+
+
+def _GetStructCodec(struct_cls):
+  """Returns the codec of a struct class, creating it on first use."""
+  # Codecs are stored in the class dict, so subclasses don't share them.
+  codec = struct_cls.__dict__.get("_codec")
+  if codec is None:
+    codec = _StructCodec(struct_cls)
+    struct_cls._codec = codec  # pylint: disable=protected-access
+
+  return codec
+
+
+def _ResetStructCodecs(struct_cls):
+  """Drops the codecs of a struct class and all its subclasses.
+
+  Codecs are rebuilt on next use to pick up fields that were added. Subclasses
+  are included, since their fields may be derived from the ones of the class.
+
+  Args:
+    struct_cls: An RDFStruct class.
+  """
+  classes = [struct_cls]
+  while classes:
+    cls = classes.pop()
+    if cls.__dict__.get("_codec") is not None:
+      cls._codec = None  # pylint: disable=protected-access
+    classes.extend(cls.__subclasses__())
+
+
 class RDFStructMetaclass(rdfvalue.RDFValueMetaclass):
   """A metaclass which registers new RDFProtoStruct instances."""
 
@@ -1628,6 +1806,9 @@ class RDFStruct(with_metaclass(RDFStructMetaclass, rdfvalue.RDFValue)):
   # Stores the raw data here.
   _data = None
 
+  # The `_StructCodec` of this class, created on first use.
+  _codec = None
+
   def __init__(self, initializer=None, age=None, **kwargs):
     # Maintain the order so that parsing and serializing a proto does not change
     # the serialized form.
@@ -1752,10 +1933,10 @@ class RDFStruct(with_metaclass(RDFStructMetaclass, rdfvalue.RDFValue)):
     self.dirty = True
 
   def SerializeToString(self):
-    return _SerializeEntries(utils.IterValuesInSortedKeysOrder(self._data))
+    return _GetStructCodec(self.__class__).Encode(self._data)
 
   def ParseFromString(self, string):
-    ReadIntoObject(string, 0, self)
+    _GetStructCodec(self.__class__).Decode(string, self)
     self.dirty = True
 
   def ParseFromDatastore(self, value):
@@ -1881,6 +2062,7 @@ class RDFStruct(with_metaclass(RDFStructMetaclass, rdfvalue.RDFValue)):
 
     cls.type_infos_by_field_number[field_desc.field_number] = field_desc
     cls.type_infos.Append(field_desc)
+    _ResetStructCodecs(cls)
 
 
 class EnumContainer(object):
@@ -2090,6 +2272,8 @@ class RDFProtoStruct(RDFStruct):
     cls.type_infos.Append(field_desc)
     cls.late_bound_type_infos.pop(field_desc.name, None)
 
+    _ResetStructCodecs(cls)
+
     # Add direct accessors only if the class does not already have them.
     if not hasattr(cls, field_desc.name):
       # This lambda is a class method so pylint: disable=protected-access
@@ -2133,3 +2317,172 @@ class SemanticDescriptor(RDFProtoStruct):
 class AnyValue(RDFProtoStruct):
   """Protobuf with arbitrary serialized proto and its type."""
   protobuf = any_pb2.Any
+
+
+class StructView(object):
+  """A read-only view of a serialized struct.
+
+  Parsing a struct splits it and copies all of its fields, even if only one of
+  them is needed later. A view keeps a reference to the serialized data and
+  only records where the fields are, the first time one of them is accessed.
+  Values are decoded on every access and embedded structs, including structs
+  stored in `google.protobuf.Any` fields, are returned as views of the same
+  data. Filtering many serialized structs on a few of their fields therefore
+  never materializes them.
+
+  Fields are accessed as attributes, like on the struct itself.
+  """
+
+  def __init__(self, struct_cls, buff, start=0, end=None):
+    """Initializes the view.
+
+    Args:
+      struct_cls: The RDFStruct class that `buff` is a serialization of.
+      buff: Bytes containing the serialized struct.
+      start: The position in `buff` where the serialized struct starts.
+      end: The position in `buff` where the serialized struct ends. Defaults to
+        the end of `buff`.
+    """
+    self.struct_cls = struct_cls
+    self._buff = buff
+    self._start = start
+    self._end = len(buff) if end is None else end
+    # Maps encoded tags to lists of `_SplitOffsets` tuples.
+    self._offsets = None
+
+  def _GetDescriptor(self, name):
+    type_descriptor = self.struct_cls.type_infos.get(name)
+    if type_descriptor is None:
+      raise AttributeError("'%s' has no field '%s'" %
+                           (self.struct_cls.__name__, name))
+
+    return type_descriptor
+
+  def _GetEntries(self, type_descriptor):
+    """Returns the offsets of all occurrences of a field."""
+    if self._offsets is None:
+      offsets = {}
+      for entry in _SplitOffsets(self._buff, self._start, self._end):
+        offsets.setdefault(entry[0], []).append(entry)
+      self._offsets = offsets
+
+    return self._offsets.get(type_descriptor.encoded_tag, [])
+
+  def _GetAnyValueType(self, type_descriptor, any_value):
+    # pylint: disable=protected-access
+    if type_descriptor._type is not None:
+      return type_descriptor._type(self)
+
+    return type_descriptor._TypeFromAnyValue(any_value)
+    # pylint: enable=protected-access
+
+  def _Decode(self, type_descriptor, entry):
+    """Decodes a single occurrence of a field."""
+    encoded_tag, length_index, data_index, data_end = entry
+    descriptor_cls = type_descriptor.__class__
+
+    if (descriptor_cls is ProtoEmbedded and
+        issubclass(type_descriptor.type, RDFStruct)):
+      return StructView(type_descriptor.type, self._buff, data_index, data_end)
+
+    if descriptor_cls is ProtoDynamicAnyValueEmbedded:
+      any_value = StructView(AnyValue, self._buff, data_index, data_end)
+      value_cls = self._GetAnyValueType(type_descriptor, any_value)
+      # Primitive values are wrapped and are decoded below.
+      if value_cls is not None and issubclass(value_cls, RDFStruct):
+        return any_value.GetFieldView("value", value_cls)
+
+    wire_format = (encoded_tag, self._buff[length_index:data_index],
+                   self._buff[data_index:data_end])
+    return type_descriptor.ConvertFromWireFormat(wire_format, container=self)
+
+  def Get(self, name):
+    """Decodes the value of a field.
+
+    Args:
+      name: The name of the field.
+
+    Returns:
+      The value of the field, a `StructView` for embedded structs or a list for
+      repeated fields. Unset fields have their default value.
+
+    Raises:
+      AttributeError: If the struct has no such field.
+    """
+    type_descriptor = self._GetDescriptor(name)
+    entries = self._GetEntries(type_descriptor)
+
+    if type_descriptor.__class__ is ProtoList:
+      return [self._Decode(type_descriptor.delegate, e) for e in entries]
+
+    if not entries:
+      return type_descriptor.GetDefault(container=self)
+
+    # As in the wire format, the last occurrence of a field wins.
+    return self._Decode(type_descriptor, entries[-1])
+
+  def GetFieldView(self, name, struct_cls):
+    """Returns a view of a bytes or embedded field parsed as `struct_cls`."""
+    entries = self._GetEntries(self._GetDescriptor(name))
+    if not entries:
+      return StructView(struct_cls, b"")
+
+    _, _, data_index, data_end = entries[-1]
+    return StructView(struct_cls, self._buff, data_index, data_end)
+
+  def GetAnyValue(self, name):
+    """Returns a view of the `AnyValue` stored in a `google.protobuf.Any`."""
+    return self.GetFieldView(name, AnyValue)
+
+  def GetAnyValueType(self, name):
+    """Returns the class stored in a `google.protobuf.Any` field.
+
+    Args:
+      name: The name of the field.
+
+    Returns:
+      The RDFValue class of the stored value or None if it is not known.
+    """
+    type_descriptor = self._GetDescriptor(name)
+    return self._GetAnyValueType(type_descriptor, self.GetAnyValue(name))
+
+  def HasField(self, name):
+    return bool(self._GetEntries(self._GetDescriptor(name)))
+
+  def FieldContains(self, name, substring):
+    """Checks if the raw data of a field contains the given bytes.
+
+    The data is searched in place, without decoding or copying it.
+
+    Args:
+      name: The name of the field.
+      substring: Bytes to search for.
+
+    Returns:
+      True if any occurrence of the field contains `substring`.
+    """
+    precondition.AssertType(substring, bytes)
+    for _, _, data_index, data_end in self._GetEntries(
+        self._GetDescriptor(name)):
+      if self._buff.find(substring, data_index, data_end) != -1:
+        return True
+
+    return False
+
+  def SerializeToString(self):
+    return self._buff[self._start:self._end]
+
+  def Materialize(self):
+    """Parses the viewed data into an object of the struct class."""
+    return self.struct_cls.FromSerializedString(self.SerializeToString())
+
+  def __getattr__(self, name):
+    # Private attributes may be looked up before `__init__` has run, e.g. when
+    # the view is copied.
+    if name.startswith("_"):
+      raise AttributeError(name)
+
+    return self.Get(name)
+
+  def __repr__(self):
+    return "<StructView of %s>" % self.struct_cls.__name__
@@ -13,6 +13,7 @@ from builtins import range  # pylint: disable=redefined-builtin
 from grr_response_core.lib import flags
 from grr_response_core.lib import rdfvalue
 from grr_response_core.lib import type_info
+from grr_response_core.lib import utils
 from grr_response_core.lib.rdfvalues import client as rdf_client
 from grr_response_core.lib.rdfvalues import client_fs as rdf_client_fs
 from grr_response_core.lib.rdfvalues import flows as rdf_flows
@@ -681,6 +682,151 @@ class RDFStructsTest(rdf_test_base.RDFValueTestMixin, test_lib.GRRBaseTest):
 
     self.assertEqual(hash(sample1), hash(sample2))
 
+  def testCodecMatchesGenericSerialization(self):
+    tested = TestStruct(foobar="hello", int=5, float=2.5, type="FIRST")
+    tested.repeated.Append("foo")
+    tested.repeated.Append("bar")
+    tested.repeat_nested.Append(foobar="baz", urn=rdfvalue.RDFURN("aff4:/baz"))
+    tested.nested.nested.foobar = "quux"
+
+    data = tested.SerializeToString()
+    self.assertEqual(
+        data,
+        rdf_structs._SerializeEntries(
+            utils.IterValuesInSortedKeysOrder(tested.GetRawData())))
+
+    generic = TestStruct()
+    rdf_structs.ReadIntoObject(data, 0, generic)
+
+    parsed = TestStruct.FromSerializedString(data)
+    self.assertEqual(parsed, generic)
+    self.assertEqual(parsed, tested)
+    self.assertEqual(parsed.SerializeToString(), data)
+
+  def testCodecIsRebuiltWhenFieldsAreAdded(self):
+
+    class CodecTest(rdf_structs.RDFProtoStruct):
+      type_description = type_info.TypeDescriptorSet(
+          rdf_structs.ProtoString(name="foo", field_number=1))
+
+    data = CodecTest(foo="bar").SerializeToString()
+    self.assertEqual(CodecTest.FromSerializedString(data).foo, "bar")
+
+    CodecTest.AddDescriptor(
+        rdf_structs.ProtoUnsignedInteger(name="baz", field_number=2))
+
+    data = CodecTest(foo="bar", baz=42).SerializeToString()
+    parsed = CodecTest.FromSerializedString(data)
+    self.assertEqual(parsed.foo, "bar")
+    self.assertEqual(parsed.baz, 42)
+
+  def testCodecsOfSubclassesAreRebuiltWhenFieldsAreAdded(self):
+
+    class CodecTest(rdf_structs.RDFProtoStruct):
+      type_description = type_info.TypeDescriptorSet(
+          rdf_structs.ProtoString(name="foo", field_number=1))
+
+    class CodecSubclassTest(CodecTest):
+      pass
+
+    CodecSubclassTest(foo="bar").SerializeToString()
+    self.assertIsNotNone(CodecSubclassTest.__dict__.get("_codec"))
+
+    CodecTest.AddDescriptor(
+        rdf_structs.ProtoUnsignedInteger(name="baz", field_number=2))
+    self.assertIsNone(CodecSubclassTest.__dict__.get("_codec"))
+
+
+class StructViewTest(test_lib.GRRBaseTest):
+  """Tests for read-only views of serialized structs."""
+
+  def _View(self, struct):
+    return rdf_structs.StructView(struct.__class__, struct.SerializeToString())
+
+  def _TestStruct(self):
+    return TestStruct(
+        foobar="foo",
+        int=42,
+        repeated=["a", "b"],
+        urn=rdfvalue.RDFURN("aff4:/foo"),
+        type=2,
+        nested=TestStruct(foobar="nested"),
+        repeat_nested=[TestStruct(int=1), TestStruct(int=2)])
+
+  def testFields(self):
+    view = self._View(self._TestStruct())
+
+    self.assertTrue(view.HasField("foobar"))
+    self.assertEqual(view.foobar, "foo")
+    self.assertEqual(view.int, 42)
+    self.assertEqual(view.repeated, ["a", "b"])
+    self.assertEqual(view.urn, rdfvalue.RDFURN("aff4:/foo"))
+    self.assertEqual(view.type, 2)
+    self.assertEqual(str(view.type), "SECOND")
+
+  def testDefaults(self):
+    view = rdf_structs.StructView(TestStruct, b"")
+
+    self.assertFalse(view.HasField("foobar"))
+    self.assertEqual(view.foobar, "string")
+    self.assertEqual(view.int, 5)
+    self.assertEqual(view.repeated, [])
+
+  def testUnknownField(self):
+    view = self._View(self._TestStruct())
+
+    with self.assertRaises(AttributeError):
+      _ = view.foo
+
+  def testEmbeddedStructsAreViews(self):
+    view = self._View(self._TestStruct())
+
+    self.assertIsInstance(view.nested, rdf_structs.StructView)
+    self.assertEqual(view.nested.foobar, "nested")
+    self.assertEqual(view.nested.Materialize(), TestStruct(foobar="nested"))
+    self.assertEqual([nested.int for nested in view.repeat_nested], [1, 2])
+
+  def testAnyValue(self):
+    status = rdf_flows.GrrStatus(status="WORKER_STUCK", error_message="stuck")
+    view = self._View(AnyValueWithoutTypeFunctionTest(dynamic=status))
+
+    self.assertEqual(view.GetAnyValueType("dynamic"), rdf_flows.GrrStatus)
+    self.assertIsInstance(view.dynamic, rdf_structs.StructView)
+    self.assertEqual(view.dynamic.error_message, "stuck")
+    self.assertEqual(view.dynamic.Materialize(), status)
+
+    any_value = view.GetAnyValue("dynamic")
+    self.assertTrue(any_value.FieldContains("value", b"stuck"))
+    self.assertFalse(any_value.FieldContains("value", b"GrrStatus"))
+
+  def testAnyValueWithPrimitiveValue(self):
+    view = self._View(
+        AnyValueWithoutTypeFunctionTest(dynamic=rdfvalue.RDFString("foo")))
+
+    self.assertEqual(view.GetAnyValueType("dynamic"), rdfvalue.RDFString)
+    self.assertEqual(view.dynamic, "foo")
+
+  def testDynamicAnyValueType(self):
+    test_pb = DynamicAnyValueTypeTest(type="TestStruct")
+    test_pb.dynamic.foobar = "Hello"
+    view = self._View(test_pb)
+
+    self.assertEqual(view.GetAnyValueType("dynamic"), TestStruct)
+    self.assertEqual(view.dynamic.foobar, "Hello")
+
+  def testFieldContains(self):
+    view = self._View(self._TestStruct())
+
+    self.assertTrue(view.FieldContains("foobar", b"fo"))
+    self.assertFalse(view.FieldContains("foobar", b"nested"))
+    self.assertTrue(view.FieldContains("nested", b"nested"))
+    self.assertTrue(view.FieldContains("repeated", b"b"))
+    self.assertFalse(view.FieldContains("repeated", b"ab"))
+
+  def testMaterialize(self):
+    test_pb = self._TestStruct()
+    self.assertEqual(self._View(test_pb).Materialize(), test_pb)
+
 
 def main(argv):
   test_lib.main(argv)
@@ -12,8 +12,13 @@ from __future__ import unicode_literals
 
 # The following are abstract base classes
 import abc
+import imp
+import importlib
 import logging
 import threading
+import time
+
+from future.utils import iteritems
 from future.utils import itervalues
 from future.utils import with_metaclass
 
@@ -49,7 +54,8 @@ class MetaclassRegistry(abc.ABCMeta):
           pass
 
       try:
-        if cls.classes and cls.__name__ in cls.classes:
+        # The registry might have lazy entries, so only look at loaded ones.
+        if dict.__contains__(cls.classes, cls.__name__):
           raise RuntimeError("Duplicate names for registered classes: %s, %s" %
                              (cls, cls.classes[cls.__name__]))
 
@@ -205,6 +211,178 @@ class OutputPluginRegistry(MetaclassRegistry):
     return mcs.PLUGIN_REGISTRY.get(plugin_name)
 
 
+class _LazyClassDict(dict):
+  """A registry dict with entries that are imported on first lookup.
+
+  Lazy entries map a class name to the module defining it. Looking the name up
+  imports the module, which registers the class through its metaclass. Listing
+  the registry imports all modules with lazy entries.
+  """
+
+  def __init__(self, *args, **kwargs):
+    super(_LazyClassDict, self).__init__(*args, **kwargs)
+    self._pending = {}
+
+  def AddLazy(self, name, module_name):
+    if not dict.__contains__(self, name):
+      self._pending[name] = module_name
+
+  def _Load(self, name):
+    """Imports the module of a lazy entry, if there is one."""
+    if name not in self._pending:
+      return
+
+    # The entry is only removed once the import is done so that concurrent
+    # lookups wait for it. The import lock is used (and not a lock of our own)
+    # because lookups can happen while some other module is being imported.
+    imp.acquire_lock()
+    try:
+      module_name = self._pending.get(name)
+      if module_name is None:
+        return
+
+      logging.debug("Importing %s for lazily registered %s", module_name,
+                    name)
+      try:
+        importlib.import_module(module_name)
+      finally:
+        del self._pending[name]
+    finally:
+      imp.release_lock()
+
+  def _LoadAll(self):
+    for name in list(self._pending):
+      self._Load(name)
+
+  def __getitem__(self, name):
+    if not dict.__contains__(self, name):
+      self._Load(name)
+    return dict.__getitem__(self, name)
+
+  def __contains__(self, name):
+    if not dict.__contains__(self, name):
+      self._Load(name)
+    return dict.__contains__(self, name)
+
+  def get(self, name, default=None):
+    if not dict.__contains__(self, name):
+      self._Load(name)
+    return dict.get(self, name, default)
+
+  def __iter__(self):
+    self._LoadAll()
+    return dict.__iter__(self)
+
+  def __len__(self):
+    self._LoadAll()
+    return dict.__len__(self)
+
+  def copy(self):
+    self._LoadAll()
+    return dict.copy(self)
+
+  def keys(self):
+    self._LoadAll()
+    return dict.keys(self)
+
+  def values(self):
+    self._LoadAll()
+    return dict.values(self)
+
+  def items(self):
+    self._LoadAll()
+    return dict.items(self)
+
+  def iterkeys(self):
+    self._LoadAll()
+    return iter(dict.keys(self))
+
+  def itervalues(self):
+    self._LoadAll()
+    return iter(dict.values(self))
+
+  def iteritems(self):
+    self._LoadAll()
+    return iter(dict.items(self))
+
+
+# Registries keyed by class name which can have lazy entries, besides the
+# `classes` dicts of top level classes.
+_NAMED_REGISTRIES = {
+    "AFF4FlowRegistry": (AFF4FlowRegistry, "FLOW_REGISTRY"),
+    "FlowRegistry": (FlowRegistry, "FLOW_REGISTRY"),
+    "OutputPluginRegistry": (OutputPluginRegistry, "PLUGIN_REGISTRY"),
+}
+
+
+def GetRegistryIds(cls):
+  """Returns ids of the registries a class can be lazily registered in.
+
+  Args:
+    cls: A class created by a `MetaclassRegistry`.
+
+  Returns:
+    A list of registry ids to pass to `AddLazyClass`, empty if the class is
+    not registered (e.g. because it is abstract).
+  """
+  if dict.get(cls.classes, cls.__name__) is not cls:
+    return []
+
+  top_level_class = cls.top_level_class
+  result = ["%s:%s" % (top_level_class.__module__, top_level_class.__name__)]
+  for registry_id, (mcs, _) in sorted(iteritems(_NAMED_REGISTRIES)):
+    if isinstance(cls, mcs):
+      result.append(registry_id)
+  return result
+
+
+def _ReplaceClassesDict(cls, old, new):
+  if cls.__dict__.get("classes") is old:
+    cls.classes = new
+  for subclass in type.__subclasses__(cls):
+    _ReplaceClassesDict(subclass, old, new)
+
+
+def _GetLazyRegistry(registry_id):
+  """Returns the registry with the given id, making it lazy if needed."""
+  if registry_id in _NAMED_REGISTRIES:
+    mcs, attribute = _NAMED_REGISTRIES[registry_id]
+    classes = getattr(mcs, attribute)
+    if not isinstance(classes, _LazyClassDict):
+      classes = _LazyClassDict(classes)
+      setattr(mcs, attribute, classes)
+    return classes
+
+  module_name, class_name = registry_id.split(":")
+  top_level_class = getattr(importlib.import_module(module_name), class_name)
+  classes = top_level_class.classes
+  if not isinstance(classes, _LazyClassDict):
+    # Every class in the hierarchy holds a reference to the same dict.
+    lazy_classes = _LazyClassDict(classes)
+    _ReplaceClassesDict(top_level_class, classes, lazy_classes)
+    classes = lazy_classes
+  return classes
+
+
+def AddLazyClass(registry_id, name, module_name):
+  """Registers a class that is imported when it is first looked up.
+
+  Registries only get lazy entries (and the small lookup overhead that comes
+  with them) once this is called for them.
+
+  Args:
+    registry_id: A registry id as returned by `GetRegistryIds`.
+    name: The name of the class.
+    module_name: The name of the module defining the class.
+  """
+  _GetLazyRegistry(registry_id).AddLazy(name, module_name)
+
+
+def GetLoadedClasses(classes):
+  """Returns classes of a registry dict without importing lazy entries."""
+  return list(dict.values(classes))
+
+
 # Utility functions
 class HookRegistry(object):
   """An initializer that can be extended by plugins.
@@ -220,6 +398,9 @@ class HookRegistry(object):
   # Already run hooks
   already_run_once = set()
 
+  # Time in seconds the last run of each hook took, by hook class name.
+  run_times = {}
+
   lock = threading.RLock()
 
   def _RunSingleHook(self, hook_cls, executed_set, required=None):
@@ -240,6 +421,8 @@ class HookRegistry(object):
     else:
       logging.debug("Initializing %s", hook_cls.__name__)
 
+    start_time = time.time()
+
     # Always call the Run hook.
     cls_instance.Run()
     executed_set.add(hook_cls)
@@ -249,6 +432,8 @@ class HookRegistry(object):
       cls_instance.RunOnce()
       self.already_run_once.add(hook_cls)
 
+    self.run_times[hook_cls.__name__] = time.time() - start_time
+
   def _RunAllHooks(self, executed_hooks, skip_set):
     # A copy of list of classes is needed because running a hook might modify
     # the list.
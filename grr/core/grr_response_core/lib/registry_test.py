@@ -0,0 +1,136 @@
+#!/usr/bin/env python
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import unicode_literals
+
+import importlib
+import time
+
+from absl.testing import absltest
+from future.utils import with_metaclass
+import mock
+
+from grr_response_core.lib import flags
+from grr_response_core.lib import registry
+from grr_response_core.lib import utils
+from grr.test_lib import test_lib
+
+
+class LazyTestPlugin(with_metaclass(registry.MetaclassRegistry, object)):
+  pass
+
+
+class LazyTestOutputPlugin(
+    with_metaclass(registry.OutputPluginRegistry, object)):
+  pass
+
+
+class TestHook(with_metaclass(registry.MetaclassRegistry,
+                              registry.HookRegistry)):
+  pass
+
+
+class SlowTestHook(TestHook):
+
+  def Run(self):
+    time.sleep(0.01)
+
+
+def _DefineClass(name, base):
+  return type(str(name), (base,), {})
+
+
+class LazyRegistryTest(absltest.TestCase):
+
+  def setUp(self):
+    super(LazyRegistryTest, self).setUp()
+    self.registry_id = "%s:LazyTestPlugin" % LazyTestPlugin.__module__
+
+    # Every test gets its own registry, so that lazy entries and classes
+    # defined by one test are not seen by others.
+    classes_stubber = utils.Stubber(LazyTestPlugin, "classes",
+                                    dict.copy(LazyTestPlugin.classes))
+    classes_stubber.Start()
+    self.addCleanup(classes_stubber.Stop)
+
+  def testGetRegistryIds(self):
+    plugin_cls = _DefineClass("LazyIdTestOutputPlugin", LazyTestOutputPlugin)
+    self.assertEqual(
+        registry.GetRegistryIds(plugin_cls),
+        ["%s:LazyTestOutputPlugin" % LazyTestOutputPlugin.__module__,
+         "OutputPluginRegistry"])
+
+    abstract_cls = _DefineClass("AbstractLazyTestPlugin", LazyTestPlugin)
+    self.assertEqual(registry.GetRegistryIds(abstract_cls), [])
+
+  def testLazyClassIsImportedOnFirstLookup(self):
+    registry.AddLazyClass(self.registry_id, "LazyFoo", "lazy.foo")
+
+    defined = []
+
+    def ImportModule(module_name):
+      self.assertEqual(module_name, "lazy.foo")
+      defined.append(_DefineClass("LazyFoo", LazyTestPlugin))
+
+    with mock.patch.object(importlib, "import_module", ImportModule):
+      loaded = registry.GetLoadedClasses(LazyTestPlugin.classes)
+      self.assertNotIn("LazyFoo", [cls.__name__ for cls in loaded])
+      self.assertIs(LazyTestPlugin.GetPlugin("LazyFoo"), defined[0])
+      self.assertIn("LazyFoo", LazyTestPlugin.classes)
+      self.assertIs(LazyTestPlugin.classes.get("LazyFoo"), defined[0])
+
+    self.assertLen(defined, 1)
+
+  def testListingImportsAllLazyClasses(self):
+    registry.AddLazyClass(self.registry_id, "LazyBar", "lazy.bar")
+    registry.AddLazyClass(self.registry_id, "LazyBaz", "lazy.baz")
+
+    def ImportModule(module_name):
+      _DefineClass(module_name.title().replace(".", ""), LazyTestPlugin)
+
+    with mock.patch.object(importlib, "import_module", ImportModule):
+      names = list(LazyTestPlugin.classes)
+
+    self.assertIn("LazyBar", names)
+    self.assertIn("LazyBaz", names)
+
+  def testUnknownNamesAreNotImported(self):
+    registry.AddLazyClass(self.registry_id, "LazyQuux", "lazy.quux")
+
+    import_module = mock.MagicMock()
+    with mock.patch.object(importlib, "import_module", import_module):
+      self.assertIsNone(LazyTestPlugin.classes.get("LazyNorf"))
+      self.assertNotIn("LazyNorf", LazyTestPlugin.classes)
+
+    self.assertFalse(import_module.called)
+
+  def testNamedRegistry(self):
+    with utils.Stubber(registry.OutputPluginRegistry, "PLUGIN_REGISTRY",
+                       dict(registry.OutputPluginRegistry.PLUGIN_REGISTRY)):
+      registry.AddLazyClass("OutputPluginRegistry", "LazyThud", "lazy.thud")
+
+      defined = []
+
+      def ImportModule(module_name):
+        del module_name  # Unused.
+        defined.append(_DefineClass("LazyThud", LazyTestOutputPlugin))
+
+      with mock.patch.object(importlib, "import_module", ImportModule):
+        plugin_cls = registry.OutputPluginRegistry.PluginClassByName(
+            "LazyThud")
+
+      self.assertIs(plugin_cls, defined[0])
+
+
+class HookRegistryTest(absltest.TestCase):
+
+  def testRunTimesAreRecorded(self):
+    TestHook().Init()
+
+    self.assertGreaterEqual(registry.HookRegistry.run_times["SlowTestHook"],
+                            0.01)
+    self.assertIn("TestHook", registry.HookRegistry.run_times)
+
+
+if __name__ == "__main__":
+  flags.StartMain(test_lib.main)
@@ -0,0 +1,153 @@
+#!/usr/bin/env python
+"""Measures where the start up time of GRR processes goes.
+
+The profiler records how long importing each module took and, together with
+the run times of init hooks recorded by the registry, logs a report once the
+server is initialized. To profile a component, run its entry point through
+this module, e.g.:
+
+  python -m grr_response_core.lib.startup_profiler \\
+      grr_response_server.bin.grr_server --component=worker
+"""
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import unicode_literals
+
+import logging
+import runpy
+import sys
+import threading
+import time
+
+from future.utils import iteritems
+
+from grr_response_core.lib import registry
+from grr_response_core.lib.util import compatibility
+
+
+class _ImportTimer(object):
+  """A replacement of `__import__` recording module import times."""
+
+  def __init__(self, original_import):
+    self.original_import = original_import
+    # Module name to a list with the total import time and the time spent in
+    # the module itself (excluding modules imported by it).
+    self.times = {}
+    self._local = threading.local()
+
+  def __call__(self, name, *args, **kwargs):
+    if len(args) >= 3:
+      fromlist = args[2]
+    else:
+      fromlist = kwargs.get("fromlist")
+
+    # `from foo import bar` can import the `foo.bar` module.
+    names = [name] + ["%s.%s" % (name, item) for item in fromlist or ()]
+    new_names = [new for new in names if new not in sys.modules]
+    if not new_names:
+      return self.original_import(name, *args, **kwargs)
+
+    if not hasattr(self._local, "stack"):
+      self._local.stack = []
+    stack = self._local.stack
+    stack.append(0.0)
+    start_time = time.time()
+    try:
+      return self.original_import(name, *args, **kwargs)
+    finally:
+      elapsed = time.time() - start_time
+      nested = stack.pop()
+      if stack:
+        stack[-1] += elapsed
+
+      # Names in the `fromlist` can also be attributes and imports can fail,
+      # only modules that actually got imported are recorded.
+      key = ",".join(new for new in new_names if new in sys.modules)
+      if key:
+        times = self.times.setdefault(key, [0.0, 0.0])
+        times[0] += elapsed
+        times[1] += elapsed - nested
+
+
+_IMPORT_TIMER = None
+
+
+def Start():
+  """Starts recording import times."""
+  global _IMPORT_TIMER
+  if _IMPORT_TIMER is not None:
+    return
+
+  _IMPORT_TIMER = _ImportTimer(compatibility.builtins.__import__)
+  compatibility.builtins.__import__ = _IMPORT_TIMER
+
+
+def Stop():
+  """Stops recording import times and drops the recorded ones."""
+  global _IMPORT_TIMER
+  if _IMPORT_TIMER is None:
+    return
+
+  compatibility.builtins.__import__ = _IMPORT_TIMER.original_import
+  _IMPORT_TIMER = None
+
+
+def IsRunning():
+  return _IMPORT_TIMER is not None
+
+
+def GetImportTimes():
+  """Returns recorded import times.
+
+  Returns:
+    A list of (module name, total seconds, own seconds) tuples, sorted by the
+    time spent in the module itself, longest first.
+  """
+  if _IMPORT_TIMER is None:
+    return []
+
+  result = [(name, total, own)
+            for name, (total, own) in iteritems(_IMPORT_TIMER.times)]
+  return sorted(result, key=lambda item: item[2], reverse=True)
+
+
+def LogReport(limit=30):
+  """Logs the slowest imports and init hooks if the profiler is running."""
+  if _IMPORT_TIMER is None:
+    return
+
+  import_times = GetImportTimes()
+  logging.info("Startup profile: imported %d modules in %.3fs",
+               len(import_times), sum(own for _, _, own in import_times))
+  for name, total, own in import_times[:limit]:
+    logging.info("  import %-60s own %.3fs total %.3fs", name, own, total)
+
+  hook_times = sorted(
+      iteritems(registry.HookRegistry.run_times),
+      key=lambda item: item[1],
+      reverse=True)
+  logging.info("Startup profile: ran %d init hooks in %.3fs", len(hook_times),
+               sum(elapsed for _, elapsed in hook_times))
+  for name, elapsed in hook_times[:limit]:
+    logging.info("  hook %-62s %.3fs", name, elapsed)
+
+
+def main(argv):
+  """Runs the module given on the command line with the profiler started."""
+  if len(argv) < 2:
+    sys.stderr.write("Usage: %s <module> [args...]\n" % argv[0])
+    return 1
+
+  Start()
+  sys.argv = argv[1:]
+  runpy.run_module(argv[1], run_name="__main__", alter_sys=True)
+  return 0
+
+
+if __name__ == "__main__":
+  # Use the state of the importable module and not of `__main__`, which is a
+  # separate copy of it.
+  # pylint: disable=g-import-not-at-top
+  from grr_response_core.lib import startup_profiler
+  # pylint: enable=g-import-not-at-top
+  sys.exit(startup_profiler.main(sys.argv))
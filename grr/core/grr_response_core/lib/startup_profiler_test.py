@@ -0,0 +1,76 @@
+#!/usr/bin/env python
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import unicode_literals
+
+import os
+import shutil
+import sys
+
+from absl.testing import absltest
+
+from grr_response_core.lib import flags
+from grr_response_core.lib import startup_profiler
+from grr.test_lib import temp
+from grr.test_lib import test_lib
+
+
+class StartupProfilerTest(absltest.TestCase):
+
+  def setUp(self):
+    super(StartupProfilerTest, self).setUp()
+    self.addCleanup(startup_profiler.Stop)
+
+    self.temp_dirpath = temp.TempDirPath()
+    self.addCleanup(shutil.rmtree, self.temp_dirpath)
+
+    sys.path.insert(0, self.temp_dirpath)
+    self.addCleanup(sys.path.remove, self.temp_dirpath)
+
+  def _WriteModule(self, name, content):
+    with open(os.path.join(self.temp_dirpath, "%s.py" % name), "w") as fd:
+      fd.write(content)
+    self.addCleanup(sys.modules.pop, name, None)
+
+  def testRecordsImportTimes(self):
+    self._WriteModule("profiled_foo", "import time\n"
+                      "import profiled_bar\n"
+                      "time.sleep(0.02)\n")
+    self._WriteModule("profiled_bar", "import time\n"
+                      "time.sleep(0.01)\n")
+
+    startup_profiler.Start()
+    self.assertTrue(startup_profiler.IsRunning())
+    # `importlib.import_module` does not go through `__import__` on Python 3.
+    __import__("profiled_foo")
+
+    import_times = {
+        name: (total, own)
+        for name, total, own in startup_profiler.GetImportTimes()
+    }
+    foo_total, foo_own = import_times["profiled_foo"]
+    bar_total, bar_own = import_times["profiled_bar"]
+    self.assertGreaterEqual(bar_own, 0.01)
+    self.assertGreaterEqual(bar_total, bar_own)
+    self.assertGreaterEqual(foo_own, 0.02)
+    self.assertAlmostEqual(foo_total, foo_own + bar_total)
+
+  def testModulesImportedBeforeAreNotRecorded(self):
+    startup_profiler.Start()
+    __import__("os")
+
+    names = [name for name, _, _ in startup_profiler.GetImportTimes()]
+    self.assertNotIn("os", names)
+
+  def testStop(self):
+    startup_profiler.Start()
+    startup_profiler.Stop()
+
+    self.assertFalse(startup_profiler.IsRunning())
+    self.assertEqual(startup_profiler.GetImportTimes(), [])
+    # This is a no-op when the profiler is not running.
+    startup_profiler.LogReport()
+
+
+if __name__ == "__main__":
+  flags.StartMain(test_lib.main)
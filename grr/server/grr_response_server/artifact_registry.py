@@ -4,6 +4,7 @@ from __future__ import absolute_import
 from __future__ import division
 from __future__ import unicode_literals
 
+import hashlib
 import logging
 import os
 import threading
@@ -121,6 +122,23 @@ class ArtifactRegistrySources(object):
                    dirpath, error)
 
 
+def _HashArtifactFiles(file_paths):
+  """Computes a digest of the paths and contents of artifact files."""
+  digest = hashlib.sha256()
+  for file_path in sorted(file_paths):
+    try:
+      with open(file_path, mode="rb") as fh:
+        content = fh.read()
+    except (IOError, OSError):
+      content = b""
+
+    digest.update(utils.SmartStr(file_path))
+    digest.update(b"\0")
+    digest.update(hashlib.sha256(content).digest())
+
+  return digest.digest()
+
+
 class ArtifactRegistry(object):
   """A global registry of artifacts."""
 
@@ -128,6 +146,10 @@ class ArtifactRegistry(object):
     self._artifacts = {}
     self._sources = ArtifactRegistrySources()
     self._dirty = False
+    # Lookup structures derived from `_artifacts`, built lazily and dropped
+    # whenever the set of registered artifacts changes.
+    self._artifacts_by_os = None
+    self._dependency_closures = {}
     # Field required by the utils.Synchronized annotation.
     self.lock = threading.RLock()
 
@@ -254,6 +276,41 @@ class ArtifactRegistry(object):
     for artifact_value in loaded_artifacts:
       Validate(artifact_value)
 
+  def _LoadArtifactsFromSnapshot(self, snapshot_path, file_paths):
+    """Loads artifacts from a snapshot written by `WriteSnapshot`.
+
+    Args:
+      snapshot_path: A path to the snapshot file.
+      file_paths: Paths of the artifact files the snapshot should reflect.
+
+    Returns:
+      True if the artifacts were loaded, False if the snapshot is missing,
+      unreadable or does not match the current artifact files.
+    """
+    try:
+      with open(snapshot_path, mode="rb") as fh:
+        snapshot = rdf_artifacts.ArtifactRegistrySnapshot.FromSerializedString(
+            fh.read())
+    # `rdfvalue.DecodeError` is a `ValueError` but malformed buffers can also
+    # yield plain `ValueError`s.
+    except (IOError, OSError, ValueError) as e:
+      logging.warn("Failed to read artifact snapshot %s: %s", snapshot_path, e)
+      return False
+
+    if snapshot.sources_hash != _HashArtifactFiles(file_paths):
+      logging.info("Artifact snapshot %s is stale, loading artifact files.",
+                   snapshot_path)
+      return False
+
+    # Artifacts in the snapshot were validated when it was written.
+    for entry in snapshot.entries:
+      self.RegisterArtifact(
+          entry.artifact, source=entry.loaded_from, overwrite_if_exists=True)
+
+    logging.debug("Loaded %d artifacts from snapshot %s", len(snapshot.entries),
+                  snapshot_path)
+    return True
+
   @utils.Synchronized
   def ClearSources(self):
     self._sources.Clear()
@@ -313,6 +370,7 @@ class ArtifactRegistry(object):
     # Clear any stale errors.
     artifact_rdfvalue.error_message = None
     self._artifacts[artifact_rdfvalue.name] = artifact_rdfvalue
+    self._InvalidateIndexes()
 
   @utils.Synchronized
   def UnregisterArtifact(self, artifact_name):
@@ -320,18 +378,76 @@ class ArtifactRegistry(object):
       del self._artifacts[artifact_name]
     except KeyError:
       raise ValueError("Artifact %s unknown." % artifact_name)
+    self._InvalidateIndexes()
 
   @utils.Synchronized
   def ClearRegistry(self):
     self._artifacts = {}
+    self._InvalidateIndexes()
     self._dirty = True
 
+  def _InvalidateIndexes(self):
+    self._artifacts_by_os = None
+    self._dependency_closures = {}
+
+  def _GetArtifactsByOs(self):
+    """Returns a dict mapping OS names to artifacts supporting them.
+
+    Artifacts with no `supported_os` support all systems and are stored under
+    the `None` key.
+    """
+    if self._artifacts_by_os is None:
+      artifacts_by_os = {}
+      for artifact in itervalues(self._artifacts):
+        for os_name in artifact.supported_os or [None]:
+          artifacts_by_os.setdefault(os_name, []).append(artifact)
+      self._artifacts_by_os = artifacts_by_os
+
+    return self._artifacts_by_os
+
   def _ReloadArtifacts(self):
     """Load artifacts from all sources."""
     self._artifacts = {}
-    self._LoadArtifactsFromFiles(self._sources.GetAllFiles())
+    self._InvalidateIndexes()
+
+    file_paths = list(self._sources.GetAllFiles())
+    snapshot_path = config.CONFIG["Artifacts.registry_snapshot_path"]
+    if not (snapshot_path and
+            self._LoadArtifactsFromSnapshot(snapshot_path, file_paths)):
+      self._LoadArtifactsFromFiles(file_paths)
+
     self.ReloadDatastoreArtifacts()
 
+  @utils.Synchronized
+  def WriteSnapshot(self, snapshot_path):
+    """Writes artifacts loaded from files to a snapshot.
+
+    The snapshot is used instead of the artifact files by later reloads for as
+    long as the files (and the set of files) stay the same. Artifacts from the
+    data store are not included as they can change at any time.
+
+    Args:
+      snapshot_path: A path of the snapshot file to write.
+    """
+    self._CheckDirty()
+
+    file_paths = list(self._sources.GetAllFiles())
+    snapshot = rdf_artifacts.ArtifactRegistrySnapshot(
+        sources_hash=_HashArtifactFiles(file_paths))
+    for name in sorted(self._artifacts):
+      artifact = self._artifacts[name]
+      if not artifact.loaded_from.startswith("file:"):
+        continue
+      snapshot.entries.Append(
+          artifact=artifact, loaded_from=artifact.loaded_from)
+
+    # Write to a temporary file first so that readers never see a partially
+    # written snapshot.
+    tmp_path = snapshot_path + ".tmp"
+    with open(tmp_path, mode="wb") as fh:
+      fh.write(snapshot.SerializeToString())
+    os.rename(tmp_path, snapshot_path)
+
   def _UnregisterDatastoreArtifacts(self):
     """Remove artifacts that came from the datastore."""
     to_remove = []
@@ -340,6 +456,8 @@ class ArtifactRegistry(object):
         to_remove.append(name)
     for key in to_remove:
       self._artifacts.pop(key)
+    if to_remove:
+      self._InvalidateIndexes()
 
   @utils.Synchronized
   def ReloadDatastoreArtifacts(self):
@@ -381,8 +499,22 @@ class ArtifactRegistry(object):
       set of artifacts matching filter criteria
     """
     self._CheckDirty(reload_datastore_artifacts=reload_datastore_artifacts)
+
+    # Narrow down the candidates using the name and OS indexes, the filters
+    # below are still applied to them.
+    if name_list:
+      candidates = [
+          self._artifacts[name] for name in name_list if name in self._artifacts
+      ]
+    elif os_name:
+      artifacts_by_os = self._GetArtifactsByOs()
+      candidates = artifacts_by_os.get(os_name, []) + artifacts_by_os.get(
+          None, [])
+    else:
+      candidates = itervalues(self._artifacts)
+
     results = set()
-    for artifact in itervalues(self._artifacts):
+    for artifact in candidates:
 
       # artifact.supported_os = [] matches all OSes
       if os_name and artifact.supported_os and (
@@ -432,6 +564,27 @@ class ArtifactRegistry(object):
           "artifact repo by running make in the artifact directory." % name)
     return result
 
+  @utils.Synchronized
+  def GetArtifactDependencyClosure(self, name):
+    """Returns names of all artifacts the given artifact depends on.
+
+    Args:
+      name: artifact name string.
+
+    Returns:
+      A frozenset of names of direct and transitive dependencies.
+    Raises:
+      ArtifactNotRegisteredError: if the artifact or any of its dependencies
+        doesn't exist in the registry.
+    """
+    self._CheckDirty()
+    closure = self._dependency_closures.get(name)
+    if closure is None:
+      artifact = self.GetArtifact(name)
+      closure = frozenset(GetArtifactDependencies(artifact, recursive=True))
+      self._dependency_closures[name] = closure
+    return closure
+
   @utils.Synchronized
   def GetArtifactNames(self, *args, **kwargs):
     return set([a.name for a in self.GetArtifacts(*args, **kwargs)])
@@ -716,7 +869,7 @@ def GetArtifactsDependenciesClosure(name_list, os_name=None):
 
   dependencies = set()
   for art in artifacts:
-    dependencies.update(GetArtifactDependencies(art, recursive=True))
+    dependencies.update(REGISTRY.GetArtifactDependencyClosure(art.name))
   if dependencies:
     artifacts.update(
         set(
@@ -3,6 +3,8 @@ from __future__ import absolute_import
 from __future__ import division
 from __future__ import unicode_literals
 
+import os
+
 from absl.testing import absltest
 import mock
 
@@ -10,6 +12,7 @@ from grr_response_core.lib import flags
 from grr_response_core.lib import rdfvalue
 from grr_response_core.lib.rdfvalues import artifacts as rdf_artifacts
 from grr_response_server import artifact_registry as ar
+from grr.test_lib import artifact_test_lib
 from grr.test_lib import temp
 from grr.test_lib import test_lib
 
@@ -274,5 +277,116 @@ class ArtifactSourceTest(absltest.TestCase):
       source.Validate()
 
 
+_ARTIFACTS_YAML = """
+name: FooFile
+doc: The Foo file.
+sources:
+- type: FILE
+  attributes:
+    paths: ['/etc/foo']
+supported_os: [Linux]
+---
+name: BarRegistryKey
+doc: The Bar key.
+sources:
+- type: REGISTRY_KEY
+  attributes:
+    keys: ['HKEY_LOCAL_MACHINE\\Software\\Bar']
+supported_os: [Windows]
+---
+name: FooGroup
+doc: All Foo artifacts.
+sources:
+- type: ARTIFACT_GROUP
+  attributes:
+    names: [FooFile, BarRegistryKey]
+"""
+
+
+class ArtifactRegistrySnapshotTest(test_lib.GRRBaseTest):
+
+  def setUp(self):
+    super(ArtifactRegistrySnapshotTest, self).setUp()
+    self.artifacts_path = temp.TempFilePath(suffix=".yaml")
+    self.snapshot_path = temp.TempFilePath(suffix=".snapshot")
+    with open(self.artifacts_path, "w") as fd:
+      fd.write(_ARTIFACTS_YAML)
+
+  def tearDown(self):
+    super(ArtifactRegistrySnapshotTest, self).tearDown()
+    os.remove(self.artifacts_path)
+    os.remove(self.snapshot_path)
+
+  def _Reload(self, registry):
+    registry.ClearRegistry()
+    overrides = {"Artifacts.registry_snapshot_path": self.snapshot_path}
+    with test_lib.ConfigOverrider(overrides):
+      return registry.GetRegisteredArtifactNames()
+
+  @artifact_test_lib.PatchCleanArtifactRegistry
+  def testSnapshotIsLoaded(self, registry):
+    registry.AddFileSource(self.artifacts_path)
+    registry.WriteSnapshot(self.snapshot_path)
+
+    with mock.patch.object(registry, "_LoadArtifactsFromFiles") as load_files:
+      names = self._Reload(registry)
+      self.assertFalse(load_files.called)
+
+    self.assertCountEqual(names, ["FooFile", "BarRegistryKey", "FooGroup"])
+    artifact = registry.GetArtifact("FooFile")
+    self.assertEqual(artifact.supported_os, ["Linux"])
+    self.assertEqual(artifact.loaded_from, "file:%s" % self.artifacts_path)
+
+  @artifact_test_lib.PatchCleanArtifactRegistry
+  def testStaleSnapshotIsIgnored(self, registry):
+    registry.AddFileSource(self.artifacts_path)
+    registry.WriteSnapshot(self.snapshot_path)
+
+    with open(self.artifacts_path, "a") as fd:
+      fd.write("---\nname: Quux\ndoc: The Quux.\n")
+
+    names = self._Reload(registry)
+    self.assertCountEqual(names,
+                          ["FooFile", "BarRegistryKey", "FooGroup", "Quux"])
+
+  @artifact_test_lib.PatchCleanArtifactRegistry
+  def testCorruptedSnapshotIsIgnored(self, registry):
+    registry.AddFileSource(self.artifacts_path)
+    with open(self.snapshot_path, "wb") as fd:
+      fd.write(b"\xff\xff\xff")
+
+    names = self._Reload(registry)
+    self.assertCountEqual(names, ["FooFile", "BarRegistryKey", "FooGroup"])
+
+  @artifact_test_lib.PatchCleanArtifactRegistry
+  def testGetArtifactsFiltersByOsAndName(self, registry):
+    registry.AddFileSource(self.artifacts_path)
+
+    def Names(**kwargs):
+      return sorted(a.name for a in registry.GetArtifacts(**kwargs))
+
+    self.assertEqual(Names(os_name="Linux"), ["FooFile", "FooGroup"])
+    self.assertEqual(Names(os_name="Windows"), ["BarRegistryKey", "FooGroup"])
+    self.assertEqual(Names(os_name="Darwin"), ["FooGroup"])
+    self.assertEqual(
+        Names(os_name="Linux", name_list=["FooFile", "BarRegistryKey", "Norf"]),
+        ["FooFile"])
+
+    registry.UnregisterArtifact("FooFile")
+    self.assertEqual(Names(os_name="Linux"), ["FooGroup"])
+
+  @artifact_test_lib.PatchCleanArtifactRegistry
+  def testGetArtifactDependencyClosure(self, registry):
+    registry.AddFileSource(self.artifacts_path)
+
+    self.assertEqual(
+        registry.GetArtifactDependencyClosure("FooGroup"),
+        {"FooFile", "BarRegistryKey"})
+    self.assertEqual(registry.GetArtifactDependencyClosure("FooFile"), set())
+
+    closure = ar.GetArtifactsDependenciesClosure(["FooGroup"], os_name="Linux")
+    self.assertCountEqual([a.name for a in closure], ["FooGroup", "FooFile"])
+
+
 if __name__ == "__main__":
   flags.StartMain(test_lib.main)
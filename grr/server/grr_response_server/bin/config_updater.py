@@ -26,6 +26,7 @@ from grr_response_core.lib import repacking
 from grr_response_server import artifact
 from grr_response_server import artifact_registry
 from grr_response_server import maintenance_utils
+from grr_response_server import plugin_manifest
 from grr_response_server import server_startup
 from grr_response_server.bin import config_updater_keys_util
 from grr_response_server.bin import config_updater_util
@@ -235,6 +236,20 @@ parser_delete_artifacts = subparsers.add_parser(
 parser_delete_artifacts.add_argument(
     "--artifact", default=[], action="append", help="The artifacts to delete.")
 
+parser_build_artifact_snapshot = subparsers.add_parser(
+    "build_artifact_snapshot",
+    help="Write the artifacts loaded from the artifact files to the snapshot "
+    "at Artifacts.registry_snapshot_path.")
+
+parser_build_plugin_manifest = subparsers.add_parser(
+    "build_plugin_manifest",
+    help="Write a manifest of flows and output plugins that can be imported "
+    "on first use. Set the GRR_PLUGIN_MANIFEST environment variable of server "
+    "components to its path to use it.")
+
+parser_build_plugin_manifest.add_argument(
+    "--output", required=True, help="The path to write the manifest to.")
+
 parser_upload_python = subparsers.add_parser(
     "upload_python",
     help="Sign and upload a 'python hack' which can be used to execute code on "
@@ -384,6 +399,17 @@ def main(args):
     artifact_registry.DeleteArtifactsFromDatastore(artifact_list, token=token)
     print("Artifacts %s deleted." % artifact_list)
 
+  elif args.subparser_name == "build_artifact_snapshot":
+    snapshot_path = grr_config.CONFIG["Artifacts.registry_snapshot_path"]
+    if not snapshot_path:
+      raise ValueError("Artifacts.registry_snapshot_path is not set.")
+    artifact_registry.REGISTRY.WriteSnapshot(snapshot_path)
+    print("Artifact snapshot written to %s." % snapshot_path)
+
+  elif args.subparser_name == "build_plugin_manifest":
+    plugin_manifest.WriteManifest(args.output)
+    print("Plugin manifest written to %s." % args.output)
+
   elif args.subparser_name == "rotate_server_key":
     print("""
 You are about to rotate the server key. Note that:
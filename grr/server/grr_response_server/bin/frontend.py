@@ -6,15 +6,22 @@ from __future__ import print_function
 from __future__ import unicode_literals
 
 import cgi
+import collections
+import errno
 import io
 import logging
+import os
 import pdb
+import select
+import signal
 import socket
 import threading
+import time
 
 
 from builtins import range  # pylint: disable=redefined-builtin
 from future.utils import iteritems
+from future.utils import itervalues
 from http import server as http_server
 import ipaddr
 import socketserver
@@ -26,6 +33,7 @@ from grr_response_server import server_plugins
 from grr_response_core import config
 from grr_response_core.config import server as config_server
 from grr_response_core.lib import communicator
+from grr_response_core.lib import config_lib
 from grr_response_core.lib import flags
 from grr_response_core.lib import rdfvalue
 from grr_response_core.lib import utils
@@ -37,6 +45,84 @@ from grr_response_server import frontend_lib
 from grr_response_server import master
 from grr_response_server import server_logging
 from grr_response_server import server_startup
+from grr_response_server import threadpool
+
+
+def _CreateFrontEnd(shared_key_cache=None):
+  """Creates a FrontEndServer configured from the config."""
+  return frontend_lib.FrontEndServer(
+      certificate=config.CONFIG["Frontend.certificate"],
+      private_key=config.CONFIG["PrivateKeys.server_key"],
+      max_queue_size=config.CONFIG["Frontend.max_queue_size"],
+      message_expiry_time=config.CONFIG["Frontend.message_expiry_time"],
+      max_retransmission_time=config
+      .CONFIG["Frontend.max_retransmission_time"],
+      shared_key_cache=shared_key_cache)
+
+
+def _EnableReusePort(sock):
+  # Python 2 doesn't export SO_REUSEPORT, 15 is its value on Linux.
+  sock.setsockopt(socket.SOL_SOCKET, getattr(socket, "SO_REUSEPORT", 15), 1)
+
+
+def HandleControlRequest(frontend, path, raw_headers, post_data, client_ip):
+  """Processes messages POSTed by a client and returns the response.
+
+  Args:
+    frontend: A frontend_lib.FrontEndServer to process the messages with.
+    path: Path of the HTTP request.
+    raw_headers: Headers of the HTTP request as a string.
+    post_data: Body of the HTTP request.
+    client_ip: The address the request came from.
+
+  Returns:
+    A serialized ClientCommunication to send back to the client.
+
+  Raises:
+    communicator.UnknownClientCertError: If the client has to enroll first.
+  """
+  if not master.MASTER_WATCHER.IsMaster():
+    # We shouldn't be getting requests from the client unless we
+    # are the active instance.
+    stats_collector_instance.Get().IncrementCounter(
+        "frontend_inactive_request_count", fields=["http"])
+    logging.info("Request sent to inactive frontend from %s", client_ip)
+
+  # Get the api version
+  try:
+    api_version = int(cgi.parse_qs(path.split("?")[1])["api"][0])
+  except (ValueError, KeyError, IndexError):
+    # The oldest api version we support if not specified.
+    api_version = 3
+
+  request_comms = rdf_flows.ClientCommunication.FromSerializedString(post_data)
+
+  # If the client did not supply the version in the protobuf we use the get
+  # parameter.
+  if not request_comms.api_version:
+    request_comms.api_version = api_version
+
+  # Reply using the same version we were requested with.
+  responses_comms = rdf_flows.ClientCommunication(
+      api_version=request_comms.api_version)
+
+  source_ip = ipaddr.IPAddress(client_ip)
+
+  if source_ip.version == 6:
+    source_ip = source_ip.ipv4_mapped or source_ip
+
+  request_comms.orig_request = rdf_flows.HttpRequest(
+      timestamp=rdfvalue.RDFDatetime.Now().AsMicrosecondsSinceEpoch(),
+      raw_headers=utils.SmartStr(raw_headers),
+      source_ip=utils.SmartStr(source_ip))
+
+  source, nr_messages = frontend.HandleMessageBundles(request_comms,
+                                                      responses_comms)
+
+  server_logging.LOGGER.LogHttpFrontendAccess(
+      request_comms.orig_request, source=source, message_count=nr_messages)
+
+  return responses_comms.SerializeToString()
 
 
 class GRRHTTPServerHandler(http_server.BaseHTTPRequestHandler):
@@ -46,6 +132,7 @@ class GRRHTTPServerHandler(http_server.BaseHTTPRequestHandler):
       200: "200 OK",
       404: "404 Not Found",
       406: "406 Not Acceptable",
+      413: "413 Request Entity Too Large",
       500: "500 Internal Server Error"
   }
 
@@ -211,21 +298,6 @@ class GRRHTTPServerHandler(http_server.BaseHTTPRequestHandler):
   @stats_utils.Timed("frontend_request_latency", fields=["http"])
   def Control(self):
     """Handle POSTS."""
-    if not master.MASTER_WATCHER.IsMaster():
-      # We shouldn't be getting requests from the client unless we
-      # are the active instance.
-      stats_collector_instance.Get().IncrementCounter(
-          "frontend_inactive_request_count", fields=["http"])
-      logging.info("Request sent to inactive frontend from %s",
-                   self.client_address[0])
-
-    # Get the api version
-    try:
-      api_version = int(cgi.parse_qs(self.path.split("?")[1])["api"][0])
-    except (ValueError, KeyError, IndexError):
-      # The oldest api version we support if not specified.
-      api_version = 3
-
     try:
       content_length = self.headers.getheader("content-length")
       if not content_length:
@@ -233,35 +305,10 @@ class GRRHTTPServerHandler(http_server.BaseHTTPRequestHandler):
 
       length = int(content_length)
 
-      request_comms = rdf_flows.ClientCommunication.FromSerializedString(
-          self._GetPOSTData(length))
-
-      # If the client did not supply the version in the protobuf we use the get
-      # parameter.
-      if not request_comms.api_version:
-        request_comms.api_version = api_version
-
-      # Reply using the same version we were requested with.
-      responses_comms = rdf_flows.ClientCommunication(
-          api_version=request_comms.api_version)
-
-      source_ip = ipaddr.IPAddress(self.client_address[0])
-
-      if source_ip.version == 6:
-        source_ip = source_ip.ipv4_mapped or source_ip
-
-      request_comms.orig_request = rdf_flows.HttpRequest(
-          timestamp=rdfvalue.RDFDatetime.Now().AsMicrosecondsSinceEpoch(),
-          raw_headers=utils.SmartStr(self.headers),
-          source_ip=utils.SmartStr(source_ip))
-
-      source, nr_messages = self.server.frontend.HandleMessageBundles(
-          request_comms, responses_comms)
-
-      server_logging.LOGGER.LogHttpFrontendAccess(
-          request_comms.orig_request, source=source, message_count=nr_messages)
-
-      self.Send(responses_comms.SerializeToString())
+      response = HandleControlRequest(self.server.frontend, self.path,
+                                      self.headers, self._GetPOSTData(length),
+                                      self.client_address[0])
+      self.Send(response)
 
     except communicator.UnknownClientCertError:
       # "406 Not Acceptable: The server can only generate a response that is not
@@ -278,20 +325,20 @@ class GRRHTTPServer(socketserver.ThreadingMixIn, http_server.HTTPServer):
 
   address_family = socket.AF_INET6
 
-  def __init__(self, server_address, handler, frontend=None, **kwargs):
+  def __init__(self,
+               server_address,
+               handler,
+               frontend=None,
+               reuse_port=False,
+               **kwargs):
     stats_collector_instance.Get().SetGaugeValue("frontend_max_active_count",
                                                  self.request_queue_size)
+    self.reuse_port = reuse_port
 
     if frontend:
       self.frontend = frontend
     else:
-      self.frontend = frontend_lib.FrontEndServer(
-          certificate=config.CONFIG["Frontend.certificate"],
-          private_key=config.CONFIG["PrivateKeys.server_key"],
-          max_queue_size=config.CONFIG["Frontend.max_queue_size"],
-          message_expiry_time=config.CONFIG["Frontend.message_expiry_time"],
-          max_retransmission_time=config
-          .CONFIG["Frontend.max_retransmission_time"])
+      self.frontend = _CreateFrontEnd()
     self.server_cert = config.CONFIG["Frontend.certificate"]
 
     (address, _) = server_address
@@ -304,21 +351,570 @@ class GRRHTTPServer(socketserver.ThreadingMixIn, http_server.HTTPServer):
     logging.info("Will attempt to listen on %s", server_address)
     http_server.HTTPServer.__init__(self, server_address, handler, **kwargs)
 
+  def server_bind(self):
+    if self.reuse_port:
+      _EnableReusePort(self.socket)
+    http_server.HTTPServer.server_bind(self)
+
   def Shutdown(self):
     self.shutdown()
 
 
-def CreateServer(frontend=None):
+class _BadRequestError(Exception):
+  """Raised when a client sends a request that can't be parsed."""
+
+
+_HTTPRequestHeader = collections.namedtuple(
+    "_HTTPRequestHeader",
+    ["method", "path", "version", "raw_headers", "headers", "content_length"])
+
+_HTTPRequest = collections.namedtuple(
+    "_HTTPRequest",
+    ["method", "path", "version", "raw_headers", "headers", "body"])
+
+
+def _ParseHTTPRequestHeader(data, max_header_size):
+  """Parses the request line and headers from the beginning of a buffer.
+
+  Args:
+    data: Bytes received from the client so far.
+    max_header_size: Maximum allowed size of the request line and headers.
+
+  Returns:
+    A tuple (header, consumed_bytes_count). The header is None if data
+    doesn't contain a complete request line and headers yet.
+
+  Raises:
+    _BadRequestError: If the request is malformed or not supported.
+  """
+  header_end = data.find(b"\r\n\r\n")
+  if header_end == -1:
+    if len(data) > max_header_size:
+      raise _BadRequestError("Request headers too long.")
+    return None, 0
+
+  lines = bytes(data[:header_end]).decode("latin-1").split("\r\n")
+  try:
+    method, path, version = lines[0].split(" ", 2)
+  except ValueError:
+    raise _BadRequestError("Malformed request line.")
+
+  headers = {}
+  for line in lines[1:]:
+    name, separator, value = line.partition(":")
+    if not separator:
+      raise _BadRequestError("Malformed header line.")
+    headers[name.strip().lower()] = value.strip()
+
+  if headers.get("transfer-encoding", "identity").lower() != "identity":
+    raise _BadRequestError("Only requests with content-length are supported.")
+
+  try:
+    content_length = int(headers.get("content-length", 0))
+  except ValueError:
+    raise _BadRequestError("Malformed content-length header.")
+  if content_length < 0:
+    raise _BadRequestError("Negative content-length header.")
+
+  header = _HTTPRequestHeader(
+      method=method.upper(),
+      path=path,
+      version=version.upper(),
+      raw_headers="\n".join(lines[1:]) + "\n",
+      headers=headers,
+      content_length=content_length)
+  return header, header_end + 4
+
+
+class _Connection(object):
+  """A client connection served by the EventLoopHTTPServer."""
+
+  def __init__(self, sock, address):
+    self.socket = sock
+    self.address = address
+    # Received data that is not part of the body of the current request.
+    self.input_buffer = bytearray()
+    # Header of the request whose body is being received and the body chunks
+    # received so far.
+    self.request_header = None
+    self.body_chunks = []
+    self.body_size = 0
+    self.output_buffer = b""
+    self.output_offset = 0
+    # Set while a request from this connection is processed by a worker.
+    self.processing = False
+    self.close_after_write = False
+    self.last_activity = time.time()
+
+  @property
+  def has_output(self):
+    return self.output_offset < len(self.output_buffer)
+
+
+class EventLoopHTTPServer(object):
+  """The GRR HTTP frontend server multiplexing connections on one thread.
+
+  Accepting connections and reading and writing data is done by a poll-based
+  event loop, so idle keep-alive connections don't cost a thread each. Request
+  processing (message decryption, HandleMessageBundles) is dispatched to a
+  bounded worker pool. When the pool is saturated, requests are rejected with
+  503 so that clients back off and retry later.
+  """
+
+  request_queue_size = 500
+
+  MAX_HEADER_SIZE = 64 * 1024
+  RECV_BLOCK_SIZE = 64 * 1024
+  POLL_INTERVAL_MS = 1000
+  SHUTDOWN_TIMEOUT = 30
+
+  statustext = {
+      200: "200 OK",
+      400: "400 Bad Request",
+      404: "404 Not Found",
+      406: "406 Not Acceptable",
+      413: "413 Request Entity Too Large",
+      500: "500 Internal Server Error",
+      503: "503 Service Unavailable",
+  }
+
+  def __init__(self,
+               server_address,
+               frontend=None,
+               max_workers=None,
+               idle_timeout=None,
+               max_request_size=None,
+               reuse_port=False):
+    if frontend:
+      self.frontend = frontend
+    else:
+      self.frontend = _CreateFrontEnd()
+    self.server_cert = config.CONFIG["Frontend.certificate"]
+
+    if max_workers is None:
+      max_workers = config.CONFIG["Frontend.event_loop_workers"]
+    if idle_timeout is None:
+      idle_timeout = config.CONFIG["Frontend.event_loop_idle_timeout"]
+    self.idle_timeout = idle_timeout
+    if max_request_size is None:
+      max_request_size = config.CONFIG["Frontend.event_loop_max_request_size"]
+    self.max_request_size = max_request_size
+
+    stats_collector_instance.Get().SetGaugeValue("frontend_max_active_count",
+                                                 max_workers)
+
+    (address, _) = server_address
+    if ipaddr.IPAddress(address).version == 4:
+      address_family = socket.AF_INET
+    else:
+      address_family = socket.AF_INET6
+
+    logging.info("Will attempt to listen on %s", server_address)
+    self.socket = socket.socket(address_family, socket.SOCK_STREAM)
+    try:
+      self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+      if reuse_port:
+        _EnableReusePort(self.socket)
+      self.socket.bind(server_address)
+      self.socket.listen(self.request_queue_size)
+    except socket.error:
+      self.socket.close()
+      raise
+    self.socket.setblocking(False)
+
+    self.worker_pool = threadpool.ThreadPool.Factory(
+        "HTTPFrontendWorkers", min_threads=max_workers, max_threads=max_workers)
+
+    # Workers report processed requests through this queue and wake the event
+    # loop up by writing to the wakeup socket.
+    self._processed_requests = collections.deque()
+    self._wakeup_reader, self._wakeup_writer = socket.socketpair()
+    self._wakeup_reader.setblocking(False)
+
+    self._poller = select.poll()
+    self._connections = {}
+    self._active_count = 0
+    self._last_idle_check = time.time()
+    self._shutdown_requested = False
+    # Set while serve_forever() is not running.
+    self._stopped = threading.Event()
+    self._stopped.set()
+
+  @property
+  def active_count(self):
+    """Number of requests currently processed by the worker pool."""
+    return self._active_count
+
+  def serve_forever(self):
+    """Serves client connections until Shutdown() is called."""
+    if self._shutdown_requested:
+      return
+
+    self._stopped.clear()
+    self.worker_pool.Start()
+    self._poller.register(self.socket.fileno(), select.POLLIN)
+    self._poller.register(self._wakeup_reader.fileno(), select.POLLIN)
+    try:
+      while not self._shutdown_requested:
+        self._PollOnce()
+
+      # Stop accepting new connections, but give the requests that are being
+      # processed a chance to finish.
+      self._poller.unregister(self.socket.fileno())
+      self.socket.close()
+      deadline = time.time() + self.SHUTDOWN_TIMEOUT
+      while self._HasPendingResponses() and time.time() < deadline:
+        self._PollOnce()
+    finally:
+      for connection in list(self._connections.values()):
+        self._CloseConnection(connection)
+      self.socket.close()
+      self.worker_pool.Stop()
+      self._stopped.set()
+
+  def Shutdown(self):
+    """Stops serving and waits for serve_forever() to return."""
+    self._shutdown_requested = True
+    if self._stopped.is_set():
+      # serve_forever() is not running, so there is nothing to wait for.
+      self.socket.close()
+      return
+
+    self._Wakeup()
+    self._stopped.wait()
+
+  def _PollOnce(self):
+    for fd, events in self._poller.poll(self.POLL_INTERVAL_MS):
+      if fd == self._wakeup_reader.fileno():
+        self._SendProcessedResponses()
+      elif fd == self.socket.fileno():
+        self._AcceptConnections()
+      else:
+        connection = self._connections.get(fd)
+        if connection is not None:
+          self._HandleConnectionEvents(connection, events)
+
+    self._CloseIdleConnections()
+
+  def _HasPendingResponses(self):
+    return any(connection.processing or connection.has_output
+               for connection in itervalues(self._connections))
+
+  def _Wakeup(self):
+    try:
+      self._wakeup_writer.send(b"x")
+    except socket.error:
+      # The wakeup socket buffer is full, so the loop will wake up anyway.
+      pass
+
+  def _AcceptConnections(self):
+    while True:
+      try:
+        sock, address = self.socket.accept()
+      except socket.error as e:
+        if e.errno not in (errno.EAGAIN, errno.EWOULDBLOCK, errno.EINTR):
+          logging.warning("Failed to accept a connection: %s", e)
+        return
+
+      sock.setblocking(False)
+      connection = _Connection(sock, address)
+      self._connections[sock.fileno()] = connection
+      self._poller.register(sock.fileno(), select.POLLIN)
+
+  def _CloseConnection(self, connection):
+    if connection.socket is None:
+      return
+
+    fd = connection.socket.fileno()
+    self._connections.pop(fd, None)
+    try:
+      self._poller.unregister(fd)
+    except KeyError:
+      pass
+    connection.socket.close()
+    connection.socket = None
+
+  def _CloseIdleConnections(self):
+    now = time.time()
+    if now - self._last_idle_check < 1:
+      return
+    self._last_idle_check = now
+
+    for connection in list(self._connections.values()):
+      if (not connection.processing and not connection.has_output and
+          connection.last_activity + self.idle_timeout < now):
+        self._CloseConnection(connection)
+
+  def _HandleConnectionEvents(self, connection, events):
+    if events & (select.POLLERR | select.POLLNVAL):
+      self._CloseConnection(connection)
+      return
+
+    if events & (select.POLLIN | select.POLLHUP):
+      self._ReadFromConnection(connection)
+
+    if events & select.POLLOUT and connection.socket is not None:
+      self._WriteToConnection(connection)
+
+  def _ReadFromConnection(self, connection):
+    try:
+      data = connection.socket.recv(self.RECV_BLOCK_SIZE)
+    except socket.error as e:
+      if e.errno not in (errno.EAGAIN, errno.EWOULDBLOCK, errno.EINTR):
+        self._CloseConnection(connection)
+      return
+
+    if not data:
+      # The client has closed the connection.
+      self._CloseConnection(connection)
+      return
+
+    connection.input_buffer += data
+    connection.last_activity = time.time()
+    self._ProcessInput(connection)
+
+  def _WriteToConnection(self, connection):
+    try:
+      sent = connection.socket.send(
+          memoryview(connection.output_buffer)[connection.output_offset:])
+    except socket.error as e:
+      if e.errno not in (errno.EAGAIN, errno.EWOULDBLOCK, errno.EINTR):
+        self._CloseConnection(connection)
+      return
+
+    connection.output_offset += sent
+    connection.last_activity = time.time()
+    if connection.has_output:
+      self._poller.modify(connection.socket.fileno(), select.POLLOUT)
+      return
+
+    connection.output_buffer = b""
+    connection.output_offset = 0
+    if connection.close_after_write:
+      self._CloseConnection(connection)
+      return
+
+    self._poller.modify(connection.socket.fileno(), select.POLLIN)
+    # Handle requests that the client sent without waiting for the response.
+    self._ProcessInput(connection)
+
+  def _ProcessInput(self, connection):
+    """Dispatches a complete request from the connection's input, if any."""
+    if (connection.processing or connection.has_output or
+        self._shutdown_requested):
+      return
+
+    header = connection.request_header
+    if header is None:
+      try:
+        header, consumed = _ParseHTTPRequestHeader(connection.input_buffer,
+                                                   self.MAX_HEADER_SIZE)
+      except _BadRequestError as e:
+        connection.input_buffer = bytearray()
+        self._SendResponse(
+            connection, None, ("Error: %s" % e).encode("utf-8"), status=400)
+        return
+
+      if header is None:
+        return
+
+      del connection.input_buffer[:consumed]
+      if header.content_length > self.max_request_size:
+        connection.input_buffer = bytearray()
+        self._SendResponse(
+            connection, None, b"Error: Request body too large.", status=413)
+        return
+
+      connection.request_header = header
+
+    # The headers are only parsed once, after that received data is collected
+    # in chunks until the body is complete.
+    missing = header.content_length - connection.body_size
+    if missing and connection.input_buffer:
+      chunk = bytes(connection.input_buffer[:missing])
+      del connection.input_buffer[:missing]
+      connection.body_chunks.append(chunk)
+      connection.body_size += len(chunk)
+
+    if connection.body_size < header.content_length:
+      return
+
+    request = _HTTPRequest(
+        method=header.method,
+        path=header.path,
+        version=header.version,
+        raw_headers=header.raw_headers,
+        headers=header.headers,
+        body=b"".join(connection.body_chunks))
+    connection.request_header = None
+    connection.body_chunks = []
+    connection.body_size = 0
+    self._DispatchRequest(connection, request)
+
+  def _DispatchRequest(self, connection, request):
+    """Responds to a request or hands it over to the worker pool."""
+    if request.method == "GET" and request.path.startswith("/server.pem"):
+      stats_collector_instance.Get().IncrementCounter(
+          "frontend_http_requests", fields=["cert", "http"])
+      self._SendResponse(connection, request, self.server_cert.AsPEM())
+      return
+
+    if request.method == "POST" and request.path.startswith("/upload"):
+      stats_collector_instance.Get().IncrementCounter(
+          "frontend_http_requests", fields=["upload", "http"])
+      logging.error("Requested no longer supported file upload through HTTP.")
+      self._SendResponse(
+          connection,
+          request,
+          b"File upload though HTTP is no longer supported",
+          status=404)
+      return
+
+    if request.method not in ["GET", "POST"]:
+      self._SendResponse(connection, request, b"", status=404)
+      return
+
+    # Don't read further requests from this connection until this one is
+    # processed.
+    connection.processing = True
+    self._poller.modify(connection.socket.fileno(), 0)
+    try:
+      self.worker_pool.AddTask(
+          self._ProcessRequest, (connection, request),
+          name="HTTPFrontendRequest",
+          blocking=False,
+          inline=False)
+    except threadpool.Full:
+      connection.processing = False
+      stats_collector_instance.Get().IncrementCounter(
+          "frontend_overloaded_request_count", fields=["http"])
+      self._SendResponse(
+          connection,
+          request,
+          b"Server is overloaded, try again later.",
+          status=503)
+      return
+
+    self._active_count += 1
+    stats_collector_instance.Get().SetGaugeValue(
+        "frontend_active_count", self._active_count, fields=["http"])
+
+  def _ProcessRequest(self, connection, request):
+    """Processes a request. Runs on a worker thread."""
+    try:
+      if request.method == "GET":
+        status, data = self._ServeStatic(request)
+      else:
+        stats_collector_instance.Get().IncrementCounter(
+            "frontend_http_requests", fields=["control", "http"])
+        status, data = self._Control(request, connection.address)
+    except Exception as e:  # pylint: disable=broad-except
+      logging.exception("Had to respond with status 500.")
+      status, data = 500, ("Error: %s" % e).encode("utf-8")
+
+    self._processed_requests.append((connection, request, status, data))
+    self._Wakeup()
+
+  static_content_path = "/static/"
+
+  def _ServeStatic(self, request):
+    if not request.path.startswith(self.static_content_path):
+      return 404, b""
+
+    stats_collector_instance.Get().IncrementCounter(
+        "frontend_http_requests", fields=["static", "http"])
+    aff4_path = aff4.FACTORY.GetStaticContentPath().Add(
+        request.path[len(self.static_content_path):])
+    try:
+      logging.info("Serving %s", aff4_path)
+      fd = aff4.FACTORY.Open(aff4_path, token=aff4.FACTORY.root_token)
+      return 200, fd.read()
+    except (IOError, AttributeError):
+      return 404, b""
+
+  @stats_utils.Counted("frontend_request_count", fields=["http"])
+  @stats_utils.Timed("frontend_request_latency", fields=["http"])
+  def _Control(self, request, client_address):
+    """Handles POSTs."""
+    if "content-length" not in request.headers:
+      raise IOError("No content-length header provided.")
+
+    try:
+      return 200, HandleControlRequest(self.frontend, request.path,
+                                       request.raw_headers, request.body,
+                                       client_address[0])
+    except communicator.UnknownClientCertError:
+      # See GRRHTTPServerHandler.Control.
+      return 406, b"Enrollment required"
+
+  def _SendProcessedResponses(self):
+    try:
+      self._wakeup_reader.recv(4096)
+    except socket.error:
+      pass
+
+    while self._processed_requests:
+      connection, request, status, data = self._processed_requests.popleft()
+      connection.processing = False
+      self._active_count -= 1
+      stats_collector_instance.Get().SetGaugeValue(
+          "frontend_active_count", self._active_count, fields=["http"])
+
+      if connection.socket is not None:
+        self._SendResponse(connection, request, data, status=status)
+
+  def _SendResponse(self, connection, request, data, status=200):
+    """Queues a response for sending to the client."""
+    if request is not None and request.version in ["HTTP/1.0", "HTTP/1.1"]:
+      version = request.version
+    else:
+      version = "HTTP/1.0"
+
+    keep_alive = False
+    if (request is not None and status != 400 and
+        not self._shutdown_requested):
+      connection_header = request.headers.get("connection", "").lower()
+      if version == "HTTP/1.1":
+        keep_alive = connection_header != "close"
+      else:
+        keep_alive = connection_header == "keep-alive"
+
+    header = ""
+    header += "%s %s\r\n" % (version, self.statustext[status])
+    header += "Server: GRR Server\r\n"
+    header += "Content-type: application/octet-stream\r\n"
+    header += "Content-Length: %d\r\n" % len(data)
+    header += "Connection: %s\r\n" % ("keep-alive" if keep_alive else "close")
+    header += "\r\n"
+
+    connection.output_buffer = header.encode("utf-8") + data
+    connection.output_offset = 0
+    connection.close_after_write = not keep_alive
+    self._WriteToConnection(connection)
+
+
+def CreateServer(frontend=None, reuse_port=False):
   """Start frontend http server."""
-  max_port = config.CONFIG.Get("Frontend.port_max",
-                               config.CONFIG["Frontend.bind_port"])
+  if reuse_port:
+    # All worker processes have to share the same port.
+    max_port = config.CONFIG["Frontend.bind_port"]
+  else:
+    max_port = config.CONFIG.Get("Frontend.port_max",
+                                 config.CONFIG["Frontend.bind_port"])
 
   for port in range(config.CONFIG["Frontend.bind_port"], max_port + 1):
 
     server_address = (config.CONFIG["Frontend.bind_address"], port)
     try:
-      httpd = GRRHTTPServer(
-          server_address, GRRHTTPServerHandler, frontend=frontend)
+      if config.CONFIG["Frontend.server_mode"] == "event_loop":
+        httpd = EventLoopHTTPServer(
+            server_address, frontend=frontend, reuse_port=reuse_port)
+      else:
+        httpd = GRRHTTPServer(
+            server_address,
+            GRRHTTPServerHandler,
+            frontend=frontend,
+            reuse_port=reuse_port)
       break
     except socket.error as e:
       if e.errno == socket.errno.EADDRINUSE and port < max_port:
@@ -331,6 +927,223 @@ def CreateServer(frontend=None):
   return httpd
 
 
+class WorkerCrashLoopError(Exception):
+  """Raised when the frontend gives up on a worker that keeps crashing."""
+
+
+class FrontendSupervisor(object):
+  """Runs the frontend in multiple forked worker processes.
+
+  Decrypting, decompressing and parsing client messages is CPU bound, so a
+  single frontend process can't make use of more than one core. The supervisor
+  forks a number of workers that all listen on the same port using
+  SO_REUSEPORT, the kernel then distributes client connections between them.
+
+  Workers that die are restarted, with an exponentially growing delay if they
+  keep crashing. If a worker crashes too many times in a row, the supervisor
+  shuts all workers down and fails. On SIGHUP, a new set of workers is started
+  and the old workers are asked to finish the requests they are processing and
+  exit, so that the frontend can be restarted without dropping connections.
+  SIGTERM and SIGINT shut all the workers down.
+
+  Workers are forked before any initialization happens, so they don't share
+  data store connections or background threads. Only the client public key
+  cache is shared between them.
+  """
+
+  # Time (in seconds) old workers get to finish their requests on shutdown.
+  SHUTDOWN_TIMEOUT = 60
+
+  # Delay (in seconds) before a crashed worker is restarted. It doubles with
+  # every consecutive crash, up to RESTART_BACKOFF_MAX.
+  RESTART_BACKOFF_MIN = 1
+  RESTART_BACKOFF_MAX = 60
+  # Time (in seconds) after which a running worker is considered healthy, so
+  # that its earlier crashes are no longer counted.
+  WORKER_HEALTHY_TIME = 300
+  # Number of consecutive crashes of a worker after which the supervisor gives
+  # up.
+  MAX_CONSECUTIVE_CRASHES = 10
+
+  def __init__(self, num_workers, shared_key_cache_size):
+    self.num_workers = num_workers
+    self.shared_key_cache = frontend_lib.SharedPublicKeyCache(
+        shared_key_cache_size)
+
+    # Maps pids of the current workers to their indices.
+    self._workers = {}
+    # Maps pids of the current workers to the times they were started.
+    self._start_times = {}
+    # Maps worker indices to the number of consecutive crashes.
+    self._crash_counts = collections.Counter()
+    # Maps indices of crashed workers to the times they are restarted at.
+    self._pending_restarts = {}
+    self._gave_up = False
+    # Maps pids of the workers that have been asked to exit to the time by
+    # which they have to be gone.
+    self._retiring_workers = {}
+    self._restart_requested = False
+    self._shutdown_requested = False
+
+  def Run(self):
+    """Runs the worker processes.
+
+    Returns:
+      None in the supervisor process, once all the workers have shut down. In
+      a newly forked worker process returns the index of the worker.
+
+    Raises:
+      WorkerCrashLoopError: In the supervisor process, if a worker kept
+        crashing and all workers were shut down because of that.
+    """
+    signal.signal(signal.SIGTERM, self._HandleShutdownSignal)
+    signal.signal(signal.SIGINT, self._HandleShutdownSignal)
+    signal.signal(signal.SIGHUP, self._HandleRestartSignal)
+
+    for index in range(self.num_workers):
+      if self._StartWorker(index):
+        return index
+
+    while self._workers or self._retiring_workers or self._pending_restarts:
+      if self._shutdown_requested:
+        self._shutdown_requested = False
+        self._pending_restarts = {}
+        self._StopWorkers(list(self._workers))
+        self._workers = {}
+      elif self._restart_requested:
+        self._restart_requested = False
+        # Crashed workers that are waiting to be restarted are started right
+        # away and get a clean slate.
+        indices = list(itervalues(self._workers)) + list(self._pending_restarts)
+        self._pending_restarts = {}
+        self._crash_counts.clear()
+        old_workers = self._workers
+        self._workers = {}
+        for index in sorted(indices):
+          if self._StartWorker(index):
+            return index
+        self._StopWorkers(list(old_workers))
+
+      now = time.time()
+      for index, restart_time in sorted(iteritems(self._pending_restarts)):
+        if restart_time <= now:
+          del self._pending_restarts[index]
+          if self._StartWorker(index):
+            return index
+
+      if self._workers or self._retiring_workers:
+        pid, status = os.waitpid(-1, os.WNOHANG)
+      else:
+        # All workers crashed and are waiting to be restarted, there are no
+        # child processes to wait for.
+        pid = 0
+
+      if not pid:
+        self._KillStuckWorkers()
+        time.sleep(1)
+        continue
+
+      self._retiring_workers.pop(pid, None)
+      start_time = self._start_times.pop(pid, None)
+      index = self._workers.pop(pid, None)
+      if index is not None:
+        logging.error("Frontend worker %d (pid %d) died with status %d.",
+                      index, pid, status)
+        self._ScheduleRestart(index, start_time)
+
+    logging.info("All frontend workers have shut down.")
+    if self._gave_up:
+      raise WorkerCrashLoopError("A frontend worker kept crashing.")
+    return None
+
+  def _ScheduleRestart(self, index, start_time):
+    """Schedules a restart of a crashed worker or gives up on it."""
+    now = time.time()
+    if now - start_time >= self.WORKER_HEALTHY_TIME:
+      self._crash_counts[index] = 0
+    self._crash_counts[index] += 1
+
+    crash_count = self._crash_counts[index]
+    if crash_count >= self.MAX_CONSECUTIVE_CRASHES:
+      logging.error(
+          "Frontend worker %d crashed %d times in a row, shutting down.",
+          index, crash_count)
+      self._gave_up = True
+      self._shutdown_requested = True
+      return
+
+    delay = min(self.RESTART_BACKOFF_MAX,
+                self.RESTART_BACKOFF_MIN * 2**(crash_count - 1))
+    logging.info("Restarting frontend worker %d in %d seconds.", index, delay)
+    self._pending_restarts[index] = now + delay
+
+  def _StartWorker(self, index):
+    """Forks a new worker, returns True in the worker process."""
+    pid = os.fork()
+    if pid == 0:
+      signal.signal(signal.SIGTERM, signal.SIG_DFL)
+      signal.signal(signal.SIGINT, signal.default_int_handler)
+      signal.signal(signal.SIGHUP, signal.SIG_DFL)
+      return True
+
+    logging.info("Started frontend worker %d (pid %d).", index, pid)
+    self._workers[pid] = index
+    self._start_times[pid] = time.time()
+    return False
+
+  def _StopWorkers(self, pids):
+    for pid in pids:
+      try:
+        os.kill(pid, signal.SIGTERM)
+      except OSError as e:
+        if e.errno != errno.ESRCH:
+          raise
+      self._retiring_workers[pid] = time.time() + self.SHUTDOWN_TIMEOUT
+
+  def _KillStuckWorkers(self):
+    now = time.time()
+    for pid, deadline in list(iteritems(self._retiring_workers)):
+      if deadline < now:
+        logging.warning("Frontend worker (pid %d) did not exit in time.", pid)
+        try:
+          os.kill(pid, signal.SIGKILL)
+        except OSError as e:
+          if e.errno != errno.ESRCH:
+            raise
+        # The worker will be reaped by waitpid(), don't kill it again.
+        self._retiring_workers[pid] = float("inf")
+
+  def _HandleShutdownSignal(self, signum, frame):
+    del signum, frame  # Unused.
+    self._shutdown_requested = True
+
+  def _HandleRestartSignal(self, signum, frame):
+    del signum, frame  # Unused.
+    self._restart_requested = True
+
+
+def _AddWorkerConfigOverrides(worker_index):
+  """Makes the config of a frontend worker process differ from the others."""
+  # Each worker writes its own stats, so that they can be aggregated by
+  # StatsStore.process_id prefix.
+  stats_process_id = config.CONFIG["StatsStore.process_id"]
+  if stats_process_id:
+    flags.FLAGS.parameter = flags.FLAGS.parameter + [
+        "StatsStore.process_id=%s_worker%d" % (stats_process_id, worker_index)
+    ]
+
+
+def _ShutdownOnSigterm(httpd):
+
+  def Handler(signum, frame):
+    del signum, frame  # Unused.
+    # Shutdown() blocks until serve_forever() returns, so it can't be called
+    # from the thread running serve_forever().
+    threading.Thread(target=httpd.Shutdown).start()
+
+  signal.signal(signal.SIGTERM, Handler)
+
+
 def main(argv):
   """Main."""
   del argv  # Unused.
@@ -341,9 +1154,32 @@ def main(argv):
 
   config.CONFIG.AddContext("HTTPServer Context")
 
+  # Only the config is loaded here: in multi-process mode all other
+  # initialization happens in the worker processes.
+  config_lib.SetPlatformArchContext()
+  config_lib.ParseConfigCommandLine()
+
+  shared_key_cache = None
+  num_processes = config.CONFIG["Frontend.processes"]
+  if num_processes > 1:
+    supervisor = FrontendSupervisor(
+        num_processes, config.CONFIG["Frontend.shared_key_cache_size"])
+    worker_index = supervisor.Run()
+    if worker_index is None:
+      return
+
+    _AddWorkerConfigOverrides(worker_index)
+    shared_key_cache = supervisor.shared_key_cache
+
   server_startup.Init()
 
-  httpd = CreateServer()
+  if shared_key_cache is not None:
+    httpd = CreateServer(
+        frontend=_CreateFrontEnd(shared_key_cache=shared_key_cache),
+        reuse_port=True)
+    _ShutdownOnSigterm(httpd)
+  else:
+    httpd = CreateServer()
 
   server_startup.DropPrivileges()
 
@@ -6,11 +6,13 @@ from __future__ import unicode_literals
 
 import hashlib
 import os
+import signal
 import socket
 import threading
 import time
 
 
+from absl.testing import absltest
 from future.builtins import range
 from future.utils import iteritems
 import ipaddr
@@ -26,6 +28,7 @@ from grr_response_server import data_store
 from grr_response_server import data_store_utils
 from grr_response_server import db
 from grr_response_server import file_store
+from grr_response_server import threadpool
 from grr_response_server.aff4_objects import aff4_grr
 from grr_response_server.aff4_objects import filestore
 from grr_response_server.bin import frontend
@@ -48,8 +51,7 @@ class GRRHTTPServerTest(test_lib.GRRBaseTest):
     # Bring up a local server for testing.
     port = portpicker.pick_unused_port()
     ip = utils.ResolveHostnameToIP("localhost", port)
-    cls.httpd = frontend.GRRHTTPServer((ip, port),
-                                       frontend.GRRHTTPServerHandler)
+    cls.httpd = cls._CreateServer((ip, port))
 
     if ipaddr.IPAddress(ip).version == 6:
       cls.address_family = socket.AF_INET6
@@ -63,6 +65,14 @@ class GRRHTTPServerTest(test_lib.GRRBaseTest):
     cls.httpd_thread.daemon = True
     cls.httpd_thread.start()
 
+  @classmethod
+  def _CreateServer(cls, server_address, reuse_port=False):
+    return frontend.GRRHTTPServer(
+        server_address, frontend.GRRHTTPServerHandler, reuse_port=reuse_port)
+
+  def _ActiveRequestCount(self):
+    return frontend.GRRHTTPServerHandler.active_counter
+
   @classmethod
   def tearDownClass(cls):
     cls.httpd.Shutdown()
@@ -77,7 +87,7 @@ class GRRHTTPServerTest(test_lib.GRRBaseTest):
 
     # Wait until all pending http requests have been handled.
     for _ in range(100):
-      if frontend.GRRHTTPServerHandler.active_counter == 0:
+      if self._ActiveRequestCount() == 0:
         return
       time.sleep(0.01)
     self.fail("HTTP server thread did not shut down in time.")
@@ -87,6 +97,17 @@ class GRRHTTPServerTest(test_lib.GRRBaseTest):
     self.assertEqual(req.status_code, 200)
     self.assertIn("BEGIN CERTIFICATE", req.content)
 
+  def testServersCanShareAPortWithReusePort(self):
+    port = portpicker.pick_unused_port()
+    ip = utils.ResolveHostnameToIP("localhost", port)
+
+    first_server = self._CreateServer((ip, port), reuse_port=True)
+    try:
+      second_server = self._CreateServer((ip, port), reuse_port=True)
+      second_server.socket.close()
+    finally:
+      first_server.socket.close()
+
   def _RunClientFileFinder(self,
                            paths,
                            action,
@@ -269,6 +290,106 @@ class GRRHTTPServerTest(test_lib.GRRBaseTest):
         self.assertFalse(filestore_fd.Get(filestore_fd.Schema.STAT))
 
 
+@db_test_lib.DualDBTest
+class EventLoopHTTPServerTest(GRRHTTPServerTest):
+  """Runs the http server tests against the event loop server."""
+
+  @classmethod
+  def _CreateServer(cls, server_address, reuse_port=False):
+    return frontend.EventLoopHTTPServer(
+        server_address, max_workers=4, idle_timeout=10, reuse_port=reuse_port)
+
+  def _ActiveRequestCount(self):
+    return self.httpd.active_count
+
+  def testConnectionIsKeptAlive(self):
+    with requests.Session() as session:
+      for _ in range(3):
+        req = session.get(self.base_url + "server.pem")
+        self.assertEqual(req.status_code, 200)
+        self.assertEqual(req.headers["Connection"], "keep-alive")
+
+  def testServerPemWithConnectionClose(self):
+    req = requests.get(
+        self.base_url + "server.pem", headers={"Connection": "close"})
+    self.assertEqual(req.status_code, 200)
+    self.assertEqual(req.headers["Connection"], "close")
+    self.assertIn("BEGIN CERTIFICATE", req.content)
+
+  def testMalformedRequestIsRejected(self):
+    sock = socket.socket(self.address_family, socket.SOCK_STREAM)
+    try:
+      sock.connect(self.httpd.socket.getsockname()[:2])
+      sock.sendall(b"GARBAGE\r\n\r\n")
+      response = sock.recv(1024)
+    finally:
+      sock.close()
+
+    self.assertTrue(response.startswith(b"HTTP/1.0 400"))
+
+  def testOverloadedServerRespondsWith503(self):
+
+    def AddTask(*args, **kwargs):
+      del args, kwargs  # Unused.
+      raise threadpool.Full()
+
+    with utils.Stubber(self.httpd.worker_pool, "AddTask", AddTask):
+      req = requests.post(self.base_url + "control", data=b"foo")
+
+    self.assertEqual(req.status_code, 503)
+
+  def testLargeRequestIsReceivedInChunks(self):
+    bodies = []
+
+    def Control(request, client_address):
+      del client_address  # Unused.
+      bodies.append(request.body)
+      return 200, b""
+
+    body = os.urandom(3 * frontend.EventLoopHTTPServer.RECV_BLOCK_SIZE + 1)
+    with utils.Stubber(self.httpd, "_Control", Control):
+      req = requests.post(self.base_url + "control", data=body)
+
+    self.assertEqual(req.status_code, 200)
+    self.assertEqual(bodies, [body])
+
+  def testTooLargeRequestIsRejected(self):
+    with utils.Stubber(self.httpd, "max_request_size", 1024):
+      req = requests.post(self.base_url + "control", data=b"x" * 1025)
+
+    self.assertEqual(req.status_code, 413)
+
+  def testShutdownWithoutServing(self):
+    port = portpicker.pick_unused_port()
+    ip = utils.ResolveHostnameToIP("localhost", port)
+
+    server = self._CreateServer((ip, port))
+    server.Shutdown()
+
+
+class FrontendSupervisorTest(absltest.TestCase):
+
+  def setUp(self):
+    super(FrontendSupervisorTest, self).setUp()
+    # The supervisor installs its own signal handlers.
+    for signum in [signal.SIGTERM, signal.SIGINT, signal.SIGHUP]:
+      self.addCleanup(signal.signal, signum, signal.getsignal(signum))
+
+  def testAllWorkersCrashingAtOnce(self):
+    supervisor = frontend.FrontendSupervisor(
+        num_workers=2, shared_key_cache_size=16)
+
+    with utils.MultiStubber(
+        (frontend.FrontendSupervisor, "RESTART_BACKOFF_MIN", 2),
+        (frontend.FrontendSupervisor, "MAX_CONSECUTIVE_CRASHES", 2)):
+      # Both workers exit before their restarts are due, so for a while there
+      # are no worker processes at all.
+      with self.assertRaises(frontend.WorkerCrashLoopError):
+        if supervisor.Run() is not None:
+          # This is a worker process, which crashes right away.
+          os._exit(1)  # pylint: disable=protected-access
+
+
 def main(args):
   test_lib.main(args)
 
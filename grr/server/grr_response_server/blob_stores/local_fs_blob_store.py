@@ -0,0 +1,121 @@
+#!/usr/bin/env python
+"""A blob store keeping blobs as files in a local directory tree."""
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import unicode_literals
+
+import binascii
+import errno
+import os
+import tempfile
+
+from builtins import range  # pylint: disable=redefined-builtin
+from future.utils import iteritems
+
+from grr_response_core import config
+from grr_response_core.lib import utils
+from grr_response_server import blob_store
+from grr_response_server import threadpool
+
+# Number of leading hex digits of the blob id used for every directory level.
+_SHARD_WIDTH = 2
+# Number of nested directory levels. With two levels of two hex digits each
+# the tree has 65536 leaf directories, which keeps directory sizes manageable
+# even with hundreds of millions of blobs.
+_SHARD_DEPTH = 2
+
+_THREADPOOL_NAME = "LocalFSBlobStore"
+
+
+class LocalFSBlobStore(blob_store.BlobStore):
+  """A content-addressed blob store backed by the local filesystem.
+
+  Every blob is stored in a separate file named after the hex representation
+  of its BlobID, e.g. <root>/ab/cd/abcd.... Blobs are written to a temporary
+  file first and then renamed into place, so that readers never see partially
+  written blobs.
+  """
+
+  def __init__(self, root=None):
+    super(LocalFSBlobStore, self).__init__()
+
+    self._root = root or config.CONFIG["Blobstore.local_fs_root"]
+    if not self._root:
+      raise ValueError("Blobstore.local_fs_root has to be set in order to use "
+                       "LocalFSBlobStore.")
+
+    self._pool = threadpool.ThreadPool.Factory(
+        _THREADPOOL_NAME,
+        min_threads=1,
+        max_threads=config.CONFIG["Blobstore.local_fs_read_threads"])
+    self._pool.Start()
+
+  def _BlobPath(self, blob_id):
+    hex_id = binascii.hexlify(blob_id.AsBytes()).decode("ascii")
+    shards = [
+        hex_id[i * _SHARD_WIDTH:(i + 1) * _SHARD_WIDTH]
+        for i in range(_SHARD_DEPTH)
+    ]
+    return os.path.join(self._root, *(shards + [hex_id]))
+
+  def _WriteBlob(self, blob_id, blob_data):
+    """Atomically writes a single blob unless it is already present."""
+    path = self._BlobPath(blob_id)
+    if os.path.exists(path):
+      return
+
+    dirname = os.path.dirname(path)
+    utils.EnsureDirExists(dirname)
+
+    fd, tmp_path = tempfile.mkstemp(dir=dirname, prefix=".tmp-")
+    try:
+      with os.fdopen(fd, "wb") as tmp_file:
+        tmp_file.write(blob_data)
+        tmp_file.flush()
+        os.fsync(tmp_file.fileno())
+
+      try:
+        os.rename(tmp_path, path)
+      except OSError as e:
+        # On Windows rename fails if the target already exists. Since blobs
+        # are content-addressed, a concurrent writer has stored the same data.
+        if e.errno != errno.EEXIST:
+          raise
+    finally:
+      if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+
+  def _ReadBlob(self, blob_id):
+    """Reads a single blob, returns None if it doesn't exist."""
+    try:
+      with open(self._BlobPath(blob_id), "rb") as fd:
+        return fd.read()
+    except IOError as e:
+      if e.errno == errno.ENOENT:
+        return None
+      raise
+
+  def WriteBlobs(self, blob_id_data_map):
+    """Creates or overwrites blobs."""
+    for blob_id, blob_data in iteritems(blob_id_data_map):
+      self._WriteBlob(blob_id, blob_data)
+
+  def ReadBlobs(self, blob_ids):
+    """Reads given blobs, using a thread pool for multi-blob batches."""
+    blob_ids = list(blob_ids)
+    if len(blob_ids) <= 1:
+      return {blob_id: self._ReadBlob(blob_id) for blob_id in blob_ids}
+
+    results = {}
+    for blob_id in blob_ids:
+      if blob_id not in results:
+        results[blob_id] = self._pool.AddAsyncTask(
+            target=self._ReadBlob, args=(blob_id,), name="ReadBlob")
+
+    return {blob_id: result.Get() for blob_id, result in iteritems(results)}
+
+  def CheckBlobsExist(self, blob_ids):
+    """Checks if blobs for the given digests already exist."""
+    return {
+        blob_id: os.path.exists(self._BlobPath(blob_id)) for blob_id in blob_ids
+    }
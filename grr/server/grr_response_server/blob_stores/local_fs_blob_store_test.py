@@ -0,0 +1,48 @@
+#!/usr/bin/env python
+"""Tests for the local filesystem blob store."""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import unicode_literals
+
+import os
+
+from grr_response_core.lib import flags
+from grr_response_server import blob_store_test_mixin
+from grr_response_server.blob_stores import local_fs_blob_store
+from grr_response_server.rdfvalues import objects as rdf_objects
+from grr.test_lib import test_lib
+
+
+class LocalFSBlobStoreTest(blob_store_test_mixin.BlobStoreTestMixin,
+                           test_lib.GRRBaseTest):
+
+  def CreateBlobStore(self):
+    self.root = os.path.join(self.temp_dir, "blobs")
+    return (local_fs_blob_store.LocalFSBlobStore(root=self.root), lambda: None)
+
+  def testBlobsAreStoredInShardedDirectories(self):
+    blob_id = rdf_objects.BlobID(b"\xab\xcd" + b"0" * 30)
+    self.blob_store.WriteBlobs({blob_id: b"foo"})
+
+    path = os.path.join(self.root, "ab", "cd", "abcd" + "30" * 30)
+    with open(path, "rb") as fd:
+      self.assertEqual(fd.read(), b"foo")
+
+  def testNoTemporaryFilesAreLeftBehind(self):
+    blob_id = rdf_objects.BlobID.FromBlobData(b"foo")
+    self.blob_store.WriteBlobs({blob_id: b"foo"})
+    self.blob_store.WriteBlobs({blob_id: b"foo"})
+
+    for _, _, filenames in os.walk(self.root):
+      for filename in filenames:
+        self.assertFalse(filename.startswith(".tmp-"))
+
+  def testRaisesIfRootIsNotConfigured(self):
+    with test_lib.ConfigOverrider({"Blobstore.local_fs_root": ""}):
+      with self.assertRaises(ValueError):
+        local_fs_blob_store.LocalFSBlobStore()
+
+
+if __name__ == "__main__":
+  flags.StartMain(test_lib.main)
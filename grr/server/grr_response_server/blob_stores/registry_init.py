@@ -7,6 +7,7 @@ from __future__ import unicode_literals
 from grr_response_core.lib.util import compatibility
 from grr_response_server import blob_store
 from grr_response_server.blob_stores import db_blob_store
+from grr_response_server.blob_stores import local_fs_blob_store
 from grr_response_server.blob_stores import memory_stream_bs
 
 
@@ -16,3 +17,6 @@ def RegisterBlobStores():
   blob_store.REGISTRY[compatibility.GetName(
       memory_stream_bs
       .MemoryStreamBlobStore)] = memory_stream_bs.MemoryStreamBlobStore
+  blob_store.REGISTRY[compatibility.GetName(
+      local_fs_blob_store
+      .LocalFSBlobStore)] = local_fs_blob_store.LocalFSBlobStore
@@ -105,6 +105,10 @@ class InMemoryDB(mem_artifacts.InMemoryDBArtifactsMixin,
     self.stats_store_entries = {}
     self.api_audit_entries = []
     self.hunts = {}
+    # Maps hunt_id to db.HuntCounters.
+    self.hunt_counters = {}
+    # Maps hunt_id to rdf_stats.ClientResourcesStats.
+    self.hunt_client_resources_stats = {}
     self.signed_binary_references = {}
     self.client_graph_series = {}
 
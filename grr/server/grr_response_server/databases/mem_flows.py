@@ -16,6 +16,7 @@ from typing import List, Optional, Text
 from grr_response_core.lib import rdfvalue
 from grr_response_core.lib import utils
 from grr_response_core.lib.rdfvalues import flows as rdf_flows
+from grr_response_core.lib.rdfvalues import structs as rdf_structs
 from grr_response_core.lib.util import compatibility
 from grr_response_server import db
 from grr_response_server import db_utils
@@ -23,6 +24,62 @@ from grr_response_server.rdfvalues import flow_objects as rdf_flow_objects
 from grr_response_server.rdfvalues import objects as rdf_objects
 
 
+def _PayloadTypeName(result):
+  """Returns the payload type name of a flow result view."""
+  payload_cls = result.GetAnyValueType("payload")
+  if payload_cls is None:
+    # The type is not known, so its name is taken from the type URL.
+    type_url = result.GetAnyValue("payload").type_url
+    return type_url.split("/")[-1].split(".")[-1]
+
+  return compatibility.GetName(payload_cls)
+
+
+def _PayloadContains(result, substring):
+  """Checks if the serialized payload of a flow result view contains bytes."""
+  payload_cls = result.GetAnyValueType("payload")
+  if (payload_cls is not None and
+      not issubclass(payload_cls, rdf_structs.RDFStruct)):
+    # Primitive payloads are stored wrapped, the wrapper is not searched.
+    return substring in result.payload.SerializeToString()
+
+  return result.GetAnyValue("payload").FieldContains("value", substring)
+
+
+def _SortedWithCursors(items):
+  """Pairs flow results or log entries with cursors, sorted by timestamp."""
+  # Items are stored in the order they were written, so their index breaks
+  # ties between items with the same timestamp.
+  return sorted(
+      (db.FlowPageCursor(timestamp=item.timestamp, item_id=i), item)
+      for i, item in enumerate(items))
+
+
+def _PageAfter(items, after, count):
+  """Returns up to count (cursor, item) pairs that follow a cursor."""
+  if after is not None:
+    items = [(c, item) for c, item in items if c > after]
+  return items[:count]
+
+
+def _LastCursor(page, after):
+  return page[-1][0] if page else after
+
+
+def _FlowResultFromView(result):
+  """Parses a flow result view into a flow result."""
+  parsed = result.Materialize()
+
+  # This is done in order to pass the tests that try to deserialize
+  # value of an unrecognized type.
+  if result.GetAnyValueType("payload") is None:
+    parsed.payload = rdf_objects.SerializedValueOfUnrecognizedType(
+        type_name=_PayloadTypeName(result),
+        value=result.GetAnyValue("payload").value)
+
+  return parsed
+
+
 class InMemoryDBFlowMixin(object):
   """InMemoryDB mixin for flow handling."""
 
@@ -434,6 +491,57 @@ class InMemoryDBFlowMixin(object):
     if needs_processing:
       self.WriteFlowProcessingRequests(needs_processing)
 
+  @utils.Synchronized
+  def WriteFlowStateBatch(self,
+                          requests=None,
+                          responses=None,
+                          client_messages=None,
+                          requests_to_delete=None,
+                          results=None):
+    """Atomically applies a batch of flow state mutations."""
+    requests = requests or []
+    responses = responses or []
+    client_messages = client_messages or []
+    requests_to_delete = requests_to_delete or []
+    results = results or []
+
+    # All checks that the individual methods would perform are done upfront so
+    # that a failure does not leave a partially applied batch behind.
+    for request in requests:
+      if (request.client_id, request.flow_id) not in self.flows:
+        raise db.AtLeastOneUnknownFlowError([(request.client_id,
+                                              request.flow_id)])
+
+    client_ids = [
+        db_utils.ClientIdFromGrrMessage(msg) for msg in client_messages
+    ]
+    for client_id in client_ids:
+      if client_id not in self.metadatas:
+        raise db.AtLeastOneUnknownClientError(client_ids=client_ids)
+
+    written_request_keys = set(
+        (r.client_id, r.flow_id, r.request_id) for r in requests)
+    for request in requests_to_delete:
+      if (request.client_id, request.flow_id) not in self.flows:
+        raise db.UnknownFlowError(request.client_id, request.flow_id)
+      key = (request.client_id, request.flow_id, request.request_id)
+      request_dict = self.flow_requests.get(key[:2], {})
+      if (request.request_id not in request_dict and
+          key not in written_request_keys):
+        raise db.UnknownFlowRequestError(request.client_id, request.flow_id,
+                                         request.request_id)
+
+    if requests:
+      self.WriteFlowRequests(requests)
+    if responses:
+      self.WriteFlowResponses(responses)
+    if client_messages:
+      self.WriteClientMessages(client_messages)
+    if requests_to_delete:
+      self.DeleteFlowRequests(requests_to_delete)
+    if results:
+      self.WriteFlowResults(results)
+
   @utils.Synchronized
   def ReadAllFlowRequestsAndResponses(self, client_id, flow_id):
     """Reads all requests and responses for a given flow from the database."""
@@ -616,7 +724,15 @@ class InMemoryDBFlowMixin(object):
       dest = self.flow_results.setdefault((r.client_id, r.flow_id), [])
       to_write = r.Copy()
       to_write.timestamp = rdfvalue.RDFDatetime.Now()
-      dest.append(to_write)
+      # Results are stored serialized and filtered through views, so that
+      # reading a page does not parse all results of the flow.
+      dest.append(to_write.SerializeToString())
+
+  def _ReadFlowResultViews(self, client_id, flow_id):
+    return [
+        rdf_structs.StructView(rdf_flow_objects.FlowResult, data)
+        for data in self.flow_results.get((client_id, flow_id), [])
+    ]
 
   def ReadFlowResults(self,
                       client_id,
@@ -627,46 +743,69 @@ class InMemoryDBFlowMixin(object):
                       with_type=None,
                       with_substring=None):
     """Reads flow results of a given flow using given query options."""
-    results = sorted(
-        [x.Copy() for x in self.flow_results.get((client_id, flow_id), [])],
-        key=lambda r: r.timestamp)
-
-    # This is done in order to pass the tests that try to deserialize
-    # value of an unrecognized type.
-    for r in results:
-      cls_name = compatibility.GetName(r.payload.__class__)
-      if cls_name not in rdfvalue.RDFValue.classes:
-        r.payload = rdf_objects.SerializedValueOfUnrecognizedType(
-            type_name=cls_name, value=r.payload.SerializeToString())
+    results = self._SortedFlowResultViews(
+        client_id,
+        flow_id,
+        with_tag=with_tag,
+        with_type=with_type,
+        with_substring=with_substring)
+
+    # Only the requested page is parsed.
+    return [
+        _FlowResultFromView(r) for _, r in results[offset:offset + count]
+    ]
+
+  def ReadFlowResultsPage(self,
+                          client_id,
+                          flow_id,
+                          count,
+                          after=None,
+                          with_tag=None,
+                          with_type=None,
+                          with_substring=None):
+    """Reads a page of flow results that follows a given cursor."""
+    results = self._SortedFlowResultViews(
+        client_id,
+        flow_id,
+        with_tag=with_tag,
+        with_type=with_type,
+        with_substring=with_substring)
+
+    page = _PageAfter(results, after, count)
+    return [_FlowResultFromView(r) for _, r in page], _LastCursor(page, after)
+
+  def _SortedFlowResultViews(self,
+                             client_id,
+                             flow_id,
+                             with_tag=None,
+                             with_type=None,
+                             with_substring=None):
+    """Returns (cursor, view) pairs of matching results in timestamp order."""
+    results = _SortedWithCursors(
+        self._ReadFlowResultViews(client_id, flow_id))
 
     if with_tag is not None:
-      results = [i for i in results if i.tag == with_tag]
+      results = [(c, r) for c, r in results if r.tag == with_tag]
 
     if with_type is not None:
-      results = [
-          i for i in results
-          if compatibility.GetName(i.payload.__class__) == with_type
-      ]
+      results = [(c, r) for c, r in results if _PayloadTypeName(r) == with_type]
 
     if with_substring is not None:
       encoded_substring = with_substring.encode("utf8")
       results = [
-          i for i in results
-          if encoded_substring in i.payload.SerializeToString()
+          (c, r) for c, r in results if _PayloadContains(r, encoded_substring)
       ]
 
-    return results[offset:offset + count]
+    return results
 
   def CountFlowResults(self, client_id, flow_id, with_tag=None, with_type=None):
     """Counts flow results of a given flow using given query options."""
-    return len(
-        self.ReadFlowResults(
-            client_id,
-            flow_id,
-            0,
-            sys.maxsize,
-            with_tag=with_tag,
-            with_type=with_type))
+    results = self._ReadFlowResultViews(client_id, flow_id)
+    return len([
+        r for r in results
+        if (with_tag is None or r.tag == with_tag) and
+        (with_type is None or _PayloadTypeName(r) == with_type)
+    ])
 
   def WriteFlowLogEntries(self, entries):
     """Writes flow log entries for a given flow."""
@@ -683,14 +822,32 @@ class InMemoryDBFlowMixin(object):
                          count,
                          with_substring=None):
     """Reads flow log entries of a given flow using given query options."""
-    entries = sorted(
-        self.flow_log_entries.get((client_id, flow_id), []),
-        key=lambda e: e.timestamp)
+    entries = self._SortedFlowLogEntries(
+        client_id, flow_id, with_substring=with_substring)
+    return [e for _, e in entries[offset:offset + count]]
+
+  def ReadFlowLogEntriesPage(self,
+                             client_id,
+                             flow_id,
+                             count,
+                             after=None,
+                             with_substring=None):
+    """Reads a page of flow log entries that follows a given cursor."""
+    entries = self._SortedFlowLogEntries(
+        client_id, flow_id, with_substring=with_substring)
+
+    page = _PageAfter(entries, after, count)
+    return [e for _, e in page], _LastCursor(page, after)
+
+  def _SortedFlowLogEntries(self, client_id, flow_id, with_substring=None):
+    """Returns (cursor, entry) pairs of matching entries in timestamp order."""
+    entries = _SortedWithCursors(
+        self.flow_log_entries.get((client_id, flow_id), []))
 
     if with_substring is not None:
-      entries = [i for i in entries if with_substring in i.message]
+      entries = [(c, e) for c, e in entries if with_substring in e.message]
 
-    return entries[offset:offset + count]
+    return entries
 
   def CountFlowLogEntries(self, client_id, flow_id):
     """Returns number of flow log entries of a given flow."""
@@ -8,6 +8,7 @@ import sys
 
 from grr_response_core.lib import rdfvalue
 from grr_response_core.lib import utils
+from grr_response_core.lib.rdfvalues import stats as rdf_stats
 from grr_response_server import db
 from grr_response_server.rdfvalues import flow_objects as rdf_flow_objects
 
@@ -18,6 +19,22 @@ class InMemoryDBHuntMixin(object):
   def _GetHuntFlows(self, hunt_id):
     return [f for f in self.flows.values() if f.parent_hunt_id == hunt_id]
 
+  def _ApplyHuntCounters(self, hunt_obj):
+    """Sets hunt object progress fields from the hunt counters."""
+    counters = self.hunt_counters.get(hunt_obj.hunt_id)
+    if counters is None:
+      return
+
+    hunt_obj.num_successful_clients = counters.num_successful_clients
+    hunt_obj.num_failed_clients = counters.num_failed_clients
+    hunt_obj.num_crashed_clients = counters.num_crashed_clients
+    hunt_obj.num_clients_with_results = counters.num_clients_with_results
+    hunt_obj.num_results = counters.num_results
+
+    stats = self.hunt_client_resources_stats.get(hunt_obj.hunt_id)
+    if stats is not None:
+      hunt_obj.client_resources_stats = self._DeepCopy(stats)
+
   @utils.Synchronized
   def WriteHuntObject(self, hunt_obj):
     """Writes a hunt object to the database."""
@@ -39,14 +56,75 @@ class InMemoryDBHuntMixin(object):
   def ReadHuntObject(self, hunt_id):
     """Reads a hunt object from the database."""
     try:
-      return self._DeepCopy(self.hunts[hunt_id])
+      hunt_obj = self._DeepCopy(self.hunts[hunt_id])
     except KeyError:
       raise db.UnknownHuntError(hunt_id)
 
+    self._ApplyHuntCounters(hunt_obj)
+    return hunt_obj
+
   @utils.Synchronized
   def ReadAllHuntObjects(self):
     """Reads all hunt objects from the database."""
-    return [self._DeepCopy(h) for h in self.hunts.values()]
+    result = []
+    for hunt_obj in self.hunts.values():
+      hunt_obj = self._DeepCopy(hunt_obj)
+      self._ApplyHuntCounters(hunt_obj)
+      result.append(hunt_obj)
+    return result
+
+  @utils.Synchronized
+  def IncrementHuntCounters(self,
+                            hunt_id,
+                            num_successful_clients=0,
+                            num_failed_clients=0,
+                            num_crashed_clients=0,
+                            num_clients_with_results=0,
+                            num_results=0,
+                            client_resources=None):
+    """Increments progress counters of a given hunt."""
+    if hunt_id not in self.hunts:
+      raise db.UnknownHuntError(hunt_id)
+
+    user_cpu_seconds = 0
+    system_cpu_seconds = 0
+    network_bytes_sent = 0
+    if client_resources is not None:
+      user_cpu_seconds = client_resources.cpu_usage.user_cpu_time
+      system_cpu_seconds = client_resources.cpu_usage.system_cpu_time
+      network_bytes_sent = client_resources.network_bytes_sent
+
+      stats = self.hunt_client_resources_stats.setdefault(
+          hunt_id, rdf_stats.ClientResourcesStats())
+      stats.RegisterResources(client_resources)
+
+    deltas = db.HuntCounters(
+        num_successful_clients=num_successful_clients,
+        num_failed_clients=num_failed_clients,
+        num_crashed_clients=num_crashed_clients,
+        num_clients_with_results=num_clients_with_results,
+        num_results=num_results,
+        total_user_cpu_seconds=user_cpu_seconds,
+        total_system_cpu_seconds=system_cpu_seconds,
+        total_network_bytes_sent=network_bytes_sent)
+    counters = self.ReadHuntCounters(hunt_id)
+    self.hunt_counters[hunt_id] = db.HuntCounters(
+        *[value + delta for value, delta in zip(counters, deltas)])
+
+  @utils.Synchronized
+  def ReadHuntCounters(self, hunt_id):
+    """Reads progress counters of a given hunt."""
+    if hunt_id not in self.hunts:
+      raise db.UnknownHuntError(hunt_id)
+
+    try:
+      return self.hunt_counters[hunt_id]
+    except KeyError:
+      return db.HuntCounters(*[0] * len(db.HuntCounters._fields))
+
+  def CompactHuntCounters(self, hunt_id):
+    """Compacts progress counters of a given hunt."""
+    # In-memory counters are never sharded, there's nothing to compact.
 
   @utils.Synchronized
   def ReadHuntLogEntries(self, hunt_id, offset, count, with_substring=None):
@@ -132,8 +210,7 @@ class InMemoryDBHuntMixin(object):
     elif filter_condition == db.HuntFlowsCondition.CRASHED_FLOWS_ONLY:
       filter_fn = lambda f: f.HasField("client_crash_info")
     elif filter_condition == db.HuntFlowsCondition.FLOWS_WITH_RESULTS_ONLY:
-      filter_fn = (lambda f: self.ReadFlowResults(f.client_id, f.flow_id, 0, sys
-                                                  .maxsize))
+      filter_fn = lambda f: self.flow_results.get((f.client_id, f.flow_id))
     else:
       raise ValueError("Invalid filter condition: %d" % filter_condition)
 
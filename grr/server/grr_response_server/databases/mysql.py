@@ -12,6 +12,7 @@ import contextlib
 import logging
 import math
 import random
+import threading
 import time
 import warnings
 
@@ -130,9 +131,11 @@ class MysqlDB(mysql_artifacts.MySQLDBArtifactsMixin,
         self._CheckForSSL(cursor)
     self.handler_thread = None
     self.handler_stop = True
+    self.handler_wakeup = threading.Event()
 
     self.flow_processing_request_handler_thread = None
     self.flow_processing_request_handler_stop = None
+    self.flow_processing_request_wakeup = threading.Event()
     self.flow_processing_request_handler_pool = (
         threadpool.ThreadPool.Factory(
             "flow_processing_pool", min_threads=2, max_threads=50))
@@ -1,21 +1,194 @@
 #!/usr/bin/env python
 """The MySQL database methods for blobs handling."""
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import unicode_literals
+
+from builtins import range  # pylint: disable=redefined-builtin
+from future.utils import iteritems
+
+from grr_response_core.lib.util import collection
+from grr_response_server.databases import mysql_utils
+from grr_response_server.rdfvalues import objects as rdf_objects
+
+# The packet size limit of the server. This is the default of older MariaDB
+# versions, newer MySQL versions default to 16 MiB or more.
+_MAX_ALLOWED_PACKET = 4 * 1024 * 1024
+
+# Blobs are stored as a sequence of chunks no larger than this value. Escaping
+# can double the size of binary data, so even a fully escaped chunk stays well
+# below the packet size limit.
+BLOB_CHUNK_SIZE = 1024 * 1024
+
+# Maximum size of a single INSERT statement: half of the packet size limit
+# leaves ample room for the query text.
+_MAX_INSERT_SIZE = _MAX_ALLOWED_PACKET // 2
+
+# Upper bound of the bytes a row adds to an INSERT statement in addition to
+# its escaped chunk data: the escaped blob id, chunk index and separators.
+_ROW_OVERHEAD = 128
+
+# Bytes that are escaped with a backslash in string literals.
+_ESCAPED_BYTES = [b"\0", b"'", b"\"", b"\\", b"\n", b"\r", b"\x1a"]
+
+# Maximum number of ids used in a single "IN (...)" clause.
+_MAX_IDS_PER_QUERY = 1000
+
+
+def _BlobChunks(blob_data):
+  """Splits blob contents into (chunk_index, chunk_data) pairs."""
+  if not blob_data:
+    # Empty blobs are still stored as a single (empty) chunk, so that their
+    # existence can be checked.
+    yield 0, b""
+    return
+
+  for chunk_index, offset in enumerate(
+      range(0, len(blob_data), BLOB_CHUNK_SIZE)):
+    yield chunk_index, blob_data[offset:offset + BLOB_CHUNK_SIZE]
+
+
+def _EscapedSize(data):
+  """Returns the size of the data when escaped in an SQL statement."""
+  return len(data) + sum(data.count(byte) for byte in _ESCAPED_BYTES)
+
+
+def _InsertBatches(rows, max_size=_MAX_INSERT_SIZE):
+  """Groups (blob_id, chunk_index, chunk_data) rows into size-bound batches.
+
+  The size of a batch is the size of the INSERT statement it results in, so
+  escaping of the chunk data and the per-row overhead are accounted for.
+
+  Args:
+    rows: An iterable of (blob_id, chunk_index, chunk_data) tuples.
+    max_size: The maximum statement size. A single row is always yielded as a
+      batch of its own, even if it exceeds this size.
+
+  Yields:
+    Lists of rows.
+  """
+  batch = []
+  batch_size = 0
+  for row in rows:
+    row_size = _EscapedSize(row[2]) + _ROW_OVERHEAD
+    if batch and batch_size + row_size > max_size:
+      yield batch
+      batch = []
+      batch_size = 0
+
+    batch.append(row)
+    batch_size += row_size
+
+  if batch:
+    yield batch
 
 
 class MySQLDBBlobsMixin(object):
   """MySQLDB mixin for blobs related functions."""
 
-  def WriteBlobs(self, blob_id_data_map):
-    raise NotImplementedError()
+  @mysql_utils.WithTransaction()
+  def WriteBlobs(self, blob_id_data_map, cursor=None):
+    """Writes given blobs."""
+
+    # Blobs are content-addressed, so blobs that are already present do not
+    # have to be overwritten: INSERT IGNORE simply skips them.
+    existing = self.CheckBlobsExist(list(blob_id_data_map), cursor=cursor)
+
+    rows = []
+    for blob_id, blob_data in iteritems(blob_id_data_map):
+      if existing[blob_id]:
+        continue
+
+      blob_id_bytes = blob_id.AsBytes()
+      for chunk_index, chunk_data in _BlobChunks(blob_data):
+        rows.append((blob_id_bytes, chunk_index, chunk_data))
+
+    for batch in _InsertBatches(rows):
+      query = ("INSERT IGNORE INTO blobs (blob_id, chunk_index, blob_chunk) "
+               "VALUES {}").format(", ".join(["(%s, %s, %s)"] * len(batch)))
+      args = []
+      for row in batch:
+        args.extend(row)
+      cursor.execute(query, args)
+
+  @mysql_utils.WithTransaction(readonly=True)
+  def ReadBlobs(self, blob_ids, cursor=None):
+    """Reads given blobs."""
+
+    chunks_by_id = {blob_id.AsBytes(): [] for blob_id in blob_ids}
+    for batch in collection.Batch(list(chunks_by_id), _MAX_IDS_PER_QUERY):
+      query = ("SELECT blob_id, blob_chunk FROM blobs "
+               "WHERE blob_id IN ({}) "
+               "ORDER BY blob_id, chunk_index").format(", ".join(
+                   ["%s"] * len(batch)))
+      cursor.execute(query, batch)
+      for blob_id_bytes, blob_chunk in cursor.fetchall():
+        chunks_by_id[bytes(blob_id_bytes)].append(bytes(blob_chunk))
+
+    result = {}
+    for blob_id in blob_ids:
+      chunks = chunks_by_id[blob_id.AsBytes()]
+      result[blob_id] = b"".join(chunks) if chunks else None
+
+    return result
+
+  @mysql_utils.WithTransaction(readonly=True)
+  def CheckBlobsExist(self, blob_ids, cursor=None):
+    """Checks if given blobs exist."""
+
+    existing = set()
+    unique_ids = list(set(blob_id.AsBytes() for blob_id in blob_ids))
+    for batch in collection.Batch(unique_ids, _MAX_IDS_PER_QUERY):
+      query = ("SELECT blob_id FROM blobs "
+               "WHERE chunk_index = 0 AND blob_id IN ({})").format(", ".join(
+                   ["%s"] * len(batch)))
+      cursor.execute(query, batch)
+      for blob_id_bytes, in cursor.fetchall():
+        existing.add(bytes(blob_id_bytes))
+
+    return {blob_id: blob_id.AsBytes() in existing for blob_id in blob_ids}
+
+  @mysql_utils.WithTransaction()
+  def WriteHashBlobReferences(self, references_by_hash, cursor=None):
+    """Writes blob references for given hashes."""
+
+    rows = []
+    for hash_id, blob_refs in iteritems(references_by_hash):
+      refs = rdf_objects.BlobReferences(items=blob_refs)
+      rows.append((hash_id.AsBytes(), refs.SerializeToString()))
+
+    for batch in collection.Batch(rows, _MAX_IDS_PER_QUERY):
+      query = ("INSERT INTO hash_blob_references (hash_id, blob_references) "
+               "VALUES {} "
+               "ON DUPLICATE KEY UPDATE "
+               "blob_references=VALUES(blob_references)").format(", ".join(
+                   ["(%s, %s)"] * len(batch)))
+      args = []
+      for row in batch:
+        args.extend(row)
+      cursor.execute(query, args)
 
-  def ReadBlobs(self, blob_ids):
-    raise NotImplementedError()
+  @mysql_utils.WithTransaction(readonly=True)
+  def ReadHashBlobReferences(self, hashes, cursor=None):
+    """Reads blob references of given hashes."""
 
-  def CheckBlobsExist(self, blob_ids):
-    raise NotImplementedError()
+    refs_by_hash = {}
+    unique_hashes = list(set(hash_id.AsBytes() for hash_id in hashes))
+    for batch in collection.Batch(unique_hashes, _MAX_IDS_PER_QUERY):
+      query = ("SELECT hash_id, blob_references FROM hash_blob_references "
+               "WHERE hash_id IN ({})").format(", ".join(["%s"] * len(batch)))
+      cursor.execute(query, batch)
+      for hash_id_bytes, blob_references in cursor.fetchall():
+        refs_by_hash[bytes(hash_id_bytes)] = blob_references
 
-  def WriteHashBlobReferences(self, references_by_hash):
-    raise NotImplementedError()
+    result = {}
+    for hash_id in hashes:
+      blob_references = refs_by_hash.get(hash_id.AsBytes())
+      if blob_references is None:
+        result[hash_id] = None
+      else:
+        result[hash_id] = list(
+            rdf_objects.BlobReferences.FromSerializedString(
+                blob_references).items)
 
-  def ReadHashBlobReferences(self, hashes):
-    raise NotImplementedError()
+    return result
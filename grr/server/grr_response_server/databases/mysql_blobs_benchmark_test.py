@@ -0,0 +1,144 @@
+#!/usr/bin/env python
+"""Benchmarks comparing blob stores under BlobHandler load."""
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import unicode_literals
+
+import logging
+import os
+import random
+import string
+import time
+import unittest
+import zlib
+
+from builtins import range  # pylint: disable=redefined-builtin
+import MySQLdb
+import pytest
+
+from grr_response_core.lib import flags
+from grr_response_core.lib import utils
+from grr_response_core.lib.rdfvalues import protodict as rdf_protodict
+from grr_response_server import blob_store
+from grr_response_server import data_store
+from grr_response_server import db
+from grr_response_server.blob_stores import db_blob_store
+from grr_response_server.blob_stores import memory_stream_bs
+from grr_response_server.databases import mysql
+from grr_response_server.flows.general import transfer
+from grr_response_server.rdfvalues import objects as rdf_objects
+from grr.test_lib import benchmark_test_lib
+from grr.test_lib import test_lib
+
+
+def _GetEnvironOrSkip(key):
+  value = os.environ.get(key)
+  if value is None:
+    raise unittest.SkipTest("'%s' variable is not set" % key)
+  return value
+
+
+@pytest.mark.benchmark
+class BlobHandlerBenchmark(benchmark_test_lib.AverageMicroBenchmarks):
+  """Measures BlobHandler.ProcessMessages throughput of blob stores."""
+
+  REPEATS = 5
+
+  NUM_MESSAGES = 100
+  BLOB_SIZE = 512 * 1024
+
+  def setUp(self):
+    super(BlobHandlerBenchmark, self).setUp()
+
+    user = _GetEnvironOrSkip("MYSQL_TEST_USER")
+    host = _GetEnvironOrSkip("MYSQL_TEST_HOST")
+    port = _GetEnvironOrSkip("MYSQL_TEST_PORT")
+    passwd = _GetEnvironOrSkip("MYSQL_TEST_PASS")
+    dbname = "".join(
+        random.choice(string.ascii_uppercase + string.digits)
+        for _ in range(10))
+
+    connection = MySQLdb.Connect(host=host, port=port, user=user, passwd=passwd)
+    cursor = connection.cursor()
+    cursor.execute("CREATE DATABASE " + dbname)
+    logging.info("Created test database: %s", dbname)
+
+    self.mysql_db = mysql.MysqlDB(
+        host=host, port=port, user=user, passwd=passwd, db=dbname)
+
+    def Fin():
+      cursor.execute("DROP DATABASE " + dbname)
+      cursor.close()
+      connection.close()
+      self.mysql_db.Close()
+
+    self.addCleanup(Fin)
+
+  def _GenerateRequests(self, unique_fraction):
+    """Generates BlobHandler requests with a given fraction of new blobs.
+
+    Blobs that are not new are taken from a small fixed set, which is written
+    to the blob store before any timing starts.
+
+    Args:
+      unique_fraction: Fraction of the blobs that are random and thus not yet
+        present in the blob store.
+
+    Returns:
+      A list of MessageHandlerRequests.
+    """
+    requests = []
+    for i in range(self.NUM_MESSAGES):
+      if random.random() < unique_fraction:
+        data = os.urandom(self.BLOB_SIZE)
+      else:
+        data = b"%08d" % (i % 10) * (self.BLOB_SIZE // 8)
+
+      blob = rdf_protodict.DataBlob(
+          data=zlib.compress(data),
+          compression=rdf_protodict.DataBlob.CompressionType.ZCOMPRESSION)
+      requests.append(
+          rdf_objects.MessageHandlerRequest(
+              client_id="C.1000000000000000",
+              handler_name=transfer.BlobHandler.handler_name,
+              request_id=i,
+              request=blob))
+
+    return requests
+
+  def _TimeBlobStore(self, name, bs):
+    handler = transfer.BlobHandler(token=self.token)
+    blobs = blob_store.BlobStoreValidationWrapper(bs)
+    rel_db = db.DatabaseValidationWrapper(self.mysql_db)
+
+    with utils.MultiStubber((data_store, "BLOBS", blobs),
+                            (data_store, "REL_DB", rel_db)):
+      # Write the fixed set of blobs that are not new.
+      handler.ProcessMessages(msgs=self._GenerateRequests(0.0))
+
+      for unique_fraction in [0.0, 0.5, 1.0]:
+        # Every repetition gets freshly generated blobs, otherwise all blobs
+        # would already be present after the first one. Only processing the
+        # messages is timed.
+        time_taken = 0.0
+        for _ in range(self.REPEATS):
+          requests = self._GenerateRequests(unique_fraction)
+          start = time.time()
+          handler.ProcessMessages(msgs=requests)
+          time_taken += time.time() - start
+
+        self.AddResult("%s (%d%% new blobs)" % (name, unique_fraction * 100),
+                       time_taken / self.REPEATS, self.REPEATS)
+
+  def testMemoryStreamBlobStore(self):
+    """BlobHandler throughput with the AFF4 MemoryStreamBlobStore."""
+    self._TimeBlobStore("MemoryStreamBlobStore",
+                        memory_stream_bs.MemoryStreamBlobStore())
+
+  def testMysqlDbBlobStore(self):
+    """BlobHandler throughput with the DbBlobStore backed by MySQL."""
+    self._TimeBlobStore("DbBlobStore (MySQL)", db_blob_store.DbBlobStore())
+
+
+if __name__ == "__main__":
+  flags.StartMain(test_lib.main)
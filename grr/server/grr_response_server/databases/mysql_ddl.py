@@ -134,6 +134,28 @@ CREATE TABLE IF NOT EXISTS foreman_rules(
     rule MEDIUMBLOB,
     PRIMARY KEY (hunt_id)
 )""", """
+CREATE TABLE IF NOT EXISTS hunts(
+    hunt_id BIGINT UNSIGNED NOT NULL,
+    create_timestamp DATETIME(6) NOT NULL,
+    last_update_timestamp DATETIME(6) NOT NULL,
+    hunt MEDIUMBLOB NOT NULL,
+    PRIMARY KEY (hunt_id)
+)""", """
+CREATE TABLE IF NOT EXISTS hunt_counters(
+    hunt_id BIGINT UNSIGNED NOT NULL,
+    shard INT UNSIGNED NOT NULL,
+    num_successful_clients BIGINT UNSIGNED NOT NULL DEFAULT 0,
+    num_failed_clients BIGINT UNSIGNED NOT NULL DEFAULT 0,
+    num_crashed_clients BIGINT UNSIGNED NOT NULL DEFAULT 0,
+    num_clients_with_results BIGINT UNSIGNED NOT NULL DEFAULT 0,
+    num_results BIGINT UNSIGNED NOT NULL DEFAULT 0,
+    user_cpu_seconds DOUBLE NOT NULL DEFAULT 0,
+    system_cpu_seconds DOUBLE NOT NULL DEFAULT 0,
+    network_bytes_sent BIGINT UNSIGNED NOT NULL DEFAULT 0,
+    client_resources_stats MEDIUMBLOB,
+    PRIMARY KEY (hunt_id, shard),
+    FOREIGN KEY (hunt_id) REFERENCES hunts(hunt_id)
+)""", """
 CREATE TABLE IF NOT EXISTS cron_jobs(
     job_id VARCHAR(128),
     job MEDIUMBLOB,
@@ -172,7 +194,9 @@ CREATE TABLE IF NOT EXISTS flows(
     flow_id BIGINT UNSIGNED,
     long_flow_id VARCHAR(255),
     parent_flow_id BIGINT UNSIGNED,
+    parent_hunt_id BIGINT UNSIGNED,
     flow BLOB,
+    flow_state INT UNSIGNED,
     client_crash_info MEDIUMBLOB,
     next_request_to_process INT UNSIGNED,
     pending_termination MEDIUMBLOB,
@@ -186,6 +210,9 @@ CREATE TABLE IF NOT EXISTS flows(
 )""", """
 CREATE INDEX IF NOT EXISTS timestamp_idx ON flows(timestamp)
 """, """
+CREATE INDEX IF NOT EXISTS flows_hunt_state_idx
+ON flows(parent_hunt_id, flow_state)
+""", """
 CREATE TABLE IF NOT EXISTS flow_requests(
     client_id BIGINT UNSIGNED,
     flow_id BIGINT UNSIGNED,
@@ -220,5 +247,43 @@ CREATE TABLE IF NOT EXISTS flow_processing_requests(
     leased_by VARCHAR(128),
     PRIMARY KEY (client_id, flow_id, timestamp),
     FOREIGN KEY (client_id, flow_id) REFERENCES flows(client_id, flow_id)
+)""", """
+CREATE TABLE IF NOT EXISTS flow_results(
+    client_id BIGINT UNSIGNED NOT NULL,
+    flow_id BIGINT UNSIGNED NOT NULL,
+    timestamp DATETIME(6) NOT NULL,
+    result_id BIGINT UNSIGNED NOT NULL AUTO_INCREMENT,
+    hunt_id BIGINT UNSIGNED,
+    type VARCHAR(128) NOT NULL,
+    tag VARCHAR(128),
+    payload MEDIUMBLOB,
+    PRIMARY KEY (client_id, flow_id, timestamp, result_id),
+    KEY (result_id),
+    KEY flow_results_by_type (client_id, flow_id, type),
+    KEY flow_results_by_tag (client_id, flow_id, tag),
+    KEY flow_results_by_hunt (hunt_id, timestamp, result_id),
+    FOREIGN KEY (client_id, flow_id) REFERENCES flows(client_id, flow_id)
+)""", """
+CREATE TABLE IF NOT EXISTS flow_log_entries(
+    client_id BIGINT UNSIGNED NOT NULL,
+    flow_id BIGINT UNSIGNED NOT NULL,
+    timestamp DATETIME(6) NOT NULL,
+    log_id BIGINT UNSIGNED NOT NULL AUTO_INCREMENT,
+    hunt_id BIGINT UNSIGNED,
+    message MEDIUMTEXT CHARACTER SET utf8 COLLATE utf8_bin,
+    PRIMARY KEY (client_id, flow_id, timestamp, log_id),
+    KEY (log_id),
+    KEY flow_log_entries_by_hunt (hunt_id, timestamp, log_id),
+    FOREIGN KEY (client_id, flow_id) REFERENCES flows(client_id, flow_id)
+)""", """
+CREATE TABLE IF NOT EXISTS blobs(
+    blob_id BINARY(32) NOT NULL,
+    chunk_index INT UNSIGNED NOT NULL,
+    blob_chunk MEDIUMBLOB NOT NULL,
+    PRIMARY KEY (blob_id, chunk_index)
+)""", """
+CREATE TABLE IF NOT EXISTS hash_blob_references(
+    hash_id BINARY(32) PRIMARY KEY,
+    blob_references MEDIUMBLOB NOT NULL
 )"""
 ]
@@ -15,6 +15,8 @@ from grr_response_core.lib import rdfvalue
 from grr_response_core.lib import utils
 from grr_response_core.lib.rdfvalues import client as rdf_client
 from grr_response_core.lib.rdfvalues import flows as rdf_flows
+from grr_response_core.lib.util import compatibility
+from grr_response_core.stats import stats_collector_instance
 from grr_response_server import db
 from grr_response_server import db_utils
 from grr_response_server.databases import mysql_utils
@@ -22,6 +24,45 @@ from grr_response_server.rdfvalues import flow_objects as rdf_flow_objects
 from grr_response_server.rdfvalues import objects as rdf_objects
 
 
+# Queues are polled with an interval growing exponentially from the minimum
+# to the maximum value while they stay empty. Writes done by this process wake
+# the polling threads up immediately.
+_MIN_POLL_INTERVAL = 0.1
+_MAX_POLL_INTERVAL = 5
+
+# Bounds on the number of flow processing requests leased at once. The actual
+# number depends on how busy the flow processing thread pool is.
+_MIN_FLOW_PROCESSING_LEASE_BATCH = 1
+_MAX_FLOW_PROCESSING_LEASE_BATCH = 500
+
+
+def _PollQueue(lease_fn, process_fn, wakeup_event, should_stop):
+  """Runs a lease loop with exponential back-off and wakeup support.
+
+  Args:
+    lease_fn: A function returning a (possibly empty) list of leased items.
+    process_fn: A function called with a non-empty list of leased items.
+    wakeup_event: A threading.Event set whenever new items might be available.
+    should_stop: A function returning True if the loop should terminate.
+  """
+  interval = _MIN_POLL_INTERVAL
+  while not should_stop():
+    # The event is cleared before leasing, so that a wakeup arriving while
+    # items are leased or processed triggers an immediate poll.
+    wakeup_event.clear()
+
+    items = lease_fn()
+    if items:
+      process_fn(items)
+      interval = _MIN_POLL_INTERVAL
+      continue
+
+    if wakeup_event.wait(interval):
+      interval = _MIN_POLL_INTERVAL
+    else:
+      interval = min(interval * 2, _MAX_POLL_INTERVAL)
+
+
 class MySQLDBFlowMixin(object):
   """MySQLDB mixin for flow handling."""
 
@@ -41,6 +82,8 @@ class MySQLDBFlowMixin(object):
     query += ",".join(value_templates)
     cursor.execute(query, args)
 
+    self.handler_wakeup.set()
+
   @mysql_utils.WithTransaction(readonly=True)
   def ReadMessageHandlerRequests(self, cursor=None):
     """Reads all message handler requests from the database."""
@@ -86,21 +129,22 @@ class MySQLDBFlowMixin(object):
     """Unregisters any registered message handler."""
     if self.handler_thread:
       self.handler_stop = True
+      self.handler_wakeup.set()
       self.handler_thread.join(timeout)
       if self.handler_thread.isAlive():
         raise RuntimeError("Message handler thread did not join in time.")
       self.handler_thread = None
 
   def _MessageHandlerLoop(self, handler, lease_time, limit):
+    """The main loop for the message handler queue."""
     while not self.handler_stop:
       try:
-        msgs = self._LeaseMessageHandlerRequests(lease_time, limit)
-        if msgs:
-          handler(msgs)
-        else:
-          time.sleep(5)
+        _PollQueue(
+            lambda: self._LeaseMessageHandlerRequests(lease_time, limit),
+            handler, self.handler_wakeup, lambda: self.handler_stop)
       except Exception as e:  # pylint: disable=broad-except
         logging.exception("_LeaseMessageHandlerRequests raised %s.", e)
+        time.sleep(_MAX_POLL_INTERVAL)
 
   @mysql_utils.WithTransaction()
   def _LeaseMessageHandlerRequests(self, lease_time, limit, cursor=None):
@@ -253,11 +297,15 @@ class MySQLDBFlowMixin(object):
     """Writes a flow object to the database."""
 
     query = ("INSERT INTO flows "
-             "(client_id, flow_id, long_flow_id, parent_flow_id, flow, "
+             "(client_id, flow_id, long_flow_id, parent_flow_id, "
+             "parent_hunt_id, flow, flow_state, client_crash_info, "
              "next_request_to_process, timestamp, last_update) VALUES "
-             "(%s, %s, %s, %s, %s, %s, %s, %s) "
+             "(%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s) "
              "ON DUPLICATE KEY UPDATE "
+             "parent_hunt_id=VALUES(parent_hunt_id), "
              "flow=VALUES(flow), "
+             "flow_state=VALUES(flow_state), "
+             "client_crash_info=VALUES(client_crash_info), "
              "next_request_to_process=VALUES(next_request_to_process),"
              "last_update=VALUES(last_update)")
 
@@ -266,14 +314,24 @@ class MySQLDBFlowMixin(object):
     else:
       pfi = None
 
+    # The id of a legacy parent hunt is only kept in the serialized flow.
+    phi = mysql_utils.ParentHuntIDToInt(flow_obj.parent_hunt_id)
+
+    if flow_obj.HasField("client_crash_info"):
+      client_crash_info = flow_obj.client_crash_info.SerializeToString()
+    else:
+      client_crash_info = None
+
     timestamp_str = mysql_utils.RDFDatetimeToMysqlString(flow_obj.create_time)
     now_str = mysql_utils.RDFDatetimeToMysqlString(rdfvalue.RDFDatetime.Now())
 
     args = [
         mysql_utils.ClientIDToInt(flow_obj.client_id),
         mysql_utils.FlowIDToInt(flow_obj.flow_id), flow_obj.long_flow_id, pfi,
-        flow_obj.SerializeToString(), flow_obj.next_request_to_process,
-        timestamp_str, now_str
+        phi,
+        flow_obj.SerializeToString(),
+        int(flow_obj.flow_state), client_crash_info,
+        flow_obj.next_request_to_process, timestamp_str, now_str
     ]
     try:
       cursor.execute(query, args)
@@ -430,6 +488,8 @@ class MySQLDBFlowMixin(object):
     if flow_obj != db.Database.unchanged:
       updates.append("flow=%s")
       args.append(flow_obj.SerializeToString())
+      updates.append("flow_state=%s")
+      args.append(int(flow_obj.flow_state))
     if client_crash_info != db.Database.unchanged:
       updates.append("client_crash_info=%s")
       args.append(client_crash_info.SerializeToString())
@@ -505,6 +565,10 @@ class MySQLDBFlowMixin(object):
     query += ", ".join(templates)
     cursor.execute(query, args)
 
+    # The transaction may not be committed yet when the handler loop wakes
+    # up. In that case the loop polls again after _MIN_POLL_INTERVAL.
+    self.flow_processing_request_wakeup.set()
+
   @mysql_utils.WithTransaction()
   def WriteFlowRequests(self, requests, cursor=None):
     """Writes a list of flow requests to the database."""
@@ -874,6 +938,26 @@ class MySQLDBFlowMixin(object):
     cursor.execute(res_query, args)
     cursor.execute(req_query, args)
 
+  @mysql_utils.WithTransaction()
+  def WriteFlowStateBatch(self,
+                          requests=None,
+                          responses=None,
+                          client_messages=None,
+                          requests_to_delete=None,
+                          results=None,
+                          cursor=None):
+    """Atomically applies a batch of flow state mutations."""
+    if requests:
+      self.WriteFlowRequests(requests, cursor=cursor)
+    if responses:
+      self.WriteFlowResponses(responses, cursor=cursor)
+    if client_messages:
+      self.WriteClientMessages(client_messages, cursor=cursor)
+    if requests_to_delete:
+      self.DeleteFlowRequests(requests_to_delete, cursor=cursor)
+    if results:
+      self.WriteFlowResults(results, cursor=cursor)
+
   @mysql_utils.WithTransaction(readonly=True)
   def ReadAllFlowRequestsAndResponses(self, client_id, flow_id, cursor=None):
     """Reads all requests and responses for a given flow from the database."""
@@ -992,10 +1076,10 @@ class MySQLDBFlowMixin(object):
       if needs_processing:
         return False
 
-    update_query = ("UPDATE flows SET flow=%s, processing_on=%s, "
-                    "processing_since=%s, processing_deadline=%s, "
-                    "next_request_to_process=%s, last_update=%s "
-                    "WHERE client_id=%s AND flow_id=%s")
+    update_query = ("UPDATE flows SET flow=%s, flow_state=%s, "
+                    "processing_on=%s, processing_since=%s, "
+                    "processing_deadline=%s, next_request_to_process=%s, "
+                    "last_update=%s WHERE client_id=%s AND flow_id=%s")
     clone = flow_obj.Copy()
     clone.processing_on = None
     clone.processing_since = None
@@ -1003,7 +1087,8 @@ class MySQLDBFlowMixin(object):
     now = rdfvalue.RDFDatetime.Now()
     now_str = mysql_utils.RDFDatetimeToMysqlString(now)
     args = [
-        clone.SerializeToString(), None, None, None,
+        clone.SerializeToString(),
+        int(clone.flow_state), None, None, None,
         flow_obj.next_request_to_process, now_str,
         mysql_utils.ClientIDToInt(flow_obj.client_id),
         mysql_utils.FlowIDToInt(flow_obj.flow_id)
@@ -1062,7 +1147,7 @@ class MySQLDBFlowMixin(object):
     cursor.execute(query)
 
   @mysql_utils.WithTransaction()
-  def _LeaseFlowProcessingReqests(self, cursor=None):
+  def _LeaseFlowProcessingReqests(self, limit=50, cursor=None):
     """Leases a number of flow processing requests."""
     now = rdfvalue.RDFDatetime.Now()
     now_str = mysql_utils.RDFDatetimeToMysqlString(now)
@@ -1077,7 +1162,7 @@ class MySQLDBFlowMixin(object):
              "LIMIT %s")
 
     id_str = utils.ProcessIdString()
-    args = (expiry_str, id_str, now_str, now_str, 50)
+    args = (expiry_str, id_str, now_str, now_str, limit)
     updated = cursor.execute(query, args)
 
     if updated == 0:
@@ -1097,21 +1182,41 @@ class MySQLDBFlowMixin(object):
 
     return res
 
+  def _FlowProcessingLeaseLimit(self):
+    """Returns how many requests the handler pool can take right now."""
+    pool = self.flow_processing_request_handler_pool
+    # Allow for one queued request per thread on top of the running ones.
+    capacity = 2 * pool.max_threads - pool.busy_threads - pool.pending_tasks
+    return max(_MIN_FLOW_PROCESSING_LEASE_BATCH,
+               min(_MAX_FLOW_PROCESSING_LEASE_BATCH, capacity))
+
+  def _LeaseFlowProcessingRequestsWithStats(self):
+    """Leases flow processing requests and records lease metrics."""
+    start_time = time.time()
+    requests = self._LeaseFlowProcessingReqests(
+        limit=self._FlowProcessingLeaseLimit())
+    stats_collector_instance.Get().RecordEvent(
+        "flow_processing_lease_latency", time.time() - start_time)
+    return requests
+
+  def _DispatchFlowProcessingRequests(self, handler, requests):
+    pool = self.flow_processing_request_handler_pool
+    for request in requests:
+      pool.AddTask(target=handler, args=(request,))
+
+    stats_collector_instance.Get().SetGaugeValue(
+        "flow_processing_queue_depth", pool.pending_tasks + pool.busy_threads)
+
   def _FlowProcessingRequestHandlerLoop(self, handler):
     """The main loop for the flow processing request queue."""
-    while not self.flow_processing_request_handler_stop:
-      try:
-        msgs = self._LeaseFlowProcessingReqests()
-        if msgs:
-          for m in msgs:
-            self.flow_processing_request_handler_pool.AddTask(
-                target=handler, args=(m,))
-        else:
-          time.sleep(5)
-
-      except Exception as e:  # pylint: disable=broad-except
-        logging.exception("_FlowProcessingRequestHandlerLoop raised %s.", e)
-        break
+    try:
+      _PollQueue(
+          self._LeaseFlowProcessingRequestsWithStats,
+          lambda requests: self._DispatchFlowProcessingRequests(
+              handler, requests), self.flow_processing_request_wakeup,
+          lambda: self.flow_processing_request_handler_stop)
+    except Exception as e:  # pylint: disable=broad-except
+      logging.exception("_FlowProcessingRequestHandlerLoop raised %s.", e)
 
   def RegisterFlowProcessingHandler(self, handler):
     """Registers a handler to receive flow processing messages."""
@@ -1130,16 +1235,142 @@ class MySQLDBFlowMixin(object):
     """Unregisters any registered flow processing handler."""
     if self.flow_processing_request_handler_thread:
       self.flow_processing_request_handler_stop = True
+      self.flow_processing_request_wakeup.set()
       self.flow_processing_request_handler_thread.join(timeout)
       if self.flow_processing_request_handler_thread.isAlive():
         raise RuntimeError("Flow processing handler did not join in time.")
       self.flow_processing_request_handler_thread = None
 
+  def _ReadFlowPage(self,
+                    table,
+                    id_column,
+                    columns,
+                    conditions,
+                    args,
+                    count,
+                    cursor,
+                    offset=0,
+                    after=None):
+    """Reads a page of rows of a flow's results or log entries.
+
+    Rows are ordered by (timestamp, id_column). For rows of a single flow this
+    is the order of the primary key, so no sorting is needed. Pages following
+    a cursor start with an index range scan right after it, while an offset
+    has all the rows before it scanned and skipped.
+
+    Args:
+      table: Table to read from.
+      id_column: Auto-increment column breaking ties between timestamps.
+      columns: List of additional columns to read.
+      conditions: List of WHERE conditions identifying the rows to page over.
+      args: Arguments for the conditions.
+      count: Maximum number of rows to return.
+      cursor: MySQL cursor to use.
+      offset: Number of rows to skip.
+      after: A db.FlowPageCursor, only rows following it are read.
+
+    Returns:
+      A tuple (rows, cursor). `rows` is a list of tuples (timestamp,
+      <columns>...), `cursor` a db.FlowPageCursor pointing at the last row,
+      or `after` if there are no rows.
+    """
+    conditions = list(conditions)
+    args = list(args)
+    if after is not None:
+      after_timestamp = mysql_utils.RDFDatetimeToMysqlString(after.timestamp)
+      conditions.append(
+          "(timestamp > %s OR (timestamp = %s AND {} > %s))".format(id_column))
+      args.extend([after_timestamp, after_timestamp, after.item_id])
+
+    query = ("SELECT timestamp, {}, {} FROM {} WHERE {} "
+             "ORDER BY timestamp, {} LIMIT %s OFFSET %s").format(
+                 id_column, ", ".join(columns), table, " AND ".join(conditions),
+                 id_column)
+    cursor.execute(query, args + [count, offset])
+    rows = cursor.fetchall()
+
+    if rows:
+      timestamp, item_id = rows[-1][:2]
+      after = db.FlowPageCursor(
+          timestamp=mysql_utils.MysqlToRDFDatetime(timestamp), item_id=item_id)
+    return [(row[0],) + tuple(row[2:]) for row in rows], after
+
+  def _FlowResultsFilterConditions(self,
+                                   with_tag=None,
+                                   with_type=None,
+                                   with_substring=None):
+    """Returns WHERE conditions and args for flow results filters."""
+    conditions = []
+    args = []
+
+    if with_tag is not None:
+      conditions.append("tag = %s")
+      args.append(with_tag)
+
+    if with_type is not None:
+      conditions.append("type = %s")
+      args.append(with_type)
+
+    if with_substring is not None:
+      conditions.append("INSTR(payload, %s) > 0")
+      args.append(with_substring.encode("utf-8"))
+
+    return conditions, args
+
+  def _FlowResultFromRow(self, client_id, flow_id, hunt_id, timestamp,
+                         type_name, tag, serialized_payload):
+    """Generates a flow result object from database values."""
+    if type_name in rdfvalue.RDFValue.classes:
+      payload_cls = rdfvalue.RDFValue.classes[type_name]
+      payload = payload_cls.FromSerializedString(serialized_payload)
+    else:
+      payload = rdf_objects.SerializedValueOfUnrecognizedType(
+          type_name=type_name, value=serialized_payload)
+
+    result = rdf_flow_objects.FlowResult(
+        client_id=client_id,
+        flow_id=flow_id,
+        payload=payload,
+        timestamp=mysql_utils.MysqlToRDFDatetime(timestamp))
+    if hunt_id is not None:
+      result.hunt_id = mysql_utils.IntToHuntID(hunt_id)
+    if tag:
+      result.tag = tag
+
+    return result
+
   @mysql_utils.WithTransaction()
   def WriteFlowResults(self, results, cursor=None):
     """Writes flow results for a given flow."""
+    if not results:
+      return
 
-  @mysql_utils.WithTransaction()
+    now_str = mysql_utils.RDFDatetimeToMysqlString(rdfvalue.RDFDatetime.Now())
+
+    templates = []
+    args = []
+    flow_keys = set()
+    for r in results:
+      flow_keys.add((r.client_id, r.flow_id))
+      templates.append("(%s, %s, %s, %s, %s, %s, %s)")
+      args.extend([
+          mysql_utils.ClientIDToInt(r.client_id),
+          mysql_utils.FlowIDToInt(r.flow_id),
+          mysql_utils.ParentHuntIDToInt(r.hunt_id), now_str,
+          compatibility.GetName(r.payload.__class__), r.tag,
+          r.payload.SerializeToString()
+      ])
+
+    query = ("INSERT INTO flow_results "
+             "(client_id, flow_id, hunt_id, timestamp, type, tag, payload) "
+             "VALUES ")
+    query += ", ".join(templates)
+    try:
+      cursor.execute(query, args)
+    except MySQLdb.IntegrityError as e:
+      raise db.AtLeastOneUnknownFlowError(list(flow_keys), cause=e)
+
+  @mysql_utils.WithTransaction(readonly=True)
   def ReadFlowResults(self,
                       client_id,
                       flow_id,
@@ -1150,8 +1381,74 @@ class MySQLDBFlowMixin(object):
                       with_substring=None,
                       cursor=None):
     """Reads flow results of a given flow using given query options."""
+    results, _ = self._ReadFlowResultsPage(
+        client_id,
+        flow_id,
+        count,
+        cursor,
+        offset=offset,
+        with_tag=with_tag,
+        with_type=with_type,
+        with_substring=with_substring)
+    return results
 
-  @mysql_utils.WithTransaction()
+  @mysql_utils.WithTransaction(readonly=True)
+  def ReadFlowResultsPage(self,
+                          client_id,
+                          flow_id,
+                          count,
+                          after=None,
+                          with_tag=None,
+                          with_type=None,
+                          with_substring=None,
+                          cursor=None):
+    """Reads a page of flow results that follows a given cursor."""
+    return self._ReadFlowResultsPage(
+        client_id,
+        flow_id,
+        count,
+        cursor,
+        after=after,
+        with_tag=with_tag,
+        with_type=with_type,
+        with_substring=with_substring)
+
+  def _ReadFlowResultsPage(self,
+                           client_id,
+                           flow_id,
+                           count,
+                           cursor,
+                           offset=0,
+                           after=None,
+                           with_tag=None,
+                           with_type=None,
+                           with_substring=None):
+    """Reads flow results and the cursor of the last one."""
+    conditions, args = self._FlowResultsFilterConditions(
+        with_tag=with_tag, with_type=with_type, with_substring=with_substring)
+    conditions = ["client_id = %s", "flow_id = %s"] + conditions
+    args = [
+        mysql_utils.ClientIDToInt(client_id),
+        mysql_utils.FlowIDToInt(flow_id)
+    ] + args
+    rows, after = self._ReadFlowPage(
+        "flow_results",
+        "result_id", ["hunt_id", "type", "tag", "payload"],
+        conditions,
+        args,
+        count,
+        cursor,
+        offset=offset,
+        after=after)
+
+    results = [
+        self._FlowResultFromRow(client_id, flow_id, hunt_id, timestamp,
+                                type_name, tag, payload)
+        for timestamp, hunt_id, type_name, tag, payload in rows
+    ]
+    return results, after
+
+  @mysql_utils.WithTransaction(readonly=True)
   def CountFlowResults(self,
                        client_id,
                        flow_id,
@@ -1159,12 +1456,47 @@ class MySQLDBFlowMixin(object):
                        with_type=None,
                        cursor=None):
     """Counts flow results of a given flow using given query options."""
+    conditions, args = self._FlowResultsFilterConditions(
+        with_tag=with_tag, with_type=with_type)
+    conditions = ["client_id = %s", "flow_id = %s"] + conditions
+    args = [
+        mysql_utils.ClientIDToInt(client_id),
+        mysql_utils.FlowIDToInt(flow_id)
+    ] + args
+    query = "SELECT COUNT(*) FROM flow_results WHERE " + " AND ".join(
+        conditions)
+    cursor.execute(query, args)
+    return cursor.fetchone()[0]
 
   @mysql_utils.WithTransaction()
-  def WriteFlowLogEntries(self, client_id, flow_id, entries, cursor=None):
+  def WriteFlowLogEntries(self, entries, cursor=None):
     """Writes flow log entries for a given flow."""
+    if not entries:
+      return
 
-  @mysql_utils.WithTransaction()
+    now_str = mysql_utils.RDFDatetimeToMysqlString(rdfvalue.RDFDatetime.Now())
+
+    templates = []
+    args = []
+    flow_keys = set()
+    for e in entries:
+      flow_keys.add((e.client_id, e.flow_id))
+      templates.append("(%s, %s, %s, %s, %s)")
+      args.extend([
+          mysql_utils.ClientIDToInt(e.client_id),
+          mysql_utils.FlowIDToInt(e.flow_id),
+          mysql_utils.ParentHuntIDToInt(e.hunt_id), now_str, e.message
+      ])
+
+    query = ("INSERT INTO flow_log_entries "
+             "(client_id, flow_id, hunt_id, timestamp, message) VALUES ")
+    query += ", ".join(templates)
+    try:
+      cursor.execute(query, args)
+    except MySQLdb.IntegrityError as e:
+      raise db.AtLeastOneUnknownFlowError(list(flow_keys), cause=e)
+
+  @mysql_utils.WithTransaction(readonly=True)
   def ReadFlowLogEntries(self,
                          client_id,
                          flow_id,
@@ -1173,7 +1505,76 @@ class MySQLDBFlowMixin(object):
                          with_substring=None,
                          cursor=None):
     """Reads flow log entries of a given flow using given query options."""
+    entries, _ = self._ReadFlowLogEntriesPage(
+        client_id,
+        flow_id,
+        count,
+        cursor,
+        offset=offset,
+        with_substring=with_substring)
+    return entries
 
-  @mysql_utils.WithTransaction()
+  @mysql_utils.WithTransaction(readonly=True)
+  def ReadFlowLogEntriesPage(self,
+                             client_id,
+                             flow_id,
+                             count,
+                             after=None,
+                             with_substring=None,
+                             cursor=None):
+    """Reads a page of flow log entries that follows a given cursor."""
+    return self._ReadFlowLogEntriesPage(
+        client_id,
+        flow_id,
+        count,
+        cursor,
+        after=after,
+        with_substring=with_substring)
+
+  def _ReadFlowLogEntriesPage(self,
+                              client_id,
+                              flow_id,
+                              count,
+                              cursor,
+                              offset=0,
+                              after=None,
+                              with_substring=None):
+    """Reads flow log entries and the cursor of the last one."""
+    conditions = ["client_id = %s", "flow_id = %s"]
+    args = [
+        mysql_utils.ClientIDToInt(client_id),
+        mysql_utils.FlowIDToInt(flow_id)
+    ]
+    if with_substring is not None:
+      conditions.append("INSTR(message, %s) > 0")
+      args.append(with_substring)
+
+    rows, after = self._ReadFlowPage(
+        "flow_log_entries",
+        "log_id", ["message"],
+        conditions,
+        args,
+        count,
+        cursor,
+        offset=offset,
+        after=after)
+
+    entries = [
+        rdf_flow_objects.FlowLogEntry(
+            client_id=client_id,
+            flow_id=flow_id,
+            timestamp=mysql_utils.MysqlToRDFDatetime(timestamp),
+            message=message) for timestamp, message in rows
+    ]
+    return entries, after
+
+  @mysql_utils.WithTransaction(readonly=True)
   def CountFlowLogEntries(self, client_id, flow_id, cursor=None):
     """Returns number of flow log entries of a given flow."""
+    query = ("SELECT COUNT(*) FROM flow_log_entries "
+             "WHERE client_id = %s AND flow_id = %s")
+    cursor.execute(
+        query,
+        [mysql_utils.ClientIDToInt(client_id),
+         mysql_utils.FlowIDToInt(flow_id)])
+    return cursor.fetchone()[0]
@@ -0,0 +1,137 @@
+#!/usr/bin/env python
+"""Benchmarks for the MySQL flow processing request queue."""
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import unicode_literals
+
+import logging
+import os
+import random
+import string
+import threading
+import time
+import unittest
+
+from builtins import range  # pylint: disable=redefined-builtin
+import mock
+import MySQLdb
+import pytest
+import queue
+
+from grr_response_core.lib import flags
+from grr_response_core.lib import rdfvalue
+from grr_response_core.lib.rdfvalues import flows as rdf_flows
+from grr_response_server import flow
+from grr_response_server.databases import mysql
+from grr_response_server.databases import mysql_flows
+from grr_response_server.rdfvalues import flow_objects as rdf_flow_objects
+from grr.test_lib import benchmark_test_lib
+from grr.test_lib import test_lib
+
+
+def _GetEnvironOrSkip(key):
+  value = os.environ.get(key)
+  if value is None:
+    raise unittest.SkipTest("'%s' variable is not set" % key)
+  return value
+
+
+class _IgnoringEvent(object):
+  """An event that is never set, emulating a plain sleep-based poll loop."""
+
+  def __init__(self):
+    self._event = threading.Event()
+
+  def set(self):  # pylint: disable=invalid-name
+    pass
+
+  def clear(self):  # pylint: disable=invalid-name
+    pass
+
+  def wait(self, timeout):  # pylint: disable=invalid-name
+    return self._event.wait(timeout)
+
+
+@pytest.mark.benchmark
+class FlowProcessingQueueBenchmark(benchmark_test_lib.MicroBenchmarks):
+  """Measures the latency of flow steps going through the queue."""
+
+  units = "s"
+
+  NUM_STEPS = 20
+
+  def setUp(self):
+    super(FlowProcessingQueueBenchmark, self).setUp()
+
+    user = _GetEnvironOrSkip("MYSQL_TEST_USER")
+    host = _GetEnvironOrSkip("MYSQL_TEST_HOST")
+    port = _GetEnvironOrSkip("MYSQL_TEST_PORT")
+    passwd = _GetEnvironOrSkip("MYSQL_TEST_PASS")
+    dbname = "".join(
+        random.choice(string.ascii_uppercase + string.digits)
+        for _ in range(10))
+
+    connection = MySQLdb.Connect(host=host, port=port, user=user, passwd=passwd)
+    cursor = connection.cursor()
+    cursor.execute("CREATE DATABASE " + dbname)
+    logging.info("Created test database: %s", dbname)
+
+    self.db = mysql.MysqlDB(
+        host=host, port=port, user=user, passwd=passwd, db=dbname)
+
+    def Fin():
+      cursor.execute("DROP DATABASE " + dbname)
+      cursor.close()
+      connection.close()
+      self.db.Close()
+
+    self.addCleanup(Fin)
+
+    self.client_id = "C.1234567890123456"
+    self.db.WriteClientMetadata(self.client_id, fleetspeak_enabled=False)
+
+    self.flow_id = flow.RandomFlowId()
+    self.db.WriteFlowObject(
+        rdf_flow_objects.Flow(
+            client_id=self.client_id,
+            flow_id=self.flow_id,
+            create_time=rdfvalue.RDFDatetime.Now()))
+
+  def _MeasureStepLatency(self):
+    """Runs a chain of flow steps and returns the average latency per step."""
+    request_queue = queue.Queue()
+
+    def Callback(request):
+      self.db.AckFlowProcessingRequests([request])
+      request_queue.put(request)
+
+    self.db.RegisterFlowProcessingHandler(Callback)
+    try:
+      start_time = time.time()
+      for _ in range(self.NUM_STEPS):
+        # Each step schedules the next one, as a flow state run would.
+        self.db.WriteFlowProcessingRequests([
+            rdf_flows.FlowProcessingRequest(
+                client_id=self.client_id, flow_id=self.flow_id)
+        ])
+        request_queue.get(True, timeout=60)
+      return (time.time() - start_time) / self.NUM_STEPS
+    finally:
+      self.db.UnregisterFlowProcessingHandler()
+
+  def testFlowStepLatency(self):
+    """Flow step latency with the adaptive, push-based lease loop."""
+    self.AddResult("Adaptive lease loop", self._MeasureStepLatency(),
+                   self.NUM_STEPS)
+
+    # The previous implementation slept for 5 seconds whenever the queue was
+    # empty and wasn't notified about new requests.
+    with mock.patch.object(mysql_flows, "_MIN_POLL_INTERVAL", 5):
+      with mock.patch.object(self.db, "flow_processing_request_wakeup",
+                             _IgnoringEvent()):
+        self.AddResult("Fixed 5s polling", self._MeasureStepLatency(),
+                       self.NUM_STEPS)
+
+
+if __name__ == "__main__":
+  flags.StartMain(test_lib.main)
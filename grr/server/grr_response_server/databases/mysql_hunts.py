@@ -1,53 +1,430 @@
 #!/usr/bin/env python
-"""The MySQL database methods for flow handling."""
+"""The MySQL database methods for hunt handling."""
 from __future__ import absolute_import
 from __future__ import division
 from __future__ import unicode_literals
 
+import MySQLdb
+
+from grr_response_core.lib import rdfvalue
+from grr_response_core.lib.rdfvalues import stats as rdf_stats
+from grr_response_core.lib.util import random
 from grr_response_server import db
+from grr_response_server.databases import mysql_utils
+from grr_response_server.rdfvalues import flow_objects as rdf_flow_objects
+from grr_response_server.rdfvalues import hunt_objects as rdf_hunt_objects
+
+# Counter increments are spread over this many rows per hunt, so that
+# concurrently completing hunt flows don't contend on a single row lock.
+_HUNT_COUNTER_SHARDS = 16
+
+# Columns of the hunt_counters table, in db.HuntCounters fields order.
+_HUNT_COUNTER_COLUMNS = [
+    "num_successful_clients", "num_failed_clients", "num_crashed_clients",
+    "num_clients_with_results", "num_results", "user_cpu_seconds",
+    "system_cpu_seconds", "network_bytes_sent"
+]
+
+_HUNT_COUNTERS_INSERT = (
+    "INSERT INTO hunt_counters (hunt_id, shard, " +
+    ", ".join(_HUNT_COUNTER_COLUMNS) + ", client_resources_stats) VALUES (" +
+    ", ".join(["%s"] * (len(_HUNT_COUNTER_COLUMNS) + 3)) + ")")
+
+
+def _HuntCountersFromRow(row):
+  """Creates db.HuntCounters from a row of hunt counter values."""
+  (num_successful_clients, num_failed_clients, num_crashed_clients,
+   num_clients_with_results, num_results, user_cpu_seconds,
+   system_cpu_seconds, network_bytes_sent) = [v or 0 for v in row]
+
+  # SUM() results are returned as decimals.
+  return db.HuntCounters(
+      num_successful_clients=int(num_successful_clients),
+      num_failed_clients=int(num_failed_clients),
+      num_crashed_clients=int(num_crashed_clients),
+      num_clients_with_results=int(num_clients_with_results),
+      num_results=int(num_results),
+      total_user_cpu_seconds=float(user_cpu_seconds),
+      total_system_cpu_seconds=float(system_cpu_seconds),
+      total_network_bytes_sent=int(network_bytes_sent))
+
+
+def _MergeClientResourcesStats(stats, other):
+  """Merges ClientResourcesStats of a different counter shard into stats."""
+  for name in [
+      "user_cpu_stats", "system_cpu_stats", "network_bytes_sent_stats"
+  ]:
+    running_stats = getattr(stats, name)
+    other_running_stats = getattr(other, name)
+
+    running_stats.num += other_running_stats.num
+    running_stats.sum += other_running_stats.sum
+    running_stats.sum_sq += other_running_stats.sum_sq
+    for b, other_b in zip(running_stats.histogram.bins,
+                          other_running_stats.histogram.bins):
+      b.num += other_b.num
+
+  stats.worst_performers = sorted(
+      list(stats.worst_performers) + list(other.worst_performers),
+      key=lambda s: s.cpu_usage.user_cpu_time + s.cpu_usage.system_cpu_time,
+      reverse=True)[:stats.NUM_WORST_PERFORMERS]
+
+
+def _MergeHuntCounterShards(rows):
+  """Merges hunt_counters rows into db.HuntCounters and resources stats."""
+  counters = db.HuntCounters(*[0] * len(db.HuntCounters._fields))
+  stats = None
+  for row in rows:
+    shard_counters = _HuntCountersFromRow(row[:len(_HUNT_COUNTER_COLUMNS)])
+    counters = db.HuntCounters(
+        *[value + delta for value, delta in zip(counters, shard_counters)])
+
+    serialized_stats = row[len(_HUNT_COUNTER_COLUMNS)]
+    if serialized_stats is None:
+      continue
+    shard_stats = rdf_stats.ClientResourcesStats.FromSerializedString(
+        serialized_stats)
+    if stats is None:
+      stats = shard_stats
+    else:
+      _MergeClientResourcesStats(stats, shard_stats)
+
+  return counters, stats
 
 
 class MySQLDBHuntMixin(object):
-  """MySQLDB mixin for flow handling."""
+  """MySQLDB mixin for hunt handling."""
+
+  @mysql_utils.WithTransaction()
+  def WriteHuntObject(self, hunt_obj, cursor=None):
+    """Writes a hunt object to the database."""
+    query = ("INSERT INTO hunts "
+             "(hunt_id, create_timestamp, last_update_timestamp, hunt) "
+             "VALUES (%s, %s, %s, %s) "
+             "ON DUPLICATE KEY UPDATE "
+             "last_update_timestamp=VALUES(last_update_timestamp), "
+             "hunt=VALUES(hunt)")
+
+    now_str = mysql_utils.RDFDatetimeToMysqlString(rdfvalue.RDFDatetime.Now())
+    args = [
+        mysql_utils.HuntIDToInt(hunt_obj.hunt_id),
+        mysql_utils.RDFDatetimeToMysqlString(hunt_obj.create_time), now_str,
+        hunt_obj.SerializeToString()
+    ]
+    cursor.execute(query, args)
+
+  def _HuntObjectFromRow(self, row):
+    """Generates a hunt object from a database row."""
+    serialized_hunt, last_update_timestamp = row
+
+    hunt_obj = rdf_hunt_objects.Hunt.FromSerializedString(serialized_hunt)
+    hunt_obj.last_update_time = mysql_utils.MysqlToRDFDatetime(
+        last_update_timestamp)
+    return hunt_obj
+
+  def _ApplyHuntCounters(self, hunt_objs, cursor):
+    """Sets hunt objects progress fields from the hunt counters."""
+    query = ("SELECT hunt_id, " + ", ".join(_HUNT_COUNTER_COLUMNS) +
+             ", client_resources_stats FROM hunt_counters")
+    args = []
+    if len(hunt_objs) == 1:
+      query += " WHERE hunt_id = %s"
+      args.append(mysql_utils.HuntIDToInt(hunt_objs[0].hunt_id))
+
+    cursor.execute(query, args)
+    rows_by_hunt_id = {}
+    for row in cursor.fetchall():
+      rows_by_hunt_id.setdefault(mysql_utils.IntToHuntID(row[0]),
+                                 []).append(row[1:])
+
+    for hunt_obj in hunt_objs:
+      rows = rows_by_hunt_id.get(hunt_obj.hunt_id)
+      if not rows:
+        continue
+
+      counters, stats = _MergeHuntCounterShards(rows)
+      hunt_obj.num_successful_clients = counters.num_successful_clients
+      hunt_obj.num_failed_clients = counters.num_failed_clients
+      hunt_obj.num_crashed_clients = counters.num_crashed_clients
+      hunt_obj.num_clients_with_results = counters.num_clients_with_results
+      hunt_obj.num_results = counters.num_results
+      if stats is not None:
+        hunt_obj.client_resources_stats = stats
 
-  def WriteHuntObject(self, hunt_obj):
-    raise NotImplementedError()
+  @mysql_utils.WithTransaction()
+  def UpdateHuntObject(self, hunt_id, update_fn, cursor=None):
+    """Updates the hunt object by applying the update function."""
+    query = ("SELECT hunt, last_update_timestamp FROM hunts "
+             "WHERE hunt_id = %s FOR UPDATE")
+    cursor.execute(query, [mysql_utils.HuntIDToInt(hunt_id)])
+    rows = cursor.fetchall()
+    if not rows:
+      raise db.UnknownHuntError(hunt_id)
 
-  def UpdateHuntObject(self, hunt_id, update_fn):
-    raise NotImplementedError()
+    hunt_obj = self._HuntObjectFromRow(rows[0])
+    self._ApplyHuntCounters([hunt_obj], cursor)
+    updated_hunt_obj = update_fn(hunt_obj)
+    if updated_hunt_obj is None:
+      raise ValueError("update_fn can't return None")
 
-  def ReadHuntObject(self, hunt_id):
-    raise NotImplementedError()
+    self.WriteHuntObject(updated_hunt_obj, cursor=cursor)
+    return updated_hunt_obj
 
-  def ReadAllHuntObjects(self):
-    raise NotImplementedError()
+  @mysql_utils.WithTransaction(readonly=True)
+  def ReadHuntObject(self, hunt_id, cursor=None):
+    """Reads a hunt object from the database."""
+    query = "SELECT hunt, last_update_timestamp FROM hunts WHERE hunt_id = %s"
+    cursor.execute(query, [mysql_utils.HuntIDToInt(hunt_id)])
+    rows = cursor.fetchall()
+    if not rows:
+      raise db.UnknownHuntError(hunt_id)
 
-  def ReadHuntLogEntries(self, hunt_id, offset, count, with_substring=None):
-    raise NotImplementedError()
+    hunt_obj = self._HuntObjectFromRow(rows[0])
+    self._ApplyHuntCounters([hunt_obj], cursor)
+    return hunt_obj
 
-  def CountHuntLogEntries(self, hunt_id):
-    raise NotImplementedError()
+  @mysql_utils.WithTransaction(readonly=True)
+  def ReadAllHuntObjects(self, cursor=None):
+    """Reads all hunt objects from the database."""
+    cursor.execute("SELECT hunt, last_update_timestamp FROM hunts")
+    hunt_objs = [self._HuntObjectFromRow(row) for row in cursor.fetchall()]
+    if hunt_objs:
+      self._ApplyHuntCounters(hunt_objs, cursor)
+    return hunt_objs
 
+  @mysql_utils.WithTransaction()
+  def IncrementHuntCounters(self,
+                            hunt_id,
+                            num_successful_clients=0,
+                            num_failed_clients=0,
+                            num_crashed_clients=0,
+                            num_clients_with_results=0,
+                            num_results=0,
+                            client_resources=None,
+                            cursor=None):
+    """Increments progress counters of a given hunt."""
+    hunt_id_int = mysql_utils.HuntIDToInt(hunt_id)
+    shard = random.UInt32() % _HUNT_COUNTER_SHARDS
+
+    user_cpu_seconds = 0
+    system_cpu_seconds = 0
+    network_bytes_sent = 0
+    if client_resources is not None:
+      user_cpu_seconds = client_resources.cpu_usage.user_cpu_time
+      system_cpu_seconds = client_resources.cpu_usage.system_cpu_time
+      network_bytes_sent = client_resources.network_bytes_sent
+
+    query = (_HUNT_COUNTERS_INSERT + " ON DUPLICATE KEY UPDATE " +
+             ", ".join("{0} = {0} + VALUES({0})".format(c)
+                       for c in _HUNT_COUNTER_COLUMNS))
+    args = [
+        hunt_id_int, shard, num_successful_clients, num_failed_clients,
+        num_crashed_clients, num_clients_with_results, num_results,
+        user_cpu_seconds, system_cpu_seconds, network_bytes_sent, None
+    ]
+    try:
+      cursor.execute(query, args)
+    except MySQLdb.IntegrityError as e:
+      raise db.UnknownHuntError(hunt_id, cause=e)
+
+    if client_resources is None:
+      return
+
+    # The shard row is locked by the upsert above until the transaction ends,
+    # so the read-modify-write of its resources stats is atomic.
+    cursor.execute(
+        "SELECT client_resources_stats FROM hunt_counters "
+        "WHERE hunt_id = %s AND shard = %s FOR UPDATE", [hunt_id_int, shard])
+    (serialized_stats,) = cursor.fetchone()
+    if serialized_stats is not None:
+      stats = rdf_stats.ClientResourcesStats.FromSerializedString(
+          serialized_stats)
+    else:
+      stats = rdf_stats.ClientResourcesStats()
+    stats.RegisterResources(client_resources)
+
+    cursor.execute(
+        "UPDATE hunt_counters SET client_resources_stats = %s "
+        "WHERE hunt_id = %s AND shard = %s",
+        [stats.SerializeToString(), hunt_id_int, shard])
+
+  @mysql_utils.WithTransaction(readonly=True)
+  def ReadHuntCounters(self, hunt_id, cursor=None):
+    """Reads progress counters of a given hunt."""
+    hunt_id_int = mysql_utils.HuntIDToInt(hunt_id)
+    cursor.execute("SELECT 1 FROM hunts WHERE hunt_id = %s", [hunt_id_int])
+    if not cursor.fetchall():
+      raise db.UnknownHuntError(hunt_id)
+
+    query = ("SELECT " +
+             ", ".join("SUM(%s)" % c for c in _HUNT_COUNTER_COLUMNS) +
+             " FROM hunt_counters WHERE hunt_id = %s")
+    cursor.execute(query, [hunt_id_int])
+    return _HuntCountersFromRow(cursor.fetchone())
+
+  @mysql_utils.WithTransaction()
+  def CompactHuntCounters(self, hunt_id, cursor=None):
+    """Compacts progress counters of a given hunt."""
+    hunt_id_int = mysql_utils.HuntIDToInt(hunt_id)
+
+    query = ("SELECT " + ", ".join(_HUNT_COUNTER_COLUMNS) +
+             ", client_resources_stats FROM hunt_counters "
+             "WHERE hunt_id = %s FOR UPDATE")
+    cursor.execute(query, [hunt_id_int])
+    rows = cursor.fetchall()
+    if len(rows) < 2:
+      return
+
+    counters, stats = _MergeHuntCounterShards(rows)
+    serialized_stats = None
+    if stats is not None:
+      serialized_stats = stats.SerializeToString()
+
+    cursor.execute("DELETE FROM hunt_counters WHERE hunt_id = %s",
+                   [hunt_id_int])
+    cursor.execute(_HUNT_COUNTERS_INSERT,
+                   [hunt_id_int, 0] + list(counters) + [serialized_stats])
+
+  @mysql_utils.WithTransaction(readonly=True)
+  def ReadHuntLogEntries(self,
+                         hunt_id,
+                         offset,
+                         count,
+                         with_substring=None,
+                         cursor=None):
+    """Reads hunt log entries of a given hunt using given query options."""
+    conditions = ["hunt_id = %s"]
+    args = [mysql_utils.HuntIDToInt(hunt_id)]
+    if with_substring is not None:
+      conditions.append("INSTR(message, %s) > 0")
+      args.append(with_substring)
+
+    rows, _ = self._ReadFlowPage(
+        "flow_log_entries",
+        "log_id", ["client_id", "flow_id", "message"],
+        conditions,
+        args,
+        count,
+        cursor,
+        offset=offset)
+
+    return [
+        rdf_flow_objects.FlowLogEntry(
+            hunt_id=hunt_id,
+            client_id=mysql_utils.IntToClientID(client_id),
+            flow_id=mysql_utils.IntToFlowID(flow_id),
+            timestamp=mysql_utils.MysqlToRDFDatetime(timestamp),
+            message=message) for timestamp, client_id, flow_id, message in rows
+    ]
+
+  @mysql_utils.WithTransaction(readonly=True)
+  def CountHuntLogEntries(self, hunt_id, cursor=None):
+    """Returns number of hunt log entries of a given hunt."""
+    query = "SELECT COUNT(*) FROM flow_log_entries WHERE hunt_id = %s"
+    cursor.execute(query, [mysql_utils.HuntIDToInt(hunt_id)])
+    return cursor.fetchone()[0]
+
+  @mysql_utils.WithTransaction(readonly=True)
   def ReadHuntResults(self,
                       hunt_id,
                       offset,
                       count,
                       with_tag=None,
                       with_type=None,
-                      with_substring=None):
-    raise NotImplementedError()
+                      with_substring=None,
+                      cursor=None):
+    """Reads hunt results of a given hunt using given query options."""
+    conditions, args = self._FlowResultsFilterConditions(
+        with_tag=with_tag, with_type=with_type, with_substring=with_substring)
+    conditions = ["hunt_id = %s"] + conditions
+    args = [mysql_utils.HuntIDToInt(hunt_id)] + args
+
+    rows, _ = self._ReadFlowPage(
+        "flow_results",
+        "result_id",
+        ["client_id", "flow_id", "hunt_id", "type", "tag", "payload"],
+        conditions,
+        args,
+        count,
+        cursor,
+        offset=offset)
+
+    ret = []
+    for timestamp, client_id, flow_id, hunt_id_int, type_name, tag, payload in (
+        rows):
+      ret.append(
+          self._FlowResultFromRow(
+              mysql_utils.IntToClientID(client_id),
+              mysql_utils.IntToFlowID(flow_id), hunt_id_int, timestamp,
+              type_name, tag, payload))
 
-  def CountHuntResults(self, hunt_id, with_tag=None, with_type=None):
-    raise NotImplementedError()
+    return ret
 
+  @mysql_utils.WithTransaction(readonly=True)
+  def CountHuntResults(self, hunt_id, with_tag=None, with_type=None,
+                       cursor=None):
+    """Counts hunt results of a given hunt using given query options."""
+    conditions, args = self._FlowResultsFilterConditions(
+        with_tag=with_tag, with_type=with_type)
+    conditions = ["hunt_id = %s"] + conditions
+    args = [mysql_utils.HuntIDToInt(hunt_id)] + args
+
+    query = "SELECT COUNT(*) FROM flow_results WHERE " + " AND ".join(
+        conditions)
+    cursor.execute(query, args)
+    return cursor.fetchone()[0]
+
+  def _HuntFlowCondition(self, condition):
+    """Returns a WHERE condition for flows matching a HuntFlowsCondition."""
+    states = rdf_flow_objects.Flow.FlowState
+    if condition == db.HuntFlowsCondition.UNSET:
+      return None
+    elif condition == db.HuntFlowsCondition.FAILED_FLOWS_ONLY:
+      return "flow_state = %d" % int(states.ERROR)
+    elif condition == db.HuntFlowsCondition.SUCCEEDED_FLOWS_ONLY:
+      return "flow_state = %d" % int(states.FINISHED)
+    elif condition == db.HuntFlowsCondition.COMPLETED_FLOWS_ONLY:
+      return "flow_state IN (%d, %d)" % (int(states.ERROR),
+                                         int(states.FINISHED))
+    elif condition == db.HuntFlowsCondition.FLOWS_IN_PROGRESS_ONLY:
+      return "flow_state = %d" % int(states.RUNNING)
+    elif condition == db.HuntFlowsCondition.CRASHED_FLOWS_ONLY:
+      return "client_crash_info IS NOT NULL"
+    elif condition == db.HuntFlowsCondition.FLOWS_WITH_RESULTS_ONLY:
+      return ("EXISTS (SELECT 1 FROM flow_results AS r "
+              "WHERE r.client_id = flows.client_id "
+              "AND r.flow_id = flows.flow_id)")
+    else:
+      raise ValueError("Invalid filter condition: %d" % condition)
+
+  @mysql_utils.WithTransaction(readonly=True)
   def ReadHuntFlows(self,
                     hunt_id,
                     offset,
                     count,
-                    filter_condition=db.HuntFlowsCondition.UNSET):
-    raise NotImplementedError()
+                    filter_condition=db.HuntFlowsCondition.UNSET,
+                    cursor=None):
+    """Reads hunt flows matching given conditins."""
+    query = ("SELECT " + self.FLOW_DB_FIELDS +
+             "FROM flows WHERE parent_hunt_id = %s")
+    filter_query = self._HuntFlowCondition(filter_condition)
+    if filter_query is not None:
+      query += " AND " + filter_query
+    query += " ORDER BY last_update LIMIT %s OFFSET %s"
 
+    cursor.execute(query, [mysql_utils.HuntIDToInt(hunt_id), count, offset])
+    return [self._FlowObjectFromRow(row) for row in cursor.fetchall()]
+
+  @mysql_utils.WithTransaction(readonly=True)
   def CountHuntFlows(self,
                      hunt_id,
-                     filter_condition=db.HuntFlowsCondition.UNSET):
-    raise NotImplementedError()
+                     filter_condition=db.HuntFlowsCondition.UNSET,
+                     cursor=None):
+    """Counts hunt flows matching given conditions."""
+    query = "SELECT COUNT(*) FROM flows WHERE parent_hunt_id = %s"
+    filter_query = self._HuntFlowCondition(filter_condition)
+    if filter_query is not None:
+      query += " AND " + filter_query
+
+    cursor.execute(query, [mysql_utils.HuntIDToInt(hunt_id)])
+    return cursor.fetchone()[0]
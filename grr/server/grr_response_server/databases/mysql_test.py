@@ -378,33 +378,6 @@ class TestMysqlDB(stats_test_lib.StatsTestMixin,
   def testReadPathInfoTimestampStatAndHashEntry(self):
     pass
 
-  def testReadingNonExistentBlobReturnsNone(self):
-    pass
-
-  def testSingleBlobCanBeWrittenAndThenRead(self):
-    pass
-
-  def testMultipleBlobsCanBeWrittenAndThenRead(self):
-    pass
-
-  def testWriting80MbOfBlobsWithSingleCallWorks(self):
-    pass
-
-  def testCheckBlobsExistCorrectlyReportsPresentAndMissingBlobs(self):
-    pass
-
-  def testHashBlobReferenceCanBeWrittenAndReadBack(self):
-    pass
-
-  def testReportsNonExistingHashesAsNone(self):
-    pass
-
-  def testCorrectlyHandlesRequestWithOneExistingAndOneMissingHash(self):
-    pass
-
-  def testMultipleHashBlobReferencesCanBeWrittenAndReadBack(self):
-    pass
-
   def testReadPathInfoOlder(self):
     pass
 
@@ -477,66 +450,6 @@ class TestMysqlDB(stats_test_lib.StatsTestMixin,
   def testMultiClearPathHistoryClearsMultipleHistories(self):
     pass
 
-  def testWritesAndReadsSingleFlowResultOfSingleType(self):
-    pass
-
-  def testWritesAndReadsMultipleFlowResultsOfSingleType(self):
-    pass
-
-  def testWritesAndReadsMultipleFlowResultsWithDifferentTimestamps(self):
-    pass
-
-  def testWritesAndReadsMultipleFlowResultsOfMultipleTypes(self):
-    pass
-
-  def testReadFlowResultsCorrectlyAppliesOffsetAndCountFilters(self):
-    pass
-
-  def testReadFlowResultsCorrectlyAppliesWithTagFilter(self):
-    pass
-
-  def testReadFlowResultsCorrectlyAppliesWithTypeFilter(self):
-    pass
-
-  def testReadFlowResultsCorrectlyAppliesWithSubstringFilter(self):
-    pass
-
-  def testReadFlowResultsCorrectlyAppliesVariousCombinationsOfFilters(self):
-    pass
-
-  def testReadFlowResultsReturnsPayloadWithMissingTypeAsSpecialValue(self):
-    pass
-
-  def testCountFlowResultsReturnsCorrectResultsCount(self):
-    pass
-
-  def testCountFlowResultsCorrectlyAppliesWithTagFilter(self):
-    pass
-
-  def testCountFlowResultsCorrectlyAppliesWithTypeFilter(self):
-    pass
-
-  def testCountFlowResultsCorrectlyAppliesWithTagAndWithTypeFilters(self):
-    pass
-
-  def testWritesAndReadsSingleFlowLogEntry(self):
-    pass
-
-  def testWritesAndReadsMultipleFlowLogEntries(self):
-    pass
-
-  def testReadFlowLogEntriesCorrectlyAppliesOffsetAndCountFilters(self):
-    pass
-
-  def testReadFlowLogEntriesCorrectlyAppliesWithSubstringFilter(self):
-    pass
-
-  def testReadFlowLogEntriesCorrectlyAppliesVariousCombinationsOfFilters(self):
-    pass
-
-  def testCountFlowLogEntriesReturnsCorrectFlowLogEntriesCount(self):
-    pass
-
   def testReadLatestPathInfosReturnsNothingForNonExistingPaths(self):
     pass
 
@@ -592,112 +505,6 @@ class TestMysqlDB(stats_test_lib.StatsTestMixin,
   def testDeleteStatsEntries_LowLimit(self):
     pass
 
-  # TODO(user): implement hunts support for MySQL
-  def testWritingAndReadingHuntObjectWorks(self):
-    pass
-
-  def testHuntObjectCanBeOverwritten(self):
-    pass
-
-  def testReadingNonExistentHuntObjectRaises(self):
-    pass
-
-  def testUpdateHuntObjectRaisesIfHuntDoesNotExist(self):
-    pass
-
-  def testUpdateHuntObjectCorrectlyUpdatesHuntObject(self):
-    pass
-
-  def testUpdateHuntObjectIsAtomic(self):
-    pass
-
-  def testUpdateHuntObjectPropagatesExceptions(self):
-    pass
-
-  def testReadAllHuntObjectsReturnsEmptyListWhenNoHunts(self):
-    pass
-
-  def testReadAllHuntObjectsReturnsAllWrittenObjects(self):
-    pass
-
-  def testReadHuntLogEntriesReturnsEntryFromSingleHuntFlow(self):
-    pass
-
-  def testReadHuntLogEntriesReturnsEntryFromMultipleHuntFlows(self):
-    pass
-
-  def testReadHuntLogEntriesCorrectlyAppliesOffsetAndCountFilters(self):
-    pass
-
-  def testReadHuntLogEntriesCorrectlyAppliesWithSubstringFilter(self):
-    pass
-
-  def testReadHuntLogEntriesCorrectlyAppliesCombinationOfFilters(self):
-    pass
-
-  def testCountHuntLogEntriesReturnsCorrectHuntLogEntriesCount(self):
-    pass
-
-  def testReadHuntResultsReadsSingleResultOfSingleType(self):
-    pass
-
-  def testReadHuntResultsReadsMultipleResultOfSingleType(self):
-    pass
-
-  def testReadHuntResultsReadsMultipleResultOfMultipleTypes(self):
-    pass
-
-  def testReadHuntResultsCorrectlyAppliedOffsetAndCountFilters(self):
-    pass
-
-  def testReadHuntResultsCorrectlyAppliesWithTagFilter(self):
-    pass
-
-  def testReadHuntResultsCorrectlyAppliesWithTypeFilter(self):
-    pass
-
-  def testReadHuntResultsCorrectlyAppliesWithSubstringFilter(self):
-    pass
-
-  def testReadHuntResultsCorrectlyAppliesVariousCombinationsOfFilters(self):
-    pass
-
-  def testReadHuntResultsReturnsPayloadWithMissingTypeAsSpecialValue(self):
-    pass
-
-  def testCountHuntResultsReturnsCorrectResultsCount(self):
-    pass
-
-  def testCountHuntResultsCorrectlyAppliesWithTagFilter(self):
-    pass
-
-  def testCountHuntResultsCorrectlyAppliesWithTypeFilter(self):
-    pass
-
-  def testCountHuntResultsCorrectlyAppliesWithTagAndWithTypeFilters(self):
-    pass
-
-  def testReadHuntFlowsReturnsEmptyListWhenNoFlows(self):
-    pass
-
-  def testReadHuntFlowsReturnsAllHuntFlowsWhenNoFilterCondition(self):
-    pass
-
-  def testReadHuntFlowsAppliesFilterConditionCorrectly(self):
-    pass
-
-  def testReadHuntFlowsCorrectlyAppliesOffsetAndCountFilters(self):
-    pass
-
-  def testCountHuntFlowsReturnsEmptyListWhenNoFlows(self):
-    pass
-
-  def testCountHuntFlowsReturnsAllHuntFlowsWhenNoFilterCondition(self):
-    pass
-
-  def testCountHuntFlowsAppliesFilterConditionCorrectly(self):
-    pass
-
   def testReadSignedBinaryReferences(self):
     pass
 
@@ -30,6 +30,32 @@ def IntToFlowID(flow_id):
   return "%08X" % flow_id
 
 
+def IsLegacyHuntID(hunt_id):
+  # Flows started by legacy (AFF4) hunts reference hunt ids of the form
+  # "H:<hex digits>".
+  return hunt_id.startswith("H:")
+
+
+def HuntIDToInt(hunt_id):
+  # Without their prefix, legacy hunt ids would map to the same values as
+  # relational ones, so they can't be stored in hunt id columns.
+  if IsLegacyHuntID(hunt_id):
+    raise ValueError("Legacy hunt id can't be stored as an int: %s" % hunt_id)
+  return int(hunt_id or "0", 16)
+
+
+def ParentHuntIDToInt(hunt_id):
+  # Only relational hunts are referenced by hunt id columns. Legacy hunts keep
+  # their flows' results and logs in AFF4 and are never looked up here.
+  if not hunt_id or IsLegacyHuntID(hunt_id):
+    return None
+  return HuntIDToInt(hunt_id)
+
+
+def IntToHuntID(hunt_id):
+  return "%08X" % hunt_id
+
+
 def StringToRDFProto(proto_type, value):
   return value if value is None else proto_type.FromSerializedString(value)
 
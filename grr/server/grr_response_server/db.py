@@ -13,6 +13,7 @@ from __future__ import division
 from __future__ import unicode_literals
 
 import abc
+import collections
 import re
 
 
@@ -266,6 +267,26 @@ class HuntFlowsCondition(object):
     return cls.FLOWS_WITH_RESULTS_ONLY
 
 
+HuntCounters = collections.namedtuple("HuntCounters", [
+    "num_successful_clients",
+    "num_failed_clients",
+    "num_crashed_clients",
+    "num_clients_with_results",
+    "num_results",
+    "total_user_cpu_seconds",
+    "total_system_cpu_seconds",
+    "total_network_bytes_sent",
+])
+
+# The position right after an item of a flow's results or log entries, used to
+# read the following page without skipping over all the items before it.
+# `item_id` breaks ties between items with the same timestamp. Its meaning is
+# up to the database implementation, so cursors are only ever passed back to
+# the database that returned them.
+FlowPageCursor = collections.namedtuple("FlowPageCursor",
+                                        ["timestamp", "item_id"])
+
+
 class ClientPath(object):
   """An immutable class representing certain path on a given client.
 
@@ -1805,6 +1826,29 @@ class Database(with_metaclass(abc.ABCMeta, object)):
       responses: List of rdf_flow_objects.FlowResponse rdfvalues to write.
     """
 
+  @abc.abstractmethod
+  def WriteFlowStateBatch(self,
+                          requests=None,
+                          responses=None,
+                          client_messages=None,
+                          requests_to_delete=None,
+                          results=None):
+    """Atomically applies a batch of flow state mutations.
+
+    This is equivalent to calling WriteFlowRequests, WriteFlowResponses,
+    WriteClientMessages, DeleteFlowRequests and WriteFlowResults (in that
+    order) with the given arguments, except that either all of the changes are
+    applied or none of them is.
+
+    Args:
+      requests: List of rdf_flow_objects.FlowRequest objects to write.
+      responses: List of rdf_flow_objects.FlowMessage objects to write.
+      client_messages: List of GrrMessage objects that should go to the client.
+      requests_to_delete: List of rdf_flow_objects.FlowRequest objects to
+        delete, together with all of their responses.
+      results: List of rdf_flow_objects.FlowResult objects to write.
+    """
+
   @abc.abstractmethod
   def ReadAllFlowRequestsAndResponses(self, client_id, flow_id):
     """Reads all requests and responses for a given flow from the database.
@@ -1932,6 +1976,42 @@ class Database(with_metaclass(abc.ABCMeta, object)):
       A list of FlowResult values sorted by timestamp in ascending order.
     """
 
+  @abc.abstractmethod
+  def ReadFlowResultsPage(self,
+                          client_id,
+                          flow_id,
+                          count,
+                          after=None,
+                          with_tag=None,
+                          with_type=None,
+                          with_substring=None):
+    """Reads a page of flow results that follows a given cursor.
+
+    Unlike `ReadFlowResults`, this doesn't skip over the results of earlier
+    pages, so reading a page takes the same time no matter how deep into the
+    results it is.
+
+    Args:
+      client_id: The client id on which this flow is running.
+      flow_id: The id of the flow to read results for.
+      count: Maximum number of results to read.
+      after: (Optional) A FlowPageCursor returned with the previous page. When
+        not specified, the first page is read.
+      with_tag: (Optional) When specified, should be a string. Only results
+        having specified tag will be returned.
+      with_type: (Optional) When specified, should be a string. Only results of
+        a specified type will be returned.
+      with_substring: (Optional) When specified, should be a string. Only
+        results having the specified string as a substring in their serialized
+        form will be returned.
+
+    Returns:
+      A tuple (results, cursor). `results` is a list of FlowResult values
+      sorted by timestamp in ascending order, `cursor` a FlowPageCursor to
+      read the following page with. If there are no results, the given cursor
+      is returned, so that results written later can be read with it.
+    """
+
   @abc.abstractmethod
   def CountFlowResults(self, client_id, flow_id, with_tag=None, with_type=None):
     """Counts flow results of a given flow using given query options.
@@ -1984,6 +2064,29 @@ class Database(with_metaclass(abc.ABCMeta, object)):
       A list of FlowLogEntry values sorted by timestamp in ascending order.
     """
 
+  @abc.abstractmethod
+  def ReadFlowLogEntriesPage(self,
+                             client_id,
+                             flow_id,
+                             count,
+                             after=None,
+                             with_substring=None):
+    """Reads a page of flow log entries that follows a given cursor.
+
+    Args:
+      client_id: The client id on which the flow is running.
+      flow_id: The id of the flow to read log entries for.
+      count: Maximum number of log entries to read.
+      after: (Optional) A FlowPageCursor returned with the previous page. When
+        not specified, the first page is read.
+      with_substring: (Optional) When specified, should be a string. Only log
+        entries having the specified string as a message substring will be
+        returned.
+
+    Returns:
+      A tuple (entries, cursor), see `ReadFlowResultsPage`.
+    """
+
   @abc.abstractmethod
   def CountFlowLogEntries(self, client_id, flow_id):
     """Returns number of flow log entries of a given flow.
@@ -2205,6 +2308,62 @@ class Database(with_metaclass(abc.ABCMeta, object)):
       A number of flows matching the specified condition.
     """
 
+  @abc.abstractmethod
+  def IncrementHuntCounters(self,
+                            hunt_id,
+                            num_successful_clients=0,
+                            num_failed_clients=0,
+                            num_crashed_clients=0,
+                            num_clients_with_results=0,
+                            num_results=0,
+                            client_resources=None):
+    """Increments progress counters of a given hunt.
+
+    Unlike UpdateHuntObject, this doesn't lock the hunt object, so it can be
+    called concurrently for every completed hunt flow. Counters are exposed
+    through ReadHuntCounters and are also reflected in num_* and
+    client_resources_stats fields of hunt objects returned by the database.
+
+    Args:
+      hunt_id: The id of the hunt to update counters for.
+      num_successful_clients: Number of clients that completed successfully.
+      num_failed_clients: Number of clients that failed.
+      num_crashed_clients: Number of clients that crashed.
+      num_clients_with_results: Number of clients that returned results.
+      num_results: Number of results written.
+      client_resources: (Optional) rdf_client_stats.ClientResources describing
+        resources used by a single completed client.
+
+    Raises:
+      UnknownHuntError: if there's no hunt with the corresponding id.
+    """
+
+  @abc.abstractmethod
+  def ReadHuntCounters(self, hunt_id):
+    """Reads progress counters of a given hunt.
+
+    Args:
+      hunt_id: The id of the hunt to read counters for.
+
+    Raises:
+      UnknownHuntError: if there's no hunt with the corresponding id.
+
+    Returns:
+      A HuntCounters object.
+    """
+
+  @abc.abstractmethod
+  def CompactHuntCounters(self, hunt_id):
+    """Compacts progress counters of a given hunt.
+
+    Counter increments may be spread over multiple storage locations to
+    avoid contention. Compaction merges them, so that reading the counters
+    stays cheap. Compaction doesn't change counter values.
+
+    Args:
+      hunt_id: The id of the hunt to compact counters for.
+    """
+
   @abc.abstractmethod
   def WriteSignedBinaryReferences(self, binary_id, references):
     """Writes blob references for a signed binary to the DB.
@@ -3036,6 +3195,37 @@ class DatabaseValidationWrapper(Database):
     precondition.AssertIterableType(responses, (rdf_flow_objects.FlowMessage))
     return self.delegate.WriteFlowResponses(responses)
 
+  def WriteFlowStateBatch(self,
+                          requests=None,
+                          responses=None,
+                          client_messages=None,
+                          requests_to_delete=None,
+                          results=None):
+    requests = requests or []
+    responses = responses or []
+    client_messages = client_messages or []
+    requests_to_delete = requests_to_delete or []
+    results = results or []
+
+    precondition.AssertIterableType(requests, rdf_flow_objects.FlowRequest)
+    precondition.AssertIterableType(responses, rdf_flow_objects.FlowMessage)
+    precondition.AssertIterableType(client_messages, rdf_flows.GrrMessage)
+    precondition.AssertIterableType(requests_to_delete,
+                                    rdf_flow_objects.FlowRequest)
+    for r in results:
+      precondition.AssertType(r, rdf_flow_objects.FlowResult)
+      _ValidateClientId(r.client_id)
+      _ValidateFlowId(r.flow_id)
+      if r.HasField("hunt_id") and r.hunt_id:
+        _ValidateHuntId(r.hunt_id)
+
+    return self.delegate.WriteFlowStateBatch(
+        requests=requests,
+        responses=responses,
+        client_messages=client_messages,
+        requests_to_delete=requests_to_delete,
+        results=results)
+
   def ReadAllFlowRequestsAndResponses(self, client_id, flow_id):
     _ValidateClientId(client_id)
     _ValidateFlowId(flow_id)
@@ -3112,6 +3302,30 @@ class DatabaseValidationWrapper(Database):
         with_type=with_type,
         with_substring=with_substring)
 
+  def ReadFlowResultsPage(self,
+                          client_id,
+                          flow_id,
+                          count,
+                          after=None,
+                          with_tag=None,
+                          with_type=None,
+                          with_substring=None):
+    _ValidateClientId(client_id)
+    _ValidateFlowId(flow_id)
+    precondition.AssertOptionalType(after, FlowPageCursor)
+    precondition.AssertOptionalType(with_tag, Text)
+    precondition.AssertOptionalType(with_type, Text)
+    precondition.AssertOptionalType(with_substring, Text)
+
+    return self.delegate.ReadFlowResultsPage(
+        client_id,
+        flow_id,
+        count,
+        after=after,
+        with_tag=with_tag,
+        with_type=with_type,
+        with_substring=with_substring)
+
   def CountFlowResults(
       self,
       client_id,
@@ -3150,6 +3364,20 @@ class DatabaseValidationWrapper(Database):
     return self.delegate.ReadFlowLogEntries(
         client_id, flow_id, offset, count, with_substring=with_substring)
 
+  def ReadFlowLogEntriesPage(self,
+                             client_id,
+                             flow_id,
+                             count,
+                             after=None,
+                             with_substring=None):
+    _ValidateClientId(client_id)
+    _ValidateFlowId(flow_id)
+    precondition.AssertOptionalType(after, FlowPageCursor)
+    precondition.AssertOptionalType(with_substring, Text)
+
+    return self.delegate.ReadFlowLogEntriesPage(
+        client_id, flow_id, count, after=after, with_substring=with_substring)
+
   def CountFlowLogEntries(self, client_id, flow_id):
     _ValidateClientId(client_id)
     _ValidateFlowId(flow_id)
@@ -3255,6 +3483,42 @@ class DatabaseValidationWrapper(Database):
     return self.delegate.CountHuntFlows(
         hunt_id, filter_condition=filter_condition)
 
+  def IncrementHuntCounters(self,
+                            hunt_id,
+                            num_successful_clients=0,
+                            num_failed_clients=0,
+                            num_crashed_clients=0,
+                            num_clients_with_results=0,
+                            num_results=0,
+                            client_resources=None):
+    _ValidateHuntId(hunt_id)
+    for value in [
+        num_successful_clients, num_failed_clients, num_crashed_clients,
+        num_clients_with_results, num_results
+    ]:
+      precondition.AssertType(value, int)
+      if value < 0:
+        raise ValueError("Hunt counters can't be decremented: %d" % value)
+    if client_resources is not None:
+      precondition.AssertType(client_resources,
+                              rdf_client_stats.ClientResources)
+    return self.delegate.IncrementHuntCounters(
+        hunt_id,
+        num_successful_clients=num_successful_clients,
+        num_failed_clients=num_failed_clients,
+        num_crashed_clients=num_crashed_clients,
+        num_clients_with_results=num_clients_with_results,
+        num_results=num_results,
+        client_resources=client_resources)
+
+  def ReadHuntCounters(self, hunt_id):
+    _ValidateHuntId(hunt_id)
+    return self.delegate.ReadHuntCounters(hunt_id)
+
+  def CompactHuntCounters(self, hunt_id):
+    _ValidateHuntId(hunt_id)
+    return self.delegate.CompactHuntCounters(hunt_id)
+
   def WriteSignedBinaryReferences(self, binary_id, references):
     precondition.AssertType(binary_id, rdf_objects.SignedBinaryID)
     precondition.AssertType(references, rdf_objects.BlobReferences)
@@ -60,6 +60,39 @@ class DatabaseTestBlobsMixin(object):
     result = d.ReadBlobs(blob_ids)
     self.assertEqual(result, dict(zip(blob_ids, blob_data)))
 
+  def testBlobLargerThanMaxPacketSizeCanBeWrittenAndThenRead(self):
+    d = self.db
+
+    blob_id = rdf_objects.BlobID(b"01234567" * 4)
+    blob_data = b"".join(b"%08d" % i for i in range(1024 * 1024))
+
+    d.WriteBlobs({blob_id: blob_data})
+
+    result = d.ReadBlobs([blob_id])
+    self.assertEqual(result, {blob_id: blob_data})
+
+  def testEmptyBlobCanBeWrittenAndThenRead(self):
+    d = self.db
+
+    blob_id = rdf_objects.BlobID.FromBlobData(b"")
+
+    d.WriteBlobs({blob_id: b""})
+
+    self.assertEqual(d.ReadBlobs([blob_id]), {blob_id: b""})
+    self.assertEqual(d.CheckBlobsExist([blob_id]), {blob_id: True})
+
+  def testWritingExistingBlobsAgainIsNoop(self):
+    d = self.db
+
+    blob_id = rdf_objects.BlobID(b"01234567" * 4)
+    blob_data = b"abcdef"
+
+    d.WriteBlobs({blob_id: blob_data})
+    d.WriteBlobs({blob_id: blob_data})
+
+    result = d.ReadBlobs([blob_id])
+    self.assertEqual(result, {blob_id: blob_data})
+
   def testCheckBlobsExistCorrectlyReportsPresentAndMissingBlobs(self):
     d = self.db
 
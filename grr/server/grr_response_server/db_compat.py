@@ -25,18 +25,20 @@ def IsLegacyHunt(hunt_id):
   return hunt_id.startswith("H:")
 
 
+def UpdateHuntResultCount(hunt_id, num_results):
+  """Accounts for results of a relational hunt that were already written."""
+
+  data_store.REL_DB.IncrementHuntCounters(hunt_id, num_results=num_results)
+  hunt_obj = data_store.REL_DB.ReadHuntObject(hunt_id)
+  hunt.StopHuntIfAverageLimitsExceeded(hunt_obj)
+
+
 def WriteHuntResults(client_id, hunt_id, responses):
   """Writes hunt results from a given client as part of a given hunt."""
 
   if not hunt.IsLegacyHunt(hunt_id):
     data_store.REL_DB.WriteFlowResults(responses)
-
-    def UpdateFn(hunt_obj):
-      hunt_obj.num_results += len(responses)
-      return hunt_obj
-
-    hunt_obj = data_store.REL_DB.UpdateHuntObject(hunt_id, UpdateFn)
-    hunt_obj = hunt.StopHuntIfAverageLimitsExceeded(hunt_obj)
+    UpdateHuntResultCount(hunt_id, len(responses))
     return
 
   hunt_id_urn = rdfvalue.RDFURN("hunts").Add(hunt_id)
@@ -69,13 +71,9 @@ def ProcessHuntFlowError(flow_obj,
   """Processes error and status message for a given hunt-induced flow."""
 
   if not hunt.IsLegacyHunt(flow_obj.parent_hunt_id):
-
-    def UpdateFn(hunt_obj):
-      hunt_obj.num_failed_clients += 1
-      return hunt_obj
-
-    hunt_obj = data_store.REL_DB.UpdateHuntObject(flow_obj.parent_hunt_id,
-                                                  UpdateFn)
+    data_store.REL_DB.IncrementHuntCounters(
+        flow_obj.parent_hunt_id, num_failed_clients=1)
+    hunt_obj = data_store.REL_DB.ReadHuntObject(flow_obj.parent_hunt_id)
     hunt_obj = hunt.StopHuntIfAverageLimitsExceeded(hunt_obj)
     return
 
@@ -111,17 +109,12 @@ def ProcessHuntFlowDone(flow_obj, status_msg=None):
             user_cpu_time=status_msg.cpu_time_used.user_cpu_time,
             system_cpu_time=status_msg.cpu_time_used.system_cpu_time),
         network_bytes_sent=status_msg.network_bytes_sent)
-
-    def UpdateFn(hunt_obj):
-      hunt_obj.num_successful_clients += 1
-      if flow_obj.num_replies_sent:
-        hunt_obj.num_clients_with_results += 1
-      hunt_obj.client_resources_stats.RegisterResources(resources)
-
-      return hunt_obj
-
-    hunt_obj = data_store.REL_DB.UpdateHuntObject(flow_obj.parent_hunt_id,
-                                                  UpdateFn)
+    data_store.REL_DB.IncrementHuntCounters(
+        flow_obj.parent_hunt_id,
+        num_successful_clients=1,
+        num_clients_with_results=int(bool(flow_obj.num_replies_sent)),
+        client_resources=resources)
+    hunt_obj = data_store.REL_DB.ReadHuntObject(flow_obj.parent_hunt_id)
     hunt_obj = hunt.StopHuntIfAverageLimitsExceeded(hunt_obj)
     hunt.CompleteHuntIfExpirationTimeReached(hunt_obj)
     return
@@ -169,13 +162,9 @@ def ProcessHuntClientCrash(flow_obj, client_crash_info):
   """Processes client crash triggerted by a given hunt-induced flow."""
 
   if not hunt.IsLegacyHunt(flow_obj.parent_hunt_id):
-
-    def UpdateFn(hunt_obj):
-      hunt_obj.num_crashed_clients += 1
-      return hunt_obj
-
-    hunt_obj = data_store.REL_DB.UpdateHuntObject(flow_obj.parent_hunt_id,
-                                                  UpdateFn)
+    data_store.REL_DB.IncrementHuntCounters(
+        flow_obj.parent_hunt_id, num_crashed_clients=1)
+    hunt_obj = data_store.REL_DB.ReadHuntObject(flow_obj.parent_hunt_id)
 
     if (hunt_obj.crash_limit and
         hunt_obj.num_crashed_clients > hunt_obj.crash_limit):
@@ -268,6 +268,18 @@ class DatabaseTestFlowMixin(object):
 
     self.assertEqual(read_flow_after_update.next_request_to_process, 5)
 
+  def testFlowOverwriteUpdatesParentHuntAndCrashInfo(self):
+    client_id, flow_id = self._SetupClientAndFlow()
+
+    rdf_flow = self.db.ReadFlowObject(client_id, flow_id)
+    rdf_flow.parent_hunt_id = u"ABCDEF12"
+    rdf_flow.client_crash_info = rdf_client.ClientCrash(crash_message="oh no")
+    self.db.WriteFlowObject(rdf_flow)
+
+    read_flow = self.db.ReadFlowObject(client_id, flow_id)
+    self.assertEqual(read_flow.client_crash_info.crash_message, "oh no")
+    self.assertEqual(self.db.CountHuntFlows(u"ABCDEF12"), 1)
+
   def testReadAllFlowObjects(self):
     client_id_1 = "C.1111111111111111"
     client_id_2 = "C.2222222222222222"
@@ -584,6 +596,71 @@ class DatabaseTestFlowMixin(object):
       self.assertCountEqual([req.request_id for req, _ in request_list],
                             [req.request_id for req in requests])
 
+  def testWriteFlowStateBatch(self):
+    client_id, flow_id = self._SetupClientAndFlow()
+
+    self.db.WriteFlowRequests([
+        rdf_flow_objects.FlowRequest(
+            client_id=client_id, flow_id=flow_id, request_id=request_id)
+        for request_id in [1, 2]
+    ])
+
+    msg = rdf_flows.GrrMessage(queue=client_id, generate_task_id=True)
+    results = self._SampleResults(client_id, flow_id)
+    self.db.WriteFlowStateBatch(
+        requests=[
+            rdf_flow_objects.FlowRequest(
+                client_id=client_id, flow_id=flow_id, request_id=3)
+        ],
+        responses=[
+            rdf_flow_objects.FlowResponse(
+                client_id=client_id,
+                flow_id=flow_id,
+                request_id=1,
+                response_id=1)
+        ],
+        client_messages=[msg],
+        requests_to_delete=[
+            rdf_flow_objects.FlowRequest(
+                client_id=client_id, flow_id=flow_id, request_id=2)
+        ],
+        results=results)
+
+    request_list = self.db.ReadAllFlowRequestsAndResponses(client_id, flow_id)
+    self.assertCountEqual([req.request_id for req, _ in request_list], [1, 3])
+    responses = dict(
+        (req.request_id, responses) for req, responses in request_list)
+    self.assertEqual(list(responses[1]), [1])
+    self.assertEqual(responses[3], {})
+
+    self.assertEqual(self.db.ReadClientMessages(client_id), [msg])
+    self.assertEqual(self.db.CountFlowResults(client_id, flow_id), len(results))
+
+  def testWriteFlowStateBatchIsAtomic(self):
+    client_id, flow_id = self._SetupClientAndFlow()
+
+    with self.assertRaises(db.AtLeastOneUnknownClientError):
+      self.db.WriteFlowStateBatch(
+          requests=[
+              rdf_flow_objects.FlowRequest(
+                  client_id=client_id, flow_id=flow_id, request_id=1)
+          ],
+          client_messages=[
+              rdf_flows.GrrMessage(
+                  queue=u"C.1234567890000000", generate_task_id=True)
+          ])
+
+    self.assertEqual(
+        self.db.ReadAllFlowRequestsAndResponses(client_id, flow_id), [])
+
+  def testWriteFlowStateBatchWithNothingToWrite(self):
+    client_id, flow_id = self._SetupClientAndFlow()
+
+    self.db.WriteFlowStateBatch()
+
+    self.assertEqual(
+        self.db.ReadAllFlowRequestsAndResponses(client_id, flow_id), [])
+
   def testResponsesForUnknownFlow(self):
     client_id = u"C.1234567890123456"
     flow_id = u"1234ABCD"
@@ -1217,6 +1294,16 @@ class DatabaseTestFlowMixin(object):
     self.assertLen(results, 1)
     self.assertEqual(results[0].payload, sample_result.payload)
 
+  def testWritesFlowResultsOfLegacyHunt(self):
+    client_id, flow_id = self._SetupClientAndFlow()
+    sample_results = self._SampleResults(client_id, flow_id, hunt_id="H:123456")
+
+    self.db.WriteFlowResults(sample_results)
+
+    results = self.db.ReadFlowResults(client_id, flow_id, 0, 100)
+    self.assertCountEqual([r.payload for r in results],
+                          [r.payload for r in sample_results])
+
   def testWritesAndReadsMultipleFlowResultsOfSingleType(self):
     client_id, flow_id = self._SetupClientAndFlow()
     sample_results = self._WriteFlowResults(
@@ -1306,6 +1393,79 @@ class DatabaseTestFlowMixin(object):
             "Results differ from expected (from %d, size %d): %s vs %s" %
             (i, l, result_payloads, expected_payloads))
 
+  def testReadFlowResultsPagesSequentiallyWhileResultsAreAdded(self):
+    client_id, flow_id = self._SetupClientAndFlow()
+    sample_results = self._WriteFlowResults(
+        self._SampleResults(client_id, flow_id), multiple_timestamps=True)
+
+    read = []
+    for offset in range(0, 6, 3):
+      read.extend(self.db.ReadFlowResults(client_id, flow_id, offset, 3))
+
+    more_results = self._WriteFlowResults(
+        self._SampleResults(client_id, flow_id), multiple_timestamps=True)
+    for offset in range(6, 20, 3):
+      read.extend(self.db.ReadFlowResults(client_id, flow_id, offset, 3))
+
+    self.assertEqual([r.payload for r in read],
+                     [r.payload for r in sample_results + more_results])
+
+    # Pages with a different set of filters are not affected by the above.
+    results = self.db.ReadFlowResults(
+        client_id, flow_id, 1, 3, with_tag="tag_1")
+    self.assertEqual([r.payload for r in results],
+                     [more_results[1].payload])
+
+  def _ReadAllPages(self, read_page, page_size):
+    items = []
+    after = None
+    while True:
+      page, after = read_page(page_size, after=after)
+      items.extend(page)
+      if len(page) < page_size:
+        return items, after
+
+  def testReadFlowResultsPage(self):
+    client_id, flow_id = self._SetupClientAndFlow()
+    sample_results = self._SampleResults(client_id, flow_id)
+    # The first results share their timestamp.
+    self.db.WriteFlowResults(sample_results[:5])
+    self._WriteFlowResults(sample_results[5:], multiple_timestamps=True)
+
+    def ReadPage(count, after=None):
+      return self.db.ReadFlowResultsPage(client_id, flow_id, count, after=after)
+
+    results, after = self._ReadAllPages(ReadPage, 3)
+    all_results = self.db.ReadFlowResults(client_id, flow_id, 0, 100)
+    self.assertEqual([r.payload for r in results],
+                     [r.payload for r in all_results])
+
+    # Results written later follow the cursor of the last page.
+    more_results = self._SampleResults(client_id, flow_id)[:2]
+    self.db.WriteFlowResults(more_results)
+    results, _ = ReadPage(3, after=after)
+    self.assertCountEqual([r.payload for r in results],
+                          [r.payload for r in more_results])
+
+  def testReadFlowResultsPageAppliesFilters(self):
+    client_id, flow_id = self._SetupClientAndFlow()
+    sample_results = self._WriteFlowResults(
+        self._SampleResults(client_id, flow_id), multiple_timestamps=True)
+
+    results, after = self.db.ReadFlowResultsPage(
+        client_id, flow_id, 10, with_tag="tag_1")
+    self.assertEqual([r.payload for r in results], [sample_results[1].payload])
+
+    results, next_after = self.db.ReadFlowResultsPage(
+        client_id, flow_id, 10, after=after, with_tag="tag_1")
+    self.assertEqual(results, [])
+    self.assertEqual(next_after, after)
+
+    results, _ = self.db.ReadFlowResultsPage(
+        client_id, flow_id, 10, with_type="ClientSummary",
+        with_substring="manufacturer_7")
+    self.assertEqual([r.payload for r in results], [sample_results[7].payload])
+
   def testReadFlowResultsCorrectlyAppliesWithTagFilter(self):
     client_id, flow_id = self._SetupClientAndFlow()
     sample_results = self._WriteFlowResults(
@@ -1546,6 +1706,28 @@ class DatabaseTestFlowMixin(object):
         entries = self.db.ReadFlowLogEntries(client_id, flow_id, i, size)
         self.assertEqual([e.message for e in entries], messages[i:i + size])
 
+  def testReadFlowLogEntriesPage(self):
+    client_id, flow_id = self._SetupClientAndFlow()
+    messages = self._WriteFlowLogEntries(client_id, flow_id)
+
+    def ReadPage(count, after=None):
+      return self.db.ReadFlowLogEntriesPage(
+          client_id, flow_id, count, after=after)
+
+    entries, after = self._ReadAllPages(ReadPage, 3)
+    self.assertEqual([e.message for e in entries], messages)
+
+    self.db.WriteFlowLogEntries([
+        rdf_flow_objects.FlowLogEntry(
+            client_id=client_id, flow_id=flow_id, message="foo")
+    ])
+    entries, _ = ReadPage(3, after=after)
+    self.assertEqual([e.message for e in entries], ["foo"])
+
+    entries, _ = self.db.ReadFlowLogEntriesPage(
+        client_id, flow_id, 3, with_substring="blah_1")
+    self.assertEqual([e.message for e in entries], [messages[1]])
+
   def testReadFlowLogEntriesCorrectlyAppliesWithSubstringFilter(self):
     client_id, flow_id = self._SetupClientAndFlow()
     messages = self._WriteFlowLogEntries(client_id, flow_id)
@@ -9,6 +9,7 @@ import threading
 
 from grr_response_core.lib import rdfvalue
 from grr_response_core.lib.rdfvalues import client as rdf_client
+from grr_response_core.lib.rdfvalues import client_stats as rdf_client_stats
 from grr_response_core.lib.util import compatibility
 from grr_response_server import db
 from grr_response_server import flow
@@ -720,6 +721,31 @@ class DatabaseTestHuntMixin(object):
 
     self.assertEqual(self.db.CountHuntFlows(hunt_obj.hunt_id), 2)
 
+  def testCountHuntFlowsReflectsFlowStateUpdates(self):
+    hunt_obj = rdf_hunt_objects.Hunt(description="foo")
+    self.db.WriteHuntObject(hunt_obj)
+
+    client_id, flow_id = self._SetupHuntClientAndFlow(
+        flow_state=rdf_flow_objects.Flow.FlowState.RUNNING,
+        hunt_id=hunt_obj.hunt_id)
+    self.assertEqual(
+        self.db.CountHuntFlows(
+            hunt_obj.hunt_id,
+            filter_condition=db.HuntFlowsCondition.FLOWS_IN_PROGRESS_ONLY), 1)
+
+    flow_obj = self.db.ReadFlowObject(client_id, flow_id)
+    flow_obj.flow_state = flow_obj.FlowState.FINISHED
+    self.db.UpdateFlow(client_id, flow_id, flow_obj=flow_obj)
+
+    self.assertEqual(
+        self.db.CountHuntFlows(
+            hunt_obj.hunt_id,
+            filter_condition=db.HuntFlowsCondition.FLOWS_IN_PROGRESS_ONLY), 0)
+    self.assertEqual(
+        self.db.CountHuntFlows(
+            hunt_obj.hunt_id,
+            filter_condition=db.HuntFlowsCondition.SUCCEEDED_FLOWS_ONLY), 1)
+
   def testCountHuntFlowsAppliesFilterConditionCorrectly(self):
     hunt_obj = rdf_hunt_objects.Hunt(description="foo")
     self.db.WriteHuntObject(hunt_obj)
@@ -732,3 +758,115 @@ class DatabaseTestHuntMixin(object):
           result, len(expected), "Result count does not match for "
           "(filter_condition=%d): %d vs %d" % (filter_condition, len(expected),
                                                result))
+
+  def testReadHuntCountersRaisesForUnknownHunt(self):
+    with self.assertRaises(db.UnknownHuntError):
+      self.db.ReadHuntCounters(rdf_hunt_objects.RandomHuntId())
+
+  def testIncrementHuntCountersRaisesForUnknownHunt(self):
+    with self.assertRaises(db.UnknownHuntError):
+      self.db.IncrementHuntCounters(
+          rdf_hunt_objects.RandomHuntId(), num_results=1)
+
+  def testReadHuntCountersReturnsZerosForNewHunt(self):
+    hunt_obj = rdf_hunt_objects.Hunt(description="foo")
+    self.db.WriteHuntObject(hunt_obj)
+
+    counters = self.db.ReadHuntCounters(hunt_obj.hunt_id)
+    self.assertEqual(counters, db.HuntCounters(0, 0, 0, 0, 0, 0, 0, 0))
+
+  def _IncrementSampleHuntCounters(self, hunt_id):
+    for i in range(10):
+      self.db.IncrementHuntCounters(
+          hunt_id,
+          num_successful_clients=1,
+          num_clients_with_results=i % 2,
+          num_results=i,
+          client_resources=rdf_client_stats.ClientResources(
+              client_id="C.%016X" % i,
+              cpu_usage=rdf_client_stats.CpuSeconds(
+                  user_cpu_time=i, system_cpu_time=2 * i),
+              network_bytes_sent=3 * i))
+    self.db.IncrementHuntCounters(hunt_id, num_failed_clients=2)
+    self.db.IncrementHuntCounters(hunt_id, num_crashed_clients=3)
+
+  def _CheckSampleHuntCounters(self, hunt_id):
+    counters = self.db.ReadHuntCounters(hunt_id)
+    self.assertEqual(counters.num_successful_clients, 10)
+    self.assertEqual(counters.num_failed_clients, 2)
+    self.assertEqual(counters.num_crashed_clients, 3)
+    self.assertEqual(counters.num_clients_with_results, 5)
+    self.assertEqual(counters.num_results, 45)
+    self.assertAlmostEqual(counters.total_user_cpu_seconds, 45)
+    self.assertAlmostEqual(counters.total_system_cpu_seconds, 90)
+    self.assertEqual(counters.total_network_bytes_sent, 135)
+
+    hunt_obj = self.db.ReadHuntObject(hunt_id)
+    self.assertEqual(hunt_obj.num_successful_clients, 10)
+    self.assertEqual(hunt_obj.num_failed_clients, 2)
+    self.assertEqual(hunt_obj.num_crashed_clients, 3)
+    self.assertEqual(hunt_obj.num_clients_with_results, 5)
+    self.assertEqual(hunt_obj.num_results, 45)
+
+    stats = hunt_obj.client_resources_stats
+    self.assertEqual(stats.user_cpu_stats.num, 10)
+    self.assertAlmostEqual(stats.user_cpu_stats.sum, 45)
+    self.assertAlmostEqual(stats.system_cpu_stats.sum, 90)
+    self.assertEqual(stats.network_bytes_sent_stats.sum, 135)
+    self.assertEqual(
+        sum(b.num for b in stats.user_cpu_stats.histogram.bins), 10)
+    self.assertLen(stats.worst_performers, 10)
+    self.assertEqual(stats.worst_performers[0].client_id, "C.0000000000000009")
+
+  def testIncrementHuntCountersIsReflectedInCountersAndHuntObject(self):
+    hunt_obj = rdf_hunt_objects.Hunt(description="foo")
+    self.db.WriteHuntObject(hunt_obj)
+
+    self._IncrementSampleHuntCounters(hunt_obj.hunt_id)
+    self._CheckSampleHuntCounters(hunt_obj.hunt_id)
+
+  def testCompactHuntCountersDoesNotChangeCounters(self):
+    hunt_obj = rdf_hunt_objects.Hunt(description="foo")
+    self.db.WriteHuntObject(hunt_obj)
+
+    self._IncrementSampleHuntCounters(hunt_obj.hunt_id)
+    self.db.CompactHuntCounters(hunt_obj.hunt_id)
+    self._CheckSampleHuntCounters(hunt_obj.hunt_id)
+
+    # Compacted counters can still be incremented.
+    self.db.IncrementHuntCounters(hunt_obj.hunt_id, num_results=5)
+    self.assertEqual(self.db.ReadHuntCounters(hunt_obj.hunt_id).num_results, 50)
+
+  def testHuntObjectUpdatesDoNotOverrideHuntCounters(self):
+    hunt_obj = rdf_hunt_objects.Hunt(description="foo")
+    self.db.WriteHuntObject(hunt_obj)
+
+    self.db.IncrementHuntCounters(hunt_obj.hunt_id, num_results=3)
+
+    def UpdateFn(h):
+      h.description = "bar"
+      return h
+
+    self.db.UpdateHuntObject(hunt_obj.hunt_id, UpdateFn)
+    self.db.IncrementHuntCounters(hunt_obj.hunt_id, num_results=4)
+
+    read_hunt_obj = self.db.ReadHuntObject(hunt_obj.hunt_id)
+    self.assertEqual(read_hunt_obj.description, "bar")
+    self.assertEqual(read_hunt_obj.num_results, 7)
+
+  def testIncrementHuntCountersIsAtomic(self):
+    hunt_obj = rdf_hunt_objects.Hunt(description="foo")
+    self.db.WriteHuntObject(hunt_obj)
+
+    def Run():
+      for _ in range(10):
+        self.db.IncrementHuntCounters(hunt_obj.hunt_id, num_results=1)
+
+    threads = [threading.Thread(target=Run) for _ in range(10)]
+    for t in threads:
+      t.start()
+    for t in threads:
+      t.join()
+
+    self.assertEqual(
+        self.db.ReadHuntCounters(hunt_obj.hunt_id).num_results, 100)
@@ -5,8 +5,9 @@ from __future__ import division
 from __future__ import unicode_literals
 
 import abc
+import bisect
+import collections
 import hashlib
-import io
 import os
 
 from future.utils import iteritems
@@ -16,6 +17,7 @@ from grr_response_core import config
 from grr_response_core.lib import utils
 from grr_response_core.lib.util import collection
 from grr_response_server import data_store
+from grr_response_server import threadpool
 from grr_response_server.rdfvalues import objects as rdf_objects
 
 
@@ -75,10 +77,59 @@ class CompositeExternalFileStore(ExternalFileStore):
 EXTERNAL_FILE_STORE = CompositeExternalFileStore()
 
 
-# TODO(user): this is a naive implementation as it reads one chunk
-# per REL_DB call. It has to be optimized.
+class _ChunkCache(utils.FastStore):
+  """LRU cache of blob contents bounded by the total number of bytes held."""
+
+  def __init__(self, max_bytes):
+    super(_ChunkCache, self).__init__(max_size=max_bytes)
+    self._total_bytes = 0
+
+  def KillObject(self, obj):
+    self._total_bytes -= len(obj)
+
+  @utils.Synchronized
+  def Put(self, key, obj):
+    node = self._hash.get(key)
+    if node:
+      self._total_bytes -= len(node.data)
+    self._total_bytes += len(obj)
+
+    return super(_ChunkCache, self).Put(key, obj)
+
+  @utils.Synchronized
+  def Expire(self):
+    """Expires least recently used blobs until the byte budget is met."""
+    while self._age and self._total_bytes > self._limit:
+      node = self._age.PopLeft()
+      self._hash.pop(node.key, None)
+      self.KillObject(node.data)
+
+  @property
+  def total_bytes(self):
+    return self._total_bytes
+
+
+_CHUNK_CACHE = None
+
+
+def _GetChunkCache():
+  """Returns a process-wide blob cache shared by all BlobStream objects."""
+  global _CHUNK_CACHE
+
+  if _CHUNK_CACHE is None:
+    _CHUNK_CACHE = _ChunkCache(config.CONFIG["Server.blob_stream_cache_size"])
+  return _CHUNK_CACHE
+
+
 class BlobStream(object):
-  """File-like object for reading from blobs."""
+  """File-like object for reading from blobs.
+
+  Blobs are fetched from the blob store in batches: whenever a blob is not
+  available locally, it is read together with up to
+  Server.blob_stream_read_ahead following blobs of the stream. Fetched blobs
+  are kept in a process-wide, byte-bounded LRU cache keyed by blob id, so
+  that streams opened for the same file share already read data.
+  """
 
   def __init__(self, client_path, blob_refs, hash_id):
     self._client_path = client_path
@@ -86,34 +137,69 @@ class BlobStream(object):
     self._hash_id = hash_id
 
     self._max_unbound_read = config.CONFIG["Server.max_unbound_read_size"]
+    self._read_ahead = max(1, config.CONFIG["Server.blob_stream_read_ahead"])
 
     self._offset = 0
     self._length = self._blob_refs[-1].offset + self._blob_refs[-1].size
+    self._ref_offsets = [ref.offset for ref in self._blob_refs]
 
-    self._current_ref = None
+    self._current_index = None
     self._current_chunk = None
+    # Blobs read by the last batch read. Kept separately from the shared
+    # cache so that read-ahead is effective even if the cache is disabled or
+    # under heavy contention.
+    self._prefetched = {}
+
+  def _FetchBlob(self, index):
+    """Returns contents of the blob referenced by self._blob_refs[index]."""
+    blob_id = self._blob_refs[index].blob_id
+
+    try:
+      return self._prefetched[blob_id]
+    except KeyError:
+      pass
+
+    cache = _GetChunkCache()
+    try:
+      return cache.Get(blob_id)
+    except KeyError:
+      pass
+
+    to_read = [blob_id]
+    for ref in self._blob_refs[index + 1:index + self._read_ahead]:
+      if ref.blob_id not in to_read and ref.blob_id not in cache:
+        to_read.append(ref.blob_id)
+
+    self._prefetched = {}
+    for k, v in iteritems(data_store.BLOBS.ReadBlobs(to_read)):
+      if v is None:
+        continue
+      self._prefetched[k] = v
+      cache.Put(k, v)
+
+    return self._prefetched.get(blob_id)
 
   def _GetChunk(self):
     """Fetches a chunk corresponding to the current offset."""
 
-    found_ref = None
-    for ref in self._blob_refs:
-      if self._offset >= ref.offset and self._offset < (ref.offset + ref.size):
-        found_ref = ref
-        break
+    if self._offset < 0 or self._offset >= self._length:
+      return None, None
 
-    if not found_ref:
+    index = bisect.bisect_right(self._ref_offsets, self._offset) - 1
+    if index < 0:
       return None, None
 
-    # If self._current_ref == found_ref, then simply return previously found
-    # chunk. Otherwise, update self._current_chunk value.
-    if self._current_ref != found_ref:
-      self._current_ref = found_ref
+    ref = self._blob_refs[index]
+    if self._offset >= ref.offset + ref.size:
+      return None, None
 
-      data = data_store.BLOBS.ReadBlobs([found_ref.blob_id])
-      self._current_chunk = data[found_ref.blob_id]
+    # If the index didn't change, then simply return previously found
+    # chunk. Otherwise, update self._current_chunk value.
+    if self._current_index != index:
+      self._current_index = index
+      self._current_chunk = self._FetchBlob(index)
 
-    return self._current_chunk, self._current_ref
+    return self._current_chunk, ref
 
   def Read(self, length=None):
     """Reads data."""
@@ -126,20 +212,50 @@ class BlobStream(object):
                                "Server.max_unbound_read_size is %d" %
                                (length, self._max_unbound_read))
 
-    result = io.BytesIO()
-    while result.tell() < length:
+    parts = []
+    remaining = length
+    while remaining > 0:
       chunk, ref = self._GetChunk()
       if not chunk:
         break
 
-      part = chunk[self._offset - ref.offset:]
+      start = self._offset - ref.offset
+      part = chunk[start:start + remaining]
       if not part:
         break
 
-      result.write(part)
-      self._offset += min(length, len(part))
+      parts.append(part)
+      self._offset += len(part)
+      remaining -= len(part)
+
+    return b"".join(parts)
+
+  def ReadInto(self, buf):
+    """Reads data directly into a writable buffer.
+
+    Args:
+      buf: A writable object supporting the buffer protocol (e.g. bytearray).
 
-    return result.getvalue()[:length]
+    Returns:
+      Number of bytes read. 0 means that the end of the stream was reached.
+    """
+    view = memoryview(buf)
+    count = 0
+    while count < len(view):
+      chunk, ref = self._GetChunk()
+      if not chunk:
+        break
+
+      start = self._offset - ref.offset
+      part = memoryview(chunk)[start:start + len(view) - count]
+      if not part:
+        break
+
+      view[count:count + len(part)] = part
+      self._offset += len(part)
+      count += len(part)
+
+    return count
 
   def Tell(self):
     """Returns current reading cursor position."""
@@ -159,6 +275,7 @@ class BlobStream(object):
       raise ValueError("Invalid whence argument: %s" % whence)
 
   read = utils.Proxy("Read")
+  readinto = utils.Proxy("ReadInto")
   tell = utils.Proxy("Tell")
   seek = utils.Proxy("Seek")
 
@@ -300,7 +417,17 @@ def OpenFile(client_path, max_timestamp=None):
   return BlobStream(client_path, blob_references, hash_id)
 
 
+# Maximum number of chunks read with a single ReadBlobs call.
 STREAM_CHUNKS_READ_AHEAD = 500
+# Maximum number of bytes read with a single ReadBlobs call.
+STREAM_CHUNKS_BATCH_BYTES = 32 * 1024 * 1024
+# Maximum number of ReadBlobs calls running concurrently. Together with
+# STREAM_CHUNKS_BATCH_BYTES this bounds the memory used by StreamFilesChunks.
+STREAM_CHUNKS_BATCHES_IN_FLIGHT = 4
+# Number of client paths for which blob references are resolved at once.
+STREAM_CHUNKS_PATHS_BATCH_SIZE = 1000
+
+_STREAM_CHUNKS_THREADPOOL_NAME = "StreamFilesChunks"
 
 
 class StreamedFileChunk(object):
@@ -327,9 +454,90 @@ class StreamedFileChunk(object):
     self.total_chunks = total_chunks
 
 
+def _GenerateChunkDescriptors(client_paths, max_timestamp=None,
+                              max_size=None):
+  """Lazily resolves blob references of given files.
+
+  Args:
+    client_paths: db.ClientPath objects describing paths to files.
+    max_timestamp: See StreamFilesChunks.
+    max_size: See StreamFilesChunks.
+
+  Yields:
+    Tuples (client_path, blob_ref, chunk_index, total_chunks, total_size) in
+    the client_paths order.
+  """
+  for cp_batch in collection.Batch(client_paths,
+                                   STREAM_CHUNKS_PATHS_BATCH_SIZE):
+    path_infos_by_cp = (
+        data_store.REL_DB.ReadLatestPathInfosWithHashBlobReferences(
+            cp_batch, max_timestamp=max_timestamp))
+
+    hash_ids_by_cp = {
+        cp: rdf_objects.SHA256HashID.FromBytes(pi.hash_entry.sha256.AsBytes())
+        for cp, pi in iteritems(path_infos_by_cp)
+        if pi
+    }
+
+    blob_refs_by_hash_id = data_store.REL_DB.ReadHashBlobReferences(
+        hash_ids_by_cp.values())
+
+    for cp in cp_batch:
+      try:
+        hash_id = hash_ids_by_cp[cp]
+      except KeyError:
+        continue
+
+      blob_refs = blob_refs_by_hash_id.get(hash_id)
+      if not blob_refs:
+        continue
+
+      num_blobs = len(blob_refs)
+      total_size = 0
+      for ref in blob_refs:
+        total_size += ref.size
+
+      cur_size = 0
+      for i, ref in enumerate(blob_refs):
+        yield cp, ref, i, num_blobs, total_size
+
+        cur_size += ref.size
+        if max_size is not None and cur_size >= max_size:
+          break
+
+
+def _BatchChunkDescriptors(descriptors):
+  """Groups chunk descriptors into batches bounded by count and size."""
+  batch = []
+  batch_bytes = 0
+  for descriptor in descriptors:
+    ref = descriptor[1]
+    if batch and (len(batch) >= STREAM_CHUNKS_READ_AHEAD or
+                  batch_bytes + ref.size > STREAM_CHUNKS_BATCH_BYTES):
+      yield batch
+      batch = []
+      batch_bytes = 0
+
+    batch.append(descriptor)
+    batch_bytes += ref.size
+
+  if batch:
+    yield batch
+
+
+def _ReadChunksBatch(batch):
+  return data_store.BLOBS.ReadBlobs(
+      set(ref.blob_id for _, ref, _, _, _ in batch))
+
+
 def StreamFilesChunks(client_paths, max_timestamp=None, max_size=None):
   """Streams contents of given files.
 
+  Blob references are resolved lazily and blobs are read in batches on a
+  thread pool, with up to STREAM_CHUNKS_BATCHES_IN_FLIGHT batches (each
+  holding at most STREAM_CHUNKS_BATCH_BYTES bytes) being read ahead of the
+  consumer.
+
   Args:
     client_paths: db.ClientPath objects describing paths to files.
     max_timestamp: If specified, then for every requested file will open the
@@ -345,47 +553,34 @@ def StreamFilesChunks(client_paths, max_timestamp=None, max_size=None):
     Files having no content will simply be ignored.
   """
 
-  path_infos_by_cp = (
-      data_store.REL_DB.ReadLatestPathInfosWithHashBlobReferences(
-          client_paths, max_timestamp=max_timestamp))
-
-  hash_ids_by_cp = {
-      cp: rdf_objects.SHA256HashID.FromBytes(pi.hash_entry.sha256.AsBytes())
-      for cp, pi in iteritems(path_infos_by_cp)
-      if pi
-  }
-
-  blob_refs_by_hash_id = data_store.REL_DB.ReadHashBlobReferences(
-      hash_ids_by_cp.values())
-
-  all_chunks = []
-  for cp in client_paths:
-    try:
-      hash_id = hash_ids_by_cp[cp]
-    except KeyError:
-      continue
-
-    try:
-      blob_refs = blob_refs_by_hash_id[hash_id]
-    except KeyError:
-      continue
-
-    num_blobs = len(blob_refs)
-    total_size = 0
-    for ref in blob_refs:
-      total_size += ref.size
-
-    cur_size = 0
-    for i, ref in enumerate(blob_refs):
-      all_chunks.append((cp, ref.blob_id, i, num_blobs, ref.offset, total_size))
-
-      cur_size += ref.size
-      if max_size is not None and cur_size >= max_size:
+  pool = threadpool.ThreadPool.Factory(
+      _STREAM_CHUNKS_THREADPOOL_NAME,
+      min_threads=1,
+      max_threads=STREAM_CHUNKS_BATCHES_IN_FLIGHT)
+  pool.Start()
+
+  batches = _BatchChunkDescriptors(
+      _GenerateChunkDescriptors(
+          client_paths, max_timestamp=max_timestamp, max_size=max_size))
+
+  in_flight = collections.deque()
+  while True:
+    while len(in_flight) < max(1, STREAM_CHUNKS_BATCHES_IN_FLIGHT):
+      try:
+        batch = next(batches)
+      except StopIteration:
         break
-
-  for batch in collection.Batch(all_chunks, STREAM_CHUNKS_READ_AHEAD):
-    blobs = data_store.BLOBS.ReadBlobs(
-        [blob_id for cp, blob_id, i, num_blobs, offset, total_size in batch])
-    for cp, blob_id, i, num_blobs, offset, total_size in batch:
-      yield StreamedFileChunk(cp, blobs[blob_id], i, num_blobs, offset,
+      in_flight.append((batch,
+                        pool.AddAsyncTask(
+                            target=_ReadChunksBatch,
+                            args=(batch,),
+                            name="ReadChunksBatch")))
+
+    if not in_flight:
+      break
+
+    batch, result = in_flight.popleft()
+    blobs = result.Get()
+    for cp, ref, i, num_blobs, total_size in batch:
+      yield StreamedFileChunk(cp, blobs[ref.blob_id], i, num_blobs, ref.offset,
                               total_size)
@@ -33,6 +33,7 @@ class BlobStreamTest(test_lib.GRRBaseTest):
     ]
     data_store.BLOBS.WriteBlobs(dict(zip(self.blob_ids, self.blob_data)))
 
+    file_store._GetChunkCache().Flush()  # pylint: disable=protected-access
     self.blob_stream = file_store.BlobStream(None, self.blob_refs, None)
 
   def testReadsFirstByte(self):
@@ -76,6 +77,51 @@ class BlobStreamTest(test_lib.GRRBaseTest):
       with self.assertRaises(file_store.OversizedReadError):
         self.blob_stream.read()
 
+  def testReadsIntoBuffer(self):
+    self.blob_stream.seek(self.blob_size - 1)
+    buf = bytearray(self.blob_size + 2)
+    self.assertEqual(self.blob_stream.readinto(buf), self.blob_size + 2)
+    self.assertEqual(bytes(buf), b"a" + b"b" * self.blob_size + b"c")
+    self.assertEqual(self.blob_stream.tell(), self.blob_size * 2 + 1)
+
+  def testReadIntoReturnsZeroAtTheEndOfStream(self):
+    self.blob_stream.seek(0, 2)
+    self.assertEqual(self.blob_stream.readinto(bytearray(10)), 0)
+
+  def testReadsAheadUsingSingleBlobStoreCall(self):
+    with test_lib.ConfigOverrider({"Server.blob_stream_read_ahead": 5}):
+      self.blob_stream = file_store.BlobStream(None, self.blob_refs, None)
+
+      with mock.patch.object(
+          data_store.BLOBS, "ReadBlobs",
+          wraps=data_store.BLOBS.ReadBlobs) as read_blobs_mock:
+        self.assertEqual(
+            self.blob_stream.read(self.blob_size * 5),
+            b"".join(self.blob_data[:5]))
+
+    self.assertEqual(read_blobs_mock.call_count, 1)
+
+  def testSharesCachedBlobsBetweenStreams(self):
+    self.blob_stream.read()
+
+    other_stream = file_store.BlobStream(None, self.blob_refs, None)
+    with mock.patch.object(data_store.BLOBS, "ReadBlobs") as read_blobs_mock:
+      self.assertEqual(other_stream.read(), b"".join(self.blob_data))
+
+    read_blobs_mock.assert_not_called()
+
+  def testChunkCacheRespectsByteBudget(self):
+    # pylint: disable=protected-access
+    cache = file_store._ChunkCache(self.blob_size * 2)
+    # pylint: enable=protected-access
+    for blob_id, blob_data in zip(self.blob_ids, self.blob_data):
+      cache.Put(blob_id, blob_data)
+
+    self.assertEqual(cache.total_bytes, self.blob_size * 2)
+    self.assertEqual(len(cache), 2)
+    self.assertIn(self.blob_ids[-1], cache)
+    self.assertNotIn(self.blob_ids[0], cache)
+
 
 class AddFileWithUnknownHashTest(test_lib.GRRBaseTest):
   """Tests for AddFileWithUnknownHash."""
@@ -413,6 +459,46 @@ class StreamFilesChunksTest(test_lib.GRRBaseTest):
     self.assertEqual(chunks[0].data, self.blob_data[0])
     self.assertEqual(chunks[1].data, self.blob_data[1])
 
+  @mock.patch.object(file_store, "STREAM_CHUNKS_READ_AHEAD", 1)
+  def testStreamsFilesInOrderWhenReadingSingleChunkBatches(self):
+    client_path_1 = db.ClientPath.OS(self.client_id, ("foo", "bar"))
+    self._WriteFile(client_path_1, (0, 3))
+
+    client_path_2 = db.ClientPath.OS(self.client_id_other, ("foo", "bar"))
+    self._WriteFile(client_path_2, (3, 6))
+
+    chunks = list(file_store.StreamFilesChunks([client_path_1, client_path_2]))
+    self.assertEqual([c.data for c in chunks], self.blob_data)
+    self.assertEqual([c.client_path for c in chunks],
+                     [client_path_1] * 3 + [client_path_2] * 3)
+
+  def testBoundsReadBlobsBatchesBySize(self):
+    client_path = db.ClientPath.OS(self.client_id, ("foo", "bar"))
+    self._WriteFile(client_path, (0, 6))
+
+    with mock.patch.object(file_store, "STREAM_CHUNKS_BATCH_BYTES",
+                           self.blob_size * 2):
+      with mock.patch.object(
+          data_store.BLOBS, "ReadBlobs",
+          wraps=data_store.BLOBS.ReadBlobs) as read_blobs_mock:
+        chunks = list(file_store.StreamFilesChunks([client_path]))
+
+    self.assertEqual([c.data for c in chunks], self.blob_data)
+    self.assertEqual(read_blobs_mock.call_count, 3)
+    for call_args in read_blobs_mock.call_args_list:
+      self.assertLen(call_args[0][0], 2)
+
+  @mock.patch.object(file_store, "STREAM_CHUNKS_PATHS_BATCH_SIZE", 1)
+  def testResolvesBlobReferencesInBatches(self):
+    client_path_1 = db.ClientPath.OS(self.client_id, ("foo", "bar"))
+    self._WriteFile(client_path_1, (0, 1))
+
+    client_path_2 = db.ClientPath.OS(self.client_id_other, ("foo", "bar"))
+    self._WriteFile(client_path_2, (1, 2))
+
+    chunks = list(file_store.StreamFilesChunks([client_path_1, client_path_2]))
+    self.assertEqual([c.data for c in chunks], self.blob_data[:2])
+
 
 def main(argv):
   # Run the full test suite
@@ -49,7 +49,6 @@ from __future__ import unicode_literals
 import logging
 
 
-from future.utils import itervalues
 from future.utils import with_metaclass
 
 from grr_response_core.lib import rdfvalue
@@ -990,7 +989,11 @@ class WellKnownFlow(GRRFlow):
   def GetAllWellKnownFlows(cls, token=None):
     """Get instances of all well known flows."""
     well_known_flows = {}
-    for cls in itervalues(registry.AFF4FlowRegistry.FLOW_REGISTRY):
+    # Modules with well known flows are never loaded lazily, so there is no
+    # need to import the lazily registered flows.
+    flow_classes = registry.GetLoadedClasses(
+        registry.AFF4FlowRegistry.FLOW_REGISTRY)
+    for cls in flow_classes:
       if issubclass(cls, WellKnownFlow) and cls.well_known_session_id:
         well_known_flow = cls(cls.well_known_session_id, mode="rw", token=token)
         well_known_flows[cls.well_known_session_id.FlowName()] = well_known_flow
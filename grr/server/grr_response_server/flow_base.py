@@ -604,40 +604,55 @@ class FlowBase(with_metaclass(registry.FlowRegistry, object)):
     return self.rdf_flow.response_count
 
   def FlushQueuedMessages(self):
-    # TODO(amoser): This could be done in a single db call, might be worth
-    # optimizing.
-
-    if self.flow_requests:
-      data_store.REL_DB.WriteFlowRequests(self.flow_requests)
-      self.flow_requests = []
-
-    if self.flow_responses:
-      data_store.REL_DB.WriteFlowResponses(self.flow_responses)
-      self.flow_responses = []
-
+    """Writes all queued flow state changes to the database."""
+    client_id = self.rdf_flow.client_id
+    fleetspeak_messages = []
+    client_messages = []
     if self.client_messages:
-      client_id = self.rdf_flow.client_id
       if fleetspeak_utils.IsFleetspeakEnabledClient(client_id):
-        for task in self.client_messages:
-          fleetspeak_utils.SendGrrMessageThroughFleetspeak(client_id, task)
+        fleetspeak_messages = self.client_messages
       else:
-        data_store.REL_DB.WriteClientMessages(self.client_messages)
-
-      self.client_messages = []
-
-    if self.completed_requests:
-      data_store.REL_DB.DeleteFlowRequests(self.completed_requests)
-      self.completed_requests = []
+        client_messages = self.client_messages
 
+    # For top-level hunt-induced flows, results are written to the hunt
+    # collection. Legacy hunts keep them in AFF4, so they can't be part of the
+    # relational batch below.
+    results = []
+    hunt_id = None
     if self.replies_to_write:
-      # For top-level hunt-induced flows, write results to the hunt collection.
       if self.rdf_flow.parent_hunt_id and not self.rdf_flow.parent_flow_id:
-        db_compat.WriteHuntResults(self.rdf_flow.client_id,
-                                   self.rdf_flow.parent_hunt_id,
-                                   self.replies_to_write)
+        hunt_id = self.rdf_flow.parent_hunt_id
+
+      if hunt_id is None or not db_compat.IsLegacyHunt(hunt_id):
+        results = self.replies_to_write
+
+    # All relational state changes go to the database in a single transaction.
+    if (self.flow_requests or self.flow_responses or client_messages or
+        self.completed_requests or results):
+      data_store.REL_DB.WriteFlowStateBatch(
+          requests=self.flow_requests,
+          responses=self.flow_responses,
+          client_messages=client_messages,
+          requests_to_delete=self.completed_requests,
+          results=results)
+
+    # Fleetspeak messages are only sent once the requests they belong to are
+    # stored, otherwise responses of fast clients would be dropped as replies
+    # to unknown requests.
+    for task in fleetspeak_messages:
+      fleetspeak_utils.SendGrrMessageThroughFleetspeak(client_id, task)
+
+    if hunt_id is not None:
+      if results:
+        db_compat.UpdateHuntResultCount(hunt_id, len(results))
       else:
-        data_store.REL_DB.WriteFlowResults(self.replies_to_write)
-      self.replies_to_write = []
+        db_compat.WriteHuntResults(client_id, hunt_id, self.replies_to_write)
+
+    self.flow_requests = []
+    self.flow_responses = []
+    self.client_messages = []
+    self.completed_requests = []
+    self.replies_to_write = []
 
   def _ProcessRepliesWithHuntOutputPlugins(self, replies):
     if db_compat.IsLegacyHunt(self.rdf_flow.parent_hunt_id):
@@ -800,11 +815,14 @@ def DualDBFlow(cls):
     raise ValueError("Flow mixin should have a name that ends in 'Mixin'.")
 
   flow_name = cls.__name__[:-5]
-  aff4_cls = type(flow_name, (cls, flow.GRRFlow), {})
+  # Both flows are reported as defined in the module of the mixin, so that
+  # they can be found (and lazily imported) through it.
+  aff4_cls = type(flow_name, (cls, flow.GRRFlow),
+                  {"__module__": cls.__module__})
   aff4_cls.__doc__ = cls.__doc__
   setattr(aff4_flows, flow_name, aff4_cls)
 
-  reldb_cls = type(flow_name, (cls, FlowBase), {})
+  reldb_cls = type(flow_name, (cls, FlowBase), {"__module__": cls.__module__})
   reldb_cls.__doc__ = cls.__doc__
   setattr(sys.modules[cls.__module__], flow_name, reldb_cls)
 
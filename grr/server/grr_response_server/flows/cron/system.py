@@ -691,3 +691,18 @@ class PurgeServerStatsCronJob(cronjobs.SystemCronJobBase):
         self.Log("Deleted %d stats entries.", total_entries_deleted)
         last_checkpoint = rdfvalue.RDFDatetime.Now()
       self.HeartBeat()  # Terminate cron-run if lifetime has been exceeded.
+
+
+class CompactHuntCountersCronJob(cronjobs.SystemCronJobBase):
+  """Cronjob that compacts progress counters of relational hunts."""
+
+  frequency = rdfvalue.Duration("10m")
+  lifetime = rdfvalue.Duration("10m")
+
+  def Run(self):
+    if not data_store.RelationalDBFlowsEnabled():
+      return
+
+    for hunt_obj in data_store.REL_DB.ReadAllHuntObjects():
+      data_store.REL_DB.CompactHuntCounters(hunt_obj.hunt_id)
+      self.HeartBeat()
@@ -4,9 +4,11 @@ from __future__ import absolute_import
 from __future__ import division
 from __future__ import unicode_literals
 
+import collections
 import stat
 
 from future.builtins import str
+from future.utils import iteritems
 
 from grr_response_core.lib import artifact_utils
 from grr_response_core.lib import rdfvalue
@@ -86,6 +88,12 @@ class FileFinderMixin(transfer.MultiGetFileLogic,
     # in unsuspected ways. Also, see the comment below.
     # TODO
     if self.args.HasField("conditions"):
+      type_enum = rdf_file_finder.FileFinderCondition.Type
+      for condition in self.args.conditions:
+        if condition.condition_type == type_enum.CONTENTS_MULTI_MATCH:
+          raise ValueError("Multi-pattern content matching is only supported "
+                           "by the client side file finder.")
+
       self.state.sorted_conditions = sorted(
           self.args.conditions, key=self._ConditionWeight)
     else:
@@ -347,7 +355,15 @@ class FileFinderMixin(transfer.MultiGetFileLogic,
 
 @flow_base.DualDBFlow
 class ClientFileFinderMixin(object):
-  """A client side file finder flow."""
+  """A client side file finder flow.
+
+  If the download action asks for it (`hash_first`), the client doesn't upload
+  file contents right away but only reports digests of all chunks of the files
+  it found. The flow then checks which chunks are already in the blob store
+  and requests only the missing ones. Chunks stored by an interrupted transfer
+  are found in the blob store the next time the file is collected, so they are
+  not sent again.
+  """
 
   friendly_name = "Client Side File Finder"
   category = "/Filesystem/"
@@ -363,6 +379,11 @@ class ClientFileFinderMixin(object):
 
     self.args.paths = list(self._InterpolatePaths(self.args.paths))
 
+    # Ids of files for which we wait for missing chunks, mapped to None or to
+    # the error that made their transfer fail.
+    self.state.pending_transfers = {}
+    self.state.next_transfer_id = 0
+
     self.CallClient(
         server_stubs.FileFinderOS, request=self.args, next_state="StoreResults")
 
@@ -375,12 +396,145 @@ class ClientFileFinderMixin(object):
       for path in artifact_utils.InterpolateKbAttributes(param_path, kb):
         yield path
 
+  def _HashFirst(self):
+    """Returns True if the client only sends digests of downloaded chunks."""
+    # Accessing unset nested fields would modify the flow arguments.
+    if not self.args.HasField("action"):
+      return False
+
+    action = self.args.action
+    action_type = rdf_file_finder.FileFinderAction.Action
+    return (action.action_type == action_type.DOWNLOAD and
+            action.HasField("download") and action.download.hash_first)
+
   def StoreResults(self, responses):
     """Stores the results returned by the client to the db."""
     if not responses.success:
       raise flow.FlowError(responses.status)
 
     self.state.files_found = len(responses)
+
+    if self._HashFirst():
+      results = []
+      hashed = []
+      for response in responses:
+        if response.HasField("transferred_file"):
+          hashed.append(response)
+        else:
+          results.append(response)
+
+      self._StoreResults(results)
+      self._FetchMissingChunks(hashed)
+    else:
+      self._StoreResults(responses)
+
+  def _FetchMissingChunks(self, responses):
+    """Requests chunks of hashed files that are not in the blob store yet.
+
+    Chunks with the same digest are requested only once, even if several files
+    (or several parts of one file) need them. Flow requests are processed in
+    the order they were made, so the result for a file is passed along with
+    the last chunk request it waits for and stored when that one is processed.
+
+    Args:
+      responses: `FileFinderResult` objects with descriptors of hashed chunks.
+    """
+    blob_ids = set()
+    for response in responses:
+      for chunk in response.transferred_file.chunks:
+        blob_ids.add(rdf_objects.BlobID.FromBytes(chunk.digest))
+
+    existing_blobs = {}
+    if blob_ids:
+      existing_blobs = data_store.BLOBS.CheckBlobsExist(blob_ids)
+
+    complete = []
+    # Chunk requests to make, keyed by the digest of the missing chunk.
+    chunk_requests = collections.OrderedDict()
+    for response in responses:
+      requests = []
+      for chunk in response.transferred_file.chunks:
+        if existing_blobs[rdf_objects.BlobID.FromBytes(chunk.digest)]:
+          continue
+
+        request = chunk_requests.get(chunk.digest)
+        if request is None:
+          request = dict(
+              index=len(chunk_requests),
+              chunk=chunk,
+              pathspec=response.stat_entry.pathspec,
+              transfer_ids=[],
+              results=[])
+          chunk_requests[chunk.digest] = request
+        requests.append(request)
+
+      if not requests:
+        complete.append(response)
+        continue
+
+      transfer_id = self.state.next_transfer_id
+      self.state.next_transfer_id += 1
+      self.state.pending_transfers[transfer_id] = None
+
+      for request in requests:
+        if transfer_id not in request["transfer_ids"]:
+          request["transfer_ids"].append(transfer_id)
+
+      last_request = max(requests, key=lambda request: request["index"])
+      last_request["results"].append([transfer_id, response])
+
+    for digest, request in iteritems(chunk_requests):
+      self.CallClient(
+          server_stubs.TransferBuffer,
+          pathspec=request["pathspec"],
+          offset=request["chunk"].offset,
+          length=request["chunk"].length,
+          next_state="ReceiveChunk",
+          request_data=dict(
+              digest=digest,
+              transfer_ids=request["transfer_ids"],
+              results=request["results"]))
+
+    self._StoreResults(complete)
+
+  def ReceiveChunk(self, responses):
+    """Checks a transferred chunk and stores files that are complete."""
+    if not responses.success:
+      error = responses.status
+    elif responses.First().data != responses.request_data["digest"]:
+      # Mixing chunks of different versions of the file would result in
+      # contents it never had.
+      error = "File has changed since it was hashed."
+    else:
+      error = None
+
+    if error is not None:
+      for transfer_id in responses.request_data["transfer_ids"]:
+        if self.state.pending_transfers[transfer_id] is None:
+          self.state.pending_transfers[transfer_id] = error
+
+    results = []
+    for transfer_id, response in responses.request_data["results"]:
+      error = self.state.pending_transfers.pop(transfer_id)
+      if error is None:
+        results.append(response)
+        continue
+
+      self.Log("Failed to transfer %s: %s",
+               response.stat_entry.pathspec.CollapsePath(), error)
+
+      # We still report the file, just without its contents.
+      result = response.Copy()
+      result.transferred_file = None
+      results.append(result)
+
+    self._StoreResults(results)
+
+  def _StoreResults(self, responses):
+    """Writes file finder results to the db and replies with them."""
+    if not responses:
+      return
+
     files_to_publish = []
     with data_store.DB.GetMutationPool() as pool:
       for response in responses:
@@ -402,6 +556,7 @@ class ClientFileFinderMixin(object):
   def _WriteFileContent(self, response, mutation_pool=None):
     """Writes file content to the db."""
     urn = response.stat_entry.pathspec.AFF4Path(self.client_urn)
+    chunks = sorted(response.transferred_file.chunks, key=lambda _: _.offset)
 
     if data_store.AFF4Enabled():
       with aff4.FACTORY.Create(
@@ -412,8 +567,6 @@ class ClientFileFinderMixin(object):
         filedesc.SetChunksize(response.transferred_file.chunk_size)
         filedesc.Set(filedesc.Schema.STAT, response.stat_entry)
 
-        chunks = sorted(
-            response.transferred_file.chunks, key=lambda _: _.offset)
         for chunk in chunks:
           filedesc.AddBlob(
               rdf_objects.BlobID.FromBytes(chunk.digest), chunk.length)
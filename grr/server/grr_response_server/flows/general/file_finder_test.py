@@ -14,6 +14,7 @@ import os
 from future.utils import itervalues
 
 from grr_response_client import vfs
+from grr_response_client.client_actions import standard
 from grr_response_core.lib import flags
 from grr_response_core.lib import rdfvalue
 from grr_response_core.lib import utils
@@ -1010,6 +1011,105 @@ class TestClientFileFinderFlow(flow_test_lib.FlowTestsBaseclass):
           os.path.join(temp_dirpath, "thud", "norf", "plugh")
       ])
 
+  def _RunHashFirstDownload(self, path, before_transfer=None):
+    """Runs a hash-first download.
+
+    Args:
+      path: The path of the file to download.
+      before_transfer: If set, called before every chunk transfer.
+
+    Returns:
+      A tuple with the flow results and the offsets of transferred chunks.
+    """
+    offsets = []
+    transfer_buffer = standard.TransferBuffer.Run
+
+    def TransferBufferRun(action, args):
+      offsets.append(args.offset)
+      if before_transfer is not None:
+        before_transfer()
+      return transfer_buffer(action, args)
+
+    with utils.Stubber(standard.TransferBuffer, "Run", TransferBufferRun):
+      session_id = flow_test_lib.TestFlowHelper(
+          file_finder.ClientFileFinder.__name__,
+          action_mocks.ClientFileFinderClientMock(),
+          client_id=self.client_id,
+          paths=[path],
+          pathtype=rdf_paths.PathSpec.PathType.OS,
+          action=rdf_file_finder.FileFinderAction.Download(
+              chunk_size=10, hash_first=True),
+          process_non_regular_files=True,
+          token=self.token)
+
+    results = flow_test_lib.GetFlowResults(self.client_id, session_id)
+    return results, offsets
+
+  def _ReadCollectedFile(self, path):
+    if data_store.RelationalDBReadEnabled(category="filestore"):
+      components = tuple(path.strip("/").split("/"))
+      fd = file_store.OpenFile(
+          db.ClientPath(
+              self.client_id.Basename(),
+              rdf_objects.PathInfo.PathType.OS,
+              components=components))
+    else:
+      urn = self.client_id.Add("fs/os").Add(path)
+      fd = aff4.FACTORY.Open(urn, token=self.token)
+    return fd.read()
+
+  def testClientFileFinderHashFirstDownload(self):
+    with temp.AutoTempFilePath() as temp_filepath:
+      with io.open(temp_filepath, "wb") as fd:
+        fd.write(b"a" * 10 + b"b" * 10 + b"c" * 5)
+
+      results, offsets = self._RunHashFirstDownload(temp_filepath)
+      self.assertLen(results, 1)
+      self.assertTrue(results[0].HasField("transferred_file"))
+      self.assertEqual(offsets, [0, 10, 20])
+      self.assertEqual(
+          self._ReadCollectedFile(temp_filepath),
+          b"a" * 10 + b"b" * 10 + b"c" * 5)
+
+      with io.open(temp_filepath, "wb") as fd:
+        fd.write(b"a" * 10 + b"x" * 10 + b"c" * 5)
+
+      # Only the chunk that has changed is transferred again.
+      results, offsets = self._RunHashFirstDownload(temp_filepath)
+      self.assertLen(results, 1)
+      self.assertTrue(results[0].HasField("transferred_file"))
+      self.assertEqual(offsets, [10])
+      self.assertEqual(
+          self._ReadCollectedFile(temp_filepath),
+          b"a" * 10 + b"x" * 10 + b"c" * 5)
+
+  def testClientFileFinderHashFirstDownloadTransfersEqualChunksOnce(self):
+    with temp.AutoTempFilePath() as temp_filepath:
+      with io.open(temp_filepath, "wb") as fd:
+        fd.write(b"q" * 10 + b"r" * 10 + b"q" * 10 + b"s" * 5)
+
+      results, offsets = self._RunHashFirstDownload(temp_filepath)
+      self.assertLen(results, 1)
+      self.assertEqual(offsets, [0, 10, 30])
+      self.assertEqual(
+          self._ReadCollectedFile(temp_filepath),
+          b"q" * 10 + b"r" * 10 + b"q" * 10 + b"s" * 5)
+
+  def testClientFileFinderHashFirstDownloadOfChangingFile(self):
+    with temp.AutoTempFilePath() as temp_filepath:
+      with io.open(temp_filepath, "wb") as fd:
+        fd.write(b"t" * 10 + b"u" * 10)
+
+      def ChangeFile():
+        with io.open(temp_filepath, "wb") as fd:
+          fd.write(b"v" * 20)
+
+      results, _ = self._RunHashFirstDownload(
+          temp_filepath, before_transfer=ChangeFile)
+      # The file is reported, but without contents mixed from both versions.
+      self.assertLen(results, 1)
+      self.assertFalse(results[0].HasField("transferred_file"))
+
   # TODO(hanuszczak): Similar function can be found in other modules. It should
   # be implemented once in the test library.
   def _Touch(self, filepath):
@@ -5,12 +5,14 @@ from __future__ import division
 from __future__ import unicode_literals
 
 import logging
-import zlib
 
 from builtins import range  # pylint: disable=redefined-builtin
+from builtins import zip  # pylint: disable=redefined-builtin
 from future.utils import iteritems
 from future.utils import itervalues
 
+from grr_response_core import config
+from grr_response_core.lib import compression
 from grr_response_core.lib import constants
 from grr_response_core.lib import rdfvalue
 from grr_response_core.lib.rdfvalues import client as rdf_client
@@ -21,6 +23,7 @@ from grr_response_core.lib.rdfvalues import flows as rdf_flows
 from grr_response_core.lib.rdfvalues import paths as rdf_paths
 from grr_response_core.lib.rdfvalues import protodict as rdf_protodict
 from grr_response_core.lib.rdfvalues import structs as rdf_structs
+from grr_response_core.stats import stats_collector_instance
 from grr_response_proto import flows_pb2
 from grr_response_server import aff4
 from grr_response_server import data_store
@@ -32,6 +35,7 @@ from grr_response_server import flow_base
 from grr_response_server import message_handlers
 from grr_response_server import notification
 from grr_response_server import server_stubs
+from grr_response_server import threadpool
 from grr_response_server.aff4_objects import aff4_grr
 from grr_response_server.aff4_objects import filestore as legacy_filestore
 from grr_response_server.rdfvalues import objects as rdf_objects
@@ -1034,12 +1038,118 @@ class GetMBRMixin(object):
       self.SendReply(rdfvalue.RDFBytes(mbr_data))
 
 
+_DECOMPRESSION_THREADPOOL_NAME = "BlobDecompression"
+
+
+def _DecompressDataBlob(data_blob):
+  """Returns (blob_id, data) for a given, possibly compressed, DataBlob."""
+  try:
+    data = compression.Decompress(data_blob.data, data_blob.compression)
+  except compression.UnsupportedCompressionError:
+    raise ValueError("Unsupported compression")
+
+  return rdf_objects.BlobID.FromBlobData(data), data
+
+
+def _DecompressDataBlobs(data_blobs):
+  """Decompresses and hashes given DataBlobs, in parallel if possible."""
+  if len(data_blobs) <= 1:
+    return [_DecompressDataBlob(data_blob) for data_blob in data_blobs]
+
+  pool = threadpool.ThreadPool.Factory(
+      _DECOMPRESSION_THREADPOOL_NAME,
+      min_threads=1,
+      max_threads=config.CONFIG["Server.blob_decompression_threads"])
+  pool.Start()
+
+  results = [
+      pool.AddAsyncTask(
+          target=_DecompressDataBlob,
+          args=(data_blob,),
+          name="DecompressDataBlob") for data_blob in data_blobs
+  ]
+  return [result.Get() for result in results]
+
+
+def _CountDeduplicatedBlobs(num_blobs, num_bytes):
+  """Accounts blobs (and their size as received) that were not written."""
+  if not num_blobs:
+    return
+
+  stats_collector_instance.Get().IncrementCounter(
+      "blob_handler_deduplicated_blobs", delta=num_blobs)
+  stats_collector_instance.Get().IncrementCounter(
+      "blob_handler_deduplicated_bytes", delta=num_bytes)
+
+
+def StoreDataBlobs(data_blobs):
+  """Writes contents of DataBlobs sent by clients to the blob store.
+
+  Blobs that are already present in the blob store are not written again.
+  If a DataBlob carries a digest of its uncompressed data and
+  Server.trust_client_blob_digests is set, blobs already present in the blob
+  store are skipped without being decompressed.
+
+  Args:
+    data_blobs: An iterable of rdf_protodict.DataBlob objects.
+  """
+  data_blobs = [data_blob for data_blob in data_blobs if data_blob.data]
+
+  to_decompress = data_blobs
+  if config.CONFIG["Server.trust_client_blob_digests"]:
+    claimed_ids = {}
+    for data_blob in data_blobs:
+      if len(data_blob.digest) == rdf_objects.BlobID.hash_id_length:
+        claimed_ids[id(data_blob)] = rdf_objects.BlobID.FromBytes(
+            data_blob.digest)
+
+    existing = {}
+    if claimed_ids:
+      existing = data_store.BLOBS.CheckBlobsExist(set(claimed_ids.values()))
+
+    to_decompress = []
+    skipped_count = 0
+    skipped_bytes = 0
+    for data_blob in data_blobs:
+      claimed_id = claimed_ids.get(id(data_blob))
+      if claimed_id is not None and existing[claimed_id]:
+        skipped_count += 1
+        skipped_bytes += len(data_blob.data)
+      else:
+        to_decompress.append(data_blob)
+
+    _CountDeduplicatedBlobs(skipped_count, skipped_bytes)
+
+  decompressed = _DecompressDataBlobs(to_decompress)
+  if not decompressed:
+    return
+
+  existing = data_store.BLOBS.CheckBlobsExist(
+      set(blob_id for blob_id, _ in decompressed))
+
+  to_write = {}
+  skipped_count = 0
+  skipped_bytes = 0
+  for data_blob, (blob_id, data) in zip(to_decompress, decompressed):
+    # Blobs sent more than once within a single batch are deduplicated too.
+    if existing[blob_id] or blob_id in to_write:
+      skipped_count += 1
+      skipped_bytes += len(data_blob.data)
+    else:
+      to_write[blob_id] = data
+
+  _CountDeduplicatedBlobs(skipped_count, skipped_bytes)
+
+  if to_write:
+    data_store.BLOBS.WriteBlobs(to_write)
+
+
 class TransferStore(flow.WellKnownFlow):
   """Store a buffer into a determined location."""
   well_known_session_id = rdfvalue.SessionID(flow_name="TransferStore")
 
   def ProcessMessages(self, msg_list):
-    blobs = []
+    data_blobs = []
     for message in msg_list:
       if (message.auth_state !=
           rdf_flows.GrrMessage.AuthorizationState.AUTHENTICATED):
@@ -1047,23 +1157,9 @@ class TransferStore(flow.WellKnownFlow):
                       message.source)
         continue
 
-      read_buffer = message.payload
-      data = read_buffer.data
-      if not data:
-        continue
+      data_blobs.append(message.payload)
 
-      if (read_buffer.compression ==
-          rdf_protodict.DataBlob.CompressionType.ZCOMPRESSION):
-        data = zlib.decompress(data)
-      elif (read_buffer.compression ==
-            rdf_protodict.DataBlob.CompressionType.UNCOMPRESSED):
-        pass
-      else:
-        raise ValueError("Unsupported compression")
-
-      blobs.append(data)
-
-    data_store.BLOBS.WriteBlobsWithUnknownHashes(blobs)
+    StoreDataBlobs(data_blobs)
 
   def ProcessMessage(self, message):
     """Write the blob into the AFF4 blob storage area."""
@@ -1076,24 +1172,7 @@ class BlobHandler(message_handlers.MessageHandler):
   handler_name = "BlobHandler"
 
   def ProcessMessages(self, msgs):
-    blobs = []
-    for msg in msgs:
-      blob = msg.request.payload
-      data = blob.data
-      if not data:
-        continue
-
-      ct = rdf_protodict.DataBlob.CompressionType
-      if blob.compression == ct.ZCOMPRESSION:
-        data = zlib.decompress(data)
-      elif blob.compression == ct.UNCOMPRESSED:
-        pass
-      else:
-        raise ValueError("Unsupported compression")
-
-      blobs.append(data)
-
-    data_store.BLOBS.WriteBlobsWithUnknownHashes(blobs)
+    StoreDataBlobs([msg.request.payload for msg in msgs])
 
 
 @flow_base.DualDBFlow
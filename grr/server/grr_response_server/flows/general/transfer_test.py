@@ -8,6 +8,7 @@ import hashlib
 import os
 import platform
 import unittest
+import zlib
 
 from builtins import range  # pylint: disable=redefined-builtin
 import mock
@@ -17,6 +18,7 @@ from grr_response_core.lib import flags
 from grr_response_core.lib import utils
 from grr_response_core.lib.rdfvalues import client as rdf_client
 from grr_response_core.lib.rdfvalues import paths as rdf_paths
+from grr_response_core.lib.rdfvalues import protodict as rdf_protodict
 from grr_response_core.lib.util import compatibility
 from grr_response_server import aff4
 from grr_response_server import data_store
@@ -29,6 +31,7 @@ from grr_response_server.rdfvalues import objects as rdf_objects
 from grr.test_lib import action_mocks
 from grr.test_lib import db_test_lib
 from grr.test_lib import flow_test_lib
+from grr.test_lib import stats_test_lib
 from grr.test_lib import test_lib
 
 # pylint:mode=test
@@ -650,6 +653,86 @@ class MultiGetFileFlowTest(CompareFDsMixin, flow_test_lib.FlowTestsBaseclass):
       self.assertIsInstance(blob_ref, rdf_objects.BlobReference)
 
 
+class BlobHandlerTest(stats_test_lib.StatsTestMixin, test_lib.GRRBaseTest):
+  """Tests for the BlobHandler message handler."""
+
+  def _Request(self, data, digest=None, compress=True):
+    ct = rdf_protodict.DataBlob.CompressionType
+    blob = rdf_protodict.DataBlob(
+        data=zlib.compress(data) if compress else data,
+        compression=ct.ZCOMPRESSION if compress else ct.UNCOMPRESSED)
+    if digest is not None:
+      blob.digest = digest
+
+    return rdf_objects.MessageHandlerRequest(
+        client_id="C.1000000000000000",
+        handler_name=transfer.BlobHandler.handler_name,
+        request_id=1,
+        request=blob)
+
+  def _ProcessMessages(self, requests):
+    transfer.BlobHandler(token=self.token).ProcessMessages(requests)
+
+  def testStoresCompressedAndUncompressedBlobs(self):
+    self._ProcessMessages(
+        [self._Request(b"foo"),
+         self._Request(b"bar", compress=False)])
+
+    for data in [b"foo", b"bar"]:
+      blob_id = rdf_objects.BlobID.FromBlobData(data)
+      self.assertEqual(data_store.BLOBS.ReadBlob(blob_id), data)
+
+  def testDoesNotRewriteExistingBlobs(self):
+    self._ProcessMessages([self._Request(b"foo")])
+
+    with mock.patch.object(data_store.BLOBS, "WriteBlobs") as write_mock:
+      with self.assertStatsCounterDelta(1, "blob_handler_deduplicated_blobs"):
+        self._ProcessMessages([self._Request(b"foo")])
+
+    write_mock.assert_not_called()
+
+  def testDeduplicatesBlobsWithinSingleBatch(self):
+    with mock.patch.object(
+        data_store.BLOBS, "WriteBlobs",
+        wraps=data_store.BLOBS.WriteBlobs) as write_mock:
+      with self.assertStatsCounterDelta(1, "blob_handler_deduplicated_blobs"):
+        self._ProcessMessages([self._Request(b"foo"), self._Request(b"foo")])
+
+    write_mock.assert_called_once()
+    self.assertLen(write_mock.call_args[0][0], 1)
+
+  def testSkipsDecompressionOfKnownBlobsWithClientDigest(self):
+    self._ProcessMessages([self._Request(b"foo")])
+
+    digest = hashlib.sha256(b"foo").digest()
+    with test_lib.ConfigOverrider({"Server.trust_client_blob_digests": True}):
+      with mock.patch.object(zlib, "decompress") as decompress_mock:
+        with self.assertStatsCounterDelta(1,
+                                          "blob_handler_deduplicated_blobs"):
+          self._ProcessMessages([self._Request(b"foo", digest=digest)])
+
+    decompress_mock.assert_not_called()
+
+  def testDecompressesKnownBlobsWithClientDigestByDefault(self):
+    self._ProcessMessages([self._Request(b"foo")])
+
+    digest = hashlib.sha256(b"foo").digest()
+    with mock.patch.object(
+        zlib, "decompress", wraps=zlib.decompress) as decompress_mock:
+      self._ProcessMessages([self._Request(b"foo", digest=digest)])
+
+    decompress_mock.assert_called_once()
+
+  def testStoresBlobWithIncorrectClientDigestUnderRealHash(self):
+    wrong_digest = hashlib.sha256(b"bar").digest()
+    self._ProcessMessages([self._Request(b"foo", digest=wrong_digest)])
+
+    blob_id = rdf_objects.BlobID.FromBlobData(b"foo")
+    self.assertEqual(data_store.BLOBS.ReadBlob(blob_id), b"foo")
+    self.assertFalse(
+        data_store.BLOBS.CheckBlobExists(rdf_objects.BlobID(wrong_digest)))
+
+
 def main(argv):
   # Run the full test suite
   test_lib.main(argv)
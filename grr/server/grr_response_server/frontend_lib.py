@@ -4,9 +4,13 @@ from __future__ import absolute_import
 from __future__ import division
 from __future__ import unicode_literals
 
+import hashlib
 import logging
+import mmap
 import operator
+import struct
 import time
+import zlib
 
 
 from future.utils import iteritems
@@ -18,6 +22,7 @@ from grr_response_core.lib import rdfvalue
 from grr_response_core.lib import utils
 from grr_response_core.lib.rdfvalues import client as rdf_client
 from grr_response_core.lib.rdfvalues import client_network as rdf_client_network
+from grr_response_core.lib.rdfvalues import crypto as rdf_crypto
 from grr_response_core.lib.rdfvalues import flows as rdf_flows
 from grr_response_core.lib.util import collection
 from grr_response_core.lib.util import random
@@ -37,15 +42,111 @@ from grr_response_server.rdfvalues import flow_objects as rdf_flow_objects
 from grr_response_server.rdfvalues import objects as rdf_objects
 
 
+class SharedPublicKeyCache(object):
+  """A cache of client public keys shared by forked frontend processes.
+
+  Entries live in an anonymous shared memory mapping. If the cache is created
+  before the frontend forks its worker processes, a key fetched from the
+  database by one worker is visible to all of them.
+
+  The cache is direct-mapped: every common name maps to a single fixed-size
+  slot and a new entry simply replaces whatever was stored there. Slots are
+  written without any locking, a checksum over the slot contents makes sure
+  that entries being overwritten concurrently are read as misses.
+  """
+
+  SLOT_SIZE = 1024
+
+  # Checksum, key length, value length.
+  _SLOT_HEADER = struct.Struct("<IHH")
+
+  def __init__(self, size):
+    self.size = size
+    self._mmap = mmap.mmap(-1, size * self.SLOT_SIZE)
+
+  def _SlotOffset(self, key):
+    digest = hashlib.md5(key).digest()
+    index = struct.unpack("<Q", digest[:8])[0] % self.size
+    return index * self.SLOT_SIZE
+
+  def Get(self, key):
+    """Returns the serialized public key stored for the given common name.
+
+    Args:
+      key: A client common name.
+
+    Returns:
+      The serialized public key.
+
+    Raises:
+      KeyError: If the key is not in the cache.
+    """
+    key = utils.SmartStr(key)
+    offset = self._SlotOffset(key)
+    header_end = offset + self._SLOT_HEADER.size
+    checksum, key_len, value_len = self._SLOT_HEADER.unpack(
+        self._mmap[offset:header_end])
+    if not key_len or key_len + value_len > self.SLOT_SIZE:
+      raise KeyError(key)
+
+    data = self._mmap[header_end:header_end + key_len + value_len]
+    if (zlib.crc32(data) & 0xffffffff != checksum or
+        data[:key_len] != key):
+      raise KeyError(key)
+
+    return data[key_len:]
+
+  def Put(self, key, value):
+    """Stores a serialized public key for the given common name."""
+    key = utils.SmartStr(key)
+    data = key + value
+    if self._SLOT_HEADER.size + len(data) > self.SLOT_SIZE:
+      # Keys this large are not expected, we just don't share them.
+      return
+
+    checksum = zlib.crc32(data) & 0xffffffff
+    slot = self._SLOT_HEADER.pack(checksum, len(key), len(value)) + data
+    offset = self._SlotOffset(key)
+    self._mmap[offset:offset + len(slot)] = slot
+
+
+def _ReadSharedPublicKey(shared_key_cache, common_name):
+  """Returns a public key from the shared cache or None if it's not there."""
+  if shared_key_cache is None:
+    return None
+
+  try:
+    serialized_key = shared_key_cache.Get(common_name)
+  except KeyError:
+    return None
+
+  stats_collector_instance.Get().IncrementCounter(
+      "grr_pub_key_cache", fields=["shared_hits"])
+  return rdf_crypto.RSAPublicKey.FromSerializedString(serialized_key)
+
+
+def _WriteSharedPublicKey(shared_key_cache, common_name, pub_key):
+  if shared_key_cache is not None:
+    shared_key_cache.Put(common_name, pub_key.SerializeToString())
+
+
 class ServerCommunicator(communicator.Communicator):
   """A communicator which stores certificates using AFF4."""
 
-  def __init__(self, certificate, private_key, token=None):
+  def __init__(self,
+               certificate,
+               private_key,
+               token=None,
+               shared_key_cache=None):
     self.client_cache = utils.FastStore(1000)
     self.token = token
     super(ServerCommunicator, self).__init__(
         certificate=certificate, private_key=private_key)
     self.pub_key_cache = utils.FastStore(max_size=50000)
+    self.shared_key_cache = shared_key_cache
+    self.outbound_cipher_cache = utils.AgeBasedCache(
+        max_size=config.CONFIG["Frontend.outbound_cipher_cache_size"],
+        max_age=config.CONFIG["Frontend.outbound_cipher_cache_max_age"])
     # Our common name as an RDFURN.
     self.common_name = rdfvalue.RDFURN(self.certificate.GetCN())
 
@@ -60,6 +161,11 @@ class ServerCommunicator(communicator.Communicator):
       stats_collector_instance.Get().IncrementCounter(
           "grr_pub_key_cache", fields=["misses"])
 
+    pub_key = _ReadSharedPublicKey(self.shared_key_cache, common_name)
+    if pub_key is not None:
+      self.pub_key_cache.Put(common_name, pub_key)
+      return pub_key
+
     # Fetch the client's cert and extract the key.
     client = aff4.FACTORY.Create(
         common_name,
@@ -81,6 +187,7 @@ class ServerCommunicator(communicator.Communicator):
 
     pub_key = cert.GetPublicKey()
     self.pub_key_cache.Put(common_name, pub_key)
+    _WriteSharedPublicKey(self.shared_key_cache, common_name, pub_key)
     return pub_key
 
   def VerifyMessageSignature(self, response_comms, packed_message_list, cipher,
@@ -195,10 +302,14 @@ class ServerCommunicator(communicator.Communicator):
 class RelationalServerCommunicator(communicator.Communicator):
   """A communicator which stores certificates using the relational db."""
 
-  def __init__(self, certificate, private_key):
+  def __init__(self, certificate, private_key, shared_key_cache=None):
     super(RelationalServerCommunicator, self).__init__(
         certificate=certificate, private_key=private_key)
     self.pub_key_cache = utils.FastStore(max_size=50000)
+    self.shared_key_cache = shared_key_cache
+    self.outbound_cipher_cache = utils.AgeBasedCache(
+        max_size=config.CONFIG["Frontend.outbound_cipher_cache_size"],
+        max_age=config.CONFIG["Frontend.outbound_cipher_cache_max_age"])
     self.common_name = self.certificate.GetCN()
 
   def _GetRemotePublicKey(self, common_name):
@@ -213,6 +324,11 @@ class RelationalServerCommunicator(communicator.Communicator):
       stats_collector_instance.Get().IncrementCounter(
           "grr_pub_key_cache", fields=["misses"])
 
+    pub_key = _ReadSharedPublicKey(self.shared_key_cache, remote_client_id)
+    if pub_key is not None:
+      self.pub_key_cache.Put(remote_client_id, pub_key)
+      return pub_key
+
     try:
       md = data_store.REL_DB.ReadClientMetadata(remote_client_id)
     except db.UnknownClientError:
@@ -225,7 +341,8 @@ class RelationalServerCommunicator(communicator.Communicator):
       raise communicator.UnknownClientCertError("Stored cert mismatch")
 
     pub_key = cert.GetPublicKey()
-    self.pub_key_cache.Put(common_name, pub_key)
+    self.pub_key_cache.Put(remote_client_id, pub_key)
+    _WriteSharedPublicKey(self.shared_key_cache, remote_client_id, pub_key)
     return pub_key
 
   def VerifyMessageSignature(self, response_comms, packed_message_list, cipher,
@@ -332,7 +449,8 @@ class FrontEndServer(object):
                private_key,
                max_queue_size=50,
                message_expiry_time=120,
-               max_retransmission_time=10):
+               max_retransmission_time=10,
+               shared_key_cache=None):
     # Identify ourselves as the server.
     self.token = access_control.ACLToken(
         username="GRRFrontEnd", reason="Implied.")
@@ -340,10 +458,15 @@ class FrontEndServer(object):
 
     if data_store.RelationalDBReadEnabled():
       self._communicator = RelationalServerCommunicator(
-          certificate=certificate, private_key=private_key)
+          certificate=certificate,
+          private_key=private_key,
+          shared_key_cache=shared_key_cache)
     else:
       self._communicator = ServerCommunicator(
-          certificate=certificate, private_key=private_key, token=self.token)
+          certificate=certificate,
+          private_key=private_key,
+          token=self.token,
+          shared_key_cache=shared_key_cache)
 
     self.message_expiry_time = message_expiry_time
     self.max_retransmission_time = max_retransmission_time
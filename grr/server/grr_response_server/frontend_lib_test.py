@@ -550,6 +550,45 @@ def MakeResponse(code=500, data=""):
   return response
 
 
+class SharedPublicKeyCacheTest(test_lib.GRRBaseTest):
+  """Tests for the memory-mapped public key cache."""
+
+  def testPutGet(self):
+    cache = frontend_lib.SharedPublicKeyCache(16)
+    cache.Put("C.1000000000000000", b"foo")
+    cache.Put("C.1000000000000001", b"bar")
+
+    self.assertEqual(cache.Get("C.1000000000000000"), b"foo")
+    self.assertEqual(cache.Get("C.1000000000000001"), b"bar")
+    with self.assertRaises(KeyError):
+      cache.Get("C.1000000000000002")
+
+  def testNewEntryReplacesEntryInTheSameSlot(self):
+    cache = frontend_lib.SharedPublicKeyCache(1)
+    cache.Put("C.1000000000000000", b"foo")
+    cache.Put("C.1000000000000001", b"bar")
+
+    with self.assertRaises(KeyError):
+      cache.Get("C.1000000000000000")
+    self.assertEqual(cache.Get("C.1000000000000001"), b"bar")
+
+  def testCorruptedEntryIsAMiss(self):
+    cache = frontend_lib.SharedPublicKeyCache(1)
+    cache.Put("C.1000000000000000", b"foo")
+    # Simulate a concurrent write that has only partially finished.
+    cache._mmap[10:11] = b"x"
+
+    with self.assertRaises(KeyError):
+      cache.Get("C.1000000000000000")
+
+  def testTooLargeEntriesAreNotStored(self):
+    cache = frontend_lib.SharedPublicKeyCache(16)
+    cache.Put("C.1000000000000000", b"x" * cache.SLOT_SIZE)
+
+    with self.assertRaises(KeyError):
+      cache.Get("C.1000000000000000")
+
+
 class ClientCommsTest(test_lib.GRRBaseTest):
   """Test the communicator."""
 
@@ -791,6 +830,51 @@ class ClientCommsTest(test_lib.GRRBaseTest):
     cn = rdf_client.ClientURN.FromPublicKey(csr.GetPublicKey())
     self.assertEqual(cn, csr.GetCN())
 
+  def _EncodeMessagesForClient(self):
+    message_list = rdf_flows.MessageList()
+    message_list.job.Append(name="OMG it's a string")
+
+    result = rdf_flows.ClientCommunication()
+    self.server_communicator.EncodeMessages(
+        message_list, result, destination=self.client_communicator.common_name)
+
+    decoded_messages, _, _ = self.client_communicator.DecryptMessage(
+        result.SerializeToString())
+    self.assertLen(decoded_messages, 1)
+    return result.encrypted_cipher
+
+  def testServerReusesOutboundCipherForTheSameClient(self):
+    self._MakeClientRecord()
+
+    encrypted_cipher = self._EncodeMessagesForClient()
+    self.assertEqual(self._EncodeMessagesForClient(), encrypted_cipher)
+
+    max_age = config.CONFIG["Frontend.outbound_cipher_cache_max_age"]
+    with test_lib.FakeTime(time.time() + max_age + 1):
+      self.assertNotEqual(self._EncodeMessagesForClient(), encrypted_cipher)
+
+  def testServerCommunicatorsShareClientPublicKeys(self):
+    self._MakeClientRecord()
+    shared_key_cache = frontend_lib.SharedPublicKeyCache(16)
+    self.server_communicator.shared_key_cache = shared_key_cache
+    self.ClientServerCommunicate()
+
+    # A new communicator (as used by another frontend process) should get the
+    # client's key from the shared cache instead of the data store.
+    self._SetupCommunicator()
+    self.server_communicator.shared_key_cache = shared_key_cache
+    shared_hits = stats_collector_instance.Get().GetMetricValue(
+        "grr_pub_key_cache", fields=["shared_hits"])
+
+    decoded_messages = self.ClientServerCommunicate()
+
+    self.assertEqual(
+        stats_collector_instance.Get().GetMetricValue(
+            "grr_pub_key_cache", fields=["shared_hits"]), shared_hits + 1)
+    for message in decoded_messages:
+      self.assertEqual(message.auth_state,
+                       rdf_flows.GrrMessage.AuthorizationState.AUTHENTICATED)
+
   def testServerKeyRotation(self):
     self._MakeClientRecord()
 
@@ -718,6 +718,9 @@ class ApiGetFlowFilesArchiveHandler(api_call_handler_base.ApiCallHandler):
 
   args_type = ApiGetFlowFilesArchiveArgs
 
+  # Number of flow results read from the database at once.
+  RESULTS_PAGE_SIZE = 1000
+
   def __init__(self, path_globs_blacklist=None, path_globs_whitelist=None):
     """Constructor.
 
@@ -801,9 +804,7 @@ class ApiGetFlowFilesArchiveHandler(api_call_handler_base.ApiCallHandler):
       flow_id = str(args.flow_id)
       flow_obj = data_store.REL_DB.ReadFlowObject(client_id, flow_id)
       flow_api_object = ApiFlow().InitFromFlowObject(flow_obj)
-      flow_results = data_store.REL_DB.ReadFlowResults(client_id, flow_id, 0,
-                                                       sys.maxsize)
-      flow_results = [r.payload for r in flow_results]
+      flow_results = self._GenerateFlowResults(client_id, flow_id)
       return flow_api_object, flow_results
     else:
       flow_urn = args.flow_id.ResolveClientFlowURN(args.client_id, token=token)
@@ -814,6 +815,18 @@ class ApiGetFlowFilesArchiveHandler(api_call_handler_base.ApiCallHandler):
       flow_results = flow.GRRFlow.ResultCollectionForFID(flow_urn)
       return flow_api_object, flow_results
 
+  def _GenerateFlowResults(self, client_id, flow_id):
+    """Yields payloads of all results of a flow, reading them page by page."""
+    after = None
+    while True:
+      results, after = data_store.REL_DB.ReadFlowResultsPage(
+          client_id, flow_id, self.RESULTS_PAGE_SIZE, after=after)
+      for result in results:
+        yield result.payload
+
+      if len(results) < self.RESULTS_PAGE_SIZE:
+        return
+
   def Handle(self, args, token=None):
     flow_api_object, flow_results = self._GetFlow(args, token)
 
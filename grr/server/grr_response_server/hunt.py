@@ -67,7 +67,17 @@ def IsLegacyHunt(hunt_id):
 
 
 def StopHuntIfAverageLimitsExceeded(hunt_obj):
-  """Stops the hunt if average limites are exceeded."""
+  """Stops the hunt if average limites are exceeded.
+
+  The progress fields of hunt objects are set from the hunt counters when
+  they are read from the database, so no further reads are needed here.
+
+  Args:
+    hunt_obj: A hunt object read after the hunt counters were last updated.
+
+  Returns:
+    The hunt object, updated if the hunt was stopped.
+  """
 
   # Do nothing if the hunt is already stopped.
   if hunt_obj.hunt_state == rdf_hunt_objects.Hunt.HuntState.STOPPED:
@@ -656,6 +656,39 @@ class HuntTest(db_test_lib.RelationalDBEnabledMixin,
       self._CheckHuntStoppedNotification(
           "reached the average CPU seconds per client")
 
+  def testAverageLimitsAreCheckedAgainstHuntObjectCounters(self):
+    client_ids = self.SetupClients(5)
+
+    hunt_id = self._CreateHunt(
+        client_rule_set=foreman_rules.ForemanClientRuleSet(),
+        client_rate=0,
+        avg_cpu_seconds_per_client_limit=1,
+        args=self.GetFileHuntArgs())
+
+    # Keep the hunt running while the clients report their resources.
+    with utils.Stubber(hunt, "MIN_CLIENTS_FOR_AVERAGE_THRESHOLDS", 10):
+      self._RunHunt(
+          client_ids,
+          client_mock=hunt_test_lib.SampleHuntMock(
+              user_cpu_time=1, system_cpu_time=2, failrate=-1))
+
+    hunt_obj = data_store.REL_DB.ReadHuntObject(hunt_id)
+    self.assertEqual(hunt_obj.hunt_state,
+                     rdf_hunt_objects.Hunt.HuntState.STARTED)
+
+    def ReadHuntCounters(hunt_id):
+      raise AssertionError("Hunt counters were read again for %s." % hunt_id)
+
+    with utils.MultiStubber(
+        (hunt, "MIN_CLIENTS_FOR_AVERAGE_THRESHOLDS", 5),
+        (data_store.REL_DB, "ReadHuntCounters", ReadHuntCounters)):
+      hunt_obj = hunt.StopHuntIfAverageLimitsExceeded(hunt_obj)
+
+    self.assertEqual(hunt_obj.hunt_state,
+                     rdf_hunt_objects.Hunt.HuntState.STOPPED)
+    self._CheckHuntStoppedNotification(
+        "reached the average CPU seconds per client")
+
   def testHuntIsStoppedIfAveragePerClientNetworkUsageTooHigh(self):
     client_ids = self.SetupClients(5)
 
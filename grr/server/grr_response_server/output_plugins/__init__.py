@@ -3,16 +3,3 @@
 from __future__ import absolute_import
 from __future__ import division
 from __future__ import unicode_literals
-
-from grr_response_server import output_plugin
-
-# pylint: disable=unused-import,g-import-not-at-top
-try:
-  from grr_response_server.output_plugins import bigquery_plugin
-except ImportError:
-  pass
-
-from grr_response_server.output_plugins import csv_plugin
-from grr_response_server.output_plugins import email_plugin
-from grr_response_server.output_plugins import sqlite_plugin
-from grr_response_server.output_plugins import yaml_plugin
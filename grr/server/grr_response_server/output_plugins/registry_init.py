@@ -0,0 +1,17 @@
+#!/usr/bin/env python
+"""Load all output plugins so that they are visible in the registry."""
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import unicode_literals
+
+# pylint: disable=unused-import,g-import-not-at-top
+# These imports populate the output plugin registry
+try:
+  from grr_response_server.output_plugins import bigquery_plugin
+except ImportError:
+  pass
+
+from grr_response_server.output_plugins import csv_plugin
+from grr_response_server.output_plugins import email_plugin
+from grr_response_server.output_plugins import sqlite_plugin
+from grr_response_server.output_plugins import yaml_plugin
@@ -0,0 +1,213 @@
+#!/usr/bin/env python
+"""Manifests of plugins that are imported when they are first used.
+
+Importing all flows and output plugins takes a large part of the start up time
+of server components, while most processes only ever use a few of them. A
+manifest lists the modules that still have to be imported on start up and, for
+all other plugin modules, the classes they register. These classes are added
+to the registries lazily and their modules are imported on first lookup.
+
+The manifest is written by `grr_config_updater build_plugin_manifest` and is
+used when its path is set in the GRR_PLUGIN_MANIFEST environment variable. It
+records a hash of the names of the installed plugin modules. If plugin modules
+were added or removed since the manifest was written, it is ignored and all
+plugins are imported as usual.
+"""
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import unicode_literals
+
+import hashlib
+import importlib
+import json
+import logging
+import os
+import pkgutil
+import sys
+
+from future.utils import itervalues
+
+from grr_response_core.lib import rdfvalue
+from grr_response_core.lib import registry
+from grr_response_server import flow
+
+# The config is not loaded yet when plugins are imported, so the manifest is
+# passed through the environment.
+MANIFEST_ENV_VARIABLE = "GRR_PLUGIN_MANIFEST"
+
+# Modules importing all modules with plugins that can be loaded lazily.
+_PLUGIN_REGISTRY_INITS = [
+    "grr_response_server.flows.cron.registry_init",
+    "grr_response_server.flows.general.registry_init",
+    "grr_response_server.output_plugins.registry_init",
+]
+
+_PLUGIN_PACKAGES = (
+    "grr_response_server.flows.cron.",
+    "grr_response_server.flows.general.",
+    "grr_response_server.output_plugins.",
+)
+
+
+def _IsPluginModule(module_name):
+  return (module_name.startswith(_PLUGIN_PACKAGES) and
+          not module_name.endswith("_test") and
+          not module_name.endswith(".registry_init"))
+
+
+def _PluginModulesHash():
+  """Returns a hash of the names of all installed plugin modules."""
+  module_names = []
+  for package_name in _PLUGIN_PACKAGES:
+    package = importlib.import_module(package_name.rstrip("."))
+    for _, module_name, is_package in pkgutil.iter_modules(
+        package.__path__, package_name):
+      if not is_package and _IsPluginModule(module_name):
+        module_names.append(module_name)
+
+  data = "\n".join(sorted(module_names)).encode("utf-8")
+  return hashlib.sha256(data).hexdigest()
+
+
+def _RegisteredClassesByModule():
+  """Returns classes of the named registries by the modules defining them.
+
+  Some classes are not attributes of the module defining them (e.g. the AFF4
+  flows created by `flow_base.DualDBFlow`), so they are only found here.
+
+  Returns:
+    A dict mapping module names to lists of classes.
+  """
+  result = {}
+  for classes in [
+      registry.AFF4FlowRegistry.FLOW_REGISTRY,
+      registry.FlowRegistry.FLOW_REGISTRY,
+      registry.OutputPluginRegistry.PLUGIN_REGISTRY,
+  ]:
+    for cls in registry.GetLoadedClasses(classes):
+      result.setdefault(cls.__module__, []).append(cls)
+  return result
+
+
+def _DefinedClasses(module, registered_classes):
+  """Returns all classes defined in a module."""
+  result = set(registered_classes.get(module.__name__, []))
+  for value in itervalues(vars(module)):
+    if isinstance(value, type) and value.__module__ == module.__name__:
+      result.add(value)
+  return result
+
+
+def _NeedsEagerImport(cls):
+  """Checks if a class has to exist before it is looked up by name."""
+  if issubclass(cls, registry.InitHook):
+    return True
+  if isinstance(cls, registry.EventRegistry) and cls.EVENTS:
+    return True
+  if isinstance(cls, registry.CronJobRegistry):
+    return True
+  # Well known flows are instantiated for all loaded classes on start up.
+  if issubclass(cls, flow.WellKnownFlow) and cls.well_known_session_id:
+    return True
+  # AFF4 attributes are also looked up by their names.
+  if "SchemaCls" in vars(cls):
+    return True
+  return False
+
+
+def BuildManifest():
+  """Builds a manifest of all plugin modules.
+
+  A module is loaded lazily only if all the classes it defines are either
+  plain classes or registered in registries that support lazy entries.
+
+  Returns:
+    A dict with the manifest, see `LoadManifest`.
+  """
+  for module_name in _PLUGIN_REGISTRY_INITS:
+    importlib.import_module(module_name)
+
+  registered_classes = _RegisteredClassesByModule()
+  eager_modules = []
+  lazy_classes = []
+  for module_name in sorted(sys.modules):
+    module = sys.modules[module_name]
+    if module is None or not _IsPluginModule(module_name):
+      continue
+
+    module_classes = []
+    eager = False
+    for cls in _DefinedClasses(module, registered_classes):
+      if not isinstance(cls, registry.MetaclassRegistry):
+        continue
+
+      if _NeedsEagerImport(cls):
+        eager = True
+        break
+
+      for registry_id in registry.GetRegistryIds(cls):
+        module_classes.append([registry_id, cls.__name__, module_name])
+
+    if eager or not module_classes:
+      eager_modules.append(module_name)
+    else:
+      lazy_classes.extend(sorted(module_classes))
+
+  return {
+      "eager_modules": eager_modules,
+      "lazy_classes": lazy_classes,
+      "plugin_modules_hash": _PluginModulesHash(),
+  }
+
+
+def WriteManifest(path):
+  with open(path, "w") as fd:
+    json.dump(BuildManifest(), fd, indent=2, sort_keys=True)
+
+
+def LoadManifest(manifest):
+  """Imports eager plugin modules and registers the lazy ones.
+
+  Args:
+    manifest: A dict with a list of `eager_modules` to import, a list of
+      `lazy_classes`, each a list with a registry id, class name and module
+      name, and the `plugin_modules_hash` of the modules it was built from.
+  """
+  for module_name in manifest["eager_modules"]:
+    importlib.import_module(module_name)
+
+  for registry_id, class_name, module_name in manifest["lazy_classes"]:
+    registry.AddLazyClass(registry_id, class_name, module_name)
+
+  # Fields of structs that are already defined can refer to lazy classes by
+  # name. These fields are only bound once the class is defined, so such
+  # classes are looked up (and imported) right away.
+  for name in rdfvalue.GetLateBoundNames():
+    rdfvalue.RDFValue.classes.get(name)
+
+  logging.debug("Imported %d plugin modules, %d plugin classes are lazy.",
+                len(manifest["eager_modules"]), len(manifest["lazy_classes"]))
+
+
+def LoadFromEnvironment():
+  """Loads the manifest from the environment.
+
+  Returns:
+    True if a manifest was loaded, False if the plugins have to be imported
+    as usual.
+  """
+  path = os.environ.get(MANIFEST_ENV_VARIABLE)
+  if not path:
+    return False
+
+  with open(path, "r") as fd:
+    manifest = json.load(fd)
+
+  if manifest.get("plugin_modules_hash") != _PluginModulesHash():
+    logging.warning(
+        "Plugin manifest %s doesn't match the installed plugin modules, "
+        "importing all plugins.", path)
+    return False
+
+  LoadManifest(manifest)
+  return True
@@ -0,0 +1,169 @@
+#!/usr/bin/env python
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import unicode_literals
+
+import json
+import os
+import subprocess
+import sys
+
+from future.utils import iteritems
+from future.utils import itervalues
+import mock
+
+from grr_response_core.lib import flags
+from grr_response_core.lib import registry
+from grr_response_server import aff4_flows
+from grr_response_server import flow
+from grr_response_server import plugin_manifest
+from grr.test_lib import temp
+from grr.test_lib import test_lib
+
+# Looks up flows in a new process in which the plugins are loaded through the
+# manifest, and prints the names that can't be found.
+_RESOLVE_FLOWS_SCRIPT = """
+import json
+import sys
+
+from grr_response_core.lib import registry
+from grr_response_server import server_plugins
+
+del server_plugins  # Unused.
+
+flow_names, aff4_flow_names = json.loads(sys.argv[1])
+unknown = []
+for registry_cls, names in [(registry.FlowRegistry, flow_names),
+                            (registry.AFF4FlowRegistry, aff4_flow_names)]:
+  for name in names:
+    try:
+      registry_cls.FlowClassByName(name)
+    except ValueError:
+      unknown.append(name)
+
+print(json.dumps({
+    "registry_init_imported":
+        "grr_response_server.flows.general.registry_init" in sys.modules,
+    "unknown": unknown,
+}))
+"""
+
+
+def _GeneralFlowNames(flow_registry):
+  return sorted(
+      name for name, cls in iteritems(flow_registry)
+      if cls.__module__.startswith("grr_response_server.flows.general."))
+
+
+class PluginManifestTest(test_lib.GRRBaseTest):
+
+  def setUp(self):
+    super(PluginManifestTest, self).setUp()
+    self.manifest = plugin_manifest.BuildManifest()
+    self.lazy_modules = set(
+        module_name for _, _, module_name in self.manifest["lazy_classes"])
+
+  def testCoversAllPluginModules(self):
+    eager_modules = set(self.manifest["eager_modules"])
+    self.assertFalse(eager_modules & self.lazy_modules)
+
+    plugin_modules = [
+        module_name for module_name in sys.modules
+        if module_name.startswith("grr_response_server.flows.general.") and
+        not module_name.endswith("_test") and
+        module_name != "grr_response_server.flows.general.registry_init"
+    ]
+    self.assertTrue(plugin_modules)
+    for module_name in plugin_modules:
+      self.assertIn(module_name, eager_modules | self.lazy_modules)
+
+  def testLazyClassesAreDefinedInTheirModules(self):
+    for registry_id, class_name, module_name in self.manifest["lazy_classes"]:
+      # AFF4 flows created by `DualDBFlow` are only attributes of aff4_flows.
+      candidates = [
+          getattr(sys.modules[module_name], class_name),
+          getattr(aff4_flows, class_name, None),
+      ]
+      self.assertTrue(
+          any(cls is not None and cls.__module__ == module_name and
+              registry_id in registry.GetRegistryIds(cls)
+              for cls in candidates))
+
+  def testDualDBFlowsAreLazy(self):
+    module_name = "grr_response_server.flows.general.network"
+    self.assertIn(["FlowRegistry", "Netstat", module_name],
+                  self.manifest["lazy_classes"])
+    self.assertIn(["AFF4FlowRegistry", "Netstat", module_name],
+                  self.manifest["lazy_classes"])
+
+  def testWellKnownFlowsAreNotLazy(self):
+    lazy_flow_names = set(
+        class_name
+        for registry_id, class_name, _ in self.manifest["lazy_classes"]
+        if registry_id == "AFF4FlowRegistry")
+
+    well_known_flows = [
+        cls for cls in itervalues(registry.AFF4FlowRegistry.FLOW_REGISTRY)
+        if issubclass(cls, flow.WellKnownFlow) and cls.well_known_session_id
+    ]
+    self.assertIn("Foreman", [cls.__name__ for cls in well_known_flows])
+    for cls in well_known_flows:
+      self.assertNotIn(cls.__name__, lazy_flow_names)
+      self.assertNotIn(cls.__module__, self.lazy_modules)
+
+  def testAllFlowsResolveWithManifest(self):
+    flow_names = _GeneralFlowNames(registry.FlowRegistry.FLOW_REGISTRY)
+    aff4_flow_names = _GeneralFlowNames(
+        registry.AFF4FlowRegistry.FLOW_REGISTRY)
+    self.assertIn("Netstat", flow_names)
+    self.assertIn("Netstat", aff4_flow_names)
+
+    with temp.AutoTempFilePath(suffix=".json") as path:
+      plugin_manifest.WriteManifest(path)
+
+      env = os.environ.copy()
+      env[str(plugin_manifest.MANIFEST_ENV_VARIABLE)] = str(path)
+      args = json.dumps([flow_names, aff4_flow_names])
+      output = subprocess.check_output(
+          [sys.executable, "-c", _RESOLVE_FLOWS_SCRIPT, args], env=env)
+
+    result = json.loads(output.decode("utf-8").splitlines()[-1])
+    self.assertFalse(result["registry_init_imported"])
+    self.assertEqual(result["unknown"], [])
+
+  def testWriteManifest(self):
+    with temp.AutoTempFilePath(suffix=".json") as path:
+      plugin_manifest.WriteManifest(path)
+
+      with open(path, "r") as fd:
+        self.assertEqual(json.load(fd), self.manifest)
+
+  def _LoadFromEnvironment(self, manifest):
+    with temp.AutoTempFilePath(suffix=".json") as path:
+      with open(path, "w") as fd:
+        json.dump(manifest, fd)
+
+      with mock.patch.dict(os.environ,
+                           {plugin_manifest.MANIFEST_ENV_VARIABLE: path}):
+        with mock.patch.object(plugin_manifest,
+                               "LoadManifest") as load_manifest:
+          loaded = plugin_manifest.LoadFromEnvironment()
+
+    return loaded, load_manifest
+
+  def testLoadFromEnvironment(self):
+    loaded, load_manifest = self._LoadFromEnvironment(self.manifest)
+
+    self.assertTrue(loaded)
+    load_manifest.assert_called_once_with(self.manifest)
+
+  def testOutdatedManifestIsIgnored(self):
+    self.manifest["plugin_modules_hash"] = "0" * 64
+    loaded, load_manifest = self._LoadFromEnvironment(self.manifest)
+
+    self.assertFalse(loaded)
+    self.assertFalse(load_manifest.called)
+
+
+if __name__ == "__main__":
+  flags.StartMain(test_lib.main)
@@ -48,6 +48,29 @@ def GetMetadata():
       stats_utils.CreateCounterMetadata(
           "db_request_errors", fields=[("call", str), ("type", str)]),
 
+      # Blob handling metrics.
+      stats_utils.CreateCounterMetadata(
+          "blob_handler_deduplicated_blobs",
+          docstring="Number of blobs received from clients that were already "
+          "stored."),
+      stats_utils.CreateCounterMetadata(
+          "blob_handler_deduplicated_bytes",
+          docstring="Number of bytes (as received from clients) of blobs that "
+          "were already stored.",
+          units="BYTES"),
+
+      # Flow processing queue metrics.
+      stats_utils.CreateEventMetadata(
+          "flow_processing_lease_latency",
+          docstring="Time needed to lease a batch of flow processing "
+          "requests.",
+          units="SECONDS"),
+      stats_utils.CreateGaugeMetadata(
+          "flow_processing_queue_depth",
+          int,
+          docstring="Number of leased flow processing requests that are "
+          "waiting for or being processed by the handler pool."),
+
       # Threadpool metrics.
       stats_utils.CreateGaugeMetadata(
           "threadpool_outstanding_tasks", int, fields=[("pool_name", str)]),
@@ -137,6 +160,8 @@ def GetMetadata():
           "frontend_request_count", fields=[("source", str)]),
       stats_utils.CreateCounterMetadata(
           "frontend_inactive_request_count", fields=[("source", str)]),
+      stats_utils.CreateCounterMetadata(
+          "frontend_overloaded_request_count", fields=[("source", str)]),
       stats_utils.CreateEventMetadata(
           "frontend_request_latency", fields=[("source", str)]),
       stats_utils.CreateEventMetadata("grr_frontendserver_handle_time"),
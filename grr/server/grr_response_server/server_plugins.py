@@ -23,14 +23,22 @@ from grr_response_server import hunts
 from grr_response_server import ip_resolver
 from grr_response_server import master
 from grr_response_server import output_plugin
-from grr_response_server import output_plugins
+from grr_response_server import plugin_manifest
 from grr_response_server import stats_server
 from grr_response_server import stats_store
 from grr_response_server.aff4_objects import registry_init
 from grr_response_server.blob_stores import registry_init
 from grr_response_server.data_stores import registry_init
-from grr_response_server.flows.cron import registry_init
-from grr_response_server.flows.general import registry_init
 from grr_response_server.flows.local import registry_init
 from grr_response_server.hunts import process_results
 from grr_response_server.local import registry_init
+
+# With a plugin manifest (see plugin_manifest.py) only the flow and output
+# plugin modules that are needed on start up are imported, others are imported
+# when their classes are first looked up.
+if not plugin_manifest.LoadFromEnvironment():
+  # pylint: disable=g-import-not-at-top
+  from grr_response_server.flows.cron import registry_init
+  from grr_response_server.flows.general import registry_init
+  from grr_response_server.output_plugins import registry_init
+  # pylint: enable=g-import-not-at-top
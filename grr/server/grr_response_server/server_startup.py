@@ -14,6 +14,7 @@ from grr_response_core import config
 from grr_response_core.lib import communicator
 from grr_response_core.lib import config_lib
 from grr_response_core.lib import registry
+from grr_response_core.lib import startup_profiler
 # pylint: disable=unused-import
 from grr_response_core.lib.local import plugins
 # pylint: enable=unused-import
@@ -98,4 +99,6 @@ def Init():
                          " initialize\". If the server is already configured,"
                          " add \"Server.initialized: True\" to your config.")
 
+  startup_profiler.LogReport()
+
   INIT_RAN = True
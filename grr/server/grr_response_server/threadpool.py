@@ -27,12 +27,14 @@ from __future__ import unicode_literals
 
 import itertools
 import logging
+import sys
 import threading
 import time
 
 
 from builtins import range  # pylint: disable=redefined-builtin
 from future.utils import itervalues
+from future.utils import raise_
 import psutil
 import queue
 
@@ -67,6 +69,52 @@ class Full(Error):
   """Raised when the threadpool is full."""
 
 
+class AsyncResultTimeoutError(Error):
+  """Raised when waiting for an asynchronous task result times out."""
+
+
+class AsyncResult(object):
+  """A handle to the result of a task scheduled with AddAsyncTask."""
+
+  def __init__(self):
+    self._done = threading.Event()
+    self._value = None
+    self._exc_info = None
+
+  def _Run(self, target, args):
+    try:
+      self._value = target(*args)
+    except Exception:  # pylint: disable=broad-except
+      self._exc_info = sys.exc_info()
+    finally:
+      self._done.set()
+
+  def Done(self):
+    """Returns True if the task has finished running."""
+    return self._done.is_set()
+
+  def Get(self, timeout=None):
+    """Waits for the task to finish and returns its result.
+
+    Args:
+      timeout: Number of seconds to wait for. If None, waits indefinitely.
+
+    Returns:
+      The value returned by the task.
+
+    Raises:
+      AsyncResultTimeoutError: if the task didn't finish within the timeout.
+      Exception: Any exception raised by the task is re-raised here.
+    """
+    if not self._done.wait(timeout):
+      raise AsyncResultTimeoutError("Task did not finish in time.")
+
+    if self._exc_info is not None:
+      raise_(*self._exc_info)
+
+    return self._value
+
+
 class _WorkerThread(threading.Thread):
   """The workers used in the ThreadPool class."""
 
@@ -452,6 +500,27 @@ class ThreadPool(object):
     if inline:
       target(*args)
 
+  def AddAsyncTask(self, target, args=(), name="Unnamed task"):
+    """Adds a task and returns a handle that can be used to get its result.
+
+    Unlike AddTask, exceptions raised by the task are not swallowed by the
+    worker, but are re-raised by AsyncResult.Get(). If the pool is full, the
+    task is run inline.
+
+    Args:
+      target: A callable which should be processed by one of the workers.
+      args: A tuple of arguments to target.
+      name: The name of this task. Used to identify tasks in the log.
+
+    Returns:
+      An AsyncResult object.
+    """
+    result = AsyncResult()
+    # pylint: disable=protected-access
+    self.AddTask(target=result._Run, args=(target, args), name=name)
+    # pylint: enable=protected-access
+    return result
+
   def CPUUsage(self):
     return self.process.cpu_percent(0)
 
@@ -165,6 +165,36 @@ class ThreadPoolTest(test_lib.GRRBaseTest):
         threadpool._TASK_EXCEPTIONS_METRIC, fields=[self.test_pool.name])
     self.assertEqual(exception_count, 2)
 
+  def testAsyncTaskReturnsResult(self):
+    results = [
+        self.test_pool.AddAsyncTask(target=lambda x: x * 2, args=(i,))
+        for i in range(10)
+    ]
+    self.assertEqual([r.Get(timeout=5) for r in results],
+                     [i * 2 for i in range(10)])
+
+  def testAsyncTaskReraisesException(self):
+
+    def Raise():
+      raise ValueError("Oops")
+
+    result = self.test_pool.AddAsyncTask(target=Raise)
+    with self.assertRaises(ValueError):
+      result.Get(timeout=5)
+
+  def testAsyncTaskGetTimesOut(self):
+    event = threading.Event()
+    result = self.test_pool.AddAsyncTask(target=event.wait)
+    try:
+      with self.assertRaises(threadpool.AsyncResultTimeoutError):
+        result.Get(timeout=0.1)
+      self.assertFalse(result.Done())
+    finally:
+      event.set()
+
+    result.Get(timeout=5)
+    self.assertTrue(result.Done())
+
   def testFailToCreateThread(self):
     """Test that we handle thread creation problems ok."""
     # The pool starts off with the minimum number of threads.
@@ -248,8 +248,8 @@ class ListProcessesMock(FileFinderClientMock):
 class ClientFileFinderClientMock(ActionMock):
 
   def __init__(self, *args, **kwargs):
-    super(ClientFileFinderClientMock, self).__init__(file_finder.FileFinderOS,
-                                                     *args, **kwargs)
+    super(ClientFileFinderClientMock, self).__init__(
+        file_finder.FileFinderOS, standard.TransferBuffer, *args, **kwargs)
 
 
 class MultiGetFileClientMock(ActionMock):